@@ -16,9 +16,20 @@ if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
 
 # Sentinela
-from ops.boot_sentinel import read_state, write_state, from_exception
+from ops.boot_sentinel import (
+    read_state, write_state, from_exception,
+    begin_boot, phase, finish_boot, install_first_request_hook, boot_timeline,
+)
+
+begin_boot()
 
 def init_database():
+    # Com DATABASE_URL (Postgres) o schema é conferido pelo main contra a head do
+    # Alembic (src/ops/schema_state.py); nenhuma DDL é feita aqui no boot.
+    if os.environ.get("DATABASE_URL", "").strip():
+        print("✅ Database schema checked by main (alembic_version)")
+        return
+
     db_path = os.environ.get("DATABASE_PATH", os.path.join(BASE_DIR, "app.db"))
     if os.path.exists(db_path):
         try:
@@ -98,6 +109,7 @@ def _attach_boot_state_route(flask_app):
         if st.get("source") == "default" and ("main" in (name or "")):
             st["main_loaded"] = True
             st["source"] = "inferred"
+        st.update(boot_timeline())
         return (st, 200)
 
 def _load_module_app(mod_name, attr="app"):
@@ -135,8 +147,12 @@ def create_app():
         return simple
 
 # --- main ---
-init_database()
-app = create_app()
+with phase("db_init"):
+    init_database()
+with phase("app_load"):
+    app = create_app()
+finish_boot()
+install_first_request_hook(app)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
@@ -0,0 +1,51 @@
+"""Patient daily rollups
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('patient_daily_rollup',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('response_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score_max', sa.Integer(), nullable=True),
+        sa.Column('alarming_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mood_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mood_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('functioning_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sleep_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('anxiety_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('doses_expected', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('doses_confirmed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('doses_missed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id', 'day', name='uq_daily_rollup_patient_day')
+    )
+    op.create_index('idx_daily_rollup_day', 'patient_daily_rollup', ['day'])
+    op.create_table('patient_daily_rollup_watermark',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('patient_daily_rollup_watermark')
+    op.drop_index('idx_daily_rollup_day')
+    op.drop_table('patient_daily_rollup')
@@ -0,0 +1,163 @@
+"""Model tables not covered by earlier migrations
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # reminder, response, medication, breathing_exercise, mood... só existiam via create_all no boot;
+    # instalações antigas já podem ter essas tabelas, então cada uma só é criada se faltar
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    for name, create in (
+        ('user', _create_user),
+        ('breathing_exercise', _create_breathing_exercise),
+        ('medication', _create_medication),
+        ('reminder', _create_reminder),
+        ('response', _create_response),
+        ('scale', _create_scale),
+        ('mood', _create_mood),
+        ('mood_chart', _create_mood_chart),
+    ):
+        if name not in existing:
+            create()
+
+
+def _create_user() -> None:
+    op.create_table('user',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    )
+
+
+def _create_breathing_exercise() -> None:
+    op.create_table('breathing_exercise',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('instructions', sa.Text(), nullable=True),
+        sa.Column('audio_url', sa.String(length=255), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _create_medication() -> None:
+    op.create_table('medication',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('dosage', sa.String(length=120), nullable=True),
+        sa.Column('schedule', sa.String(length=120), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _create_reminder() -> None:
+    op.create_table('reminder',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('reminder_type', sa.String(length=50), nullable=False),
+        sa.Column('scale_type', sa.String(length=50), nullable=True),
+        sa.Column('medication_id', sa.Integer(), nullable=True),
+        sa.Column('breathing_exercise_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('frequency', sa.String(length=50), nullable=False),
+        sa.Column('scheduled_time', sa.Time(), nullable=False),
+        sa.Column('next_send_date', sa.DateTime(), nullable=False),
+        sa.Column('custom_schedule', sa.JSON(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['medication_id'], ['medication.id']),
+        sa.ForeignKeyConstraint(['breathing_exercise_id'], ['breathing_exercise.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _create_response() -> None:
+    op.create_table('response',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('reminder_id', sa.Integer(), nullable=False),
+        sa.Column('response_data', sa.JSON(), nullable=True),
+        sa.Column('media_url', sa.String(length=500), nullable=True),
+        sa.Column('text_response', sa.Text(), nullable=True),
+        sa.Column('score', sa.Integer(), nullable=True),
+        sa.Column('is_alarming', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['reminder_id'], ['reminder.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_response_patient_id', 'response', ['patient_id'])
+    op.create_index('ix_response_reminder_id', 'response', ['reminder_id'])
+
+
+def _create_scale() -> None:
+    op.create_table('scale',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('questions', sa.JSON(), nullable=False),
+        sa.Column('scoring_rules', sa.JSON(), nullable=False),
+        sa.Column('alarm_threshold', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+
+def _create_mood() -> None:
+    op.create_table('mood',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=True),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mood_patient_id', 'mood', ['patient_id'])
+
+
+def _create_mood_chart() -> None:
+    op.create_table('mood_chart',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mood_chart_patient_id', 'mood_chart', ['patient_id'])
+
+
+def downgrade() -> None:
+    # Tabelas anteriores a esta migration em instalações antigas: não são removidas
+    pass
@@ -0,0 +1,52 @@
+"""u-ETG plan days and confirmations
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    _create_plan_days()
+    _create_confirmations()
+
+
+def _create_plan_days() -> None:
+    op.create_table('uetg_plan_days',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('phone_e164', sa.String(length=32), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('week_start', sa.Date(), nullable=False),
+        sa.Column('planned_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('phone_e164', 'day', name='uq_uetg_plan_phone_day')
+    )
+    op.create_index('idx_uetg_plan_week', 'uetg_plan_days', ['phone_e164', 'week_start'])
+
+
+def _create_confirmations() -> None:
+    op.create_table('uetg_confirmations',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('phone_e164', sa.String(length=32), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('slot', sa.String(length=5), nullable=False),
+        sa.Column('patient_name', sa.String(length=200), nullable=True),
+        sa.Column('confirmed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('phone_e164', 'day', name='uq_uetg_confirmation_phone_day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('uetg_confirmations')
+    op.drop_index('idx_uetg_plan_week')
+    op.drop_table('uetg_plan_days')
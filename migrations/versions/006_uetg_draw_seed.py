@@ -0,0 +1,26 @@
+"""u-ETG batch draw seed and day index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('uetg_plan_days', sa.Column('draw_seed', sa.String(length=32), nullable=True))
+    # Envio diário consulta todos os pacientes sorteados para o dia
+    op.create_index('idx_uetg_plan_day', 'uetg_plan_days', ['day'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_uetg_plan_day')
+    op.drop_column('uetg_plan_days', 'draw_seed')
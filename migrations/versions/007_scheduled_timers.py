@@ -0,0 +1,44 @@
+"""Persisted one-shot timers (snooze, delay)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade() -> None:
+    op.create_table('scheduled_timers',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('fire_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('dedupe_key', sa.String(length=120), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('fired_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_scheduled_timers_due', 'scheduled_timers', ['status', 'fire_at'])
+    # No máximo um pendente por dedupe_key
+    op.create_index('uq_scheduled_timers_pending_dedupe', 'scheduled_timers', ['dedupe_key'],
+                    unique=True, postgresql_where=PENDING, sqlite_where=PENDING)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_scheduled_timers_pending_dedupe')
+    op.drop_index('idx_scheduled_timers_due')
+    op.drop_table('scheduled_timers')
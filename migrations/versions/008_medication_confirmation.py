@@ -0,0 +1,41 @@
+"""Medication confirmations (dose reminders and answers)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('medication_confirmation',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('medication_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.String(length=64), nullable=False),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+        sa.Column('confirmed_time', sa.DateTime(), nullable=True),
+        sa.Column('taken_at', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['medication_id'], ['medication.id']),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_medication_confirmation_scheduled', 'medication_confirmation',
+                    ['medication_id', 'scheduled_time'])
+    op.create_index('ix_medication_confirmation_patient_id', 'medication_confirmation', ['patient_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_medication_confirmation_patient_id')
+    op.drop_index('idx_medication_confirmation_scheduled')
+    op.drop_table('medication_confirmation')
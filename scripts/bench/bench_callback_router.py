@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark: roteamento de callbacks por cadeia de startswith x CallbackRegistry
+
+Mede o custo por id com a cadeia de prefixos antiga (mesma ordem do
+WhatsAppMessageHandler) e com o registro (trie para ids legados, dicionário
+para ids compactos), e repete os dois com 10/100/1000 fluxos sintéticos
+a mais: a cadeia cresce com o número de fluxos, o registro não.
+
+--fuzz confere o codec: ida e volta de ids compactos aleatórios, lixo
+aleatório nunca levanta exceção, assinatura adulterada é rejeitada e,
+passado o prazo, ids legados tipados das rotas só-compactas são recusados.
+Sem CALLBACK_SIGNING_KEY no ambiente usa uma chave só de benchmark.
+
+uso: python scripts/bench/bench_callback_router.py [N] [--fuzz]
+"""
+import logging
+import os
+import pathlib
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+os.environ.setdefault("CALLBACK_SIGNING_KEY", "bench-only-key")
+
+from datetime import date, timedelta  # noqa: E402
+
+from src.messaging.callbacks import (  # noqa: E402
+    COMPACT_ONLY, MARK, ROUTES, CallbackCodec, CallbackRegistry, CallbackRoute, callback_registry
+)
+
+LEGACY_CHAIN = (
+    ("uetg", ("slot_",)),
+    ("questionnaire", ("questionnaire_", "start_questionnaire_")),
+    ("medication", ("medication_",)),
+    ("mood", ("mood_", "start_mood_")),
+    ("breathing", ("breathing_", "start_breathing_")),
+    ("reminder", ("snooze_", "delay_reminder_", "skip_")),
+)
+
+SAMPLE_IDS = (
+    "slot_0730", "start_questionnaire_PHQ-9", "questionnaire_answer_2",
+    "medication_taken_17", "start_mood_chart", "mood_level_3",
+    "start_breathing_4", "breathing_done", "snooze_reminder_42_60",
+    "delay_reminder_42", "skip_medication_8", "skip_reminder_42", "back_main",
+)
+
+
+def legacy_chain(extra):
+    """Cadeia de startswith com `extra` fluxos sintéticos no fim"""
+    chain = LEGACY_CHAIN + tuple((f"flow{i}", (f"flow{i}_action_",)) for i in range(extra))
+
+    def route(data):
+        for family, prefixes in chain:
+            for prefix in prefixes:
+                if data.startswith(prefix):
+                    return family
+        return None
+    return route
+
+
+legacy_route = legacy_chain(0)
+
+
+def synthetic_registry(extra):
+    registry = CallbackRegistry(ROUTES)
+    for i in range(extra):
+        registry.add(CallbackRoute(f"flow{i}.action", f"flow{i}", f"flow{i}_action_", f"x{i}",
+                                   (("item_id", int),)))
+    return registry
+
+
+def timed(label, fn, ids, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(ids[i % len(ids)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:>22}: {elapsed * 1000:8.1f} ms  ({elapsed / n * 1e6:.2f} µs/id)")
+
+
+def fuzz(rounds):
+    logging.getLogger("src.messaging.callbacks").setLevel(logging.ERROR)  # rejeições são esperadas
+    rng = random.Random(1234)
+    routes = callback_registry.routes()
+
+    for _ in range(rounds):
+        route = rng.choice(routes)
+        args = {}
+        for field in route.fields:
+            if field[1] is int:
+                args[field[0]] = rng.randrange(10 ** 7)
+            else:
+                args[field[0]] = "".join(rng.choice(string.ascii_letters + "_-") for _ in range(rng.randrange(1, 12)))
+        data = callback_registry.encode(route.name, **args)
+        assert len(data.encode("utf-8")) <= 64, data
+        callback = callback_registry.match(data)
+        assert callback is not None and callback.route == route and callback.args == args, (data, callback)
+
+        # Qualquer caractere trocado na assinatura invalida o id
+        position = rng.randrange(len(data) - 6, len(data))
+        replacement = rng.choice([c for c in string.ascii_letters + string.digits if c != data[position]])
+        assert callback_registry.match(data[:position] + replacement + data[position + 1:]) is None, data
+
+    alphabet = string.printable + "~._áç😊"
+    for _ in range(rounds):
+        data = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 40)))
+        if rng.random() < 0.3:
+            data = MARK + "1" + data
+        callback_registry.match(data)  # não pode levantar
+
+    # Prazo dos ids legados: antes aceitos, depois recusados só nas rotas só-compactas
+    codec = CallbackCodec(os.environ["CALLBACK_SIGNING_KEY"])
+    open_registry = CallbackRegistry(ROUTES, codec=codec, legacy_until=date.today())
+    closed_registry = CallbackRegistry(ROUTES, codec=codec, legacy_until=date.today() - timedelta(days=1))
+    unsigned_registry = CallbackRegistry(ROUTES, codec=None, legacy_until=date.today() - timedelta(days=1))
+    for data in SAMPLE_IDS:
+        callback = open_registry.match(data, COMPACT_ONLY)
+        assert (callback.route.family if callback else None) == legacy_route(data), data
+        assert unsigned_registry.match(data, COMPACT_ONLY) is not None or callback is None, data
+        compact_only = callback is not None and callback.args is not None and (
+            callback.route.name in COMPACT_ONLY or callback.route.family in COMPACT_ONLY)
+        assert (closed_registry.match(data, COMPACT_ONLY) is None) == compact_only or callback is None, data
+        assert closed_registry.match(data) is not None or callback is None, data  # WhatsApp: sem prazo
+        converted = closed_registry.compact(data)
+        assert (converted != data) == compact_only, data
+        if compact_only:
+            assert closed_registry.match(converted, COMPACT_ONLY).data == data, data
+    assert closed_registry.match("medication_taken_yes", COMPACT_ONLY) is not None  # afetivograma
+    assert unsigned_registry.match(closed_registry.encode("reminder.skip", reminder_id=42)) is None
+    assert unsigned_registry.encode("reminder.skip", reminder_id=42) == "skip_reminder_42"
+
+    print(f"fuzz: {rounds} idas e voltas, {rounds} adulterações, {rounds} ids aleatórios e prazo legado ok")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 200000
+
+    if "--fuzz" in sys.argv:
+        fuzz(min(n, 20000))
+        return
+
+    for data in SAMPLE_IDS:
+        callback = callback_registry.match(data)
+        assert (callback.route.family if callback else None) == legacy_route(data), data
+
+    compact = [
+        callback_registry.encode("reminder.snooze", reminder_id=42, minutes=60),
+        callback_registry.encode("medication.taken", medication_id=17),
+        callback_registry.encode("breathing.start", exercise_id=4),
+    ]
+
+    for extra in (0, 10, 100, 1000):
+        timed(f"startswith +{extra} fluxos", legacy_chain(extra), SAMPLE_IDS, n)
+        timed(f"registro +{extra} rotas", synthetic_registry(extra).match, SAMPLE_IDS, n)
+    timed("registro (compacto)", callback_registry.match, compact, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lembretes com template pré-compilado x montagem por mensagem
+
+Simula o pico da manhã (N lembretes de medicação) comparando a montagem
+antiga (f-string + lista de botões + dicionário + json.dumps) com
+CompiledMessage.render_payload. Também confere que os dois payloads são
+equivalentes.
+
+uso: python scripts/bench/bench_message_templates.py [N]
+"""
+import json
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from src.templates.message_templates import get_message_template  # noqa: E402
+
+
+def legacy_payload(to, name, medication_name, dosage, at, instructions, medication_id):
+    message = f"""💊 *Lembrete de Medicação*
+
+Olá, {name}!
+
+É hora de tomar sua medicação:
+
+💊 *{medication_name}*
+📏 *Dosagem:* {dosage}
+🕐 *Horário:* {at}
+
+"""
+    if instructions:
+        message += f"📝 *Instruções:* {instructions}\n\n"
+    message += "Por favor, confirme quando tomar a medicação:"
+
+    buttons = [
+        {"id": f"medication_taken_{medication_id}", "title": "✅ Tomei"},
+        {"id": f"medication_snooze_{medication_id}", "title": "⏰ Lembrar em 30min"},
+        {"id": f"medication_skip_{medication_id}", "title": "❌ Não vou tomar"}
+    ]
+    formatted_buttons = []
+    for i, button in enumerate(buttons):
+        formatted_buttons.append({
+            "type": "reply",
+            "reply": {"id": button.get('id', f"btn_{i}"), "title": button.get('title', f"Opção {i+1}")}
+        })
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "interactive",
+        "interactive": {
+            "type": "button",
+            "header": {"type": "text", "text": "Lembrete de Medicação"},
+            "body": {"text": message},
+            "action": {"buttons": formatted_buttons}
+        }
+    }
+    return json.dumps(payload).encode('utf-8')
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    patients = [
+        (f"55119{i:08d}", f"Paciente \"{i}\"", "Sertralina", "50mg", "08:00",
+         "Tomar após o café" if i % 2 else None, i)
+        for i in range(n)
+    ]
+    template = get_message_template('medication_reminder')
+
+    def compiled(to, name, medication_name, dosage, at, instructions, medication_id):
+        return template.render_payload(
+            to, name=name, medication_name=medication_name, dosage=dosage, time=at,
+            instructions=f"📝 *Instruções:* {instructions}\n\n" if instructions else "",
+            medication_id=medication_id
+        )
+
+    for args in patients[:50]:
+        assert json.loads(legacy_payload(*args)) == json.loads(compiled(*args)), args
+
+    for label, build in (("legado", legacy_payload), ("compilado", compiled)):
+        start = time.perf_counter()
+        for args in patients:
+            build(*args)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>10}: {elapsed * 1000:8.1f} ms  ({elapsed / n * 1e6:.2f} µs/mensagem)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Verifica o orçamento de imports do boot
+
+Importa src.main num processo limpo (o que executa todo o _init_app) e lê
+o perfil gravado num boot_state temporário (BOOT_STATE_PATH), sem tocar
+no /tmp/boot_state.json do app nem no histórico de boots. Sai com código 1
+se o total de imports passar do orçamento (BOOT_IMPORT_BUDGET_MS ou
+--budget), listando os módulos mais caros e os pacotes que cada um puxou.
+
+uso: python scripts/ops/check_boot_budget.py [--budget MS] [--top N]
+"""
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=None, help="orçamento em ms")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.budget is not None:
+        env["BOOT_IMPORT_BUDGET_MS"] = str(args.budget)
+
+    with tempfile.TemporaryDirectory(prefix="boot-budget-") as tmp:
+        state_path = pathlib.Path(tmp) / "boot_state.json"
+        env["BOOT_STATE_PATH"] = str(state_path)
+        proc = subprocess.run([sys.executable, "-c", "import src.main"], cwd=ROOT, env=env)
+        if proc.returncode != 0:
+            print(f"❌ Boot falhou (código {proc.returncode})")
+            return 2
+        profile = json.loads(state_path.read_text(encoding="utf-8")).get("imports")
+
+    if not profile:
+        print("❌ Perfil de imports não encontrado no boot_state")
+        return 2
+
+    for entry in profile["modules"][:args.top]:
+        pulled = ", ".join(entry["pulled"]) or "-"
+        print(f"{entry['ms']:9.1f} ms  {entry['module']:<40} {pulled}")
+    print(f"\nTotal: {profile['total_ms']} ms  (orçamento {profile['budget_ms']} ms)")
+
+    if profile["over_budget"]:
+        print("❌ Orçamento de boot estourado")
+        return 1
+    print("✅ Dentro do orçamento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
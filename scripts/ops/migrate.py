@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Passo de release: leva o banco até a head das migrations antes do boot
+
+Banco versionado atrás da head roda `alembic upgrade head`; se a migração
+falhar o processo sai com erro e o deploy não segue com tabelas faltando.
+Banco sem alembic_version mas com tabelas (create_all antigo) é carimbado
+em BASELINE_REVISION e migrado a partir dali. Banco vazio é deixado para o
+bootstrap do boot (src/ops/schema_state.py), que faz create_all e carimba
+a head. Sem DATABASE_URL (SQLite local) não há nada a fazer.
+
+Roda uma vez por deploy (Procfile `release`, preDeployCommand do Railway),
+não a cada boot.
+
+uso: python scripts/ops/migrate.py
+"""
+import os
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.ops.schema_state import adopt_unversioned, alembic_head, current_revision  # noqa: E402
+
+
+def main():
+    url = (os.getenv("DATABASE_URL") or "").strip()
+    if not url:
+        print("ℹ️ DATABASE_URL não definido: schema do SQLite local fica com o app")
+        return 0
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+
+    from sqlalchemy import create_engine, pool
+
+    engine = create_engine(url, poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            current = current_revision(connection)
+        if current is None:
+            with engine.begin() as connection:
+                current = adopt_unversioned(connection)
+            if current is not None:
+                print(f"ℹ️ Banco sem alembic_version com tabelas: carimbado em {current}")
+    finally:
+        engine.dispose()
+
+    head = alembic_head()
+    if current is None:
+        print(f"ℹ️ Banco vazio: o boot faz o bootstrap e carimba {head}")
+        return 0
+    if current == head:
+        print(f"✅ Schema em dia ({head})")
+        return 0
+
+    from alembic import command
+    from alembic.config import Config
+
+    print(f"⏫ alembic upgrade head ({current} -> {head})")
+    command.upgrade(Config(str(ROOT / "alembic.ini")), "head")
+    print(f"✅ Schema migrado para {head}")
+    return 0
+
+
+if __name__ == "__main__":
+    os.chdir(ROOT)
+    sys.exit(main())
@@ -7,7 +7,7 @@ Admin UI & routes (Fase 2)
 - Painel u-ETG (/admin/uetg) com "Sortear semana agora (teste)"
 - Cadastro rápido de paciente (nome + telefone E.164)
 - Lista de pacientes (ativos)
-- "Semana atual" por paciente (duas janelas: Seg/Ter e Qui/Sex) — cálculo determinístico por semana
+- "Semana atual" por paciente (duas janelas: Seg/Ter e Qui/Sex) — dias gravados em uetg_plan_days pelo job
 - Runs recentes (se existirem em wa_campaign_runs)
 OBS: Envio real ao paciente NÃO é alterado; botão de teste segue enviando APENAS ao ADMIN_PHONE.
 """
@@ -17,7 +17,6 @@ import re
 import json
 import uuid
 import random
-import hashlib
 from datetime import datetime, timedelta
 
 import pytz
@@ -28,7 +27,9 @@ from flask import (
 )
 from sqlalchemy import text
 
+from src.models.uetg import UetgPlanDay
 from src.models.user import db
+from src.services.uetg_calendar import EARLY_OFFSETS, LATE_OFFSETS, week_start_of
 
 # Blueprint do Admin (registrado no main.py com url_prefix="/admin")
 admin_bp = Blueprint("admin", __name__)
@@ -69,28 +70,17 @@ def _require_auth():
 
 def _week_bounds_today():
     now = datetime.now(TZ)
-    base = now.date()
-    monday = base - timedelta(days=base.weekday())  # 0=Mon
+    monday = week_start_of(now.date())
     sunday = monday + timedelta(days=6)
     return monday, sunday
 
-# Sorteio "livre" (para o botão de teste)
-def _sorted_week_draw(now=None):
-    if now is None:
-        now = datetime.now(TZ)
-    base_date = now.date()
-    monday = base_date - timedelta(days=base_date.weekday())
-
-    first_candidates = [monday, monday + timedelta(days=1)]                 # seg/ter
-    second_candidates = [monday + timedelta(days=3), monday + timedelta(days=4)]  # qui/sex
-
-    first_pick = random.choice(first_candidates)
-    second_pick = random.choice(second_candidates)
-
-    pt_weekdays = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+_PT_WEEKDAYS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
 
+def _draw_view(first_pick, second_pick, **extra):
     def fmt(d):
-        return f"{d.strftime('%d/%m')} ({pt_weekdays[d.weekday()]})"
+        if d is None:
+            return "não sorteado"
+        return f"{d.strftime('%d/%m')} ({_PT_WEEKDAYS[d.weekday()]})"
 
     return {
         "first_date": first_pick,
@@ -99,37 +89,44 @@ def _sorted_week_draw(now=None):
         "second_label": fmt(second_pick),
         "tz": TZ_NAME,
         "slots": list(UETG_SLOTS_OFFER),
+        **extra,
     }
 
-# Sorteio determinístico por paciente/semana (sem persistir; evita mexer em schema)
-def _deterministic_week_draw(key: str, now=None):
+# Sorteio "livre" (para o botão de teste)
+def _sorted_week_draw(now=None):
     if now is None:
         now = datetime.now(TZ)
-    year, week, _ = now.isocalendar()
-    base_date = now.date()
-    monday = base_date - timedelta(days=base_date.weekday())
-    c1 = [monday, monday + timedelta(days=1)]                 # seg/ter
-    c2 = [monday + timedelta(days=3), monday + timedelta(days=4)]  # qui/sex
-
-    seed_bytes = f"{key}:{year}:{week}".encode("utf-8")
-    h = int(hashlib.sha256(seed_bytes).hexdigest(), 16)
-    first_pick = c1[h & 1]
-    second_pick = c2[(h >> 1) & 1]
-
-    pt_weekdays = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
-
-    def fmt(d):
-        return f"{d.strftime('%d/%m')} ({pt_weekdays[d.weekday()]})"
+    monday = week_start_of(now.date())
+    first_pick = monday + timedelta(days=random.choice(EARLY_OFFSETS))   # seg/ter
+    second_pick = monday + timedelta(days=random.choice(LATE_OFFSETS))   # qui/sex
+    return _draw_view(first_pick, second_pick)
 
-    return {
-        "first_date": first_pick,
-        "second_date": second_pick,
-        "first_label": fmt(first_pick),
-        "second_label": fmt(second_pick),
-        "tz": TZ_NAME,
-        "slots": list(UETG_SLOTS_OFFER),
-        "seed_info": {"year": year, "week": week}
-    }
+# Sorteio gravado pelo job (uetg_plan_days) na semana atual: {telefone: [dias]}
+def _planned_days(phones, now=None):
+    if now is None:
+        now = datetime.now(TZ)
+    phones = [p for p in phones if p]
+    if not phones:
+        return {}
+    rows = (db.session.query(UetgPlanDay.phone_e164, UetgPlanDay.day, UetgPlanDay.draw_seed)
+            .filter(UetgPlanDay.phone_e164.in_(phones),
+                    UetgPlanDay.week_start == week_start_of(now.date()))
+            .order_by(UetgPlanDay.day)
+            .all())
+    planned = {}
+    for phone, day, seed in rows:
+        planned.setdefault(phone, {"days": [], "seed": seed})["days"].append(day)
+    return planned
+
+def _planned_week_view(plan, now=None):
+    if now is None:
+        now = datetime.now(TZ)
+    year, week, _ = now.isocalendar()
+    days = (plan or {}).get("days") or []
+    first_pick = days[0] if days else None
+    second_pick = days[1] if len(days) > 1 else None
+    return _draw_view(first_pick, second_pick,
+                      seed_info={"year": year, "week": week, "key_id": (plan or {}).get("seed")})
 
 # ------------ WhatsApp ------------
 
@@ -244,9 +241,9 @@ def home():
     patients = _list_patients(limit=200)
     # monta painel "Semana atual" determinístico por paciente
     weekly = []
+    planned = _planned_days([p["phone_e164"] for p in patients])
     for p in patients:
-        key = p["phone_e164"] or p["id"]
-        draw = _deterministic_week_draw(key)
+        draw = _planned_week_view(planned.get(p["phone_e164"]))
         weekly.append({
             "name": p["name"],
             "phone": p["phone_e164"],
@@ -275,7 +272,8 @@ def uetg_page():
         return _require_auth()
 
     monday, sunday = _week_bounds_today()
-    draw = _sorted_week_draw()
+    phone = os.getenv("UETG_PATIENT_PHONE") or ADMIN_PHONE
+    draw = _planned_week_view(_planned_days([phone]).get(phone))
     runs = _fetch_runs(limit=50)
 
     return render_template_string(
@@ -8,6 +8,7 @@ import pytz
 from src.admin.models.campaign import WACampaign
 from src.admin.services.campaign_service import CampaignService
 from src.models.user import db
+from src.ops.query_profiler import query_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,7 @@ class CampaignSchedulerService:
                 
                 # Job principal: verificar campanhas a cada minuto
                 self.scheduler.add_job(
-                    func=self._check_campaigns,
+                    func=self._profiled_check_campaigns,
                     trigger=IntervalTrigger(seconds=60),
                     id='campaign_checker',
                     name='Campaign Checker',
@@ -110,6 +111,11 @@ class CampaignSchedulerService:
         next_run = min(job.next_run_time for job in jobs if job.next_run_time)
         return next_run.isoformat() if next_run else None
     
+    def _profiled_check_campaigns(self):
+        """Job do agendador: verificação de campanhas dentro de um escopo do perfil de consultas"""
+        with query_profiler.profile('campaigns.check'):
+            self._check_campaigns()
+    
     def _check_campaigns(self):
         """Verificar e executar campanhas que devem rodar agora"""
         try:
@@ -187,7 +193,7 @@ class CampaignSchedulerService:
         """Forçar verificação imediata de campanhas"""
         try:
             logger.info("Force checking campaigns...")
-            self._check_campaigns()
+            self._profiled_check_campaigns()
             return True
         except Exception as e:
             logger.error(f"Error in force check: {e}")
@@ -3,6 +3,8 @@ import requests
 import logging
 from typing import Dict, Any, Optional
 
+from src.ops.metrics import timed_post
+
 logger = logging.getLogger(__name__)
 
 class AdminWhatsAppService:
@@ -80,7 +82,7 @@ class AdminWhatsAppService:
             logger.info(f"Sending template {template_name} to {phone_e164[:4]}****{phone_e164[-4:]}")
             
             # Fazer requisição
-            response = requests.post(self.base_url, json=payload, headers=headers, timeout=30)
+            response = timed_post('messages.template', self.base_url, json=payload, headers=headers, timeout=30)
             
             # Processar resposta
             if response.status_code == 200:
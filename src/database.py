@@ -6,6 +6,7 @@ import sqlite3
 import json
 from datetime import datetime
 import os
+from src.services.score_categorizer import QUESTIONNAIRE_CATEGORIZERS
 
 class MedicalDatabase:
     def __init__(self, db_path="medical_questionnaires.db"):
@@ -140,24 +141,53 @@ class MedicalDatabase:
     
     def _check_and_create_alert(self, cursor, questionnaire_id, questionnaire_type, total_score, patient_data):
         """Verificar se precisa criar alerta para casos severos"""
-        alert_needed = False
-        alert_message = ""
+        categorizer = QUESTIONNAIRE_CATEGORIZERS.get(questionnaire_type)
+        band = categorizer.categorize(total_score) if categorizer else None
         
-        if questionnaire_type == "GAD-7" and total_score >= 15:
-            alert_needed = True
-            alert_message = f"🚨 ALERTA: {patient_data['firstName']} {patient_data['lastName']} apresentou ansiedade severa (GAD-7: {total_score}/21)"
-        
-        elif questionnaire_type == "PHQ-9" and total_score >= 20:
-            alert_needed = True
-            alert_message = f"🚨 ALERTA: {patient_data['firstName']} {patient_data['lastName']} apresentou depressão severa (PHQ-9: {total_score}/27)"
-        
-        if alert_needed:
+        if band and band.alarming:
+            alert_message = f"🚨 ALERTA: {patient_data['firstName']} {patient_data['lastName']} apresentou {band.label.lower()} ({questionnaire_type}: {total_score}/{categorizer.max_score})"
             cursor.execute('''
                 INSERT INTO alerts (questionnaire_id, alert_type, message)
                 VALUES (?, ?, ?)
             ''', (questionnaire_id, "SEVERE_SCORE", alert_message))
             print(f"🚨 ALERTA CRIADO: {alert_message}")
     
+    def recategorize_questionnaires(self, questionnaire_type=None):
+        """Reclassificar questionários já gravados com os pontos de corte atuais"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        types = [questionnaire_type] if questionnaire_type else list(QUESTIONNAIRE_CATEGORIZERS)
+        updated = 0
+        
+        for qtype in types:
+            categorizer = QUESTIONNAIRE_CATEGORIZERS.get(qtype)
+            if not categorizer:
+                continue
+            
+            cursor.execute('''
+                SELECT id, total_score, category FROM questionnaires
+                WHERE questionnaire_type = ?
+            ''', (qtype,))
+            rows = cursor.fetchall()
+            
+            bands = categorizer.categorize_many([row[1] for row in rows])
+            changes = [
+                (band.label, row[0])
+                for row, band in zip(rows, bands)
+                if band and band.label != row[2]
+            ]
+            
+            if changes:
+                cursor.executemany('UPDATE questionnaires SET category = ? WHERE id = ?', changes)
+                updated += len(changes)
+        
+        conn.commit()
+        conn.close()
+        
+        print(f"✅ {updated} questionários reclassificados")
+        return updated
+    
     def get_patient_results(self, patient_id, questionnaire_type=None):
         """Buscar resultados de um paciente"""
         conn = sqlite3.connect(self.db_path)
@@ -0,0 +1,84 @@
+"""
+Job de manutenção dos rollups diários (patient_daily_rollup)
+Recalcula de forma incremental os dias afetados desde a última execução
+"""
+
+import os
+import logging
+from datetime import date, datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+import pytz
+
+from src.ops.query_profiler import query_profiler
+
+# Configurações
+TIMEZONE = pytz.timezone("America/Sao_Paulo")
+ROLLUP_INTERVAL_MINUTES = int(os.getenv("ROLLUP_INTERVAL_MINUTES") or "15")
+# Dias de histórico recalculados na primeira execução (sem marca d'água gravada)
+ROLLUP_INITIAL_BACKFILL_DAYS = int(os.getenv("ROLLUP_INITIAL_BACKFILL_DAYS") or "90")
+
+# Logger
+logger = logging.getLogger(__name__)
+scheduler = None
+_app = None
+
+
+def run_incremental():
+    """Executa uma rodada incremental (dentro do app context)"""
+    from src.services.rollup_service import RollupService
+
+    with _app.app_context(), query_profiler.profile("rollup.incremental"):
+        try:
+            service = RollupService()
+            if service.watermark() is None and ROLLUP_INITIAL_BACKFILL_DAYS > 0:
+                # Uma vez só: a marca d'água é gravada mesmo se o backfill não escreveu linhas
+                started_at = datetime.utcnow()
+                today = date.today()
+                written = service.backfill(today - timedelta(days=ROLLUP_INITIAL_BACKFILL_DAYS), today)
+                service.set_watermark(started_at)
+                logger.info(f"Rollups: backfill inicial com {written} linhas")
+            else:
+                written = service.refresh_incremental()
+                logger.info(f"Rollups: {written} linhas atualizadas")
+        except Exception as e:
+            logger.error(f"Erro ao atualizar rollups: {e}")
+            from src.models.user import db
+            db.session.rollback()
+
+
+def init_scheduler(app):
+    """Inicializa o job periódico de rollups"""
+    global scheduler, _app
+
+    try:
+        if scheduler is not None:
+            logger.warning("Rollup scheduler já está rodando")
+            return
+
+        _app = app
+        scheduler = BackgroundScheduler(timezone=TIMEZONE)
+
+        scheduler.add_job(
+            run_incremental,
+            IntervalTrigger(minutes=ROLLUP_INTERVAL_MINUTES, timezone=TIMEZONE),
+            id="rollup_incremental",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+
+        scheduler.start()
+        logger.info(f"✅ Rollup scheduler started (a cada {ROLLUP_INTERVAL_MINUTES} min).")
+
+    except Exception as e:
+        logger.error(f"Erro ao inicializar rollup scheduler: {e}")
+
+
+def stop_scheduler():
+    """Para o agendador"""
+    global scheduler
+    if scheduler:
+        scheduler.shutdown()
+        scheduler = None
+        logger.info("🛑 Rollup scheduler stopped.")
@@ -0,0 +1,240 @@
+"""
+Ingestão do Telegram por long polling (getUpdates)
+
+Alternativa ao webhook para ambientes sem URL pública (local/staging) e
+para não atrelar a vazão a uma requisição HTTP por atualização. Um loop
+busca lotes grandes com getUpdates, despacha para o
+TelegramMessageHandler num pool de threads e só então avança o offset.
+
+O offset não é gravado localmente: o Telegram guarda a confirmação no
+servidor (getUpdates com offset N confirma tudo abaixo de N). Após um
+reinício, a primeira chamada sem offset devolve só o que ainda não foi
+confirmado, ou seja, entrega pelo menos uma vez sem arquivo nem tabela.
+Ao parar, o poller confirma o último lote processado.
+
+Atualizações do mesmo chat são processadas em ordem, na mesma tarefa;
+chats diferentes rodam em paralelo.
+
+Ativação: TELEGRAM_INGESTION=polling (o main chama init_poller), ou
+processo dedicado com `python -m src.jobs.telegram_poller`, que sobe só o
+banco e o poller (sem agendadores nem blueprints).
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from src.ops.metrics import metrics
+
+# Configurações
+TELEGRAM_INGESTION = (os.getenv("TELEGRAM_INGESTION") or "webhook").strip().lower()
+POLL_LIMIT = int(os.getenv("TELEGRAM_POLL_LIMIT") or "100")
+POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT") or "30")
+POLL_WORKERS = int(os.getenv("TELEGRAM_POLL_WORKERS") or "4")
+ALLOWED_UPDATES = ["message", "callback_query"]
+MAX_BACKOFF_SECONDS = 60
+
+# Logger
+logger = logging.getLogger(__name__)
+
+UPDATES_TOTAL = metrics.counter(
+    "telegram_updates_total", "Atualizações do Telegram recebidas por polling", ("status",))
+BATCH_SIZE = metrics.histogram(
+    "telegram_poll_batch_size", "Atualizações por chamada getUpdates", (),
+    buckets=(0, 1, 5, 10, 25, 50, 100))
+
+
+def _chat_key(update: Dict):
+    if "message" in update:
+        return update["message"].get("chat", {}).get("id")
+    if "callback_query" in update:
+        return update["callback_query"].get("message", {}).get("chat", {}).get("id")
+    return None
+
+
+def group_by_chat(updates: List[Dict]) -> List[List[Dict]]:
+    """Agrupar mantendo a ordem de chegada dentro de cada chat"""
+    groups: Dict = {}
+    for update in updates:
+        groups.setdefault(_chat_key(update), []).append(update)
+    return list(groups.values())
+
+
+class TelegramPoller:
+    """Loop de getUpdates com despacho em lote para um pool de threads"""
+
+    def __init__(self, app, telegram_service=None, handler=None, workers: int = POLL_WORKERS):
+        from src.services.telegram_service import TelegramService
+
+        self.app = app
+        self.telegram_service = telegram_service or TelegramService(bot_token=os.getenv("TELEGRAM_BOT_TOKEN"))
+        self._handler = handler
+        self._handler_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tg-update")
+        # None: o Telegram começa pelo primeiro update ainda não confirmado
+        self.offset = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            with self._handler_lock:
+                if self._handler is None:
+                    from src.services.telegram_message_handler import TelegramMessageHandler
+                    self._handler = TelegramMessageHandler()
+        return self._handler
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # getUpdates não funciona com webhook ativo
+        self.telegram_service.delete_webhook()
+        self._thread = threading.Thread(target=self._run, name="telegram-poller", daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Telegram poller iniciado (offset={self.offset}, workers={self.executor._max_workers})")
+
+    def stop(self, timeout: float = POLL_TIMEOUT + 15) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.executor.shutdown(wait=True)
+        self.confirm_offset()
+        logger.info("🛑 Telegram poller parado.")
+
+    def _run(self) -> None:
+        import requests
+
+        session = requests.Session()
+        backoff = 1
+        while not self._stop.is_set():
+            result = self.telegram_service.get_updates(
+                offset=self.offset, limit=POLL_LIMIT, timeout=POLL_TIMEOUT,
+                allowed_updates=ALLOWED_UPDATES, session=session,
+            )
+            if not result.get("ok"):
+                logger.warning(f"getUpdates falhou ({result.get('error') or result.get('description')}); nova tentativa em {backoff}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                continue
+            backoff = 1
+
+            updates = result.get("result") or []
+            BATCH_SIZE.observe(len(updates))
+            if updates:
+                self.process_batch(updates)
+
+    def process_batch(self, updates: List[Dict]) -> None:
+        """Processar um lote e confirmar o offset depois que todos terminarem"""
+        futures = [self.executor.submit(self._process_group, group) for group in group_by_chat(updates)]
+        wait(futures)
+
+        # Confirmado no servidor pelo próximo getUpdates (ou por confirm_offset ao parar)
+        self.offset = max(u["update_id"] for u in updates) + 1
+
+    def confirm_offset(self) -> None:
+        """Confirmar no Telegram o último lote processado, sem esperar novidades"""
+        if self.offset is None:
+            return
+        result = self.telegram_service.get_updates(offset=self.offset, limit=1, timeout=0,
+                                                   allowed_updates=ALLOWED_UPDATES)
+        if not result.get("ok"):
+            logger.warning(f"Offset {self.offset} não confirmado no Telegram; o lote pode ser reentregue")
+
+    def _process_group(self, updates: List[Dict]) -> None:
+        with self.app.app_context():
+            for update in updates:
+                try:
+                    result = self.handler.handle_update(update)
+                    UPDATES_TOTAL.inc(status=(result or {}).get("status", "unknown"))
+                except Exception as e:
+                    UPDATES_TOTAL.inc(status="exception")
+                    logger.error(f"Erro ao processar update {update.get('update_id')}: {e}")
+
+
+poller: Optional[TelegramPoller] = None
+
+
+def init_poller(app) -> Optional[TelegramPoller]:
+    """Inicializa o poller se TELEGRAM_INGESTION=polling"""
+    global poller
+
+    if TELEGRAM_INGESTION != "polling":
+        return None
+    if poller is not None:
+        logger.warning("Telegram poller já está rodando")
+        return poller
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
+        logger.error("TELEGRAM_INGESTION=polling sem TELEGRAM_BOT_TOKEN; poller não iniciado")
+        return None
+
+    try:
+        poller = TelegramPoller(app)
+        poller.start()
+    except Exception as e:
+        logger.error(f"Erro ao inicializar Telegram poller: {e}")
+        poller = None
+    return poller
+
+
+def stop_poller():
+    """Para o poller"""
+    global poller
+    if poller:
+        poller.stop()
+        poller = None
+
+
+def _standalone_app():
+    """App Flask mínimo para o processo dedicado: só banco e modelos"""
+    from flask import Flask
+
+    from src.models.user import db
+    from src.ops.ingest_log import install_ingest_logging
+    from src.ops.schema_state import MODEL_MODULES
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    install_ingest_logging()
+
+    database_url = os.getenv("DATABASE_URL", "").strip()
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+    if not database_url:
+        # mesmo fallback sqlite do main
+        database_url = f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app.db')}"
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+
+    for module, required in MODEL_MODULES:
+        try:
+            __import__(module, fromlist=["*"])
+        except Exception as e:
+            if required:
+                raise
+            logger.warning(f"{module} não carregado: {e}")
+    return app
+
+
+if __name__ == "__main__":
+    # Processo dedicado: python -m src.jobs.telegram_poller
+    # Não importa o src.main, então nenhum agendador é iniciado aqui
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
+        raise SystemExit("TELEGRAM_BOT_TOKEN não definido")
+
+    poller = TelegramPoller(_standalone_app())
+    poller.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        poller.stop()
@@ -1,23 +1,28 @@
 """
 Sistema de agendamento automático para exames u-ETG
-Sorteia 2 datas úteis por semana e envia lembretes automáticos
+Sorteia 2 datas úteis por semana para cada paciente u-ETG e envia lembretes automáticos
 """
 
 import os
 import json
-import random
-import requests
 import logging
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 import pytz
 
+from src.ops.metrics import timed_post
+from src.services.uetg_store import uetg_store
+from src.services.uetg_calendar import uetg_calendar
+from src.services.uetg_draw_engine import UetgTarget, uetg_draw_engine
+
 # Configurações
 TIMEZONE = pytz.timezone("America/Sao_Paulo")
-DATA_DIR = "/tmp"  # Railway usa /tmp para arquivos temporários
-PLAN_FILE = os.path.join(DATA_DIR, "uetg_plan.json")
-CONFIRMATIONS_FILE = os.path.join(DATA_DIR, "uetg_confirmations.json")
+# Arquivos do armazenamento antigo: importados para o banco no init, se existirem
+DATA_DIR = "/tmp"
+LEGACY_PLAN_FILE = os.path.join(DATA_DIR, "uetg_plan.json")
+LEGACY_CONFIRMATIONS_FILE = os.path.join(DATA_DIR, "uetg_confirmations.json")
 
 # Variáveis de ambiente com validação robusta
 WHATSAPP_ACCESS_TOKEN = (os.getenv("WHATSAPP_ACCESS_TOKEN") or "").strip()
@@ -35,6 +40,7 @@ WHATSAPP_API_URL = (
 # Logger
 logger = logging.getLogger(__name__)
 scheduler = None
+_app = None
 
 
 def validate_config():
@@ -61,9 +67,7 @@ def validate_config():
 def load_plan():
     """Carrega o plano de datas sorteadas"""
     try:
-        if os.path.exists(PLAN_FILE):
-            with open(PLAN_FILE, "r") as f:
-                return json.load(f)
+        return uetg_store.load_plan(UETG_PATIENT_PHONE)
     except Exception as e:
         logger.error(f"Erro ao carregar plano: {e}")
     return {}
@@ -72,9 +76,7 @@ def load_plan():
 def save_plan(plan):
     """Salva o plano de datas sorteadas"""
     try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(PLAN_FILE, "w") as f:
-            json.dump(plan, f, indent=2)
+        uetg_store.save_plan(UETG_PATIENT_PHONE, plan["week_start"], plan["days"])
         logger.info("Plano salvo com sucesso")
     except Exception as e:
         logger.error(f"Erro ao salvar plano: {e}")
@@ -83,26 +85,16 @@ def save_plan(plan):
 def load_confirmations():
     """Carrega as confirmações de horários"""
     try:
-        if os.path.exists(CONFIRMATIONS_FILE):
-            with open(CONFIRMATIONS_FILE, "r") as f:
-                return json.load(f)
+        return uetg_store.confirmations(UETG_PATIENT_PHONE)
     except Exception as e:
         logger.error(f"Erro ao carregar confirmações: {e}")
     return {}
 
 
-def save_confirmation(date, slot, patient_name):
-    """Salva uma confirmação de horário"""
+def save_confirmation(date, slot, patient_name, phone=None):
+    """Salva uma confirmação de horário (upsert por telefone + dia)"""
     try:
-        confirmations = load_confirmations()
-        confirmations[date] = {
-            "slot": slot,
-            "patient_name": patient_name,
-            "confirmed_at": datetime.now(TIMEZONE).isoformat(),
-        }
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(CONFIRMATIONS_FILE, "w") as f:
-            json.dump(confirmations, f, indent=2)
+        uetg_store.save_confirmation(phone or UETG_PATIENT_PHONE, date, slot, patient_name)
         logger.info(f"Confirmação salva: {patient_name} - {slot} em {date}")
         return True
     except Exception as e:
@@ -110,6 +102,47 @@ def save_confirmation(date, slot, patient_name):
         return False
 
 
+def import_legacy_files():
+    """
+    Importa os JSON antigos de /tmp para o banco (uma vez) e renomeia os arquivos
+
+    Grava direto no uetg_store (que levanta em erro, ao contrário de
+    save_plan/save_confirmation) e só renomeia o arquivo para ".imported"
+    depois de conferir no banco todas as linhas dele; se algo falhar, o
+    arquivo fica onde está e a importação é repetida no próximo init.
+    """
+    if os.path.exists(LEGACY_PLAN_FILE):
+        try:
+            with open(LEGACY_PLAN_FILE, "r") as f:
+                plan = json.load(f)
+            days = plan.get("days") or []
+            if days:
+                uetg_store.save_plan(UETG_PATIENT_PHONE, plan["week_start"], days)
+            missing = [day for day in days if not uetg_store.is_planned(UETG_PATIENT_PHONE, day)]
+            if missing:
+                raise RuntimeError(f"dias não gravados: {missing}")
+            os.replace(LEGACY_PLAN_FILE, f"{LEGACY_PLAN_FILE}.imported")
+            logger.info(f"Plano antigo do u-ETG importado ({len(days)} dias)")
+        except Exception as e:
+            logger.error(f"Erro ao importar plano antigo do u-ETG (arquivo mantido): {e}")
+
+    if os.path.exists(LEGACY_CONFIRMATIONS_FILE):
+        try:
+            with open(LEGACY_CONFIRMATIONS_FILE, "r") as f:
+                confirmations = json.load(f)
+            for day, entry in confirmations.items():
+                uetg_store.save_confirmation(UETG_PATIENT_PHONE, day, entry.get("slot"), entry.get("patient_name"))
+            stored = uetg_store.confirmations(UETG_PATIENT_PHONE)
+            missing = [day for day, entry in confirmations.items()
+                       if (stored.get(day) or {}).get("slot") != entry.get("slot")]
+            if missing:
+                raise RuntimeError(f"confirmações não gravadas: {missing}")
+            os.replace(LEGACY_CONFIRMATIONS_FILE, f"{LEGACY_CONFIRMATIONS_FILE}.imported")
+            logger.info(f"Confirmações antigas do u-ETG importadas ({len(confirmations)})")
+        except Exception as e:
+            logger.error(f"Erro ao importar confirmações antigas do u-ETG (arquivo mantido): {e}")
+
+
 def send_whatsapp_message(phone_number, message):
     """Envia mensagem de texto via WhatsApp"""
     if not phone_number or not phone_number.strip():
@@ -133,7 +166,7 @@ def send_whatsapp_message(phone_number, message):
             "text": {"body": message},
         }
 
-        response = requests.post(WHATSAPP_API_URL, headers=headers, json=data)
+        response = timed_post("messages.text", WHATSAPP_API_URL, headers=headers, json=data)
 
         if response.status_code == 200:
             logger.info(f"Mensagem enviada para {phone_number[:8]}***")
@@ -183,7 +216,7 @@ def send_whatsapp_template(phone_number, template_name, parameters):
             },
         }
 
-        response = requests.post(WHATSAPP_API_URL, headers=headers, json=data)
+        response = timed_post("messages.template", WHATSAPP_API_URL, headers=headers, json=data)
 
         if response.status_code == 200:
             logger.info(f"Template {template_name} enviado para {phone_number[:8]}***")
@@ -219,8 +252,22 @@ def get_weekdays_next_week():
     return weekdays
 
 
+def _legacy_patients():
+    """Paciente configurado por variável de ambiente (instalações de um paciente só)"""
+    if UETG_PATIENT_PHONE:
+        return [UetgTarget(UETG_PATIENT_PHONE, UETG_PATIENT_NAME)]
+    return []
+
+
+def _summary_lines(items, limit=20):
+    lines = items[:limit]
+    if len(items) > limit:
+        lines.append(f"... e mais {len(items) - limit}")
+    return "\n".join(lines)
+
+
 def plan_next_week():
-    """Sorteia 2 datas úteis para a próxima semana"""
+    """Sorteia 2 datas úteis da próxima semana para todos os pacientes u-ETG"""
     try:
         logger.info("🎲 Iniciando sorteio semanal u-ETG...")
 
@@ -229,42 +276,35 @@ def plan_next_week():
             return False
 
         weekdays = get_weekdays_next_week()
+        patients = uetg_draw_engine.active_patients(extra=_legacy_patients())
+        result = uetg_draw_engine.draw_week(weekdays[0], patients=patients)
+        uetg_calendar.precompute([p.phone for p in patients])
 
-        # Separar início (seg/ter) e fim (qui/sex) da semana
-        early_week = weekdays[:2]  # Segunda e terça
-        late_week = weekdays[3:]  # Quinta e sexta
+        # Notificar admin (um resumo para o lote)
+        names = {p.phone: p.name for p in patients}
+        pt_weekdays = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
 
-        # Sortear uma data de cada período
-        selected_dates = [random.choice(early_week), random.choice(late_week)]
+        def fmt(day_iso):
+            day = datetime.fromisoformat(day_iso)
+            return f"{day.strftime('%d/%m')} ({pt_weekdays[day.weekday()]})"
 
-        # Salvar o plano
-        week_start = weekdays[0].isoformat()
-        plan = {
-            "week_start": week_start,
-            "days": [date.isoformat() for date in selected_dates],
-            "planned_at": datetime.now(TIMEZONE).isoformat(),
-        }
-
-        save_plan(plan)
-
-        # Notificar admin
-        dates_text = "\n".join(
-            [f"📅 {date.strftime('%d/%m/%Y (%A)')}" for date in selected_dates]
-        )
+        dates_text = _summary_lines([
+            f"📅 {names.get(phone, phone)}: {' e '.join(fmt(d) for d in days)}"
+            for phone, days in result["drawn"].items()
+        ]) or "Nenhum paciente novo para sortear"
 
         admin_message = f"""🎲 *Sorteio u-ETG Realizado*
 
-Datas sorteadas para {UETG_PATIENT_NAME}:
+Pacientes sorteados: {len(result['drawn'])} (já sorteados: {len(result['skipped'])})
 
 {dates_text}
 
 Semana: {weekdays[0].strftime('%d/%m')} a {weekdays[-1].strftime('%d/%m/%Y')}
+Chave do sorteio: {result['seed']}
 Sorteado em: {datetime.now(TIMEZONE).strftime('%d/%m/%Y às %H:%M')}"""
 
         if send_whatsapp_message(ADMIN_PHONE_NUMBER, admin_message):
-            logger.info(
-                f"Sorteio concluído: {[d.strftime('%d/%m') for d in selected_dates]}"
-            )
+            logger.info(f"Sorteio concluído: {len(result['drawn'])} pacientes")
             return True
         else:
             logger.error("Falha ao notificar admin sobre sorteio")
@@ -278,55 +318,53 @@ Sorteado em: {datetime.now(TIMEZONE).strftime('%d/%m/%Y às %H:%M')}"""
 
 
 def send_today():
-    """Envia lembrete se hoje é um dia sorteado"""
+    """Envia o lembrete para todos os pacientes sorteados para hoje"""
     try:
-        today = datetime.now(TIMEZONE).date().isoformat()
-        plan = load_plan()
-
-        if not plan or "days" not in plan:
-            logger.info("Nenhum plano encontrado para hoje")
-            return False
+        today_date = datetime.now(TIMEZONE)
+        targets = uetg_draw_engine.due_on(today_date.date(), default_name=UETG_PATIENT_NAME,
+                                          extra=_legacy_patients())
 
-        if today not in plan["days"]:
-            logger.info(f"Hoje ({today}) não está nos dias sorteados")
+        if not targets:
+            logger.info(f"Hoje ({today_date.date().isoformat()}) não está nos dias sorteados")
             return False
 
-        logger.info(f"🚨 Enviando lembrete u-ETG para hoje ({today})")
+        logger.info(f"🚨 Enviando lembrete u-ETG para hoje: {len(targets)} pacientes")
 
         if not validate_config():
             logger.error("Configuração inválida - envio cancelado")
             return False
 
         # Formatar data para exibição
-        today_date = datetime.now(TIMEZONE)
         formatted_date = today_date.strftime("%d/%m/%Y")
 
-        # Enviar template para paciente
-        template_sent = send_whatsapp_template(
-            UETG_PATIENT_PHONE,
-            "uetg_paciente_agenda_ptbr",
-            [UETG_PATIENT_NAME, formatted_date, UETG_DEFAULT_SLOT],
+        # Enviar template para os pacientes (pool compartilhado)
+        results = uetg_draw_engine.dispatch(
+            targets,
+            lambda target: send_whatsapp_template(
+                target.phone,
+                "uetg_paciente_agenda_ptbr",
+                [target.name, formatted_date, UETG_DEFAULT_SLOT],
+            ),
         )
+        sent = [t.name for t in targets if results.get(t.phone)]
+        failed = [t.name for t in targets if not results.get(t.phone)]
 
         # Notificar admin
-        if template_sent:
-            admin_message = f"""📨 *Lembrete u-ETG Enviado*
+        admin_message = f"""📨 *Lembretes u-ETG*
 
-Paciente: {UETG_PATIENT_NAME}
 Data: {formatted_date}
 Horário sugerido: {UETG_DEFAULT_SLOT}
+Enviados: {len(sent)}
+{_summary_lines(sent)}"""
+        if failed:
+            admin_message += f"""
 
-Template enviado às {today_date.strftime('%H:%M')}"""
-            send_whatsapp_message(ADMIN_PHONE_NUMBER, admin_message)
-        else:
-            admin_message = f"""❌ *Erro no Envio u-ETG*
+❌ Falhas: {len(failed)}
+{_summary_lines(failed)}"""
+        admin_message += f"\n\nProcessado às {today_date.strftime('%H:%M')}"
+        send_whatsapp_message(ADMIN_PHONE_NUMBER, admin_message)
 
-Falha ao enviar template para {UETG_PATIENT_NAME}
-Data: {formatted_date}
-Tentativa às {today_date.strftime('%H:%M')}"""
-            send_whatsapp_message(ADMIN_PHONE_NUMBER, admin_message)
-
-        return template_sent
+        return bool(sent) and not failed
 
     except Exception as e:
         logger.error(f"Erro ao enviar lembrete: {e}")
@@ -335,9 +373,28 @@ Tentativa às {today_date.strftime('%H:%M')}"""
         return False
 
 
-def init_scheduler():
+def precompute_calendar():
+    """Pré-calcular o calendário dos pacientes u-ETG (N semanas à frente)"""
+    try:
+        patients = uetg_draw_engine.active_patients(extra=_legacy_patients())
+        uetg_calendar.precompute([p.phone for p in patients])
+    except Exception as e:
+        logger.error(f"Erro ao pré-calcular calendário u-ETG: {e}")
+
+
+def _in_app_context(job):
+    """Jobs do APScheduler rodam fora de requisição: abrir o app context para o banco"""
+    def run():
+        with _app.app_context() if _app is not None else nullcontext():
+            return job()
+
+    run.__name__ = job.__name__
+    return run
+
+
+def init_scheduler(app=None):
     """Inicializa o agendador automático"""
-    global scheduler
+    global scheduler, _app
 
     try:
         if scheduler is not None:
@@ -347,12 +404,19 @@ def init_scheduler():
         if not validate_config():
             logger.error("Configuração inválida - scheduler não iniciado")
             return
+        if not uetg_calendar.enabled:
+            logger.error("UETG_DRAW_KEY não definido - scheduler u-ETG não iniciado")
+            return
+
+        _app = app
+        _in_app_context(import_legacy_files)()
+        _in_app_context(precompute_calendar)()
 
         scheduler = BackgroundScheduler(timezone=TIMEZONE)
 
         # Sorteio semanal: todo sábado às 12:00
         scheduler.add_job(
-            plan_next_week,
+            _in_app_context(plan_next_week),
             CronTrigger(day_of_week="sat", hour=12, minute=0, timezone=TIMEZONE),
             id="uetg_weekly_planning",
             replace_existing=True,
@@ -360,7 +424,7 @@ def init_scheduler():
 
         # Envio diário: segunda a sexta às 07:00
         scheduler.add_job(
-            send_today,
+            _in_app_context(send_today),
             CronTrigger(day_of_week="mon-fri", hour=7, minute=0, timezone=TIMEZONE),
             id="uetg_daily_send",
             replace_existing=True,
@@ -424,7 +488,7 @@ def process_button_click(button_id, patient_phone, patient_name):
         logger.info(f"Processando clique: {button_id} -> {selected_slot}")
 
         # Salvar confirmação
-        if save_confirmation(today, selected_slot, patient_name.strip()):
+        if save_confirmation(today, selected_slot, patient_name.strip(), phone=patient_phone.strip()):
             # Confirmar para o paciente
             patient_message = f"""✅ Horário confirmado: {selected_slot} para hoje ({datetime.now(TIMEZONE).strftime('%d/%m/%Y')})
 
@@ -18,6 +18,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("main")
 
+# Logs dos webhooks/poller (ingest.*) vão por fila com writer em segundo plano
+from src.ops.ingest_log import install_ingest_logging  # noqa: E402
+install_ingest_logging()
+
 # --- APP / CONFIG DB ---
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), "static"))
 app.config["SECRET_KEY"] = os.getenv("APP_SECRET", "change-me")
@@ -35,6 +39,13 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # Extensão do projeto
 from src.models.user import db  # noqa: E402
+from src.ops.import_profiler import boot_profiler  # noqa: E402
+from src.ops.schema_state import MODEL_MODULES, ensure_schema  # noqa: E402
+from src.ops.metrics import install_db_metrics, install_flask_metrics  # noqa: E402
+from src.ops.query_profiler import query_profiler  # noqa: E402
+from src.ops.boot_sentinel import (  # noqa: E402
+    begin_boot, boot_timeline, finish_boot, install_first_request_hook, phase as boot_phase,
+)
 
 CORS(app)
 
@@ -43,54 +54,28 @@ _admin_loaded = False
 _admin_load_error = None
 _MAIN_LOADED = False
 _BOOT_ERROR = None
+_SCHEMA_STATE = None
 
 
 def _load_models_safely():
     """
     Importa MODELOS que participam do create_all(), de forma defensiva.
     IMPORTANTE: usar o alias Patient de src.models.patient (tabela 'patients').
+    Cada import é medido pelo boot_profiler.
     """
     problems = []
 
-    # Pacientes
-    try:
-        from src.models.patient import Patient  # noqa: F401
-    except Exception as e:
-        problems.append(f"patient model not loaded: {e}")
-
-    # Dependentes de patients.id
-    try:
-        from src.models.reminder import Reminder  # noqa: F401
-    except Exception as e:
-        problems.append(f"reminder model not loaded: {e}")
-
-    try:
-        from src.models.response import Response  # noqa: F401
-    except Exception as e:
-        problems.append(f"response model not loaded: {e}")
-
-    try:
-        from src.models.medication import Medication  # noqa: F401
-    except Exception as e:
-        problems.append(f"medication model not loaded: {e}")
-
-    # Exercício de respiração (usado por Reminder)
-    try:
-        from src.models.breathing_exercise import BreathingExercise  # noqa: F401
-    except Exception as e:
-        problems.append(f"breathing_exercise model not loaded: {e}")
-
-    # Modelos opcionais (não derrubam boot)
-    try:
-        __import__("src.models.mood", fromlist=["*"])
-    except Exception as e:
-        logger.warning(f"mood model not loaded: {e}")
-
-    # Campanhas (opcional; não derruba Admin)
-    try:
-        __import__("src.admin.models.campaign", fromlist=["*"])
-    except Exception as e:
-        logger.warning(f"campaign models not loaded: {e}")
+    # Pacientes primeiro, depois dependentes de patients.id
+    for module, required in MODEL_MODULES:
+        try:
+            with boot_profiler.measure(module):
+                __import__(module, fromlist=["*"])
+        except Exception as e:
+            name = module.rsplit(".", 1)[-1]
+            if required:
+                problems.append(f"{name} model not loaded: {e}")
+            else:
+                logger.warning(f"{name} model not loaded: {e}")
 
     if problems:
         for p in problems:
@@ -101,7 +86,8 @@ def _register_api_blueprints():
     """Importa e registra blueprints de API com tolerância a falhas."""
     def _try(bp_import, prefix):
         try:
-            bp = bp_import()
+            with boot_profiler.measure(f"blueprint {prefix}"):
+                bp = bp_import()
             app.register_blueprint(bp, url_prefix=prefix)
             logger.info(f"API blueprint loaded: {prefix}")
         except Exception as e:
@@ -126,7 +112,8 @@ def _load_admin_blueprint():
     """Carrega a UI de Admin. Se falhar, deixa um endpoint de diagnóstico em /admin."""
     global _admin_loaded, _admin_load_error
     try:
-        admin_bp = __import__("src.admin.routes", fromlist=["admin_bp"]).admin_bp
+        with boot_profiler.measure("src.admin.routes"):
+            admin_bp = __import__("src.admin.routes", fromlist=["admin_bp"]).admin_bp
         app.register_blueprint(admin_bp, url_prefix="/admin")
         _admin_loaded = True
         logger.info("Admin UI loaded")
@@ -190,30 +177,30 @@ def health():
 
 
 def _boot_state_view():
-    """Handler real do /ops/boot-state."""
+    """Handler real do /ops/boot-state (inclui fases do boot e histórico)."""
     if _MAIN_LOADED:
-        return jsonify(
-            {
-                "main_loaded": True,
-                "source": "main_boot",
-                "last_attempt": datetime.utcnow().isoformat() + "Z",
-            }
-        )
+        payload = {
+            "main_loaded": True,
+            "source": "main_boot",
+            "last_attempt": datetime.utcnow().isoformat() + "Z",
+        }
     else:
         err = _BOOT_ERROR or "unknown"
-        return jsonify(
-            {
-                "main_loaded": False,
-                "source": "exception",
-                "error_type": getattr(err, "__class__", type("E", (), {})).__name__
-                if hasattr(err, "__class__")
-                else "Exception",
-                "summary": str(err),
-                "file": "src/main.py",
-                "line": 0,
-                "last_attempt": datetime.utcnow().isoformat() + "Z",
-            }
-        )
+        payload = {
+            "main_loaded": False,
+            "source": "exception",
+            "error_type": getattr(err, "__class__", type("E", (), {})).__name__
+            if hasattr(err, "__class__")
+            else "Exception",
+            "summary": str(err),
+            "file": "src/main.py",
+            "line": 0,
+            "last_attempt": datetime.utcnow().isoformat() + "Z",
+        }
+    payload["schema"] = _SCHEMA_STATE
+    payload.update(boot_timeline())
+    payload["imports"] = boot_profiler.summary()
+    return jsonify(payload)
 
 
 def _register_boot_state_route():
@@ -236,31 +223,74 @@ def admin_spa_catch_all(subpath):
 
 def _init_app():
     """Inicializa modelos, cria tabelas, agenda jobs e carrega Admin."""
-    global _MAIN_LOADED, _BOOT_ERROR
+    global _MAIN_LOADED, _BOOT_ERROR, _SCHEMA_STATE
 
     try:
-        _load_models_safely()
+        install_flask_metrics(app)
+        install_db_metrics()
+        query_profiler.install()
+        query_profiler.install_flask(app)
 
-        # Cria/garante tabelas
+        with boot_phase("model_import"):
+            _load_models_safely()
+
+        # Confere a versão do schema (DDL só em banco sem alembic_version)
         try:
-            db.create_all()
+            with boot_phase("schema_check"):
+                _SCHEMA_STATE = ensure_schema(db)
+            logger.info(f"Schema: {_SCHEMA_STATE}")
         except Exception:
-            logger.error("⚠️ DB create_all falhou", exc_info=True)
+            logger.error("⚠️ Verificação/criação do schema falhou", exc_info=True)
             raise
 
+        # Dados de referência e cache de pacientes: invalidação por commit e escalas compiladas carregadas uma vez
+        try:
+            with boot_phase("reference_caches"):
+                __import__("src.services.reference_cache", fromlist=["install_model_watchers"]).install_model_watchers()
+                __import__("src.services.patient_cache", fromlist=["install_patient_watcher"]).install_patient_watcher()
+                __import__("src.services.scale_registry", fromlist=["scale_registry"]).scale_registry.load()
+        except Exception:
+            logger.exception("Error loading reference data caches")
+
         # Registra APIs com tolerância a falhas
-        _register_api_blueprints()
+        with boot_phase("blueprints"):
+            _register_api_blueprints()
 
         # Jobs (tolerante a falha)
-        try:
-            init_scheduler = __import__("src.jobs.uetg_scheduler", fromlist=["init_scheduler"]).init_scheduler
-            init_scheduler()
-            logger.info("u-ETG Scheduler initialized")
-        except Exception:
-            logger.exception("Error initializing u-ETG scheduler")
+        with boot_phase("scheduler_start"):
+            try:
+                with boot_profiler.measure("src.jobs.uetg_scheduler"):
+                    init_scheduler = __import__("src.jobs.uetg_scheduler", fromlist=["init_scheduler"]).init_scheduler
+                init_scheduler(app)
+                logger.info("u-ETG Scheduler initialized")
+            except Exception:
+                logger.exception("Error initializing u-ETG scheduler")
+
+            try:
+                with boot_profiler.measure("src.jobs.rollup_job"):
+                    init_rollup_scheduler = __import__("src.jobs.rollup_job", fromlist=["init_scheduler"]).init_scheduler
+                init_rollup_scheduler(app)
+                logger.info("Rollup scheduler initialized")
+            except Exception:
+                logger.exception("Error initializing rollup scheduler")
+
+            # Timers persistidos (adiar lembrete/medicação)
+            try:
+                with boot_profiler.measure("src.services.timer_service"):
+                    init_timer_service = __import__("src.services.timer_service", fromlist=["init_timer_service"]).init_timer_service
+                init_timer_service(app)
+            except Exception:
+                logger.exception("Error initializing timer service")
+
+            # Ingestão do Telegram por long polling (TELEGRAM_INGESTION=polling)
+            try:
+                __import__("src.jobs.telegram_poller", fromlist=["init_poller"]).init_poller(app)
+            except Exception:
+                logger.exception("Error initializing Telegram poller")
 
         # Admin UI
-        _load_admin_blueprint()
+        with boot_phase("admin"):
+            _load_admin_blueprint()
 
         _MAIN_LOADED = True
         _BOOT_ERROR = None
@@ -271,12 +301,17 @@ def _init_app():
         _BOOT_ERROR = e
         logger.exception("Main app failed to initialize")
     finally:
+        boot_profiler.flush()
         _register_boot_state_route()
+        install_first_request_hook(app)
+        finish_boot()
 
 
 # ---------- Entrada ----------
 if __name__ == "__main__":
-    db.init_app(app)
+    begin_boot()
+    with boot_phase("sqlalchemy_init"):
+        db.init_app(app)
     with app.app_context():
         _init_app()
 
@@ -285,7 +320,9 @@ if __name__ == "__main__":
     logger.info(f"Starting on port {port} (debug={debug})")
     app.run(host="0.0.0.0", port=port, debug=debug)
 else:
-    db.init_app(app)
+    begin_boot()
+    with boot_phase("sqlalchemy_init"):
+        db.init_app(app)
     with app.app_context():
         _init_app()
 
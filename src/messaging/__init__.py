@@ -0,0 +1,33 @@
+"""
+Núcleo de mensagens independente de canal.
+
+O conteúdo (texto, cabeçalho, botões) é descrito uma vez em
+OutboundMessage; cada canal tem um transporte que sabe entregá-lo
+(WhatsApp Graph API, Telegram Bot API ou o transporte falso local).
+O MessagingCore escolhe o canal de cada paciente, faz fallback e mede
+custo/latência, de modo que pooling, métricas e roteamento valem para
+todos os canais.
+
+Uso:
+    from src.messaging import messaging
+    messaging.send_template(patient, 'scale_reminder', name=..., ...)
+"""
+
+from src.messaging.message import OutboundMessage
+from src.messaging.transports import (
+    FakeTransport,
+    TelegramTransport,
+    Transport,
+    WhatsAppTransport,
+)
+from src.messaging.core import MessagingCore, messaging
+
+__all__ = [
+    "OutboundMessage",
+    "Transport",
+    "WhatsAppTransport",
+    "TelegramTransport",
+    "FakeTransport",
+    "MessagingCore",
+    "messaging",
+]
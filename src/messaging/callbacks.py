@@ -0,0 +1,353 @@
+"""
+Ids de callback (botões do WhatsApp / callback_data do Telegram)
+
+Duas formas convivem:
+- legada: "<prefixo><arg>_<arg>" (ex.: "snooze_reminder_42_60"), usada nos
+  templates e em botões já entregues;
+- compacta: "~1rz.42.60.<assinatura>" — versão, código da rota, argumentos
+  e HMAC truncado (CALLBACK_SIGNING_KEY). Cabe folgado nos 64 bytes do
+  Telegram e não pode ser forjada por um cliente que monte callback_data
+  à mão.
+
+CALLBACK_SIGNING_KEY é opcional e não tem valor padrão. Sem ela não há
+ids compactos: encode() devolve o id legado, sem assinatura, ids compactos
+recebidos são recusados e um aviso é registrado no boot (nada é assinado
+com chave previsível). Com a chave, o Telegram emite ids compactos para as
+rotas de COMPACT_ONLY (lembretes e medicação tomada, que carregam ids do
+banco). Se CALLBACK_LEGACY_UNTIL estiver definido, depois dessa data os ids
+legados tipados dessas rotas deixam de ser aceitos no Telegram; sem ele
+continuam aceitos. Ids legados sem argumentos tipados (ex.:
+"medication_taken_yes" do afetivograma) e o WhatsApp não mudam.
+
+CallbackRegistry resolve as duas: a compacta por dicionário (código da
+rota) e a legada por prefixo mais longo numa trie; o custo depende do
+tamanho do id, não do número de rotas. Os argumentos saem tipados em
+Callback.args, e Callback.data é sempre o id legado equivalente, o formato
+que os serviços existentes recebem.
+
+CallbackRouter é a tabela de um canal: família da rota -> handler.
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+from collections import namedtuple
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from src.ops.metrics import metrics
+
+CALLBACK_SIGNING_KEY = (os.getenv("CALLBACK_SIGNING_KEY") or "").strip()
+# Último dia em que ids legados das rotas de COMPACT_ONLY ainda valem no Telegram (vazio: sem prazo)
+CALLBACK_LEGACY_UNTIL = (os.getenv("CALLBACK_LEGACY_UNTIL") or "").strip()
+# Rotas (nome ou família) emitidas só em forma compacta no Telegram
+COMPACT_ONLY = frozenset({'reminder', 'medication.taken'})
+
+VERSION = "1"
+MARK = "~"
+SEPARATOR = "."
+SIGNATURE_CHARS = 6
+
+logger = logging.getLogger(__name__)
+
+CALLBACKS_TOTAL = metrics.counter(
+    "callback_routes_total", "Callbacks recebidos por rota e resultado", ("route", "status"))
+
+_MISSING = object()
+
+
+class CallbackError(ValueError):
+    """Id compacto inválido (versão, rota, argumentos ou assinatura)"""
+
+
+class CallbackRoute(namedtuple('CallbackRoute', ['name', 'family', 'prefix', 'code', 'fields'])):
+    """
+    Rota de callback
+
+    fields: ((nome, tipo) ou (nome, tipo, padrão), ...); o último campo str
+    do id legado fica com o resto do texto (nomes de escala com "_").
+    """
+
+    __slots__ = ()
+
+    def parse_legacy(self, rest: str) -> Optional[Dict]:
+        """Argumentos tipados a partir do texto após o prefixo (None se não conferem)"""
+        parts = rest.split('_', len(self.fields) - 1) if self.fields and rest else []
+        args = {}
+        for index, field in enumerate(self.fields):
+            name, kind = field[0], field[1]
+            if index < len(parts) and parts[index] != '':
+                try:
+                    args[name] = kind(parts[index])
+                except ValueError:
+                    return None
+            elif len(field) > 2:
+                args[name] = field[2]
+            else:
+                return None
+        return args
+
+    def legacy_id(self, args: Dict) -> str:
+        values = [str(args[f[0]]) for f in self.fields if args.get(f[0]) is not None]
+        return self.prefix + '_'.join(values)
+
+
+Callback = namedtuple('Callback', ['route', 'args', 'data'])
+
+
+class CallbackCodec:
+    """Ids compactos: versão + código da rota + argumentos + HMAC truncado"""
+
+    def __init__(self, key: str = CALLBACK_SIGNING_KEY):
+        if not key or key == "change-me":
+            raise ValueError("CALLBACK_SIGNING_KEY não configurada")
+        self._mac = hmac.new(key.encode('utf-8'), digestmod=hashlib.sha256)
+
+    def _sign(self, body: str) -> str:
+        mac = self._mac.copy()  # evita refazer o preparo da chave a cada id
+        mac.update(body.encode('utf-8'))
+        digest = mac.digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii')[:SIGNATURE_CHARS]
+
+    def encode(self, route: CallbackRoute, args: Dict) -> str:
+        values = []
+        for field in route.fields:
+            value = args.get(field[0], field[2] if len(field) > 2 else _MISSING)
+            if value is _MISSING:
+                raise CallbackError(f"{route.name}: falta o argumento {field[0]}")
+            value = '' if value is None else str(value)
+            if SEPARATOR in value or MARK in value:
+                raise CallbackError(f"{route.name}: {field[0]} não pode conter '{SEPARATOR}' ou '{MARK}'")
+            values.append(value)
+        body = SEPARATOR.join([VERSION + route.code] + values)
+        return f"{MARK}{body}{SEPARATOR}{self._sign(body)}"
+
+    def decode(self, data: str, routes_by_code: Dict[str, CallbackRoute]) -> Callback:
+        if not data.startswith(MARK):
+            raise CallbackError("id sem marcador")
+        body, _, signature = data[1:].rpartition(SEPARATOR)
+        if not body or not hmac.compare_digest(signature.encode('utf-8'), self._sign(body).encode('ascii')):
+            raise CallbackError("assinatura inválida")
+        head, *values = body.split(SEPARATOR)
+        if head[:1] != VERSION:
+            raise CallbackError(f"versão não suportada: {head[:1]!r}")
+        route = routes_by_code.get(head[1:])
+        if route is None or len(values) != len(route.fields):
+            raise CallbackError(f"rota desconhecida: {head[1:]!r}")
+
+        args = {}
+        for field, value in zip(route.fields, values):
+            if value == '' and len(field) > 2:
+                args[field[0]] = field[2]
+                continue
+            try:
+                args[field[0]] = field[1](value)
+            except ValueError:
+                raise CallbackError(f"{route.name}: {field[0]} inválido")
+        return Callback(route, args, route.legacy_id(args))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+def _legacy_until(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        logger.error(f"CALLBACK_LEGACY_UNTIL inválido: {value!r}; ids legados seguem aceitos")
+        return None
+
+
+def _default_codec() -> Optional[CallbackCodec]:
+    if not CALLBACK_SIGNING_KEY:
+        logger.warning("CALLBACK_SIGNING_KEY não definida: ids compactos desativados, só ids legados")
+        if CALLBACK_LEGACY_UNTIL:
+            logger.warning("CALLBACK_LEGACY_UNTIL ignorado sem CALLBACK_SIGNING_KEY")
+        return None
+    return CallbackCodec(CALLBACK_SIGNING_KEY)
+
+
+class CallbackRegistry:
+    """Rotas conhecidas; resolve ids compactos e legados"""
+
+    def __init__(self, routes: Iterable[CallbackRoute] = (), codec: Optional[CallbackCodec] = _MISSING,
+                 legacy_until: Optional[date] = _MISSING):
+        # codec None: sem chave de assinatura (só ids legados)
+        self.codec = _default_codec() if codec is _MISSING else codec
+        self.legacy_until = _legacy_until(CALLBACK_LEGACY_UNTIL) if legacy_until is _MISSING else legacy_until
+        self._by_name: Dict[str, CallbackRoute] = {}
+        self._by_code: Dict[str, CallbackRoute] = {}
+        self._root = _TrieNode()
+        for route in routes:
+            self.add(route)
+
+    def add(self, route: CallbackRoute) -> None:
+        for registered, key in ((self._by_name, route.name), (self._by_code, route.code)):
+            if key in registered and registered[key] != route:
+                raise ValueError(f"Rota de callback duplicada: {key}")
+        self._by_name[route.name] = route
+        self._by_code[route.code] = route
+        node = self._root
+        for char in route.prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        node.route = route
+
+    def route(self, name: str) -> CallbackRoute:
+        return self._by_name[name]
+
+    def encode(self, name: str, **args) -> str:
+        """Id compacto e assinado da rota `name` (id legado se não há chave)"""
+        route = self._by_name[name]
+        if self.codec is None:
+            return route.legacy_id(args)
+        return self.codec.encode(route, args)
+
+    def compact(self, data: str, only: Iterable[str] = COMPACT_ONLY) -> str:
+        """Id legado tipado de uma rota de `only` -> id compacto; demais ids inalterados"""
+        if self.codec is None or not data or data.startswith(MARK):
+            return data
+        route = self._longest_prefix(data)
+        if route is None or not _listed(route, only):
+            return data
+        args = route.parse_legacy(data[len(route.prefix):])
+        if args is None:
+            return data
+        try:
+            return self.codec.encode(route, args)
+        except CallbackError:
+            return data
+
+    def legacy_expired(self, today: Optional[date] = None) -> bool:
+        """Ids legados das rotas só-compactas já não valem (exige chave: sem ela não há alternativa)"""
+        if self.codec is None or self.legacy_until is None:
+            return False
+        return (today or date.today()) > self.legacy_until
+
+    def _longest_prefix(self, data: str) -> Optional[CallbackRoute]:
+        node, found = self._root, None
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                found = node.route
+        return found
+
+    def match(self, data: str, compact_only: Iterable[str] = ()) -> Optional[Callback]:
+        """
+        Callback resolvido ou None (id desconhecido ou compacto inválido)
+
+        compact_only: rotas (nome ou família) cujo id legado tipado é recusado
+        depois de legacy_until
+        """
+        if not data:
+            return None
+        if data.startswith(MARK):
+            if self.codec is None:
+                CALLBACKS_TOTAL.inc(route="compact", status="invalid")
+                logger.warning("Callback compacto rejeitado: CALLBACK_SIGNING_KEY não configurada")
+                return None
+            try:
+                callback = self.codec.decode(data, self._by_code)
+            except CallbackError as e:
+                CALLBACKS_TOTAL.inc(route="compact", status="invalid")
+                logger.warning(f"Callback compacto rejeitado: {e}")
+                return None
+            CALLBACKS_TOTAL.inc(route=callback.route.name, status="ok")
+            return callback
+
+        route = self._longest_prefix(data)
+        if route is None:
+            CALLBACKS_TOTAL.inc(route="none", status="unmatched")
+            return None
+        args = route.parse_legacy(data[len(route.prefix):])
+        if args is not None and compact_only and _listed(route, compact_only) and self.legacy_expired():
+            CALLBACKS_TOTAL.inc(route=route.name, status="legacy_rejected")
+            logger.warning(f"Callback legado recusado para {route.name} (só ids compactos)")
+            return None
+        CALLBACKS_TOTAL.inc(route=route.name, status="ok" if args is not None else "untyped")
+        return Callback(route, args, data)
+
+    def routes(self) -> Tuple[CallbackRoute, ...]:
+        return tuple(self._by_name.values())
+
+
+def _listed(route: CallbackRoute, names: Iterable[str]) -> bool:
+    return route.name in names or route.family in names
+
+
+class CallbackRouter:
+    """Tabela de um canal: família (ou nome) da rota -> handler"""
+
+    def __init__(self, handlers: Dict[str, Callable], registry: Optional[CallbackRegistry] = None,
+                 compact_only: Iterable[str] = ()):
+        self.registry = registry or callback_registry
+        self.handlers = dict(handlers)
+        # Canal que só emite ids compactos para estas rotas (ver CallbackRegistry.match)
+        self.compact_only = frozenset(compact_only)
+
+    def resolve(self, data: str) -> Tuple[Optional[Callable], Optional[Callback]]:
+        """(handler, callback); handler None se a rota não é tratada neste canal"""
+        callback = self.registry.match(data, self.compact_only)
+        if callback is None:
+            return None, None
+        handler = self.handlers.get(callback.route.name) or self.handlers.get(callback.route.family)
+        return handler, callback
+
+
+# Rotas conhecidas. Ordem irrelevante: vale o prefixo mais longo.
+# Códigos são permanentes (ids compactos já entregues dependem deles).
+ROUTES = (
+    # u-ETG
+    CallbackRoute('uetg.slot', 'uetg', 'slot_', 'us', (('slot', str),)),
+    # Questionários
+    CallbackRoute('questionnaire.start', 'questionnaire', 'start_questionnaire_', 'qs', (('scale', str),)),
+    CallbackRoute('questionnaire.action', 'questionnaire', 'questionnaire_', 'qa', (('action', str),)),
+    # Medicação
+    CallbackRoute('medication.taken', 'medication', 'medication_taken_', 'mt', (('medication_id', int),)),
+    CallbackRoute('medication.snooze', 'medication', 'medication_snooze_', 'mz', (('medication_id', int),)),
+    CallbackRoute('medication.skip', 'medication', 'medication_skip_', 'mk', (('medication_id', int),)),
+    CallbackRoute('medication.other', 'medication', 'medication_', 'mo', (('action', str),)),
+    # Humor
+    CallbackRoute('mood.start', 'mood', 'start_mood_', 'hs', (('what', str),)),
+    CallbackRoute('mood.answer', 'mood', 'mood_', 'ha', (('answer', str),)),
+    # Respiração
+    CallbackRoute('breathing.start', 'breathing', 'start_breathing_', 'bs', (('exercise_id', int),)),
+    CallbackRoute('breathing.option', 'breathing', 'breathing_', 'bo', (('option', str),)),
+    # Lembretes (adiar/pular)
+    CallbackRoute('reminder.snooze', 'reminder', 'snooze_reminder_', 'rz',
+                  (('reminder_id', int), ('minutes', int, None))),
+    CallbackRoute('reminder.delay', 'reminder', 'delay_reminder_', 'rd',
+                  (('reminder_id', int), ('minutes', int, None))),
+    CallbackRoute('reminder.snooze_medication', 'reminder', 'snooze_medication_', 'rm',
+                  (('reminder_id', int), ('minutes', int, None))),
+    CallbackRoute('reminder.skip', 'reminder', 'skip_reminder_', 'rk', (('reminder_id', int),)),
+    CallbackRoute('reminder.skip_medication', 'reminder', 'skip_medication_', 'rs', (('reminder_id', int),)),
+    CallbackRoute('reminder.snooze_other', 'reminder', 'snooze_', 'ro', (('rest', str),)),
+    CallbackRoute('reminder.skip_other', 'reminder', 'skip_', 'rx', (('rest', str),)),
+    # Painel admin do WhatsApp
+    CallbackRoute('admin.patients', 'admin.patients', 'patients_', 'ap', (('action', str),)),
+    CallbackRoute('admin.reminders', 'admin.reminders', 'reminders_', 'ar', (('action', str),)),
+    CallbackRoute('admin.reports', 'admin.reports', 'reports_', 'at', (('action', str),)),
+    CallbackRoute('admin.system', 'admin.system', 'system_', 'as', (('action', str),)),
+)
+
+# Instância global
+callback_registry = CallbackRegistry(ROUTES)
+
+
+def callback_id(name: str, **args) -> str:
+    """Atalho: id compacto e assinado da rota `name` (ex.: botões do Telegram)"""
+    return callback_registry.encode(name, **args)
+
+
+def compact_callback_id(data: str) -> str:
+    """Atalho: id legado de uma rota de COMPACT_ONLY convertido para compacto (botões de templates)"""
+    return callback_registry.compact(data)
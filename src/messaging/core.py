@@ -0,0 +1,179 @@
+"""
+MessagingCore: roteamento de mensagens entre canais
+
+Para cada paciente os canais com endereço são ordenados pela política
+MESSAGING_ROUTING:
+- cost (padrão): menor custo por mensagem (Telegram é gratuito,
+  mensagens do WhatsApp iniciadas pela empresa são cobradas);
+- latency: menor latência média observada (EWMA dos últimos envios);
+- fixed: ordem de MESSAGING_CHANNELS.
+Empates seguem MESSAGING_CHANNELS. Se o envio falha, tenta o próximo canal.
+
+prepare() resolve rota e conteúdo de cada canal antes do envio (usado
+pelo envio agrupado por minuto, src/messaging/send_buckets.py); deliver()
+envia o resultado sem tocar no paciente nem renderizar de novo.
+
+MESSAGING_FAKE=1 troca todos os transportes pelo FakeTransport (ambiente
+local), que guarda as mensagens em memória.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from src.messaging.message import OutboundMessage
+from src.messaging.transports import (
+    FakeTransport,
+    TelegramTransport,
+    Transport,
+    WhatsAppTransport,
+)
+from src.ops.metrics import metrics
+
+# Configurações
+MESSAGING_ROUTING = (os.getenv("MESSAGING_ROUTING") or "cost").strip().lower()
+MESSAGING_CHANNELS = tuple(
+    c.strip() for c in (os.getenv("MESSAGING_CHANNELS") or "whatsapp,telegram").split(",") if c.strip()
+)
+MESSAGING_FAKE = os.getenv("MESSAGING_FAKE", "0") == "1"
+LATENCY_ALPHA = 0.2  # peso do envio mais recente na média de latência
+
+logger = logging.getLogger(__name__)
+
+SEND_SECONDS = metrics.histogram(
+    "messaging_send_seconds", "Duração dos envios por canal", ("channel",))
+SENDS_TOTAL = metrics.counter(
+    "messaging_sends_total", "Envios por canal, template e resultado", ("channel", "template", "status"))
+
+# Envio pronto: routes = [(transporte, endereço, conteúdo renderizado ou None)]
+PreparedSend = namedtuple('PreparedSend', ['message', 'routes'])
+
+
+class MessagingCore:
+    """Registro de transportes + escolha de canal por paciente"""
+
+    def __init__(self, transports: Optional[List[Transport]] = None,
+                 routing: str = MESSAGING_ROUTING, channels=MESSAGING_CHANNELS):
+        self.routing = routing
+        self.channels = tuple(channels)
+        self._transports: Dict[str, Transport] = {}
+        self._latency: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        for transport in transports or ():
+            self.register(transport)
+
+    def register(self, transport: Transport) -> None:
+        self._transports[transport.channel] = transport
+        if transport.channel not in self.channels:
+            self.channels = self.channels + (transport.channel,)
+
+    def transport(self, channel: str) -> Optional[Transport]:
+        return self._transports.get(channel)
+
+    # ---------- Roteamento ----------
+
+    def routes(self, patient, channel: Optional[str] = None) -> List[tuple]:
+        """[(transporte, endereço)] na ordem de tentativa"""
+        names = [channel] if channel else [c for c in self.channels if c in self._transports]
+        candidates = []
+        for name in names:
+            transport = self._transports.get(name)
+            address = transport.address_for(patient) if transport else None
+            if address:
+                candidates.append((transport, address))
+
+        if self.routing == "cost":
+            candidates.sort(key=lambda c: c[0].cost)
+        elif self.routing == "latency":
+            # Canal ainda sem medição vai para o fim (sort é estável)
+            candidates.sort(key=lambda c: self._latency.get(c[0].channel, float("inf")))
+        return candidates
+
+    def _observe(self, channel: str, elapsed: float) -> None:
+        SEND_SECONDS.observe(elapsed, channel=channel)
+        with self._lock:
+            previous = self._latency.get(channel)
+            self._latency[channel] = elapsed if previous is None else (
+                LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * previous)
+
+    # ---------- Envio ----------
+
+    def prepare(self, patient, message: OutboundMessage, channel: Optional[str] = None) -> PreparedSend:
+        """Resolver rotas e renderizar o conteúdo de cada canal agora (envio depois via deliver)"""
+        return PreparedSend(message, [
+            (transport, address, transport.render(address, message))
+            for transport, address in self.routes(patient, channel)
+        ])
+
+    def send(self, patient, message: OutboundMessage, channel: Optional[str] = None) -> Dict:
+        """
+        Entregar a mensagem pelo melhor canal disponível do paciente
+
+        Args:
+            patient: Patient (ou PatientSnapshot) com os endereços dos canais
+            message: Conteúdo a enviar
+            channel: Forçar um canal (sem fallback)
+
+        Returns:
+            {'success', 'channel', 'message_id'?, 'attempts': [...], 'error'?}
+        """
+        # Sem pré-renderização: cada canal só monta o conteúdo se for tentado
+        routes = [(transport, address, None) for transport, address in self.routes(patient, channel)]
+        return self.deliver(PreparedSend(message, routes))
+
+    def deliver(self, prepared: PreparedSend) -> Dict:
+        """Enviar um PreparedSend, tentando as rotas em ordem (mesmo retorno de send)"""
+        message = prepared.message
+        if not prepared.routes:
+            SENDS_TOTAL.inc(channel="none", template=message.name, status="no_route")
+            return {'success': False, 'channel': None, 'attempts': [],
+                    'error': 'Paciente sem canal de mensagens disponível'}
+
+        attempts = []
+        for transport, address, rendered in prepared.routes:
+            start = time.perf_counter()
+            try:
+                result = transport.send(address, message, rendered)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            self._observe(transport.channel, time.perf_counter() - start)
+
+            status = "sent" if result.get('success') else "error"
+            SENDS_TOTAL.inc(channel=transport.channel, template=message.name, status=status)
+            attempts.append({'channel': transport.channel, 'success': bool(result.get('success')),
+                             'error': result.get('error')})
+            if result.get('success'):
+                return {'success': True, 'channel': transport.channel,
+                        'message_id': result.get('message_id'), 'attempts': attempts}
+            logger.warning(f"Falha ao enviar {message.name} via {transport.channel}: {result.get('error')}")
+
+        return {'success': False, 'channel': None, 'attempts': attempts,
+                'error': attempts[-1]['error']}
+
+    def send_template(self, patient, template_name: str, channel: Optional[str] = None, **fields) -> Dict:
+        """Atalho: send() com OutboundMessage.from_template"""
+        return self.send(patient, OutboundMessage.from_template(template_name, **fields), channel=channel)
+
+    def stats(self) -> Dict:
+        return {
+            'routing': self.routing,
+            'channels': [c for c in self.channels if c in self._transports],
+            'latency_ms': {c: round(v * 1000, 1) for c, v in self._latency.items()},
+            'cost': {c: t.cost for c, t in self._transports.items()},
+        }
+
+
+def _default_transports() -> List[Transport]:
+    if MESSAGING_FAKE:
+        return [FakeTransport()]
+    transports = [WhatsAppTransport()]
+    if os.getenv("TELEGRAM_BOT_TOKEN"):
+        transports.append(TelegramTransport())
+    return transports
+
+
+# Instância global
+messaging = MessagingCore(_default_transports())
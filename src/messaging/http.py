@@ -0,0 +1,29 @@
+"""
+Sessões HTTP compartilhadas (keep-alive) para as APIs de mensagens
+
+Uma requests.Session por thread: conexões TLS reaproveitadas entre
+envios em vez de um handshake por chamada, sem compartilhar a mesma
+Session entre threads (agendador, poller, webhooks).
+"""
+
+import os
+import threading
+
+POOL_MAXSIZE = int(os.getenv("MESSAGING_HTTP_POOL_SIZE") or "10")
+
+_local = threading.local()
+
+
+def http_session():
+    """requests.Session da thread atual, criada sob demanda"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
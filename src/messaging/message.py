@@ -0,0 +1,50 @@
+"""
+Mensagem de saída neutra em relação ao canal
+"""
+
+from typing import List, Optional, Tuple
+
+from src.templates.message_templates import get_message_template
+
+
+class OutboundMessage:
+    """Conteúdo a entregar: template compilado + campos, ou texto livre com botões"""
+
+    __slots__ = ('template', 'fields', '_text', '_header', '_buttons')
+
+    def __init__(self, text: str = '', header: Optional[str] = None,
+                 buttons: Optional[List[Tuple[str, str]]] = None,
+                 template=None, fields: Optional[dict] = None):
+        self.template = template
+        self.fields = fields or {}
+        self._text = text
+        self._header = header
+        self._buttons = tuple(buttons or ())
+
+    @classmethod
+    def from_template(cls, template_name: str, **fields) -> 'OutboundMessage':
+        """Mensagem a partir de um template de src/templates/message_templates.py"""
+        return cls(template=get_message_template(template_name), fields=fields)
+
+    @property
+    def name(self) -> str:
+        return self.template.name if self.template is not None else 'text'
+
+    @property
+    def text(self) -> str:
+        if self.template is not None:
+            return self.template.render_text(**self.fields)
+        return self._text
+
+    @property
+    def header(self) -> Optional[str]:
+        if self.template is not None:
+            return self.template.header
+        return self._header
+
+    @property
+    def buttons(self) -> Tuple[Tuple[str, str], ...]:
+        """[(id, título)] com os campos já preenchidos"""
+        if self.template is not None:
+            return self.template.render_buttons(**self.fields)
+        return self._buttons
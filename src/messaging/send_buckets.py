@@ -0,0 +1,250 @@
+"""
+Envio agrupado por (fuso, minuto)
+
+Os lembretes se concentram em poucos horários fixos (07:30, 12:00, 12:15,
+16:40, 19:00...), e enviar tudo em série quando a varredura encontra os
+vencidos joga a renderização e o pico de envios para dentro do mesmo minuto.
+O SendBucketer separa as etapas:
+
+- stage(): recebe o item com antecedência (o agendador olha
+  SEND_BUCKET_LEAD_SECONDS à frente), resolve rota e conteúdo de cada canal
+  (MessagingCore.prepare) e guarda no grupo (fuso, minuto do envio);
+- na virada do minuto o grupo é liberado no pool de envio
+  (SEND_BUCKET_WORKERS): urgentes na hora, os demais espaçados a
+  SEND_BUCKET_RATE por segundo, sem passar de SEND_BUCKET_SPREAD_SECONDS
+  (grupos grandes aceleram para caber na janela);
+- os resultados (com 'delivered_at', hora local) ficam numa fila drenada
+  pelo dono (completed()), que grava
+  no banco na própria thread; a chave só sai do índice de deduplicação
+  quando é drenada, então varreduras seguidas não enfileiram de novo.
+
+Horários sem fuso são interpretados no fuso informado em stage() ou, sem
+fuso, na hora local do servidor (mesma convenção do datetime.now() do
+agendador).
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.messaging.core import MessagingCore, PreparedSend, messaging
+from src.messaging.message import OutboundMessage
+from src.ops.metrics import metrics
+
+# Configurações
+SEND_BUCKET_LEAD_SECONDS = float(os.getenv("SEND_BUCKET_LEAD_SECONDS") or "120")
+SEND_BUCKET_WORKERS = int(os.getenv("SEND_BUCKET_WORKERS") or "8")
+SEND_BUCKET_RATE = float(os.getenv("SEND_BUCKET_RATE") or "20")
+SEND_BUCKET_SPREAD_SECONDS = float(os.getenv("SEND_BUCKET_SPREAD_SECONDS") or "30")
+MAX_WAIT = 5.0  # reavaliar o relógio de parede pelo menos a cada 5 s
+DELIVERY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_SECONDS = metrics.histogram(
+    "send_bucket_delivery_seconds", "Atraso entre o minuto previsto e a entrega",
+    ("priority",), buckets=DELIVERY_BUCKETS)
+ITEMS_TOTAL = metrics.counter(
+    "send_bucket_items_total", "Itens do envio por minuto por resultado", ("priority", "status"))
+STAGED = metrics.gauge(
+    "send_bucket_staged", "Itens aguardando a virada do minuto", ())
+
+
+@lru_cache(maxsize=64)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def bucket_of(due_at: datetime, tz: Optional[str] = None, now: Optional[float] = None) -> Tuple[str, float]:
+    """
+    (fuso, epoch do minuto de envio): primeira virada de minuto em ou após
+    due_at; itens já vencidos caem no minuto corrente (liberação imediata)
+    """
+    if due_at.tzinfo is None:
+        due_at = due_at.replace(tzinfo=_zone(tz)) if tz else due_at.astimezone()
+    epoch = due_at.timestamp()
+    now = time.time() if now is None else now
+    minute = (now // 60) * 60 if epoch <= now else -(-epoch // 60) * 60
+    return tz or "local", minute
+
+
+class _Staged:
+    __slots__ = ('key', 'prepared', 'urgent', 'release_at')
+
+    def __init__(self, key, prepared: PreparedSend, urgent: bool, release_at: float):
+        self.key = key
+        self.prepared = prepared
+        self.urgent = urgent
+        self.release_at = release_at
+
+
+class SendBucketer:
+    """Fila de envios por minuto com pré-renderização e liberação suavizada"""
+
+    def __init__(self, core: Optional[MessagingCore] = None, workers: int = SEND_BUCKET_WORKERS,
+                 rate: float = SEND_BUCKET_RATE, spread: float = SEND_BUCKET_SPREAD_SECONDS):
+        self.core = core or messaging
+        self.workers = workers
+        self.rate = rate
+        self.spread = spread
+        self._buckets: Dict[Tuple[str, float], List[_Staged]] = {}
+        self._heap: list = []  # (instante, seq, chave do grupo | _Staged)
+        self._keys = set()     # itens em espera, em envio ou com resultado não drenado
+        self._done = deque()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+
+    # ---------- Entrada ----------
+
+    def stage(self, key: Hashable, due_at: datetime, patient, message: OutboundMessage,
+              tz: Optional[str] = None, urgent: bool = False, channel: Optional[str] = None) -> bool:
+        """
+        Pré-renderizar e agendar um envio para o minuto de due_at
+
+        Args:
+            key: Identifica o item (ex.: ('reminder', id, next_send_date)); repetido = ignorado
+            due_at: Horário previsto (com ou sem fuso)
+            patient: Patient/PatientSnapshot; os endereços são resolvidos aqui
+            tz: Fuso de due_at quando ele não tem tzinfo
+            urgent: Sai na virada do minuto, sem espaçamento
+
+        Returns:
+            False se a chave já estava na fila
+        """
+        with self._cond:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+
+        try:
+            prepared = self.core.prepare(patient, message, channel)
+            bucket = bucket_of(due_at, tz)
+        except Exception:
+            with self._cond:
+                self._keys.discard(key)
+            raise
+
+        with self._cond:
+            items = self._buckets.get(bucket)
+            if items is None:
+                items = self._buckets[bucket] = []
+                heapq.heappush(self._heap, (bucket[1], next(self._seq), bucket))
+            items.append(_Staged(key, prepared, urgent, bucket[1]))
+            STAGED.inc()
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def completed(self) -> List[Tuple[Hashable, Dict]]:
+        """Drenar [(chave, resultado do envio)] e liberar as chaves para novo stage"""
+        drained = []
+        while self._done:
+            drained.append(self._done.popleft())
+        if drained:
+            with self._cond:
+                for key, _ in drained:
+                    self._keys.discard(key)
+        return drained
+
+    def pending(self, key: Hashable) -> bool:
+        with self._cond:
+            return key in self._keys
+
+    # ---------- Liberação ----------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="send-buckets", daemon=True)
+            self._thread.start()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="send-bucket")
+        return self._executor
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._cond.wait(min(delay, MAX_WAIT))
+                    continue
+
+                now = time.time()
+                released, ready = [], []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)[2]
+                    if isinstance(entry, _Staged):
+                        ready.append(entry)
+                    else:
+                        released.extend(self._buckets.pop(entry, ()))
+                if released:
+                    # Grupos que viram no mesmo instante (fusos diferentes) dividem a janela
+                    ready.extend(self._spread(released, now))
+
+            for item in ready:
+                STAGED.dec()
+                self.executor.submit(self._deliver, item)
+
+    def _spread(self, items: List[_Staged], now: float) -> List[_Staged]:
+        """Urgentes para envio imediato; os demais de volta ao heap, espaçados"""
+        urgent = [item for item in items if item.urgent]
+        normal = [item for item in items if not item.urgent]
+        if normal:
+            gap = min(1.0 / self.rate, self.spread / len(normal)) if self.rate > 0 else 0.0
+            for index, item in enumerate(normal):
+                if index == 0 or gap <= 0:
+                    urgent.append(item)
+                else:
+                    heapq.heappush(self._heap, (now + index * gap, next(self._seq), item))
+            logger.info(f"Minuto liberado: {len(items)} envios ({len(items) - len(normal)} urgentes, "
+                        f"{len(normal)} em {round(gap * max(len(normal) - 1, 0), 1)}s)")
+        return urgent
+
+    def _deliver(self, item: _Staged) -> None:
+        priority = "urgent" if item.urgent else "normal"
+        try:
+            result = self.core.deliver(item.prepared)
+        except Exception as e:
+            logger.error(f"Erro no envio agrupado: {e}")
+            result = {'success': False, 'error': str(e)}
+        delivered_at = time.time()
+        result['delivered_at'] = datetime.fromtimestamp(delivered_at)
+        DELIVERY_SECONDS.observe(max(delivered_at - item.release_at, 0.0), priority=priority)
+        ITEMS_TOTAL.inc(priority=priority, status="sent" if result.get('success') else "error")
+        self._done.append((item.key, result))
+
+    # ---------- Diagnóstico ----------
+
+    def stats(self) -> Dict:
+        with self._cond:
+            buckets = [
+                {'tz': tz, 'minute': datetime.fromtimestamp(minute, timezone.utc).isoformat(),
+                 'size': len(items), 'urgent': sum(1 for i in items if i.urgent)}
+                for (tz, minute), items in sorted(self._buckets.items(), key=lambda b: b[0][1])
+            ]
+            return {
+                'buckets': buckets,
+                'tracked': len(self._keys),
+                'completed_undrained': len(self._done),
+                'rate': self.rate,
+                'spread_seconds': self.spread,
+            }
+
+
+# Instância global
+send_bucketer = SendBucketer()
@@ -0,0 +1,243 @@
+"""
+Despacho de mensagens do Telegram respeitando os limites da plataforma
+
+O Telegram aceita ~30 mensagens/s por bot e ~1 mensagem/s por chat; acima
+disso responde 429 com parameters.retry_after. O dispatcher:
+- passa cada envio por um token bucket global e um por chat (com rajada
+  pequena para respostas de conversa em sequência);
+- em 429, pausa o bucket do chat pelo retry_after e tenta de novo; se
+  outro chat também levou 429 dentro de GLOBAL_429_WINDOW segundos, o
+  limite estourado é o do bot e o bucket global também é pausado;
+- na thread de uma requisição (webhook) nunca dorme: se for preciso
+  esperar uma ficha ou repetir após 429, o envio segue em segundo plano
+  (fichas já reservadas, então a ordem dentro do chat é mantida) e a
+  chamada devolve {"ok": True, "deferred": True};
+- em broadcast(), roda tarefas de envio em paralelo entre chats, mantendo
+  a ordem dentro de cada chat, de modo que o lote roda no teto da plataforma.
+
+Um dispatcher por token de bot (os limites são por bot): dispatcher_for(service).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.ops.metrics import metrics
+
+# Configurações
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE") or "30")
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE") or "1")
+CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST") or "3")
+DISPATCH_WORKERS = int(os.getenv("TELEGRAM_DISPATCH_WORKERS") or "8")
+MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES") or "3")
+CHAT_BUCKETS_MAX = 10000
+GLOBAL_429_WINDOW = 1.0
+
+logger = logging.getLogger(__name__)
+
+SENDS_TOTAL = metrics.counter(
+    "telegram_sends_total", "Chamadas de envio à Bot API por método e resultado", ("method", "status"))
+THROTTLE_SECONDS = metrics.histogram(
+    "telegram_throttle_seconds", "Espera imposta pelos token buckets antes do envio", ("scope",))
+DEFERRED_TOTAL = metrics.counter(
+    "telegram_deferred_total", "Envios de requisições passados para segundo plano", ("reason",))
+
+
+def _in_request() -> bool:
+    """Rodando na thread de uma requisição Flask (webhook)?"""
+    try:
+        from flask import has_request_context
+    except ImportError:
+        return False
+    return has_request_context()
+
+
+class TokenBucket:
+    """Token bucket por reserva: quem pega a ficha recebe quanto deve esperar"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Consumir uma ficha e devolver os segundos de espera (0 se havia saldo)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Bloquear o bucket por `seconds` (retry_after do Telegram)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class TelegramDispatcher:
+    """Envios da Bot API com limites global/por chat e retry em 429"""
+
+    def __init__(self, service, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE,
+                 chat_burst: float = CHAT_BURST, workers: int = DISPATCH_WORKERS,
+                 max_retries: int = MAX_RETRIES):
+        self.service = service
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self._chats: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._chats_lock = threading.Lock()
+        self._last_429: Tuple[Optional[str], float] = (None, 0.0)
+        self._deferred: Optional[ThreadPoolExecutor] = None
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        with self._chats_lock:
+            bucket = self._chats.get(key)
+            if bucket is None:
+                bucket = self._chats[key] = TokenBucket(self.chat_rate, self.chat_burst)
+                while len(self._chats) > CHAT_BUCKETS_MAX:
+                    # LRU: o chat usado há mais tempo já recuperou as fichas
+                    self._chats.popitem(last=False)
+            else:
+                self._chats.move_to_end(key)
+            return bucket
+
+    @staticmethod
+    def _wait(seconds: float, scope: str) -> None:
+        THROTTLE_SECONDS.observe(seconds, scope=scope)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    @property
+    def deferred(self) -> ThreadPoolExecutor:
+        if self._deferred is None:
+            with self._chats_lock:
+                if self._deferred is None:
+                    self._deferred = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix="tg-deferred")
+        return self._deferred
+
+    def send(self, method: str, payload: Dict) -> Dict:
+        """
+        Chamar um método de envio (sendMessage, editMessageText...) respeitando os limites
+
+        Returns:
+            Resposta da API do Telegram ({"ok": ...}); {"ok": True, "deferred": True}
+            quando o envio de uma requisição seguiu em segundo plano
+        """
+        chat_key = str(payload.get("chat_id"))
+        chat_bucket = self._chat_bucket(chat_key)
+        if not _in_request():
+            return self._send_blocking(method, payload, chat_key, chat_bucket)
+
+        # Thread do webhook: reserva as fichas agora e, se houver espera, adia
+        delay = max(chat_bucket.reserve(), self.global_bucket.reserve())
+        if delay > 0:
+            return self._defer("throttle", method, payload, chat_key, chat_bucket, 0, delay)
+        result = self._call(method, payload, chat_key, chat_bucket, 0)
+        if result.get("error_code") == 429 and self.max_retries > 0:
+            return self._defer("429", method, payload, chat_key, chat_bucket, 1, None)
+        return result
+
+    def _defer(self, reason: str, method: str, payload: Dict, chat_key: str, chat_bucket: TokenBucket,
+               attempt: int, delay: Optional[float]) -> Dict:
+        DEFERRED_TOTAL.inc(reason=reason)
+        self.deferred.submit(self._send_blocking, method, payload, chat_key, chat_bucket, attempt, delay)
+        return {"ok": True, "deferred": True, "result": {}}
+
+    def _send_blocking(self, method: str, payload: Dict, chat_key: str, chat_bucket: TokenBucket,
+                       first_attempt: int = 0, delay: Optional[float] = None) -> Dict:
+        """Envio com espera e retry (agendador, poller e envios adiados)"""
+        result: Dict = {"ok": False, "error": "not sent"}
+        for attempt in range(first_attempt, self.max_retries + 1):
+            if delay is None:
+                # Primeiro o chat (espera longa), depois a ficha global (espera curta)
+                self._wait(chat_bucket.reserve(), "chat")
+                self._wait(self.global_bucket.reserve(), "global")
+            else:
+                # Fichas reservadas pela requisição que adiou o envio
+                self._wait(delay, "deferred")
+                delay = None
+
+            result = self._call(method, payload, chat_key, chat_bucket, attempt)
+            if result.get("error_code") != 429:
+                return result
+        return result
+
+    def _call(self, method: str, payload: Dict, chat_key: str, chat_bucket: TokenBucket, attempt: int) -> Dict:
+        """Uma chamada à API; em 429 pausa o chat (e o bot todo, se for o limite global)"""
+        result = self.service.call(method, payload)
+        if result.get("ok"):
+            SENDS_TOTAL.inc(method=method, status="ok")
+            return result
+        if result.get("error_code") != 429:
+            SENDS_TOTAL.inc(method=method, status=str(result.get("error_code") or "error"))
+            return result
+
+        retry_after = (result.get("parameters") or {}).get("retry_after", 1)
+        SENDS_TOTAL.inc(method=method, status="429")
+        now = time.monotonic()
+        with self._chats_lock:
+            other_chat, last_at = self._last_429
+            self._last_429 = (chat_key, now)
+        global_limit = other_chat not in (None, chat_key) and now - last_at <= GLOBAL_429_WINDOW
+        logger.warning(f"Telegram 429 em {method}: retry_after={retry_after}s "
+                       f"({'bot' if global_limit else 'chat'}, tentativa {attempt + 1})")
+        chat_bucket.pause(retry_after)
+        if global_limit:
+            self.global_bucket.pause(retry_after)
+        return result
+
+    def broadcast(self, tasks: List[Tuple[object, Callable[[], Dict]]]) -> List[Dict]:
+        """
+        Rodar tarefas de envio em paralelo entre chats e em ordem dentro de cada chat
+
+        Args:
+            tasks: [(chave do chat, função sem argumentos que faz o envio)];
+                a chave só agrupa (chat_id ou paciente) e os limites ficam com send()
+
+        Returns:
+            Retornos das funções na mesma ordem de `tasks`
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, (key, _task) in enumerate(tasks):
+            groups.setdefault(str(key), []).append(index)
+
+        results: List[Dict] = [{}] * len(tasks)
+
+        def run(indexes):
+            for index in indexes:
+                try:
+                    results[index] = tasks[index][1]()
+                except Exception as e:
+                    results[index] = {"ok": False, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(groups) or 1),
+                                thread_name_prefix="tg-dispatch") as executor:
+            list(executor.map(run, groups.values()))
+        return results
+
+
+_dispatchers: Dict[str, TelegramDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def dispatcher_for(service) -> TelegramDispatcher:
+    """Dispatcher compartilhado pelo token do bot (limites valem por bot)"""
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(service.bot_token)
+        if dispatcher is None:
+            dispatcher = _dispatchers[service.bot_token] = TelegramDispatcher(service)
+        return dispatcher
@@ -0,0 +1,164 @@
+"""
+Transportes: como cada canal entrega uma OutboundMessage
+
+Todo transporte expõe o mesmo contrato:
+- address_for(patient): endereço do paciente no canal (None se não tem)
+- render(address, message): conteúdo já montado para o canal (payload,
+  texto + botões), usado na pré-renderização; None = montar no envio
+- send(address, message, rendered=None): {'success': bool, 'message_id'?, 'error'?}
+- cost: custo relativo por mensagem, usado pelo roteamento
+
+Os serviços de API são importados sob demanda para não carregar os
+clientes HTTP no import do pacote (e evitar import circular com
+telegram_service, que usa src.messaging.http).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from src.messaging.callbacks import compact_callback_id
+from src.messaging.message import OutboundMessage
+
+# Telegram aceita no máximo 64 bytes em callback_data
+TELEGRAM_CALLBACK_MAX_BYTES = 64
+
+
+class Transport:
+    """Contrato comum dos canais"""
+
+    channel = None
+    cost = 0.0
+
+    def address_for(self, patient) -> Optional[str]:
+        raise NotImplementedError
+
+    def render(self, address: str, message: OutboundMessage):
+        return None
+
+    def send(self, address: str, message: OutboundMessage, rendered=None) -> Dict:
+        raise NotImplementedError
+
+
+class WhatsAppTransport(Transport):
+    """WhatsApp Business (Graph API) via WhatsAppService"""
+
+    channel = 'whatsapp'
+
+    def __init__(self, service=None, cost: Optional[float] = None):
+        self._service = service
+        # Mensagens iniciadas pela empresa são cobradas por conversa
+        self.cost = float(os.getenv('WHATSAPP_MESSAGE_COST') or '1.0') if cost is None else cost
+
+    @property
+    def service(self):
+        if self._service is None:
+            from src.services.whatsapp_service import WhatsAppService
+            self._service = WhatsAppService()
+        return self._service
+
+    def address_for(self, patient) -> Optional[str]:
+        return (getattr(patient, 'whatsapp_phone', None)
+                or getattr(patient, 'phone_e164', None)
+                or getattr(patient, 'phone_number', None))
+
+    def render(self, address: str, message: OutboundMessage) -> Optional[bytes]:
+        if message.template is not None:
+            # Caminho rápido: payload pré-serializado do template
+            return message.template.render_payload(address, **message.fields)
+        return None
+
+    def send(self, address: str, message: OutboundMessage, rendered=None) -> Dict:
+        payload = rendered if rendered is not None else self.render(address, message)
+        if payload is not None:
+            result = self.service.send_payload(payload)
+        elif message.buttons:
+            buttons = [{'id': button_id, 'title': title} for button_id, title in message.buttons]
+            result = self.service.send_interactive_message(address, message.header or '', message.text, buttons)
+        else:
+            result = self.service.send_text_message(address, message.text)
+
+        if result.get('success'):
+            messages = (result.get('response') or {}).get('messages') or [{}]
+            return {'success': True, 'message_id': messages[0].get('id')}
+        return {'success': False, 'error': result.get('error') or result.get('response'),
+                'status_code': result.get('status_code')}
+
+
+class TelegramTransport(Transport):
+    """Telegram Bot API via TelegramService"""
+
+    channel = 'telegram'
+
+    def __init__(self, service=None, cost: Optional[float] = None):
+        self._service = service
+        self.cost = float(os.getenv('TELEGRAM_MESSAGE_COST') or '0.0') if cost is None else cost
+
+    @property
+    def service(self):
+        if self._service is None:
+            from src.services.telegram_service import TelegramService
+            self._service = TelegramService(bot_token=os.getenv('TELEGRAM_BOT_TOKEN'))
+        return self._service
+
+    def address_for(self, patient) -> Optional[str]:
+        chat_id = getattr(patient, 'telegram_chat_id', None)
+        return str(chat_id) if chat_id else None
+
+    def render(self, address: str, message: OutboundMessage) -> Tuple[str, List[Dict]]:
+        text = message.text
+        if message.header and message.template is None:
+            text = f"*{message.header}*\n\n{text}"
+
+        # Botões de lembrete/medicação dos templates saem assinados (ver src/messaging/callbacks.py)
+        buttons = []
+        for button_id, title in message.buttons:
+            button_id = compact_callback_id(button_id)
+            if len(button_id.encode('utf-8')) <= TELEGRAM_CALLBACK_MAX_BYTES:
+                buttons.append({'text': title, 'callback_data': button_id})
+        return text, buttons
+
+    def send(self, address: str, message: OutboundMessage, rendered=None) -> Dict:
+        text, buttons = rendered if rendered is not None else self.render(address, message)
+        if buttons:
+            result = self.service.send_interactive_message(address, text, buttons)
+        else:
+            result = self.service.send_text_message(address, text)
+
+        if result.get('ok'):
+            return {'success': True, 'message_id': (result.get('result') or {}).get('message_id')}
+        return {'success': False, 'error': result.get('error') or result.get('description')}
+
+
+class FakeTransport(Transport):
+    """Canal local: guarda as mensagens numa caixa de saída em memória (dev/staging)"""
+
+    channel = 'fake'
+
+    def __init__(self, maxlen: int = 1000, fail: bool = False):
+        self.outbox = deque(maxlen=maxlen)
+        self.fail = fail
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def address_for(self, patient) -> Optional[str]:
+        patient_id = getattr(patient, 'id', None)
+        return f"patient:{patient_id}" if patient_id is not None else None
+
+    def send(self, address: str, message: OutboundMessage, rendered=None) -> Dict:
+        if self.fail:
+            return {'success': False, 'error': 'fake transport configured to fail'}
+        with self._lock:
+            self._sequence += 1
+            message_id = f"fake-{self._sequence}"
+            self.outbox.append({
+                'message_id': message_id,
+                'address': address,
+                'template': message.name,
+                'text': message.text,
+                'buttons': list(message.buttons),
+                'sent_at': time.time(),
+            })
+        return {'success': True, 'message_id': message_id}
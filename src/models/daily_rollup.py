@@ -0,0 +1,81 @@
+# src/models/daily_rollup.py
+from datetime import datetime
+from src.models.user import db
+
+class PatientDailyRollup(db.Model):
+    """Agregados diários por paciente (escalas, humor e aderência)
+
+    Mantido de forma incremental por src/jobs/rollup_job.py; relatórios de
+    longo prazo leem desta tabela em vez das linhas brutas.
+    """
+    __tablename__ = 'patient_daily_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('patient_id', 'day', name='uq_daily_rollup_patient_day'),
+        db.Index('idx_daily_rollup_day', 'day'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Mesma padronização de FK de Mood/Response
+    patient_id = db.Column(db.String(64), db.ForeignKey('patients.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+
+    # Escalas (Response)
+    response_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    score_max = db.Column(db.Integer)
+    alarming_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Afetivograma (MoodChart)
+    mood_count = db.Column(db.Integer, nullable=False, default=0)
+    mood_sum = db.Column(db.Integer, nullable=False, default=0)
+    functioning_sum = db.Column(db.Integer, nullable=False, default=0)
+    sleep_sum = db.Column(db.Integer, nullable=False, default=0)
+    anxiety_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    # Aderência (Medication.schedule x MedicationConfirmation)
+    doses_expected = db.Column(db.Integer, nullable=False, default=0)
+    doses_confirmed = db.Column(db.Integer, nullable=False, default=0)
+    doses_missed = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PatientDailyRollup p={self.patient_id} day={self.day}>'
+
+    def to_dict(self):
+        return {
+            'patient_id': self.patient_id,
+            'day': self.day.isoformat() if self.day else None,
+            'response_count': self.response_count,
+            'score_avg': round(self.score_sum / self.response_count, 1) if self.response_count else None,
+            'score_max': self.score_max,
+            'alarming_count': self.alarming_count,
+            'mood_count': self.mood_count,
+            'mood_avg': round(self.mood_sum / self.mood_count, 2) if self.mood_count else None,
+            'functioning_avg': round(self.functioning_sum / self.mood_count, 1) if self.mood_count else None,
+            'sleep_avg': round(self.sleep_sum / self.mood_count, 2) if self.mood_count else None,
+            'anxiety_avg': round(self.anxiety_sum / self.mood_count, 2) if self.mood_count else None,
+            'doses_expected': self.doses_expected,
+            'doses_confirmed': self.doses_confirmed,
+            'doses_missed': self.doses_missed,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class RollupWatermark(db.Model):
+    """Marca d'água do job de rollups (uma linha por nome)
+
+    Gravada a cada rodada, mesmo sem linhas de rollup; assim o backfill
+    inicial roda uma única vez, inclusive em instalação sem dados.
+    """
+    __tablename__ = 'patient_daily_rollup_watermark'
+    __table_args__ = {'extend_existing': True}
+
+    name = db.Column(db.String(50), primary_key=True)
+    # Início da última rodada concluída (UTC)
+    value = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<RollupWatermark {self.name}={self.value}>'
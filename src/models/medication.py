@@ -33,8 +33,39 @@ class Medication(db.Model):
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
-# --- STUB para compatibilidade legada ---
-# Alguns arquivos antigos podem tentar importar "MedicationConfirmation".
-# Tornamos essa classe ABSTRATA para não criar tabela nem DDL.
 class MedicationConfirmation(db.Model):
-    __abstract__ = True
+    """Dose lembrada/confirmada (uma linha por lembrete de dose enviado ou resposta)"""
+    __tablename__ = "medication_confirmation"
+    __table_args__ = (
+        db.Index("idx_medication_confirmation_scheduled", "medication_id", "scheduled_time"),
+        {"extend_existing": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    medication_id = db.Column(db.Integer, db.ForeignKey("medication.id"), nullable=False)
+    # Mesma padronização de Medication.patient_id
+    patient_id = db.Column(db.String(64), db.ForeignKey("patients.id"), nullable=False, index=True)
+
+    scheduled_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    confirmed_time = db.Column(db.DateTime)
+    taken_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, confirmed, taken, missed, skipped, delayed
+    notes = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<MedicationConfirmation {self.medication_id} {self.status}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "medication_id": self.medication_id,
+            "patient_id": self.patient_id,
+            "scheduled_time": self.scheduled_time.isoformat() if self.scheduled_time else None,
+            "confirmed_time": self.confirmed_time.isoformat() if self.confirmed_time else None,
+            "taken_at": self.taken_at.isoformat() if self.taken_at else None,
+            "status": self.status,
+            "notes": self.notes,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,54 @@
+# src/models/timer.py
+from datetime import datetime
+from sqlalchemy import text
+from src.models.user import db
+
+# -----------------------------------------------------------------------------
+# Timers únicos persistidos (adiar lembrete, lembrar medicação de novo...)
+# - O banco é a fonte da verdade; a roda de tempo em memória
+#   (src/services/timer_service.py) é reconstruída a partir daqui no boot.
+# - fire_at em UTC; payload é o JSON passado à ação do `kind`.
+# -----------------------------------------------------------------------------
+
+class ScheduledTimer(db.Model):
+    """Ação agendada para disparar uma vez em fire_at"""
+    __tablename__ = 'scheduled_timers'
+    __table_args__ = (
+        db.Index('idx_scheduled_timers_due', 'status', 'fire_at'),
+        # No máximo um pendente por dedupe_key (índice parcial; postgres e sqlite)
+        db.Index('uq_scheduled_timers_pending_dedupe', 'dedupe_key', unique=True,
+                 postgresql_where=text("status = 'pending'"),
+                 sqlite_where=text("status = 'pending'")),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    fire_at = db.Column(db.DateTime, nullable=False)
+    # 'pending', 'running', 'fired', 'cancelled', 'failed'
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    # Um novo timer com a mesma chave cancela o pendente (ex.: adiar duas vezes)
+    dedupe_key = db.Column(db.String(120), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fired_at = db.Column(db.DateTime, nullable=True)
+    # Quando o processo atual reservou o timer (pending -> running)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ScheduledTimer {self.kind} {self.fire_at}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': self.payload,
+            'fire_at': self.fire_at.isoformat() if self.fire_at else None,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'fired_at': self.fired_at.isoformat() if self.fired_at else None,
+            'claimed_at': self.claimed_at.isoformat() if self.claimed_at else None,
+        }
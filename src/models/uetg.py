@@ -0,0 +1,65 @@
+# src/models/uetg.py
+from datetime import datetime
+from src.models.user import db
+
+# -----------------------------------------------------------------------------
+# u-ETG: datas sorteadas e confirmações de horário
+# - O paciente do u-ETG é identificado pelo telefone (UETG_PATIENT_PHONE pode
+#   não estar cadastrado em 'patients'), por isso não há FK.
+# - Uma linha por (telefone, dia); gravação por upsert em src/services/uetg_store.py
+# -----------------------------------------------------------------------------
+
+class UetgPlanDay(db.Model):
+    """Dia sorteado para coleta u-ETG"""
+    __tablename__ = 'uetg_plan_days'
+    __table_args__ = (
+        db.UniqueConstraint('phone_e164', 'day', name='uq_uetg_plan_phone_day'),
+        db.Index('idx_uetg_plan_week', 'phone_e164', 'week_start'),
+        db.Index('idx_uetg_plan_day', 'day'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_e164 = db.Column(db.String(32), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    week_start = db.Column(db.Date, nullable=False)
+    planned_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Semente do sorteio em lote (auditoria: mesma semente + mesmos pacientes = mesmo sorteio)
+    draw_seed = db.Column(db.String(32))
+
+    def __repr__(self):
+        return f'<UetgPlanDay {self.day}>'
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'week_start': self.week_start.isoformat() if self.week_start else None,
+            'planned_at': self.planned_at.isoformat() if self.planned_at else None,
+            'draw_seed': self.draw_seed,
+        }
+
+
+class UetgConfirmation(db.Model):
+    """Horário confirmado pelo paciente para um dia sorteado"""
+    __tablename__ = 'uetg_confirmations'
+    __table_args__ = (
+        db.UniqueConstraint('phone_e164', 'day', name='uq_uetg_confirmation_phone_day'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_e164 = db.Column(db.String(32), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    slot = db.Column(db.String(5), nullable=False)  # HH:MM
+    patient_name = db.Column(db.String(200))
+    confirmed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UetgConfirmation {self.day} {self.slot}>'
+
+    def to_dict(self):
+        return {
+            'slot': self.slot,
+            'patient_name': self.patient_name,
+            'confirmed_at': self.confirmed_at.isoformat() if self.confirmed_at else None,
+        }
@@ -1,11 +1,55 @@
 # src/ops/boot_sentinel.py
-import json, os, traceback, datetime, pathlib
+import json, os, time, traceback, datetime, pathlib, threading
+from contextlib import contextmanager
 
-STATE_PATH = "/tmp/boot_state.json"
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+# BOOT_STATE_PATH permite isolar execuções avulsas (ex.: scripts/ops/check_boot_budget.py)
+STATE_PATH = os.getenv("BOOT_STATE_PATH") or "/tmp/boot_state.json"
+
+# Chaves de perfil gravadas durante o boot e preservadas pelo write_state
+PROFILE_KEYS = ("imports", "boot", "history")
+
+# Boots anteriores mantidos no histórico
+BOOT_HISTORY_SIZE = int(os.getenv("BOOT_HISTORY_SIZE", "20"))
 
 def _now_iso():
     return datetime.datetime.utcnow().isoformat() + "Z"
 
+
+_thread_lock = threading.RLock()
+_lock_depth = 0
+
+
+@contextmanager
+def _state_lock():
+    """
+    Exclusão mútua no read-modify-write do estado (app.py, src/main.py e
+    vários workers bootam ao mesmo tempo); reentrante na mesma thread
+    """
+    global _lock_depth
+    with _thread_lock:
+        handle = None
+        if _lock_depth == 0 and fcntl is not None:
+            try:
+                handle = open(STATE_PATH + ".lock", "a")
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            except OSError:
+                if handle is not None:
+                    handle.close()
+                handle = None
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+
 def read_state():
     p = pathlib.Path(STATE_PATH)
     if p.exists():
@@ -27,10 +71,21 @@ def read_state():
 def write_state(d):
     d = dict(d or {})
     d.setdefault("last_attempt", _now_iso())
-    try:
-        pathlib.Path(STATE_PATH).write_text(json.dumps(d, ensure_ascii=False), encoding="utf-8")
-    except Exception:
-        pass
+    with _state_lock():
+        previous = read_state()
+        for key in PROFILE_KEYS:
+            if key not in d and key in previous:
+                d[key] = previous[key]
+        # Arquivo temporário + os.replace: leitores nunca veem JSON pela metade
+        tmp = f"{STATE_PATH}.{os.getpid()}.tmp"
+        try:
+            pathlib.Path(tmp).write_text(json.dumps(d, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, STATE_PATH)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
 
 def from_exception(exc: Exception):
     tb = traceback.TracebackException.from_exception(exc)
@@ -54,3 +109,111 @@ def from_exception(exc: Exception):
         "last_attempt": _now_iso(),
         "source": "exception"
     }
+
+def record_imports(profile):
+    """Grava o custo de import por módulo medido no boot (ver import_profiler)"""
+    with _state_lock():
+        st = read_state()
+        st["imports"] = profile
+        write_state(st)
+
+
+# ---------- Fases do boot ----------
+# O estado fica no arquivo (e não em memória) porque app.py e src/main.py
+# importam este módulo por caminhos diferentes (ops.* e src.ops.*).
+
+def begin_boot():
+    """Abre o registro do boot deste processo; o anterior vai para o histórico"""
+    with _state_lock():
+        st = read_state()
+        current = st.get("boot")
+        if current and current.get("pid") == os.getpid():
+            return current
+        history = st.get("history") or []
+        if current:
+            history = ([current] + history)[:BOOT_HISTORY_SIZE]
+        st["history"] = history
+        st["boot"] = {
+            "pid": os.getpid(),
+            "started_at": _now_iso(),
+            "started_epoch": time.time(),
+            "phases": [],
+            "total_ms": None,
+            "first_request_ms": None,
+        }
+        write_state(st)
+        return st["boot"]
+
+
+def record_phase(name, ms, ok=True, error=None):
+    """Anexa uma fase (duração em ms) ao boot atual"""
+    with _state_lock():
+        begin_boot()
+        st = read_state()
+        boot = st["boot"]
+        boot["phases"].append({
+            "name": name,
+            "ms": round(ms, 1),
+            "ok": ok,
+            "error": error,
+            "at_ms": round((time.time() - boot["started_epoch"]) * 1000, 1),
+        })
+        write_state(st)
+
+
+@contextmanager
+def phase(name):
+    """Mede o bloco como uma fase do boot (a exceção é registrada e repassada)"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_phase(name, (time.perf_counter() - start) * 1000, ok=False, error=type(e).__name__)
+        raise
+    record_phase(name, (time.perf_counter() - start) * 1000)
+
+
+def finish_boot():
+    """Fecha o boot: tempo total até o app estar pronto para servir"""
+    with _state_lock():
+        st = read_state()
+        boot = st.get("boot")
+        if boot and boot.get("pid") == os.getpid() and boot.get("total_ms") is None:
+            boot["total_ms"] = round((time.time() - boot["started_epoch"]) * 1000, 1)
+            write_state(st)
+
+
+def record_first_request():
+    """Tempo do início do processo até a primeira requisição"""
+    with _state_lock():
+        st = read_state()
+        boot = st.get("boot")
+        if boot and boot.get("pid") == os.getpid() and boot.get("first_request_ms") is None:
+            boot["first_request_ms"] = round((time.time() - boot["started_epoch"]) * 1000, 1)
+            write_state(st)
+
+
+def install_first_request_hook(flask_app):
+    """Registra a primeira requisição servida pelo app (uma vez por processo)"""
+    if getattr(flask_app, "_boot_first_request_hooked", False):
+        return
+    flask_app._boot_first_request_hooked = True
+    seen = []
+
+    @flask_app.before_request
+    def _boot_first_request():
+        if not seen:
+            seen.append(True)
+            record_first_request()
+
+
+def boot_timeline():
+    """Fases do boot atual e dos anteriores, para o /ops/boot-state"""
+    st = read_state()
+    return {
+        "boot": st.get("boot"),
+        "history": [
+            {k: b.get(k) for k in ("started_at", "total_ms", "first_request_ms", "phases")}
+            for b in st.get("history") or []
+        ],
+    }
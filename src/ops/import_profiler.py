@@ -0,0 +1,73 @@
+# src/ops/import_profiler.py
+"""
+Perfil de custo de import no boot.
+
+Cada etapa de import do main (modelos, blueprints, jobs) é medida com
+`measure(label)`; além do tempo, registra quais pacotes de terceiros
+entraram em sys.modules naquela etapa, para achar quem puxa dependências
+pesadas. O resultado vai para /tmp/boot_state.json (chave "imports").
+"""
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Orçamento total dos imports do boot; acima disso o boot registra alerta
+BOOT_IMPORT_BUDGET_MS = float(os.getenv("BOOT_IMPORT_BUDGET_MS", "2500"))
+
+
+def _top_level_packages():
+    return {name.split(".", 1)[0] for name in list(sys.modules)}
+
+
+class ImportProfiler:
+    """Acumula (etapa, ms, pacotes novos) em ordem de execução"""
+
+    def __init__(self, budget_ms: float = BOOT_IMPORT_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.entries = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def measure(self, label: str):
+        before = _top_level_packages()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            pulled = sorted(_top_level_packages() - before - {"src"})
+            self.entries.append({"module": label, "ms": round(elapsed_ms, 1), "pulled": pulled})
+
+    def total_ms(self) -> float:
+        return round(sum(e["ms"] for e in self.entries), 1)
+
+    def summary(self) -> dict:
+        total = self.total_ms()
+        return {
+            "total_ms": total,
+            "wall_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "budget_ms": self.budget_ms,
+            "over_budget": total > self.budget_ms,
+            "modules": sorted(self.entries, key=lambda e: e["ms"], reverse=True),
+        }
+
+    def flush(self) -> dict:
+        """Grava o perfil no boot_state e avisa se o orçamento estourou"""
+        summary = self.summary()
+        if summary["over_budget"]:
+            slowest = ", ".join(f"{e['module']}={e['ms']}ms" for e in summary["modules"][:3])
+            logger.warning(f"Imports do boot em {summary['total_ms']}ms (orçamento {self.budget_ms}ms): {slowest}")
+        try:
+            from src.ops.boot_sentinel import record_imports
+            record_imports(summary)
+        except Exception:
+            logger.debug("Falha ao gravar perfil de imports", exc_info=True)
+        return summary
+
+
+# Perfil do processo atual (preenchido pelo main)
+boot_profiler = ImportProfiler()
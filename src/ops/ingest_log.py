@@ -0,0 +1,204 @@
+# src/ops/ingest_log.py
+"""
+Log estruturado, amostrado e assíncrono para os caminhos de ingestão
+(webhooks do Telegram e do WhatsApp, poller).
+
+- Amostragem por evento antes de criar o LogRecord (INGEST_LOG_SAMPLING,
+  ex.: "telegram.update=0.05,whatsapp.message=0.1"; padrão
+  INGEST_LOG_SAMPLE_RATE). WARNING e acima nunca são amostrados.
+- Formatação preguiçosa: o registro carrega os campos crus e só vira
+  texto (JSON) no writer em segundo plano.
+- Redação por campo: textos viram tamanho, telefones/chat_id e dados de
+  callback viram HMAC curto com INGEST_LOG_HASH_KEY (dá para correlacionar
+  sem expor o dado; sem a chave o valor é só marcado como redigido, pois
+  um hash sem segredo de um telefone sai por força bruta), nomes são
+  removidos.
+- install_ingest_logging() liga os loggers "ingest.*" a uma fila com
+  QueueListener; fila cheia descarta o registro (contado em
+  ingest_log_dropped_total) em vez de bloquear a requisição.
+"""
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from src.ops.metrics import metrics
+
+INGEST_LOG_SAMPLE_RATE = float(os.getenv("INGEST_LOG_SAMPLE_RATE", "1.0"))
+INGEST_LOG_QUEUE_SIZE = int(os.getenv("INGEST_LOG_QUEUE_SIZE", "10000"))
+# Segredo do HMAC dos campos "hash" (INGEST_LOG_HASH_SALT: nome antigo)
+INGEST_LOG_HASH_KEY = os.getenv("INGEST_LOG_HASH_KEY") or os.getenv("INGEST_LOG_HASH_SALT") or ""
+
+
+def _parse_sampling(spec):
+    rates = {}
+    for item in (spec or "").split(","):
+        event, sep, rate = item.partition("=")
+        if sep and event.strip():
+            try:
+                rates[event.strip()] = float(rate)
+            except ValueError:
+                continue
+    return rates
+
+
+SAMPLING = _parse_sampling(os.getenv("INGEST_LOG_SAMPLING"))
+
+# campo -> política ("length" | "hash" | "drop")
+REDACTION = {
+    "text": "length",
+    "body": "length",
+    "caption": "length",
+    "phone": "hash",
+    "chat_id": "hash",
+    "from": "hash",
+    "user_id": "hash",
+    "name": "drop",
+    "first_name": "drop",
+    "last_name": "drop",
+    "username": "drop",
+    "data": "hash",           # callback_data carrega ids de lembrete/medicação
+    "callback_data": "hash",
+}
+
+DROPPED = metrics.counter(
+    "ingest_log_dropped_total", "Registros de log de ingestão descartados com a fila cheia", ("logger",))
+SAMPLED_OUT = metrics.counter(
+    "ingest_log_sampled_out_total", "Eventos de log de ingestão não gravados pela amostragem", ("event",))
+
+
+_hash_key = INGEST_LOG_HASH_KEY.encode("utf-8") or None
+
+
+def _hash(value):
+    if _hash_key is None:
+        return "redacted"
+    return hmac.new(_hash_key, str(value).encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+def redact(fields):
+    """Cópia dos campos com a política de REDACTION aplicada (recursiva em dicts)"""
+    clean = {}
+    for key, value in fields.items():
+        policy = REDACTION.get(key)
+        if value is None or policy is None:
+            clean[key] = redact(value) if isinstance(value, dict) else value
+        elif policy == "length":
+            clean[f"{key}_len"] = len(value) if isinstance(value, str) else None
+        elif policy == "hash":
+            clean[key] = _hash(value)
+        # "drop": omitido
+    return clean
+
+
+def telegram_update_fields(update):
+    """Campos relevantes de um update do Telegram (sem copiar o dict inteiro)"""
+    if "message" in update:
+        message = update["message"]
+        return {
+            "update_id": update.get("update_id"),
+            "kind": "message",
+            "chat_id": (message.get("chat") or {}).get("id"),
+            "text": message.get("text"),
+        }
+    if "callback_query" in update:
+        callback = update["callback_query"]
+        return {
+            "update_id": update.get("update_id"),
+            "kind": "callback_query",
+            "chat_id": ((callback.get("message") or {}).get("chat") or {}).get("id"),
+            "data": callback.get("data"),
+        }
+    return {"update_id": update.get("update_id"), "kind": "other", "keys": sorted(update)}
+
+
+class _StructuredMessage:
+    """Mensagem de log formatada só quando um handler a emite"""
+
+    __slots__ = ("event", "fields", "extract")
+
+    def __init__(self, event, fields, extract=None):
+        self.event = event
+        self.fields = fields
+        self.extract = extract
+
+    def __str__(self):
+        fields = self.fields
+        if self.extract is not None:
+            fields = {**self.extract[0](self.extract[1]), **fields}
+        payload = {"event": self.event, **redact(fields)}
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class IngestLogger:
+    """Logger de eventos de ingestão: ingest_log.event("telegram.update", ...)"""
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(f"ingest.{name}")
+
+    def event(self, event, level=logging.INFO, extract=None, **fields):
+        """
+        Registrar um evento
+
+        Args:
+            event: Nome do evento (chave da amostragem)
+            level: Nível de log
+            extract: (função, objeto) avaliada só na formatação, ex.
+                     (telegram_update_fields, update)
+            **fields: Campos do evento (redigidos na formatação)
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            rate = SAMPLING.get(event, INGEST_LOG_SAMPLE_RATE)
+            if rate < 1.0 and random.random() >= rate:
+                SAMPLED_OUT.inc(event=event)
+                return
+        self.logger.log(level, _StructuredMessage(event, fields, extract))
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia e não formata na thread do chamador"""
+
+    def prepare(self, record):
+        # O QueueHandler padrão formata aqui (na thread da requisição);
+        # o listener formata ao emitir.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc(logger=record.name)
+
+
+_listener = None
+
+
+def install_ingest_logging():
+    """Ligar os loggers ingest.* a uma fila com writer em segundo plano"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    root = logging.getLogger()
+    targets = list(root.handlers) or [logging.StreamHandler()]
+    log_queue = queue.Queue(maxsize=INGEST_LOG_QUEUE_SIZE)
+
+    ingest = logging.getLogger("ingest")
+    ingest.addHandler(_DroppingQueueHandler(log_queue))
+    ingest.propagate = False
+
+    if _hash_key is None:
+        logging.getLogger(__name__).warning(
+            "INGEST_LOG_HASH_KEY não definido: telefones, chat_id e callbacks saem como 'redacted' nos logs de ingestão")
+
+    _listener = logging.handlers.QueueListener(log_queue, *targets, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,331 @@
+# src/ops/metrics.py
+"""
+Registro de métricas em processo, exportado em /metrics (formato texto do
+Prometheus, sem dependências externas).
+
+Tipos: Counter, Gauge (valor fixo ou função avaliada na coleta) e
+Histogram (buckets cumulativos). Cada métrica aceita rótulos; os valores
+de rótulo devem ter cardinalidade baixa (endpoint, status, tipo), nunca
+telefone ou id de paciente.
+
+/metrics exige METRICS_TOKEN (ou ADMIN_HTTP_TOKEN) em
+"Authorization: Bearer <token>" ou X-Admin-Token; sem token configurado
+o endpoint responde 404.
+"""
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+# Buckets padrão em segundos (latência de API, webhook e banco)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Atraso do agendador: de segundos a horas
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name}: rótulos esperados {self.label_names}, recebidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+        self._functions = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Valor calculado a cada coleta (ex.: tamanho de um dicionário de sessões)"""
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # chave -> [contagens por bucket..., soma, total]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, inf)} {series[-1]}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(series[-2]))}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrica {name} já registrada como {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global
+metrics = MetricsRegistry()
+
+# ---------- Métricas do pipeline de mensagens ----------
+
+GRAPH_API_SECONDS = metrics.histogram(
+    "graph_api_request_seconds", "Latência das chamadas à Graph API do WhatsApp", ("endpoint",))
+GRAPH_API_RESPONSES = metrics.counter(
+    "graph_api_responses_total", "Respostas da Graph API por endpoint e status HTTP", ("endpoint", "status"))
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_seconds", "Duração das requisições HTTP (inclui webhooks)", ("endpoint", "method"))
+HTTP_RESPONSES = metrics.counter(
+    "http_responses_total", "Respostas HTTP por rota e status", ("endpoint", "status"))
+SCHEDULER_LAG_SECONDS = metrics.histogram(
+    "scheduler_lag_seconds", "Atraso entre o horário previsto e o envio", ("job",), buckets=LAG_BUCKETS)
+SCHEDULER_QUEUE_DEPTH = metrics.gauge(
+    "scheduler_queue_depth", "Itens vencidos aguardando envio na última varredura", ("queue",))
+DB_QUERY_SECONDS = metrics.histogram(
+    "db_query_seconds", "Duração das consultas SQL por operação", ("operation",))
+ACTIVE_SESSIONS = metrics.gauge(
+    "conversation_sessions_active", "Sessões de conversa em andamento", ("kind",))
+
+
+def timed_post(endpoint, url, **kwargs):
+    """POST pela sessão HTTP compartilhada medindo latência e status da Graph API"""
+    from src.messaging.http import http_session
+
+    start = time.perf_counter()
+    try:
+        response = http_session().post(url, **kwargs)
+    except Exception as e:
+        GRAPH_API_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        GRAPH_API_RESPONSES.inc(endpoint=endpoint, status=type(e).__name__)
+        raise
+    GRAPH_API_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    GRAPH_API_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+
+def observe_lag(job, due_at, now=None):
+    """Registrar o atraso de um envio em relação ao horário previsto"""
+    if due_at is None:
+        return
+    lag = ((now or datetime.now()) - due_at).total_seconds()
+    SCHEDULER_LAG_SECONDS.observe(max(lag, 0.0), job=job)
+
+
+_SQL_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+_query_observers = []
+_engine_hooks_installed = False
+
+
+def add_query_observer(observer):
+    """
+    Registrar observer(statement, parameters, executemany, elapsed) chamado
+    ao fim de cada consulta (elapsed em segundos). Um único par de eventos
+    do Engine mede a consulta uma vez e atende todos os observadores
+    (métricas e perfil de consultas).
+    """
+    global _engine_hooks_installed
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+    if _engine_hooks_installed:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        for observe in _query_observers:
+            observe(statement, parameters, executemany, elapsed)
+
+    _engine_hooks_installed = True
+
+
+def _observe_db_metrics(statement, parameters, executemany, elapsed):
+    head = statement.lstrip()[:6].upper()
+    operation = head if head in _SQL_OPERATIONS else "OTHER"
+    DB_QUERY_SECONDS.observe(elapsed, operation=operation)
+
+
+def install_db_metrics():
+    """Medir a duração de cada consulta via eventos do SQLAlchemy Engine"""
+    add_query_observer(_observe_db_metrics)
+
+
+def install_flask_metrics(flask_app):
+    """Medir duração e status de cada requisição e expor GET /metrics"""
+    if getattr(flask_app, "_metrics_installed", False):
+        return
+    flask_app._metrics_installed = True
+
+    from flask import Response, g, request
+
+    @flask_app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @flask_app.after_request
+    def _metrics_end(response):
+        start = getattr(g, "_metrics_start", None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, method=request.method)
+            HTTP_RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+        return response
+
+    def _metrics_view():
+        token = os.getenv("METRICS_TOKEN") or os.getenv("ADMIN_HTTP_TOKEN")
+        if not token:
+            return Response("not found\n", status=404, mimetype="text/plain")
+        authorization = request.headers.get("Authorization") or ""
+        supplied = (authorization[7:] if authorization.startswith("Bearer ") else
+                    request.headers.get("X-Admin-Token") or "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8")):
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    flask_app.add_url_rule("/metrics", endpoint="ops_metrics", view_func=_metrics_view)
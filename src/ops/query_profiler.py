@@ -0,0 +1,173 @@
+# src/ops/query_profiler.py
+"""
+Perfil de consultas SQL por requisição Flask e por job do agendador.
+
+Eventos do SQLAlchemy Engine contam as consultas e o tempo de banco do
+escopo ativo na thread (requisição ou job). Ao fechar o escopo:
+- consultas acima de SLOW_QUERY_MS vão para o log com o *formato* dos
+  parâmetros (nomes e tipos), nunca os valores (dados de pacientes);
+- o mesmo SQL repetido QUERY_REPEAT_THRESHOLD vezes é sinalizado como N+1;
+- o resumo fica num buffer circular consultável em /admin/api/db/query-profile.
+
+Com QUERY_PROFILER_HEADERS=1 as respostas levam X-DB-Query-Count e X-DB-Time-Ms.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+QUERY_PROFILER_HEADERS = os.getenv("QUERY_PROFILER_HEADERS", "0") == "1"
+QUERY_PROFILE_HISTORY = int(os.getenv("QUERY_PROFILE_HISTORY", "200"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _param_shape(parameters, executemany=False):
+    """Nomes/tipos dos parâmetros, sem valores"""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"rows": len(parameters), "row": _param_shape(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryStats:
+    """Consultas de um escopo (requisição ou job)"""
+
+    __slots__ = ("label", "kind", "started_at", "count", "db_ms", "statements", "slow")
+
+    def __init__(self, label, kind):
+        self.label = label
+        self.kind = kind
+        self.started_at = datetime.utcnow()
+        self.count = 0
+        self.db_ms = 0.0
+        self.statements = Counter()
+        self.slow = 0
+
+    def repeated(self):
+        return [(sql, n) for sql, n in self.statements.most_common(5) if n >= QUERY_REPEAT_THRESHOLD]
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "kind": self.kind,
+            "started_at": self.started_at.isoformat() + "Z",
+            "queries": self.count,
+            "db_ms": round(self.db_ms, 1),
+            "slow": self.slow,
+            "repeated": [{"sql": sql[:200], "count": n} for sql, n in self.repeated()],
+        }
+
+
+class QueryProfiler:
+    """Escopos por thread + histórico dos últimos escopos encerrados"""
+
+    def __init__(self, history=QUERY_PROFILE_HISTORY):
+        self._local = threading.local()
+        self._recent = deque(maxlen=history)
+        self._installed = False
+
+    def current(self):
+        return getattr(self._local, "stats", None)
+
+    def begin(self, label, kind="request"):
+        stats = QueryStats(label, kind)
+        self._local.stats = stats
+        return stats
+
+    def end(self):
+        stats = self.current()
+        self._local.stats = None
+        if stats is None:
+            return None
+        for sql, n in stats.repeated():
+            logger.warning(f"Possível N+1 em {stats.kind} {stats.label}: {n}x {sql[:200]}")
+        if stats.count:
+            self._recent.append(stats.to_dict())
+        return stats
+
+    @contextmanager
+    def profile(self, label, kind="job"):
+        """Perfilar um job do agendador (ou qualquer bloco fora de requisição)"""
+        previous = self.current()
+        stats = self.begin(label, kind)
+        try:
+            yield stats
+        finally:
+            self.end()
+            self._local.stats = previous
+
+    def recent(self, limit=50, sort="db_ms"):
+        items = list(self._recent)
+        if sort in ("db_ms", "queries"):
+            items.sort(key=lambda e: e[sort], reverse=True)
+        else:
+            items.reverse()
+        return items[:limit]
+
+    # ---------- Ganchos ----------
+
+    def install(self):
+        """Ouvir as consultas de todas as Engines (gancho compartilhado com as métricas)"""
+        if self._installed:
+            return
+        from src.ops.metrics import add_query_observer
+
+        add_query_observer(self._observe_query)
+        self._installed = True
+
+    def _observe_query(self, statement, parameters, executemany, elapsed):
+        elapsed_ms = elapsed * 1000
+        stats = self.current()
+        if stats is not None:
+            stats.count += 1
+            stats.db_ms += elapsed_ms
+            stats.statements[_WHITESPACE_RE.sub(" ", statement).strip()] += 1
+        if elapsed_ms >= SLOW_QUERY_MS:
+            if stats is not None:
+                stats.slow += 1
+            where = f"{stats.kind} {stats.label}" if stats is not None else "fora de escopo"
+            logger.warning(
+                f"Consulta lenta ({elapsed_ms:.0f}ms) em {where}: "
+                f"{_WHITESPACE_RE.sub(' ', statement)[:300]} params={_param_shape(parameters, executemany)}"
+            )
+
+    def install_flask(self, flask_app):
+        """Um escopo por requisição; cabeçalhos opcionais com o total"""
+        if getattr(flask_app, "_query_profiler_installed", False):
+            return
+        flask_app._query_profiler_installed = True
+
+        from flask import request
+
+        @flask_app.before_request
+        def _profile_start():
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            self.begin(f"{request.method} {rule}", "request")
+
+        @flask_app.after_request
+        def _profile_headers(response):
+            stats = self.current()
+            if stats is not None and QUERY_PROFILER_HEADERS:
+                response.headers["X-DB-Query-Count"] = str(stats.count)
+                response.headers["X-DB-Time-Ms"] = f"{stats.db_ms:.1f}"
+            return response
+
+        @flask_app.teardown_request
+        def _profile_end(exc):
+            self.end()
+
+
+# Instância global
+query_profiler = QueryProfiler()
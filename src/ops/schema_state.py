@@ -0,0 +1,162 @@
+# src/ops/schema_state.py
+"""
+Verificação rápida do estado do schema no boot.
+
+Em vez de sondar tabelas e emitir DDL a cada boot, o startup lê uma única
+linha (alembic_version.version_num) e compara com a head das migrations em
+migrations/versions. Se estiver em dia, nenhuma DDL é executada; migrations
+rodam fora do boot (`alembic upgrade head`, via scripts/ops/migrate.py).
+
+Bancos sem alembic_version:
+- vazios passam uma única vez pelo create_all e são carimbados na head;
+- com tabelas (instalações antigas criadas com create_all) não recebem
+  create_all, que não altera tabelas existentes: são carimbados em
+  BASELINE_REVISION, o schema dessas instalações, e `alembic upgrade head`
+  aplica o resto (scripts/ops/migrate.py faz isso no release).
+"""
+import logging
+import os
+import pathlib
+import re
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = pathlib.Path(__file__).resolve().parents[2] / "migrations" / "versions"
+
+# (módulo, obrigatório): modelos que participam do create_all do bootstrap
+MODEL_MODULES = (
+    ("src.models.patient", True),
+    ("src.models.reminder", True),
+    ("src.models.response", True),
+    ("src.models.medication", True),
+    ("src.models.breathing_exercise", True),  # usado por Reminder
+    ("src.models.scale", False),
+    # Modelos opcionais (não derrubam boot)
+    ("src.models.mood", False),
+    ("src.models.daily_rollup", False),
+    ("src.models.uetg", False),
+    ("src.models.timer", False),  # timers de adiar/lembrar de novo
+    ("src.admin.models.campaign", False),  # campanhas (não derruba Admin)
+)
+
+# "auto": create_all + carimbo só em banco sem versão; "off": nunca faz DDL no boot
+SCHEMA_BOOTSTRAP = (os.getenv("SCHEMA_BOOTSTRAP") or "auto").strip().lower()
+
+# Revisão equivalente ao schema das instalações anteriores ao Alembic (create_all no boot)
+BASELINE_REVISION = "002"
+
+_REVISION_RE = re.compile(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_RE = re.compile(r"^down_revision\s*=\s*(?:['\"]([^'\"]+)['\"]|None)", re.M)
+
+_head_cache = None
+
+
+def alembic_head():
+    """Revisão head lida dos arquivos de migration (sem importar o alembic)"""
+    global _head_cache
+    if _head_cache is not None:
+        return _head_cache
+
+    revisions, parents = set(), set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        rev = _REVISION_RE.search(source)
+        if not rev:
+            continue
+        revisions.add(rev.group(1))
+        down = _DOWN_RE.search(source)
+        if down and down.group(1):
+            parents.add(down.group(1))
+
+    heads = sorted(revisions - parents)
+    if len(heads) != 1:
+        raise RuntimeError(f"Esperada uma única head de migration, encontradas: {heads}")
+    _head_cache = heads[0]
+    return _head_cache
+
+
+def current_revision(connection):
+    """version_num gravado no banco (None se alembic_version não existe)"""
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+
+    try:
+        row = connection.execute(text("SELECT version_num FROM alembic_version")).first()
+    except DBAPIError:
+        connection.rollback()
+        return None
+    return row[0] if row else None
+
+
+def stamp(connection, revision):
+    """Gravar `revision` como versão atual (equivalente a `alembic stamp`)"""
+    from sqlalchemy import Column, MetaData, String, Table
+
+    table = Table(
+        "alembic_version", MetaData(),
+        Column("version_num", String(32), primary_key=True, nullable=False),
+    )
+    table.create(connection, checkfirst=True)
+    connection.execute(table.delete())
+    connection.execute(table.insert().values(version_num=revision))
+
+
+def adopt_unversioned(connection):
+    """
+    Banco sem alembic_version que já tem tabelas: carimbar BASELINE_REVISION.
+
+    Returns:
+        revisão carimbada, ou None se o banco está vazio (nada feito)
+    """
+    from sqlalchemy import inspect
+
+    tables = set(inspect(connection).get_table_names()) - {"alembic_version"}
+    if not tables:
+        return None
+    stamp(connection, BASELINE_REVISION)
+    return BASELINE_REVISION
+
+
+def ensure_schema(db):
+    """
+    Conferir a versão do schema e só fazer DDL quando o banco não tem versão.
+
+    Returns:
+        {'head', 'current', 'status', 'ddl'} com status em
+        'current' | 'bootstrapped' | 'behind' | 'unversioned'
+    """
+    head = alembic_head()
+    with db.engine.connect() as connection:
+        current = current_revision(connection)
+        connection.rollback()
+
+    state = {"head": head, "current": current, "status": "current", "ddl": False}
+    if current == head:
+        return state
+
+    if current is not None:
+        # Banco versionado, mas atrás (ou à frente) da head: migração é fora do boot
+        state["status"] = "behind"
+        logger.error(f"Schema na revisão {current}, head é {head}: rode `alembic upgrade head`")
+        return state
+
+    if SCHEMA_BOOTSTRAP == "off":
+        state["status"] = "unversioned"
+        logger.warning("Banco sem alembic_version e SCHEMA_BOOTSTRAP=off: nenhuma DDL executada")
+        return state
+
+    with db.engine.begin() as connection:
+        adopted = adopt_unversioned(connection)
+    if adopted is not None:
+        # Instalação antiga: create_all não alteraria as tabelas existentes
+        state.update(status="behind", current=adopted, ddl=True)
+        logger.error(f"Banco sem alembic_version com tabelas: carimbado em {adopted}, "
+                     f"rode `python scripts/ops/migrate.py` para chegar a {head}")
+        return state
+
+    logger.info(f"Banco vazio sem alembic_version: create_all e carimbo na revisão {head}")
+    db.create_all()
+    with db.engine.begin() as connection:
+        stamp(connection, head)
+    state.update(status="bootstrapped", current=head, ddl=True)
+    return state
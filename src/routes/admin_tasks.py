@@ -108,3 +108,119 @@ def _require_admin_token():
     if supplied == token:
         return None
     return jsonify({"success": False, "error": "unauthorized"}), 401
+
+
+@admin_tasks_bp.route("/rollups/backfill", methods=["POST"])
+def rollups_backfill():
+    """Recalcula os rollups diários de um período (?start=AAAA-MM-DD&end=AAAA-MM-DD)"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from datetime import date, timedelta
+    from src.services.rollup_service import RollupService
+    try:
+        end = date.fromisoformat(request.args.get("end")) if request.args.get("end") else date.today()
+        start = date.fromisoformat(request.args.get("start")) if request.args.get("start") else end - timedelta(days=90)
+    except ValueError:
+        return jsonify({"success": False, "error": "invalid_date"}), 400
+    if start > end:
+        return jsonify({"success": False, "error": "start_after_end"}), 400
+    try:
+        written = RollupService().backfill(start, end)
+        return jsonify({"success": True, "start": start.isoformat(), "end": end.isoformat(), "rows": written}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_tasks_bp.route("/rollups/summary", methods=["GET"])
+def rollups_summary():
+    """Totais por paciente a partir dos rollups (?days=30&patient_ids=1,2)"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from datetime import date, timedelta
+    from src.services.rollup_service import RollupService
+    try:
+        days = int(request.args.get("days", 30))
+        ids = request.args.get("patient_ids")
+        ids = [i.strip() for i in ids.split(",")] if ids else None
+        end = date.today()
+        return jsonify(RollupService().summary(end - timedelta(days=days - 1), end, ids)), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_tasks_bp.route("/responses/recategorize", methods=["POST"])
+def responses_recategorize():
+    """Reclassifica o histórico de respostas após mudança nos pontos de corte (?scale=PHQ-9)"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from src.services.scale_registry import scale_registry
+    from src.services.score_categorizer import recategorize_responses
+    try:
+        scale_registry.reload()
+        stats = recategorize_responses(request.args.get("scale"), int(request.args.get("chunk_size", 1000)))
+        return jsonify({"success": True, **stats}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_tasks_bp.route("/db/query-profile", methods=["GET"])
+def db_query_profile():
+    """Consultas por requisição/job mais recentes (?sort=db_ms|queries|recent&limit=50)"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from src.ops.query_profiler import query_profiler, SLOW_QUERY_MS, QUERY_REPEAT_THRESHOLD
+    try:
+        limit = int(request.args.get("limit", 50))
+        items = query_profiler.recent(limit, request.args.get("sort", "db_ms"))
+        return jsonify({
+            "success": True,
+            "slow_query_ms": SLOW_QUERY_MS,
+            "repeat_threshold": QUERY_REPEAT_THRESHOLD,
+            "items": items,
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_tasks_bp.route("/messaging/stats", methods=["GET"])
+def messaging_stats():
+    """Canais registrados, política de roteamento, custo/latência por canal e envios por minuto"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from src.messaging import messaging
+    from src.messaging.send_buckets import send_bucketer
+    try:
+        return jsonify({"success": True, **messaging.stats(), "send_buckets": send_bucketer.stats()}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_tasks_bp.route("/timers", methods=["GET"])
+def timers_overview():
+    """Roda de timers deste processo e timers do banco por status (?status=pending&limit=50)"""
+    denied = _require_admin_token()
+    if denied:
+        return denied
+    from src.models.timer import ScheduledTimer
+    from src.models.user import db
+    from src.services.timer_service import timer_service
+    try:
+        limit = int(request.args.get("limit", 50))
+        status = request.args.get("status", "pending")
+        counts = dict(db.session.query(ScheduledTimer.status, db.func.count(ScheduledTimer.id))
+                      .group_by(ScheduledTimer.status).all())
+        items = (ScheduledTimer.query.filter_by(status=status)
+                 .order_by(ScheduledTimer.fire_at).limit(limit).all())
+        return jsonify({
+            "success": True,
+            "wheel": timer_service.stats(),
+            "counts": counts,
+            "items": [timer.to_dict() for timer in items],
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -1,16 +1,15 @@
 from flask import Blueprint, request, jsonify, send_file
-from src.services.iclinic_service import iClinicService
+from src.services.lazy_service import LazyService
 from src.models.patient import Patient
 from src.models.response import Response
 from src.models.user import db
 from datetime import datetime
 import io
-import json
 
 iclinic_bp = Blueprint('iclinic', __name__)
 
-# Instância do serviço iClinic
-iclinic_service = iClinicService()
+# Instância do serviço iClinic (criada no primeiro uso)
+iclinic_service = LazyService('src.services.iclinic_service.iClinicService')
 
 @iclinic_bp.route('/export/patients', methods=['GET'])
 def export_patients():
@@ -136,6 +135,34 @@ def export_mood_trends():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@iclinic_bp.route('/export/daily-rollups', methods=['GET'])
+def export_daily_rollups():
+    """Exportar agregados diários por paciente (longo prazo)"""
+    try:
+        days = int(request.args.get('days', 365))
+        patient_id = request.args.get('patient_id')
+        
+        patient_id = int(patient_id) if patient_id else None
+        
+        csv_content = iclinic_service.export_daily_rollups_to_csv(patient_id, days)
+        
+        # Criar arquivo em memória
+        output = io.BytesIO()
+        output.write(csv_content.encode('utf-8'))
+        output.seek(0)
+        
+        filename = f'agregados_diarios_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        
+        return send_file(
+            output,
+            mimetype='text/csv',
+            as_attachment=True,
+            download_name=filename
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @iclinic_bp.route('/import/patient', methods=['POST'])
 def import_patient():
     """Importar dados de paciente do iClinic"""
@@ -164,23 +191,27 @@ def import_patients_bulk():
         if not data or 'patients' not in data:
             return jsonify({'error': 'Lista de pacientes é obrigatória'}), 400
         
-        imported_patients = []
-        errors = []
+        try:
+            chunk_size = max(1, int(request.args.get('chunk_size', 500)))
+        except ValueError:
+            return jsonify({'error': 'chunk_size inválido'}), 400
+        
+        results = iclinic_service.import_patients_bulk(data['patients'], chunk_size=chunk_size)
         
-        for patient_data in data['patients']:
-            try:
-                patient = iclinic_service.import_patient_from_iclinic_data(patient_data)
-                imported_patients.append(patient.to_dict())
-            except Exception as e:
-                errors.append({
-                    'patient_data': patient_data,
-                    'error': str(e)
-                })
+        imported_patients = [r['patient'] for r in results if r['status'] != 'error']
+        errors = [
+            {'index': r['index'], 'patient_data': r['patient_data'], 'error': r['error']}
+            for r in results if r['status'] == 'error'
+        ]
         
         return jsonify({
             'message': f'{len(imported_patients)} pacientes importados com sucesso',
             'imported_patients': imported_patients,
-            'errors': errors
+            'errors': errors,
+            'results': [
+                {'index': r['index'], 'status': r['status'], 'patient_id': r.get('patient', {}).get('id')}
+                for r in results
+            ]
         }), 201
         
     except Exception as e:
@@ -207,13 +238,8 @@ def download_integration_report():
         patient_id = request.args.get('patient_id')
         patient_id = int(patient_id) if patient_id else None
         
-        report = iclinic_service.generate_integration_report(patient_id)
-        
-        # Criar arquivo JSON em memória
-        output = io.BytesIO()
-        json_content = json.dumps(report, indent=2, ensure_ascii=False)
-        output.write(json_content.encode('utf-8'))
-        output.seek(0)
+        # Relatório serializado vem do cache enquanto os dados não mudarem
+        output = io.BytesIO(iclinic_service.get_integration_report_json(patient_id))
         
         filename = f'relatorio_integracao_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
         
@@ -261,6 +287,7 @@ def sync_patient_data():
         
         if updated_fields:
             db.session.commit()
+            iclinic_service.invalidate_report_cache()
         
         return jsonify({
             'message': 'Dados do paciente sincronizados com sucesso',
@@ -353,7 +380,8 @@ def get_integration_status():
                     'patients',
                     'responses',
                     'medication_adherence',
-                    'mood_trends'
+                    'mood_trends',
+                    'daily_rollups'
                 ]
             },
             'features': {
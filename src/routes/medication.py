@@ -226,6 +226,23 @@ def get_adherence_report(patient_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@medication_bp.route('/adherence', methods=['GET'])
+def get_clinic_adherence():
+    """Obter aderência de todos os pacientes (ou de uma lista) em um único cálculo"""
+    try:
+        days = int(request.args.get('days', 30))
+        patient_ids = request.args.get('patient_ids')
+        
+        ids = [int(id.strip()) for id in patient_ids.split(',')] if patient_ids else None
+        
+        from src.services.adherence_service import MedicationAdherenceService
+        report = MedicationAdherenceService().compute(ids, days)
+        
+        return jsonify(report), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @medication_bp.route('/patients/<int:patient_id>/medications/active', methods=['GET'])
 def get_active_medications(patient_id):
     """Obter medicações ativas de um paciente"""
@@ -168,6 +168,23 @@ def get_mood_trend(patient_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@mood_bp.route('/trends', methods=['GET'])
+def get_clinic_mood_trends():
+    """Obter tendências de humor de vários pacientes (painel da clínica)"""
+    try:
+        days = int(request.args.get('days', 30))
+        patient_ids = request.args.get('patient_ids')
+        
+        ids = [int(id.strip()) for id in patient_ids.split(',')] if patient_ids else None
+        
+        from src.services.mood_analytics import MoodAnalyticsService
+        report = MoodAnalyticsService().clinic_trends(ids, days)
+        
+        return jsonify(report), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @mood_bp.route('/breathing-exercises', methods=['GET'])
 def get_breathing_exercises():
     """Listar exercícios de respiração"""
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.scale import Scale
+from src.services.scale_registry import scale_registry
 
 scale_bp = Blueprint('scale', __name__)
 
@@ -47,6 +48,7 @@ def create_scale():
     
     db.session.add(scale)
     db.session.commit()
+    scale_registry.reload()
     
     return jsonify(scale.to_dict()), 201
 
@@ -68,6 +70,7 @@ def update_scale(scale_id):
         scale.alarm_threshold = data['alarm_threshold']
     
     db.session.commit()
+    scale_registry.reload()
     return jsonify(scale.to_dict())
 
 @scale_bp.route('/scales/<int:scale_id>', methods=['DELETE'])
@@ -76,6 +79,7 @@ def delete_scale(scale_id):
     scale = Scale.query.get_or_404(scale_id)
     db.session.delete(scale)
     db.session.commit()
+    scale_registry.reload()
     return jsonify({'message': 'Escala deletada com sucesso'})
 
 @scale_bp.route('/scales/<string:scale_name>/calculate', methods=['POST'])
@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify
-from src.services.scheduler_service import SchedulerService
+from src.services.lazy_service import LazyService
 from datetime import time
 
 scheduler_bp = Blueprint('scheduler', __name__)
 
-# Instância global do agendador
-scheduler_service = SchedulerService()
+# Instância global do agendador (criada no primeiro uso)
+scheduler_service = LazyService('src.services.scheduler_service.SchedulerService')
 
 @scheduler_bp.route('/start', methods=['POST'])
 def start_scheduler():
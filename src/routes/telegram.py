@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
-from src.services.telegram_service import TelegramService
-from src.services.telegram_message_handler import TelegramMessageHandler
+from src.services.lazy_service import LazyService
+from src.ops.ingest_log import IngestLogger, telegram_update_fields
 import logging
 import os
 
@@ -9,10 +9,11 @@ telegram_bp = Blueprint('telegram', __name__)
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+ingest_log = IngestLogger('telegram')
 
-# Instâncias dos serviços
-telegram_service = TelegramService(bot_token=os.getenv('TELEGRAM_BOT_TOKEN'))
-message_handler = TelegramMessageHandler()
+# Instâncias dos serviços (criadas no primeiro uso)
+telegram_service = LazyService('src.services.telegram_service.TelegramService', bot_token=os.getenv('TELEGRAM_BOT_TOKEN'))
+message_handler = LazyService('src.services.telegram_message_handler.TelegramMessageHandler')
 
 @telegram_bp.route('/webhook', methods=['POST'])
 def telegram_webhook():
@@ -24,7 +25,7 @@ def telegram_webhook():
             logger.warning("Webhook recebido sem dados")
             return jsonify({"status": "error", "message": "No data received"}), 400
         
-        logger.info(f"Webhook recebido: {update}")
+        ingest_log.event("telegram.update", extract=(telegram_update_fields, update))
         
         # Verificar se a atualização é válida
         if not telegram_service.is_valid_update(update):
@@ -34,7 +35,7 @@ def telegram_webhook():
         # Processar a mensagem
         result = message_handler.handle_update(update)
         
-        logger.info(f"Resultado do processamento: {result}")
+        ingest_log.event("telegram.result", status=(result or {}).get("status"))
         
         return jsonify({"status": "success", "result": result}), 200
         
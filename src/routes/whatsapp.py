@@ -7,19 +7,21 @@ import re
 import json
 import logging
 from datetime import datetime
-import requests
 
 from flask import Blueprint, request, jsonify
 
 # DB e modelos
 from sqlalchemy import text as sql_text
 from src.models.user import db
-from src.models.patient import Patient
+from src.services.patient_cache import patient_cache
+from src.ops.metrics import timed_post
+from src.ops.ingest_log import IngestLogger
 
 # Processador genérico (mantido)
 from src.services.response_processor import response_processor
 
 logger = logging.getLogger(__name__)
+ingest_log = IngestLogger('whatsapp')
 
 whatsapp_bp = Blueprint('whatsapp', __name__)
 
@@ -47,9 +49,9 @@ def send_whatsapp_message(phone: str, message: str) -> bool:
             "text": {"body": message}
         }
 
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
+        resp = timed_post("messages.text", url, headers=headers, json=payload, timeout=10)
         if resp.status_code == 200:
-            logger.info(f"[WA] Mensagem enviada para {phone}")
+            ingest_log.event("whatsapp.sent", phone=phone)
             return True
         else:
             logger.error(f"[WA] Erro ao enviar: {resp.status_code} - {resp.text}")
@@ -130,7 +132,7 @@ def handle_uetg_selection(phone: str, text: str) -> bool:
     # Tenta obter nome do paciente pelo telefone
     patient_name = None
     try:
-        p = Patient.query.filter_by(phone_e164=phone).first()
+        p = patient_cache.lookup("phone_e164", phone)
         if p:
             patient_name = getattr(p, "name", None)
     except Exception as e:
@@ -227,7 +229,7 @@ def process_incoming_message(message: dict, value: dict):
         if not phone or not text:
             return
 
-        logger.info(f"Mensagem recebida de {phone}: {text}")
+        ingest_log.event("whatsapp.message", phone=phone, text=text)
 
         # 1) Prioridade: laço de confirmação u-ETG
         if handle_uetg_selection(phone, text):
@@ -0,0 +1,230 @@
+import re
+from typing import Dict, List, Optional
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import func
+from src.models.medication import Medication, MedicationConfirmation
+from src.models.user import db
+
+_TIME_RE = re.compile(r'(\d{1,2})[:h](\d{2})')
+
+# Status gravados pelos canais -> status do cálculo (WhatsApp grava taken/skipped)
+STATUS_ALIASES = {'taken': 'confirmed', 'skipped': 'missed'}
+
+
+def parse_schedule(schedule: Optional[str]) -> List[time]:
+    """Converter o texto de Medication.schedule ("08:00, 20:00") em horários ordenados"""
+    if not schedule:
+        return []
+
+    times = set()
+    for hour, minute in _TIME_RE.findall(schedule):
+        hour, minute = int(hour), int(minute)
+        if 0 <= hour < 24 and 0 <= minute < 60:
+            times.add(time(hour, minute))
+    return sorted(times)
+
+
+class MedicationAdherenceService:
+    """Cálculo de aderência medicamentosa em lote
+
+    Doses esperadas vêm de Medication.schedule; doses registradas vêm de uma
+    única consulta agregada (medicação x dia x status) em
+    MedicationConfirmation. Assim a clínica inteira é calculada com duas
+    consultas, independente do número de pacientes e de confirmações.
+
+    patient_id das tabelas de medicação é String(64): os ids recebidos são
+    convertidos para str e os resultados vêm indexados por str(patient_id).
+    """
+
+    def compute(self, patient_ids: Optional[List[int]] = None, days: int = 30,
+                now: datetime = None) -> Dict:
+        """
+        Calcular aderência por paciente e por medicação
+
+        Args:
+            patient_ids: IDs dos pacientes (None = todos com medicação ativa)
+            days: Janela de análise em dias (inclui hoje)
+            now: Momento de referência (padrão: agora)
+
+        Returns:
+            {'period_days', 'start_date', 'end_date', 'patients': {str(patient_id): {...}}}
+        """
+        now = now or datetime.now()
+        end_date = now.date()
+        start_date = end_date - timedelta(days=days - 1)
+
+        medications = self._load_medications(patient_ids)
+        daily_counts = self._load_daily_counts([m.id for m in medications], start_date, end_date)
+
+        patients = {}
+        for medication in medications:
+            result = self._medication_adherence(
+                medication, daily_counts.get(medication.id, {}), start_date, now
+            )
+            patient = patients.setdefault(medication.patient_id, {
+                'expected': 0,
+                'confirmed': 0,
+                'missed': 0,
+                'unanswered': 0,
+                'adherence_rate': 0.0,
+                'medications': []
+            })
+            for key in ('expected', 'confirmed', 'missed', 'unanswered'):
+                patient[key] += result[key]
+            patient['medications'].append(result)
+
+        for patient in patients.values():
+            patient['adherence_rate'] = self._rate(patient['confirmed'], patient['expected'])
+
+        return {
+            'period_days': days,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'patients': patients
+        }
+
+    def patient_adherence(self, patient_id: int, days: int = 7) -> Dict:
+        """Aderência de um paciente (mesmo cálculo do lote)"""
+        report = self.compute([patient_id], days)
+        return report['patients'].get(str(patient_id), {
+            'expected': 0, 'confirmed': 0, 'missed': 0, 'unanswered': 0,
+            'adherence_rate': 0.0, 'medications': []
+        })
+
+    def _load_medications(self, patient_ids: Optional[List[int]]) -> List[Medication]:
+        """Medicações ativas de todos os pacientes pedidos (uma consulta)"""
+        query = Medication.query.filter(Medication.is_active == True)  # noqa: E712
+        if patient_ids is not None:
+            if not patient_ids:
+                return []
+            query = query.filter(Medication.patient_id.in_([str(patient_id) for patient_id in patient_ids]))
+        return query.order_by(Medication.patient_id, Medication.id).all()
+
+    def _load_daily_counts(self, medication_ids: List[int], start_date: date,
+                           end_date: date) -> Dict[int, Dict[date, Dict[str, int]]]:
+        """Contagem de confirmações por medicação, dia e status (uma consulta agregada)"""
+        if not medication_ids:
+            return {}
+
+        day = func.date(MedicationConfirmation.scheduled_time)
+        rows = db.session.query(
+            MedicationConfirmation.medication_id,
+            day,
+            MedicationConfirmation.status,
+            func.count()
+        ).filter(
+            MedicationConfirmation.medication_id.in_(medication_ids),
+            MedicationConfirmation.scheduled_time >= datetime.combine(start_date, time.min),
+            MedicationConfirmation.scheduled_time < datetime.combine(end_date + timedelta(days=1), time.min)
+        ).group_by(MedicationConfirmation.medication_id, day, MedicationConfirmation.status).all()
+
+        counts = {}
+        for medication_id, row_day, status, count in rows:
+            # SQLite devolve date() como texto, Postgres como date
+            if not isinstance(row_day, date):
+                row_day = date.fromisoformat(str(row_day)[:10])
+            status = STATUS_ALIASES.get(status, status)
+            by_status = counts.setdefault(medication_id, {}).setdefault(row_day, {})
+            by_status[status] = by_status.get(status, 0) + count
+        return counts
+
+    def _medication_adherence(self, medication: Medication, counts: Dict[date, Dict[str, int]],
+                              start_date: date, now: datetime) -> Dict:
+        """Aderência, sequências e janelas de doses perdidas de uma medicação"""
+        schedule = parse_schedule(medication.schedule)
+        first_day = start_date
+        if medication.created_at and medication.created_at.date() > first_day:
+            first_day = medication.created_at.date()
+
+        totals = {'expected': 0, 'confirmed': 0, 'missed': 0, 'unanswered': 0}
+        current_streak = longest_streak = 0
+        missed_windows = []
+        open_window = None
+
+        day = first_day
+        while day <= now.date():
+            expected, confirmed, missed = self._day_doses(schedule, counts.get(day, {}), day, now)
+            unanswered = expected - confirmed - missed
+
+            totals['expected'] += expected
+            totals['confirmed'] += confirmed
+            totals['missed'] += missed
+            totals['unanswered'] += unanswered
+
+            if expected:
+                if confirmed == expected:
+                    current_streak += 1
+                    longest_streak = max(longest_streak, current_streak)
+                    open_window = None
+                else:
+                    current_streak = 0
+                    if open_window is None:
+                        open_window = {'start': day.isoformat(), 'end': day.isoformat(), 'missed_doses': 0}
+                        missed_windows.append(open_window)
+                    open_window['end'] = day.isoformat()
+                    open_window['missed_doses'] += expected - confirmed
+
+            day += timedelta(days=1)
+
+        return {
+            'medication_id': medication.id,
+            'name': medication.name,
+            'dosage': medication.dosage,
+            'doses_per_day': len(schedule) or None,
+            **totals,
+            'adherence_rate': self._rate(totals['confirmed'], totals['expected']),
+            'current_streak_days': current_streak,
+            'longest_streak_days': longest_streak,
+            'missed_windows': missed_windows
+        }
+
+    def daily_totals(self, patient_ids: Optional[List[int]], start_date: date, end_date: date,
+                     now: datetime = None) -> Dict[tuple, Dict[str, int]]:
+        """
+        Doses esperadas/confirmadas/perdidas por (str(patient_id), dia)
+
+        Usado pelos rollups diários; mesmas duas consultas do cálculo em lote.
+        """
+        now = now or datetime.now()
+        end_date = min(end_date, now.date())
+
+        medications = self._load_medications(patient_ids)
+        daily_counts = self._load_daily_counts([m.id for m in medications], start_date, end_date)
+
+        totals = {}
+        for medication in medications:
+            schedule = parse_schedule(medication.schedule)
+            counts = daily_counts.get(medication.id, {})
+            day = start_date
+            if medication.created_at and medication.created_at.date() > day:
+                day = medication.created_at.date()
+            while day <= end_date:
+                expected, confirmed, missed = self._day_doses(schedule, counts.get(day, {}), day, now)
+                if expected:
+                    day_totals = totals.setdefault((medication.patient_id, day),
+                                                   {'expected': 0, 'confirmed': 0, 'missed': 0})
+                    day_totals['expected'] += expected
+                    day_totals['confirmed'] += confirmed
+                    day_totals['missed'] += missed
+                day += timedelta(days=1)
+        return totals
+
+    def _day_doses(self, schedule: List[time], by_status: Dict[str, int], day: date,
+                   now: datetime) -> tuple:
+        """(esperadas, confirmadas, perdidas) de uma medicação em um dia"""
+        if schedule:
+            if day == now.date():
+                # Hoje só contam as doses cujo horário já passou
+                expected = sum(1 for t in schedule if t <= now.time())
+            else:
+                expected = len(schedule)
+        else:
+            # Sem horário cadastrado: lembretes enviados são as doses esperadas
+            expected = sum(by_status.values())
+
+        confirmed = min(by_status.get('confirmed', 0), expected)
+        missed = min(by_status.get('missed', 0), expected - confirmed)
+        return expected, confirmed, missed
+
+    def _rate(self, confirmed: int, expected: int) -> float:
+        return round(confirmed / expected * 100, 1) if expected else 0.0
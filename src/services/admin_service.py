@@ -8,6 +8,8 @@ from src.models.mood_chart import MoodChart, BreathingExercise
 from src.models.user import db
 from src.services.whatsapp_service import WhatsAppService
 from src.services.scheduler_service import SchedulerService
+from src.services.rollup_service import RollupService
+from src.messaging.callbacks import CallbackRouter
 from datetime import datetime, date, time, timedelta
 import json
 
@@ -17,12 +19,21 @@ class AdminService:
     def __init__(self):
         self.whatsapp_service = WhatsAppService()
         self.scheduler_service = SchedulerService()
+        self.rollup_service = RollupService()
         
         # Número do profissional (deve ser configurado)
         self.admin_phone = "5511999999999"  # Configurar com o número real
         
         # Estados de conversa administrativa
         self.admin_states = {}
+        
+        # Botões do painel: rota -> handler (src/messaging/callbacks.py)
+        self.button_router = CallbackRouter({
+            'admin.patients': self._handle_patients_button,
+            'admin.reminders': self._handle_reminders_button,
+            'admin.reports': self._handle_reports_button,
+            'admin.system': self._handle_system_button,
+        })
     
     def handle_admin_command(self, phone_number: str, command: str, contact_name: str = "Admin") -> Dict:
         """Processar comando administrativo"""
@@ -80,14 +91,9 @@ class AdminService:
         if not self._is_admin(phone_number):
             return self._send_unauthorized_message(phone_number)
         
-        if button_id.startswith('patients_'):
-            return self._handle_patients_button(phone_number, button_id)
-        elif button_id.startswith('reminders_'):
-            return self._handle_reminders_button(phone_number, button_id)
-        elif button_id.startswith('reports_'):
-            return self._handle_reports_button(phone_number, button_id)
-        elif button_id.startswith('system_'):
-            return self._handle_system_button(phone_number, button_id)
+        handler, callback = self.button_router.resolve(button_id)
+        if handler:
+            return handler(phone_number, callback.data)
         
         return {'status': 'processed', 'action': 'admin_button_processed'}
     
@@ -461,14 +467,25 @@ Por favor, tente novamente ou entre em contato com o suporte."""
             self.whatsapp_service.send_text_message(phone_number, message)
             return {'status': 'sent', 'action': 'empty_responses_report_sent'}
         
+        # Totais da semana vêm dos rollups diários (O(dias), não O(respostas))
+        totals = self.rollup_service.summary(week_ago.date(), date.today())['patients'].values()
+        total_responses = sum(p['responses'] for p in totals)
+        total_alarming = sum(p['alarming'] for p in totals)
+        
         message = "📋 *Respostas dos Últimos 7 Dias:*\n\n"
+        message += f"📊 Total: {total_responses} respostas, {total_alarming} alertas\n\n"
+        
+        # Response.patient_id é String(64); Patient.id é inteiro
+        patients = {str(p.id): p for p in Patient.query.filter(
+            Patient.id.in_({int(r.patient_id) for r in recent_responses if str(r.patient_id).isdigit()})
+        ).all()}
         
         for response in recent_responses:
-            patient = Patient.query.get(response.patient_id)
+            patient = patients.get(str(response.patient_id))
             patient_name = patient.name if patient else "Paciente não encontrado"
             
             # Determinar tipo de resposta
-            response_data = response.response_data
+            response_data = response.response_data or {}
             scale_name = response_data.get('scale_name', 'Não especificado')
             
             message += f"👤 *{patient_name}*\n"
@@ -484,6 +501,61 @@ Por favor, tente novamente ou entre em contato com o suporte."""
         
         return {'status': 'sent', 'action': 'responses_report_sent'}
     
+    def _send_adherence_report(self, phone_number: str) -> Dict:
+        """Enviar relatório de aderência medicamentosa (últimos 30 dias, via rollups)"""
+        
+        start_date = date.today() - timedelta(days=29)
+        summary = self.rollup_service.summary(start_date, date.today())['patients']
+        rows = [(pid, p) for pid, p in summary.items() if p['doses_expected']]
+        
+        if not rows:
+            message = "💊 *Aderência Medicamentosa*\n\nNenhuma dose registrada nos últimos 30 dias."
+            self.whatsapp_service.send_text_message(phone_number, message)
+            return {'status': 'sent', 'action': 'empty_adherence_report_sent'}
+        
+        rows.sort(key=lambda item: item[1]['adherence_rate'])
+        patients = {str(p.id): p for p in Patient.query.filter(
+            Patient.id.in_([int(pid) for pid, _ in rows[:10] if str(pid).isdigit()])).all()}
+        
+        message = "💊 *Aderência - Últimos 30 Dias:*\n\n"
+        for patient_id, data in rows[:10]:
+            patient = patients.get(str(patient_id))
+            message += f"👤 *{patient.name if patient else patient_id}*\n"
+            message += f"✅ {data['doses_confirmed']}/{data['doses_expected']} doses ({data['adherence_rate']}%)\n\n"
+        
+        if len(rows) > 10:
+            message += "📝 *Mostrando os 10 pacientes com menor aderência.*"
+        
+        self.whatsapp_service.send_text_message(phone_number, message)
+        
+        return {'status': 'sent', 'action': 'adherence_report_sent'}
+    
+    def _send_mood_trends_report(self, phone_number: str) -> Dict:
+        """Enviar relatório de humor (últimos 7 dias, via rollups)"""
+        
+        start_date = date.today() - timedelta(days=6)
+        summary = self.rollup_service.summary(start_date, date.today())['patients']
+        rows = [(pid, p) for pid, p in summary.items() if p['mood_entries']]
+        
+        if not rows:
+            message = "😊 *Tendências de Humor*\n\nNenhum registro de humor nos últimos 7 dias."
+            self.whatsapp_service.send_text_message(phone_number, message)
+            return {'status': 'sent', 'action': 'empty_mood_report_sent'}
+        
+        patients = {str(p.id): p for p in Patient.query.filter(
+            Patient.id.in_([int(pid) for pid, _ in rows[:10] if str(pid).isdigit()])).all()}
+        
+        message = "😊 *Humor - Últimos 7 Dias:*\n\n"
+        for patient_id, data in rows[:10]:
+            patient = patients.get(str(patient_id))
+            message += f"👤 *{patient.name if patient else patient_id}*\n"
+            message += f"📊 Humor médio: {data['mood_avg']}\n"
+            message += f"📅 {data['mood_entries']} registros\n\n"
+        
+        self.whatsapp_service.send_text_message(phone_number, message)
+        
+        return {'status': 'sent', 'action': 'mood_trends_report_sent'}
+    
     def _send_system_status(self, phone_number: str) -> Dict:
         """Enviar status do sistema"""
         
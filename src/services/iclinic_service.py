@@ -1,12 +1,60 @@
 import csv
 import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from sqlalchemy import func
 from src.models.patient import Patient
 from src.models.response import Response
 from src.models.medication import Medication, MedicationConfirmation
-from src.models.mood_chart import MoodChart
+from src.models.mood import MoodChart
 from src.models.user import db
+from src.services.adherence_service import MedicationAdherenceService
+from src.services.rollup_service import RollupService
+
+# Validade máxima do relatório de integração em cache (segundos)
+REPORT_CACHE_TTL = 300
+# Relatórios em cache (um por patient_id; None = todos)
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES") or "64")
+
+# Incrementado a cada commit deste processo que altera dados do relatório
+_report_generation = 0
+_report_watcher_installed = False
+
+
+def _install_report_watcher() -> None:
+    """Invalidar relatórios após commits que tocam nos modelos do relatório (inclui edições)"""
+    global _report_watcher_installed
+    if _report_watcher_installed:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    watched = (Patient, Response, Medication, MedicationConfirmation, MoodChart)
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_report_changes(session, flush_context):
+        if any(isinstance(obj, watched)
+               for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+            session.info['iclinic_report_dirty'] = True
+
+    @event.listens_for(Session, 'after_commit')
+    def _bump_report_generation(session):
+        global _report_generation
+        if session.info.pop('iclinic_report_dirty', False):
+            _report_generation += 1
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_report_changes(session):
+        session.info.pop('iclinic_report_dirty', None)
+
+    _report_watcher_installed = True
+
 
 class iClinicService:
     """Serviço de integração com iClinic via exportação/importação de dados"""
@@ -22,6 +70,14 @@ class iClinicService:
             'cpf': 'cpf',
             'active': 'is_active'
         }
+        
+        self.adherence_service = MedicationAdherenceService()
+        self.rollup_service = RollupService()
+        
+        # Cache do relatório de integração: patient_id -> (fingerprint, timestamp, json), LRU
+        self._report_cache = OrderedDict()
+        self._report_cache_lock = threading.Lock()
+        _install_report_watcher()
     
     def export_patients_to_csv(self, patients: List[Patient] = None) -> str:
         """
@@ -152,7 +208,7 @@ class iClinicService:
         )
         
         if patient_id:
-            query = query.filter_by(patient_id=patient_id)
+            query = query.filter_by(patient_id=str(patient_id))
         
         confirmations = query.all()
         
@@ -176,7 +232,7 @@ class iClinicService:
         writer.writerow(headers)
         
         # Agrupar por paciente e medicação
-        adherence_data = self._calculate_adherence_data(confirmations)
+        adherence_data = self._calculate_adherence_data(confirmations, days)
         
         for data in adherence_data:
             writer.writerow(data)
@@ -197,12 +253,12 @@ class iClinicService:
         from datetime import timedelta
         start_date = datetime.now() - timedelta(days=days)
         
-        query = MoodChart.query.filter(MoodChart.date >= start_date.date())
+        query = MoodChart.query.filter(MoodChart.day >= start_date.date())
         
         if patient_id:
-            query = query.filter_by(patient_id=patient_id)
+            query = query.filter_by(patient_id=str(patient_id))
         
-        mood_charts = query.order_by(MoodChart.date.desc()).all()
+        mood_charts = query.order_by(MoodChart.day.desc()).all()
         
         headers = [
             'patient_code',
@@ -234,21 +290,75 @@ class iClinicService:
             row = [
                 patient.id,
                 patient.name,
-                mood_chart.date.strftime('%Y-%m-%d'),
-                mood_chart.mood_level or '',
-                mood_chart.functioning_level or '',
-                mood_chart.sleep_quality or '',
-                mood_chart.sleep_hours or '',
-                mood_chart.anxiety_level or '',
-                mood_chart.irritability_level or '',
-                '1' if mood_chart.medications_taken else '0',
-                mood_chart.significant_events or '',
-                mood_chart.notes or ''
+                mood_chart.day.strftime('%Y-%m-%d'),
+                mood_chart.value if mood_chart.value is not None else '',
+                # O afetivograma só registra o valor do dia; colunas mantidas para o layout do iClinic
+                '', '', '', '', '', '', '', ''
             ]
             writer.writerow(row)
         
         return output.getvalue()
     
+    def export_daily_rollups_to_csv(self, patient_id: int = None, days: int = 365) -> str:
+        """
+        Exportar agregados diários (escalas, humor e aderência) em formato CSV
+        
+        Lê da tabela de rollups, então o custo cresce com o número de dias
+        do período e não com o número de eventos registrados.
+        
+        Args:
+            patient_id: ID do paciente (se None, exporta todos)
+            days: Número de dias para análise
+            
+        Returns:
+            String contendo o CSV formatado
+        """
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days - 1)
+        rollups = self.rollup_service.daily(start_date, end_date, [patient_id] if patient_id else None)
+        
+        headers = [
+            'patient_code',
+            'date',
+            'responses',
+            'score_avg',
+            'score_max',
+            'alarming',
+            'mood_avg',
+            'functioning_avg',
+            'sleep_avg',
+            'anxiety_avg',
+            'doses_expected',
+            'doses_confirmed',
+            'doses_missed'
+        ]
+        
+        output = io.StringIO()
+        writer = csv.writer(output)
+        
+        # Escrever cabeçalho
+        writer.writerow(headers)
+        
+        for rollup in rollups:
+            data = rollup.to_dict()
+            writer.writerow([
+                rollup.patient_id,
+                data['day'],
+                data['response_count'],
+                data['score_avg'] if data['score_avg'] is not None else '',
+                data['score_max'] if data['score_max'] is not None else '',
+                data['alarming_count'],
+                data['mood_avg'] if data['mood_avg'] is not None else '',
+                data['functioning_avg'] if data['functioning_avg'] is not None else '',
+                data['sleep_avg'] if data['sleep_avg'] is not None else '',
+                data['anxiety_avg'] if data['anxiety_avg'] is not None else '',
+                data['doses_expected'],
+                data['doses_confirmed'],
+                data['doses_missed']
+            ])
+        
+        return output.getvalue()
+    
     def import_patient_from_iclinic_data(self, iclinic_data: Dict) -> Patient:
         """
         Importar dados de paciente do iClinic para o sistema
@@ -260,21 +370,12 @@ class iClinicService:
             Objeto Patient criado ou atualizado
         """
         # Mapear campos do iClinic para o nosso sistema
-        patient_data = {
-            'name': iclinic_data.get('name'),
-            'phone_number': self._format_phone_from_iclinic(iclinic_data.get('mobile_phone')),
-            'email': iclinic_data.get('email'),
-            'birth_date': self._parse_date(iclinic_data.get('birth_date')),
-            'cpf': iclinic_data.get('cpf'),
-            'is_active': iclinic_data.get('active', '1') == '1'
-        }
+        patient_data = self._map_iclinic_patient_data(iclinic_data)
         
-        # Verificar se paciente já existe (por CPF ou telefone)
+        # Verificar se paciente já existe (pelo telefone, chave única do modelo)
         existing_patient = None
-        if patient_data['cpf']:
-            existing_patient = Patient.query.filter_by(cpf=patient_data['cpf']).first()
-        elif patient_data['phone_number']:
-            existing_patient = Patient.query.filter_by(phone_number=patient_data['phone_number']).first()
+        if patient_data['phone_e164']:
+            existing_patient = Patient.query.filter_by(phone_e164=patient_data['phone_e164']).first()
         
         if existing_patient:
             # Atualizar paciente existente
@@ -285,16 +386,123 @@ class iClinicService:
             db.session.commit()
             return existing_patient
         else:
+            if not patient_data['name'] or not patient_data['phone_e164']:
+                raise ValueError('Nome e telefone do paciente são obrigatórios')
             # Criar novo paciente
             patient = Patient(**patient_data)
             db.session.add(patient)
             db.session.commit()
             return patient
     
+    def import_patients_bulk(self, records: List[Dict], chunk_size: int = 500) -> List[Dict]:
+        """
+        Importar pacientes do iClinic em lote
+        
+        Para cada bloco de `chunk_size` registros, busca os pacientes já
+        existentes (por telefone) em uma única consulta, aplica as
+        atualizações/criações em memória e faz um único commit.
+        
+        Args:
+            records: Lista de dicionários com dados de pacientes do iClinic
+            chunk_size: Quantidade de registros por bloco
+            
+        Returns:
+            Lista com o resultado de cada linha, na ordem de entrada:
+            {'index', 'status': 'created'|'updated'|'imported'|'error', 'patient'|'error'}
+            ('imported' só aparece quando o bloco precisou ser reprocessado linha a linha)
+        """
+        results = []
+        
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            try:
+                results.extend(self._import_patient_chunk(chunk, start))
+            except Exception:
+                # Falha no commit do bloco: reprocessa linha a linha para isolar o erro
+                db.session.rollback()
+                results.extend(self._import_patient_chunk_fallback(chunk, start))
+        
+        # Atualizações não mudam a contagem de pacientes; força novo relatório
+        self.invalidate_report_cache()
+        return results
+    
+    def _import_patient_chunk(self, chunk: List[Dict], offset: int) -> List[Dict]:
+        """Importar um bloco de pacientes com uma consulta de prefetch e um commit"""
+        mapped = []
+        results = []
+        
+        for i, iclinic_data in enumerate(chunk):
+            try:
+                if not isinstance(iclinic_data, dict):
+                    raise ValueError('Registro de paciente inválido')
+                mapped.append((offset + i, iclinic_data, self._map_iclinic_patient_data(iclinic_data)))
+            except Exception as e:
+                results.append({'index': offset + i, 'status': 'error',
+                                'patient_data': iclinic_data, 'error': str(e)})
+        
+        # Prefetch dos pacientes existentes do bloco (uma consulta)
+        phones = {data['phone_e164'] for _, _, data in mapped if data['phone_e164']}
+        by_phone = {}
+        if phones:
+            for patient in Patient.query.filter(Patient.phone_e164.in_(phones)).all():
+                by_phone[patient.phone_e164] = patient
+        
+        touched = []
+        for index, iclinic_data, patient_data in mapped:
+            # Mesmo critério de import_patient_from_iclinic_data: telefone
+            existing_patient = by_phone.get(patient_data['phone_e164']) if patient_data['phone_e164'] else None
+            
+            if existing_patient:
+                for key, value in patient_data.items():
+                    if value is not None:
+                        setattr(existing_patient, key, value)
+                touched.append((index, 'updated', existing_patient))
+                continue
+            
+            if not patient_data['name'] or not patient_data['phone_e164']:
+                results.append({'index': index, 'status': 'error', 'patient_data': iclinic_data,
+                                'error': 'Nome e telefone do paciente são obrigatórios'})
+                continue
+            
+            patient = Patient(**patient_data)
+            db.session.add(patient)
+            # Registros repetidos no mesmo arquivo passam a atualizar o paciente recém-criado
+            by_phone[patient_data['phone_e164']] = patient
+            touched.append((index, 'created', patient))
+        
+        # flush atribui os ids; serializar antes do commit evita um SELECT de
+        # recarga por linha (expire_on_commit)
+        db.session.flush()
+        for index, status, patient in touched:
+            results.append({'index': index, 'status': status, 'patient': patient.to_dict()})
+        db.session.commit()
+        
+        results.sort(key=lambda r: r['index'])
+        return results
+    
+    def _import_patient_chunk_fallback(self, chunk: List[Dict], offset: int) -> List[Dict]:
+        """Importar um bloco linha a linha (usado quando o commit em lote falha)"""
+        results = []
+        
+        for i, iclinic_data in enumerate(chunk):
+            try:
+                patient = self.import_patient_from_iclinic_data(iclinic_data)
+                results.append({'index': offset + i, 'status': 'imported', 'patient': patient.to_dict()})
+            except Exception as e:
+                db.session.rollback()
+                results.append({'index': offset + i, 'status': 'error',
+                                'patient_data': iclinic_data, 'error': str(e)})
+        
+        return results
+    
     def generate_integration_report(self, patient_id: int = None) -> Dict:
         """
         Gerar relatório consolidado para integração com iClinic
         
+        Cada entidade (respostas, medicações, humor) é buscada com uma única
+        consulta para todos os pacientes do relatório e agrupada em memória,
+        então o número de consultas não cresce com o número de pacientes.
+        
         Args:
             patient_id: ID do paciente (se None, gera para todos)
             
@@ -314,70 +522,66 @@ class iClinicService:
         
         # Buscar pacientes
         if patient_id:
-            patients = [Patient.query.get(patient_id)]
+            patients = [p for p in [Patient.query.get(patient_id)] if p]
         else:
-            patients = Patient.query.filter_by(is_active=True).all()
+            patients = Patient.query.filter_by(active=True).all()
+        
+        if not patients:
+            return report
+        
+        # patient_id das tabelas relacionadas é String(64)
+        patient_ids = [str(patient.id) for patient in patients]
+        start_date = datetime.now() - timedelta(days=30)
+        
+        responses_by_patient = self._group_by_patient(self._latest_per_patient(
+            Response, Response.created_at, patient_ids,
+            Response.created_at >= start_date
+        ))
+        medications_by_patient = self._group_by_patient(Medication.query.filter(
+            Medication.patient_id.in_(patient_ids),
+            Medication.is_active == True  # noqa: E712
+        ).all())
+        mood_by_patient = self._group_by_patient(self._latest_per_patient(
+            MoodChart, MoodChart.day, patient_ids,
+            MoodChart.day >= start_date.date()
+        ))
         
         for patient in patients:
-            if not patient:
-                continue
-            
+            key = str(patient.id)
             # Dados do paciente
             patient_data = {
                 'id': patient.id,
                 'name': patient.name,
-                'phone': patient.phone_number,
-                'email': patient.email,
+                'phone': patient.phone_e164,
                 'recent_responses': [],
                 'medications': [],
                 'mood_entries': []
             }
             
             # Respostas recentes (últimos 30 dias)
-            from datetime import timedelta
-            start_date = datetime.now() - timedelta(days=30)
-            
-            responses = Response.query.filter(
-                Response.patient_id == patient.id,
-                Response.created_at >= start_date
-            ).order_by(Response.created_at.desc()).limit(10).all()
-            
-            for response in responses:
+            for response in responses_by_patient.get(key, []):
                 response_data = response.response_data or {}
                 patient_data['recent_responses'].append({
                     'scale': response_data.get('scale_name', 'Não especificado'),
                     'score': response.score,
-                    'category': response.category,
+                    'category': response_data.get('category'),
                     'alarming': response.is_alarming,
                     'date': response.created_at.strftime('%Y-%m-%d %H:%M')
                 })
             
             # Medicações ativas
-            medications = Medication.query.filter_by(
-                patient_id=patient.id,
-                is_active=True
-            ).all()
-            
-            for medication in medications:
+            for medication in medications_by_patient.get(key, []):
                 patient_data['medications'].append({
                     'name': medication.name,
                     'dosage': medication.dosage,
-                    'frequency': medication.frequency,
-                    'times': medication.times
+                    'schedule': medication.schedule
                 })
             
             # Registros de humor recentes
-            mood_charts = MoodChart.query.filter(
-                MoodChart.patient_id == patient.id,
-                MoodChart.date >= start_date.date()
-            ).order_by(MoodChart.date.desc()).limit(10).all()
-            
-            for mood_chart in mood_charts:
+            for mood_chart in mood_by_patient.get(key, []):
                 patient_data['mood_entries'].append({
-                    'date': mood_chart.date.strftime('%Y-%m-%d'),
-                    'mood_level': mood_chart.mood_level,
-                    'functioning_level': mood_chart.functioning_level,
-                    'sleep_quality': mood_chart.sleep_quality
+                    'date': mood_chart.day.strftime('%Y-%m-%d'),
+                    'mood_level': mood_chart.value
                 })
             
             report['patients'].append(patient_data)
@@ -391,6 +595,72 @@ class iClinicService:
         
         return report
     
+    def get_integration_report_json(self, patient_id: int = None) -> bytes:
+        """
+        Relatório de integração serializado em JSON, com cache
+        
+        O cache é invalidado quando muda a "impressão digital" dos dados:
+        commits deste processo que alteram os modelos do relatório (inclusive
+        edições, como desativar uma medicação) e contagem/maior id de cada
+        tabela (inserções de outros processos). Edições feitas por outro
+        processo só aparecem após REPORT_CACHE_TTL segundos. No máximo
+        REPORT_CACHE_MAX_ENTRIES relatórios ficam em cache (LRU).
+        """
+        fingerprint = self._integration_data_fingerprint()
+        now = time.monotonic()
+        
+        with self._report_cache_lock:
+            cached = self._report_cache.get(patient_id)
+            if cached and cached[0] == fingerprint and now - cached[1] < REPORT_CACHE_TTL:
+                self._report_cache.move_to_end(patient_id)
+                return cached[2]
+        
+        report = self.generate_integration_report(patient_id)
+        content = json.dumps(report, indent=2, ensure_ascii=False).encode('utf-8')
+        
+        with self._report_cache_lock:
+            self._report_cache[patient_id] = (fingerprint, now, content)
+            self._report_cache.move_to_end(patient_id)
+            while len(self._report_cache) > REPORT_CACHE_MAX_ENTRIES:
+                self._report_cache.popitem(last=False)
+        
+        return content
+    
+    def invalidate_report_cache(self):
+        """Descartar relatórios de integração em cache"""
+        with self._report_cache_lock:
+            self._report_cache.clear()
+    
+    def _integration_data_fingerprint(self) -> tuple:
+        """Resumo barato (uma agregação por tabela) usado para invalidar o cache"""
+        fingerprint = [_report_generation]
+        for model, column in ((Patient, Patient.id), (Response, Response.created_at),
+                              (Medication, Medication.id), (MoodChart, MoodChart.created_at)):
+            count, last = db.session.query(func.count(model.id), func.max(column)).one()
+            fingerprint.append((count, str(last)))
+        return tuple(fingerprint)
+    
+    def _latest_per_patient(self, model, order_column, patient_ids: List[str], *criteria, limit: int = 10) -> List:
+        """Buscar os `limit` registros mais recentes de cada paciente em uma única consulta"""
+        row_number = func.row_number().over(
+            partition_by=model.patient_id,
+            order_by=order_column.desc()
+        ).label('rn')
+        ranked = db.session.query(model.id.label('id'), row_number).filter(
+            model.patient_id.in_(patient_ids), *criteria
+        ).subquery()
+        
+        return model.query.join(ranked, model.id == ranked.c.id).filter(
+            ranked.c.rn <= limit
+        ).order_by(model.patient_id, order_column.desc()).all()
+    
+    def _group_by_patient(self, rows: List) -> Dict[str, List]:
+        """Agrupar registros por patient_id preservando a ordem"""
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row.patient_id, []).append(row)
+        return grouped
+    
     def _format_phone_for_iclinic(self, phone: str) -> str:
         """Formatar telefone para o padrão do iClinic"""
         if not phone:
@@ -422,6 +692,16 @@ class iClinicService:
         
         return phone
     
+    def _map_iclinic_patient_data(self, iclinic_data: Dict) -> Dict:
+        """Mapear campos do iClinic para os campos do modelo Patient"""
+        # Patient só guarda nome, telefone (E.164 sem +) e situação; CPF, e-mail
+        # e nascimento do iClinic não têm coluna no modelo
+        return {
+            'name': iclinic_data.get('name'),
+            'phone_e164': self._format_phone_from_iclinic(iclinic_data.get('mobile_phone')) or None,
+            'active': iclinic_data.get('active', '1') == '1'
+        }
+    
     def _parse_date(self, date_str: str) -> date:
         """Converter string de data para objeto date"""
         if not date_str:
@@ -447,56 +727,48 @@ class iClinicService:
         
         return ' | '.join(formatted)
     
-    def _calculate_adherence_data(self, confirmations: List[MedicationConfirmation]) -> List[List]:
+    def _calculate_adherence_data(self, confirmations: List[MedicationConfirmation], days: int = 30) -> List[List]:
         """Calcular dados de aderência medicamentosa"""
-        # Agrupar por paciente e medicação
-        grouped = {}
-        
-        for confirmation in confirmations:
-            patient = Patient.query.get(confirmation.patient_id)
-            medication = Medication.query.get(confirmation.medication_id)
-            
-            if not patient or not medication:
-                continue
-            
-            key = (patient.id, medication.id)
-            
-            if key not in grouped:
-                grouped[key] = {
-                    'patient': patient,
-                    'medication': medication,
-                    'confirmations': []
-                }
-            
-            grouped[key]['confirmations'].append(confirmation)
+        if not confirmations:
+            return []
+        
+        # Pacientes e medicações em uma consulta cada (em vez de uma por confirmação);
+        # confirmation.patient_id é String(64), Patient.id é inteiro
+        patient_ids = {int(c.patient_id) for c in confirmations if str(c.patient_id).isdigit()}
+        medication_ids = {c.medication_id for c in confirmations}
+        patients = {str(p.id): p for p in Patient.query.filter(Patient.id.in_(patient_ids)).all()}
+        medications = {m.id: m for m in Medication.query.filter(Medication.id.in_(medication_ids)).all()}
+        
+        # Aderência (doses esperadas x confirmadas) de todos os pacientes em um único cálculo
+        adherence = self.adherence_service.compute(list(patient_ids), days)['patients']
+        rates = {}
+        for patient_id, patient_adherence in adherence.items():
+            for med in patient_adherence['medications']:
+                rates[(patient_id, med['medication_id'])] = med['adherence_rate']
         
-        # Calcular aderência para cada grupo
         result = []
         
-        for (patient_id, medication_id), data in grouped.items():
-            patient = data['patient']
-            medication = data['medication']
-            confirmations = data['confirmations']
+        for confirmation in sorted(confirmations, key=lambda c: (c.patient_id, c.medication_id, c.scheduled_time)):
+            patient = patients.get(confirmation.patient_id)
+            medication = medications.get(confirmation.medication_id)
             
-            total_scheduled = len(confirmations)
-            total_confirmed = len([c for c in confirmations if c.status == 'confirmed'])
+            if not patient or not medication:
+                continue
             
-            adherence_percentage = (total_confirmed / total_scheduled * 100) if total_scheduled > 0 else 0
+            adherence_percentage = rates.get((confirmation.patient_id, medication.id), 0.0)
             
-            for confirmation in confirmations:
-                row = [
-                    patient.id,
-                    patient.name,
-                    medication.name,
-                    medication.dosage,
-                    confirmation.scheduled_time.strftime('%Y-%m-%d'),
-                    confirmation.scheduled_time.strftime('%H:%M:%S'),
-                    confirmation.confirmed_time.strftime('%Y-%m-%d') if confirmation.confirmed_time else '',
-                    confirmation.confirmed_time.strftime('%H:%M:%S') if confirmation.confirmed_time else '',
-                    confirmation.status,
-                    f'{adherence_percentage:.1f}%'
-                ]
-                result.append(row)
+            row = [
+                patient.id,
+                patient.name,
+                medication.name,
+                medication.dosage,
+                confirmation.scheduled_time.strftime('%Y-%m-%d'),
+                confirmation.scheduled_time.strftime('%H:%M:%S'),
+                confirmation.confirmed_time.strftime('%Y-%m-%d') if confirmation.confirmed_time else '',
+                confirmation.confirmed_time.strftime('%H:%M:%S') if confirmation.confirmed_time else '',
+                confirmation.status,
+                f'{adherence_percentage:.1f}%'
+            ]
+            result.append(row)
         
         return result
-
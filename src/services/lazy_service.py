@@ -0,0 +1,47 @@
+"""
+Instâncias de serviço criadas sob demanda
+
+Blueprints guardam serviços em variáveis de módulo (`scheduler_service =
+SchedulerService()`), o que importa o serviço e todas as suas dependências
+(requests, APScheduler, croniter...) no boot. LazyService recebe o caminho
+da classe e só importa e instancia no primeiro acesso a um atributo.
+"""
+
+import importlib
+import threading
+
+
+class LazyService:
+    """Proxy que importa e constrói o serviço no primeiro uso"""
+
+    def __init__(self, target: str, *args, **kwargs):
+        module_path, _, class_name = target.rpartition('.')
+        self._module_path = module_path
+        self._class_name = class_name
+        self._args = args
+        self._kwargs = kwargs
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """Instância real (criada uma única vez, mesmo com várias threads)"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    cls = getattr(importlib.import_module(self._module_path), self._class_name)
+                    instance = cls(*self._args, **self._kwargs)
+                    self._instance = instance
+        return instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        state = 'carregado' if self._instance is not None else 'pendente'
+        return f"<LazyService {self._module_path}.{self._class_name} ({state})>"
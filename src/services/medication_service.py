@@ -3,41 +3,33 @@ from src.models.patient import Patient
 from src.models.medication import Medication, MedicationConfirmation
 from src.models.user import db
 from src.services.whatsapp_service import WhatsAppService
-from datetime import datetime, date, time
+from src.services.adherence_service import MedicationAdherenceService
+from src.services.timer_service import timer_service
+from datetime import datetime, date, time, timedelta
 import json
 
+# Minutos até lembrar de novo quando o paciente adia a dose
+MEDICATION_DELAY_MINUTES = 15
+
 class MedicationService:
     """Serviço para gerenciar lembretes de medicação"""
     
     def __init__(self):
         self.whatsapp_service = WhatsAppService()
+        self.adherence_service = MedicationAdherenceService()
     
     def send_medication_reminder(self, patient: Patient, medication: Medication) -> Dict:
         """Enviar lembrete de medicação"""
         current_time = datetime.now().strftime('%H:%M')
         
-        message = f"""💊 *Lembrete de Medicação*
-
-⏰ *Horário:* {current_time}
-💊 *Medicamento:* {medication.name}
-📏 *Dosagem:* {medication.dosage}
-
-{medication.instructions if medication.instructions else ''}
-
-Por favor, confirme quando tomar o medicamento."""
-        
-        # Criar botões de confirmação
-        buttons = [
-            {'id': f'med_confirm_{medication.id}', 'title': '✅ Tomei agora'},
-            {'id': f'med_delay_{medication.id}', 'title': '⏰ Lembrar em 15min'},
-            {'id': f'med_skip_{medication.id}', 'title': '❌ Pular esta dose'}
-        ]
-        
-        result = self.whatsapp_service.send_interactive_message(
+        result = self.whatsapp_service.send_template(
             patient.phone_number,
-            "💊 Hora do Medicamento",
-            message,
-            buttons
+            'medication_dose_reminder',
+            time=current_time,
+            medication_name=medication.name,
+            dosage=medication.dosage,
+            instructions=medication.instructions if medication.instructions else '',
+            medication_id=medication.id
         )
         
         # Criar registro de confirmação pendente
@@ -70,7 +62,7 @@ Por favor, confirme quando tomar o medicamento."""
         # Buscar confirmação pendente
         confirmation = MedicationConfirmation.query.filter_by(
             medication_id=medication_id,
-            patient_id=patient.id,
+            patient_id=str(patient.id),
             status='pending'
         ).order_by(MedicationConfirmation.created_at.desc()).first()
         
@@ -103,20 +95,28 @@ Por favor, confirme quando tomar o medicamento."""
     
     def _delay_medication(self, patient: Patient, medication: Medication, confirmation: MedicationConfirmation) -> Dict:
         """Atrasar lembrete de medicação"""
+        self._schedule_medication_retry(patient, medication)
+        
         message = f"""⏰ *Lembrete Adiado*
 
 💊 {medication.name}
-🔔 Você receberá um novo lembrete em 15 minutos.
+🔔 Você receberá um novo lembrete em {MEDICATION_DELAY_MINUTES} minutos.
 
 Não se esqueça! 😊"""
         
         self.whatsapp_service.send_text_message(patient.phone_number, message)
         
-        # Aqui você implementaria a lógica para reagendar o lembrete
-        # Por exemplo, adicionar uma tarefa para enviar em 15 minutos
-        
         return {'status': 'delayed', 'action': 'medication_delayed'}
     
+    def _schedule_medication_retry(self, patient: Patient, medication: Medication) -> int:
+        """Agendar o novo lembrete da dose (substitui um adiamento pendente)"""
+        return timer_service.schedule(
+            'medication.resend',
+            {'medication_id': medication.id, 'patient_id': patient.id},
+            delay=timedelta(minutes=MEDICATION_DELAY_MINUTES),
+            dedupe_key=f"medication:{patient.id}:{medication.id}"
+        )
+    
     def _skip_medication(self, patient: Patient, medication: Medication, confirmation: MedicationConfirmation) -> Dict:
         """Pular dose de medicação"""
         if confirmation:
@@ -203,7 +203,7 @@ Por favor, responda:
         # Buscar confirmação pendente
         confirmation = MedicationConfirmation.query.filter_by(
             medication_id=medication.id,
-            patient_id=patient.id,
+            patient_id=str(patient.id),
             status='pending'
         ).order_by(MedicationConfirmation.created_at.desc()).first()
         
@@ -225,10 +225,12 @@ Obrigado por confirmar! 👍"""
     
     def _delay_medication_text(self, patient: Patient, medication: Medication) -> Dict:
         """Atrasar medicação via resposta de texto"""
+        self._schedule_medication_retry(patient, medication)
+        
         message = f"""⏰ *Entendido!*
 
 💊 {medication.name}
-🔔 Vou lembrar você novamente em 15 minutos.
+🔔 Vou lembrar você novamente em {MEDICATION_DELAY_MINUTES} minutos.
 
 Não se esqueça! 😊"""
         
@@ -238,26 +240,14 @@ Não se esqueça! 😊"""
     
     def get_medication_adherence_report(self, patient: Patient, days: int = 7) -> Dict:
         """Gerar relatório de aderência à medicação"""
-        from datetime import timedelta
-        
-        start_date = datetime.now() - timedelta(days=days)
-        
-        confirmations = MedicationConfirmation.query.filter(
-            MedicationConfirmation.patient_id == patient.id,
-            MedicationConfirmation.created_at >= start_date
-        ).all()
-        
-        total_scheduled = len(confirmations)
-        confirmed = len([c for c in confirmations if c.status == 'confirmed'])
-        missed = len([c for c in confirmations if c.status == 'missed'])
-        
-        adherence_rate = (confirmed / total_scheduled * 100) if total_scheduled > 0 else 0
+        adherence = self.adherence_service.patient_adherence(patient.id, days)
         
         return {
-            'total_scheduled': total_scheduled,
-            'confirmed': confirmed,
-            'missed': missed,
-            'adherence_rate': round(adherence_rate, 1),
-            'period_days': days
+            'total_scheduled': adherence['expected'],
+            'confirmed': adherence['confirmed'],
+            'missed': adherence['missed'],
+            'unanswered': adherence['unanswered'],
+            'adherence_rate': adherence['adherence_rate'],
+            'period_days': days,
+            'medications': adherence['medications']
         }
-
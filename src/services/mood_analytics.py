@@ -0,0 +1,230 @@
+import math
+from typing import Dict, Iterable, List, Optional
+from datetime import date, timedelta
+from sqlalchemy import null
+from src.models.mood import MoodChart
+from src.models.user import db
+
+# Séries extraídas do afetivograma (nome na análise -> coluna do MoodChart).
+# O modelo atual (src/models/mood.py) só guarda o valor do dia; métricas sem
+# coluna no modelo saem como séries vazias (count 0).
+MOOD_METRICS = {
+    'mood': 'value',
+    'functioning': 'functioning_level',
+    'sleep': 'sleep_quality',
+    'anxiety': 'anxiety_level',
+}
+
+
+class MoodAnalyticsService:
+    """Análises de tendência do afetivograma em formato colunar
+
+    As séries de todos os pacientes pedidos são carregadas com uma única
+    consulta (somente as colunas necessárias, sem hidratar objetos ORM) e
+    guardadas como listas paralelas por paciente. As estatísticas são
+    calculadas em uma passada sobre cada coluna.
+    """
+
+    def __init__(self, rolling_window: int = 7, min_segment: int = 3):
+        self.rolling_window = rolling_window
+        self.min_segment = min_segment
+
+    def load_series(self, patient_ids: Optional[List[int]], start_date: date,
+                    end_date: date = None) -> Dict[str, Dict[str, List]]:
+        """
+        Carregar séries de humor de vários pacientes com uma consulta
+
+        Args:
+            patient_ids: IDs dos pacientes (None = todos)
+            start_date: Primeiro dia incluído
+            end_date: Último dia incluído (padrão: hoje)
+
+        Returns:
+            {patient_id (str): {'dates': [...], 'mood': [...], 'functioning': [...], ...}}
+        """
+        columns = [MoodChart.patient_id, MoodChart.day] + [
+            getattr(MoodChart, column) if hasattr(MoodChart, column) else null().label(metric)
+            for metric, column in MOOD_METRICS.items()
+        ]
+        query = db.session.query(*columns).filter(
+            MoodChart.day >= start_date,
+            MoodChart.day <= (end_date or date.today())
+        )
+        if patient_ids is not None:
+            if not patient_ids:
+                return {}
+            # MoodChart.patient_id é String(64)
+            query = query.filter(MoodChart.patient_id.in_([str(patient_id) for patient_id in patient_ids]))
+
+        return self.build_series(query.order_by(MoodChart.patient_id, MoodChart.day).all())
+
+    def row_of(self, entry) -> tuple:
+        """(patient_id, dia, métricas...) de um MoodChart já carregado"""
+        return (entry.patient_id, entry.day) + tuple(
+            getattr(entry, column, None) for column in MOOD_METRICS.values()
+        )
+
+    def build_series(self, rows: Iterable) -> Dict[str, Dict[str, List]]:
+        """Transpor linhas (patient_id, date, métricas...) para colunas por paciente"""
+        series = {}
+        for row in rows:
+            patient_series = series.get(row[0])
+            if patient_series is None:
+                patient_series = {'dates': []}
+                for metric in MOOD_METRICS:
+                    patient_series[metric] = []
+                series[row[0]] = patient_series
+
+            patient_series['dates'].append(row[1])
+            for offset, metric in enumerate(MOOD_METRICS, start=2):
+                patient_series[metric].append(row[offset])
+
+        return series
+
+    def summarize_series(self, patient_series: Dict[str, List]) -> Dict:
+        """Calcular média, variância, inclinação, média móvel e ponto de mudança de cada métrica"""
+        dates = patient_series['dates']
+        summary = {
+            'total_entries': len(dates),
+            'first_date': dates[0].isoformat() if dates else None,
+            'last_date': dates[-1].isoformat() if dates else None,
+            'metrics': {}
+        }
+        if not dates:
+            return summary
+
+        origin = dates[0]
+        day_offsets = [(day - origin).days for day in dates]
+
+        for metric in MOOD_METRICS:
+            # Descarta dias sem valor mantendo o alinhamento com as datas
+            points = [(x, y) for x, y in zip(day_offsets, patient_series[metric]) if y is not None]
+            summary['metrics'][metric] = self._summarize_metric(points, origin)
+
+        return summary
+
+    def patient_trend(self, patient_id: int, days: int = 30) -> Dict:
+        """Resumo de tendência para um paciente"""
+        start_date = date.today() - timedelta(days=days)
+        series = self.load_series([patient_id], start_date).get(str(patient_id))
+        summary = self.summarize_series(series or {'dates': []})
+        summary['patient_id'] = patient_id
+        summary['period_days'] = days
+        return summary
+
+    def clinic_trends(self, patient_ids: Optional[List[int]] = None, days: int = 30) -> Dict:
+        """Resumo de tendência de vários pacientes (painel da clínica) com uma consulta"""
+        start_date = date.today() - timedelta(days=days)
+        series = self.load_series(patient_ids, start_date)
+
+        patients = {}
+        for patient_id, patient_series in series.items():
+            patients[patient_id] = self.summarize_series(patient_series)
+
+        return {
+            'period_days': days,
+            'start_date': start_date.isoformat(),
+            'total_patients': len(patients),
+            'patients': patients
+        }
+
+    def _summarize_metric(self, points: List[tuple], origin: date) -> Dict:
+        """Estatísticas de uma métrica a partir de pares (dia, valor)"""
+        n = len(points)
+        if n == 0:
+            return {'count': 0, 'mean': None, 'variance': None, 'slope_per_day': None,
+                    'rolling_mean': [], 'change_point': None}
+
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+
+        sum_x = sum(xs)
+        sum_y = sum(ys)
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+
+        # Variância amostral e regressão linear (mínimos quadrados) em uma passada
+        sxx = sxy = syy = 0.0
+        for x, y in points:
+            dx = x - mean_x
+            dy = y - mean_y
+            sxx += dx * dx
+            sxy += dx * dy
+            syy += dy * dy
+
+        return {
+            'count': n,
+            'mean': round(mean_y, 2),
+            'variance': round(syy / (n - 1), 3) if n > 1 else 0.0,
+            'slope_per_day': round(sxy / sxx, 4) if sxx else 0.0,
+            'rolling_mean': self._rolling_mean(xs, ys, origin),
+            'change_point': self._change_point(xs, ys, origin)
+        }
+
+    def _rolling_mean(self, xs: List[int], ys: List, origin: date) -> List[Dict]:
+        """Média móvel dos últimos `rolling_window` registros (somas acumuladas, O(n))"""
+        window = self.rolling_window
+        result = []
+        running = 0.0
+        for i, y in enumerate(ys):
+            running += y
+            if i >= window:
+                running -= ys[i - window]
+            size = min(i + 1, window)
+            result.append({
+                'date': (origin + timedelta(days=xs[i])).isoformat(),
+                'value': round(running / size, 2)
+            })
+        return result
+
+    def _change_point(self, xs: List[int], ys: List, origin: date) -> Optional[Dict]:
+        """
+        Ponto de mudança de nível mais provável (divisão binária em uma passada)
+
+        Usa somas de prefixo para avaliar todas as divisões em O(n) e
+        escolhe a que maximiza a diferença de médias ponderada pelo
+        tamanho dos segmentos. Só é reportado se a diferença superar
+        2 desvios-padrão combinados.
+        """
+        n = len(ys)
+        k = self.min_segment
+        if n < 2 * k:
+            return None
+
+        prefix = [0.0]
+        prefix_sq = [0.0]
+        for y in ys:
+            prefix.append(prefix[-1] + y)
+            prefix_sq.append(prefix_sq[-1] + y * y)
+
+        total = prefix[-1]
+        best_split = None
+        best_score = 0.0
+        for split in range(k, n - k + 1):
+            left_mean = prefix[split] / split
+            right_mean = (total - prefix[split]) / (n - split)
+            score = abs(right_mean - left_mean) * math.sqrt(split * (n - split) / n)
+            if score > best_score:
+                best_score = score
+                best_split = split
+
+        if best_split is None:
+            return None
+
+        left_n = best_split
+        right_n = n - best_split
+        left_mean = prefix[best_split] / left_n
+        right_mean = (total - prefix[best_split]) / right_n
+        # Variância dentro dos segmentos (combinada)
+        within = (prefix_sq[-1] - left_n * left_mean ** 2 - right_n * right_mean ** 2) / max(n - 2, 1)
+        std = math.sqrt(max(within, 0.0))
+
+        if std and abs(right_mean - left_mean) < 2 * std:
+            return None
+
+        return {
+            'date': (origin + timedelta(days=xs[best_split])).isoformat(),
+            'before_mean': round(left_mean, 2),
+            'after_mean': round(right_mean, 2),
+            'shift': round(right_mean - left_mean, 2)
+        }
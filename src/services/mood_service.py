@@ -1,8 +1,10 @@
 from typing import Dict, List
 from src.models.patient import Patient
 from src.models.mood_chart import MoodChart
+from src.models.mood import MoodChart as MoodEntry
 from src.models.user import db
 from src.services.whatsapp_service import WhatsAppService
+from src.services.mood_analytics import MoodAnalyticsService
 from datetime import datetime, date, timedelta
 import json
 
@@ -11,6 +13,7 @@ class MoodService:
     
     def __init__(self):
         self.whatsapp_service = WhatsAppService()
+        self.analytics = MoodAnalyticsService()
     
     def start_mood_registration(self, patient: Patient) -> Dict:
         """Iniciar registro de humor diário"""
@@ -290,28 +293,36 @@ Você pode registrar novamente amanhã! 📅"""
         """Gerar relatório de tendência de humor"""
         start_date = date.today() - timedelta(days=days)
         
-        mood_entries = MoodChart.query.filter(
-            MoodChart.patient_id == patient.id,
-            MoodChart.date >= start_date
-        ).order_by(MoodChart.date.desc()).all()
+        mood_entries = MoodEntry.query.filter(
+            MoodEntry.patient_id == str(patient.id),
+            MoodEntry.day >= start_date
+        ).order_by(MoodEntry.day.desc()).all()
         
         if not mood_entries:
             return {'status': 'no_data', 'message': 'Nenhum registro encontrado'}
         
-        # Calcular médias
-        avg_mood = sum(entry.mood_level for entry in mood_entries) / len(mood_entries)
-        avg_functioning = sum(entry.functioning_level for entry in mood_entries) / len(mood_entries)
-        avg_anxiety = sum(entry.anxiety_level or 0 for entry in mood_entries) / len(mood_entries)
+        # Estatísticas calculadas sobre as colunas das mesmas linhas (sem nova consulta)
+        series = self.analytics.build_series(
+            self.analytics.row_of(entry) for entry in reversed(mood_entries)
+        )[str(patient.id)]
+        summary = self.analytics.summarize_series(series)
+        metrics = summary['metrics']
         
         return {
             'period_days': days,
             'total_entries': len(mood_entries),
-            'avg_mood': round(avg_mood, 1),
-            'avg_functioning': round(avg_functioning, 1),
-            'avg_anxiety': round(avg_anxiety, 1),
+            'avg_mood': self._round_mean(metrics['mood']),
+            'avg_functioning': self._round_mean(metrics['functioning']),
+            # Como antes: dias sem ansiedade registrada contam como 0
+            'avg_anxiety': round(sum(value or 0 for value in series['anxiety']) / len(mood_entries), 1),
+            'trend': metrics,
             'entries': [entry.to_dict() for entry in mood_entries]
         }
     
+    def _round_mean(self, metric: Dict):
+        """Média com 1 casa decimal (formato histórico do relatório)"""
+        return round(metric['mean'], 1) if metric['mean'] is not None else None
+    
     def _get_mood_description(self, mood_level: int) -> str:
         """Obter descrição do nível de humor"""
         descriptions = {
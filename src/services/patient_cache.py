@@ -0,0 +1,170 @@
+"""
+Cache de pacientes por telefone / chat id
+
+Cada mensagem recebida precisa do paciente do remetente. Em vez de uma
+consulta por mensagem, o resultado é guardado como um snapshot imutável
+numa LRU com TTL, indexada pela coluna usada na busca (phone_e164,
+whatsapp_phone, telegram_chat_id). Commits que inserem, alteram ou removem
+um Patient descartam todas as entradas daquele paciente, seja qual for a
+origem da escrita (/api/patients, painel admin, importação CSV, handlers).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PATIENT_CACHE_TTL = int(os.getenv('PATIENT_CACHE_TTL', '600'))
+PATIENT_CACHE_SIZE = int(os.getenv('PATIENT_CACHE_SIZE', '10000'))
+
+# Colunas aceitas como chave de busca
+LOOKUP_COLUMNS = ('phone_e164', 'whatsapp_phone', 'telegram_chat_id')
+
+PatientSnapshot = namedtuple('PatientSnapshot', [
+    'id', 'name', 'phone_e164', 'phone_number', 'whatsapp_phone', 'telegram_chat_id',
+    'telegram_username', 'is_active', 'email', 'cpf', 'birth_date', 'created_at'
+])
+
+
+def snapshot_of(patient) -> PatientSnapshot:
+    """Cópia somente leitura dos campos usados pelos canais de mensagem"""
+    active = getattr(patient, 'is_active', None)
+    if active is None:
+        active = getattr(patient, 'active', None)
+    return PatientSnapshot(
+        patient.id,
+        patient.name,
+        getattr(patient, 'phone_e164', None),
+        getattr(patient, 'phone_number', None),
+        getattr(patient, 'whatsapp_phone', None),
+        getattr(patient, 'telegram_chat_id', None),
+        getattr(patient, 'telegram_username', None),
+        active,
+        getattr(patient, 'email', None),
+        getattr(patient, 'cpf', None),
+        getattr(patient, 'birth_date', None),
+        getattr(patient, 'created_at', None),
+    )
+
+
+class PatientCache:
+    """LRU com TTL de (coluna, valor) -> PatientSnapshot"""
+
+    def __init__(self, ttl: int = PATIENT_CACHE_TTL, max_size: int = PATIENT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # chave -> (guardado_em, snapshot)
+        self._keys_by_id: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def lookup(self, column: str, value) -> Optional[PatientSnapshot]:
+        """Paciente cuja `column` é `value` (consulta o banco só em miss)"""
+        if column not in LOOKUP_COLUMNS:
+            raise ValueError(f"Coluna de busca não suportada: {column}")
+        if not value:
+            return None
+
+        key = (column, str(value))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1]
+                self._drop(key)
+            self._stats['misses'] += 1
+
+        from src.models.patient import Patient
+
+        # Ausências não são guardadas: o paciente pode ser criado logo em seguida
+        patient = Patient.query.filter_by(**{column: value}).first()
+        if patient is None:
+            return None
+        return self.store(patient)
+
+    def store(self, patient) -> PatientSnapshot:
+        """Guardar o paciente sob todas as suas chaves de busca"""
+        snapshot = patient if isinstance(patient, PatientSnapshot) else snapshot_of(patient)
+        now = time.monotonic()
+        with self._lock:
+            for column in LOOKUP_COLUMNS:
+                value = getattr(snapshot, column)
+                if not value:
+                    continue
+                key = (column, str(value))
+                self._drop(key)
+                self._entries[key] = (now, snapshot)
+                self._keys_by_id.setdefault(snapshot.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+        return snapshot
+
+    def invalidate(self, patient_id=None) -> None:
+        """Descartar as entradas de um paciente (ou todas)"""
+        with self._lock:
+            if patient_id is None:
+                self._entries.clear()
+                self._keys_by_id.clear()
+            else:
+                for key in self._keys_by_id.pop(patient_id, ()):
+                    self._entries.pop(key, None)
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict:
+        return dict(self._stats, size=len(self._entries), max_size=self.max_size, ttl=self.ttl)
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_id.get(entry[1].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[entry[1].id]
+
+
+# Instância global
+patient_cache = PatientCache()
+
+_hooks_installed = False
+
+
+def install_patient_watcher() -> None:
+    """Invalidar o cache após commits que tocam em Patient (chamado na inicialização)"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    from src.models.patient import Patient
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_patients(session, flush_context):
+        ids = {
+            obj.id
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+            if isinstance(obj, Patient)
+        }
+        if ids:
+            session.info.setdefault('patient_cache_ids', set()).update(ids)
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate_committed(session):
+        for patient_id in session.info.pop('patient_cache_ids', ()):
+            patient_cache.invalidate(patient_id)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_patients(session):
+        session.info.pop('patient_cache_ids', None)
+
+    _hooks_installed = True
@@ -1,9 +1,9 @@
 from typing import Dict, List, Optional
 from src.models.patient import Patient
-from src.models.scale import Scale
 from src.models.response import Response
 from src.models.user import db
 from src.services.whatsapp_service import WhatsAppService
+from src.services.scale_registry import scale_registry, CompiledScale, TEXT_RESPONSE_SCALES
 from datetime import datetime
 import json
 
@@ -15,8 +15,8 @@ class QuestionnaireService:
     
     def start_questionnaire(self, patient: Patient, scale_name: str) -> Dict:
         """Iniciar um questionário para o paciente"""
-        scale = Scale.query.filter_by(name=scale_name).first()
-        if not scale:
+        scale = scale_registry.get(scale_name)
+        if not scale or scale.scale_id is None:
             return {'status': 'error', 'message': 'Escala não encontrada'}
         
         # Enviar mensagem de introdução
@@ -33,52 +33,32 @@ Vamos começar? 🤝"""
         # Iniciar primeira pergunta
         return self._send_question(patient, scale, 0)
     
-    def _send_question(self, patient: Patient, scale: Scale, question_index: int) -> Dict:
+    def _send_question(self, patient: Patient, scale: CompiledScale, question_index: int) -> Dict:
         """Enviar uma pergunta específica do questionário"""
-        if question_index >= len(scale.questions):
+        if question_index >= scale.question_count:
             return self._finish_questionnaire(patient, scale)
         
         question = scale.questions[question_index]
         
-        # Criar opções de resposta baseadas no tipo de escala
-        if scale.name in ['PHQ-9', 'GAD-7']:
-            # Escala 0-3
-            buttons = [
-                {'id': f'q_{question_index}_0', 'title': '0 - Nem um pouco'},
-                {'id': f'q_{question_index}_1', 'title': '1 - Vários dias'},
-                {'id': f'q_{question_index}_2', 'title': '2 - Mais da metade'},
-                {'id': f'q_{question_index}_3', 'title': '3 - Quase todos os dias'}
-            ]
-        elif scale.name == 'MDQ':
-            # Sim/Não
-            buttons = [
-                {'id': f'q_{question_index}_1', 'title': 'Sim'},
-                {'id': f'q_{question_index}_0', 'title': 'Não'}
-            ]
-        elif scale.name == 'ASRS':
-            # Escala 0-4
-            buttons = [
-                {'id': f'q_{question_index}_0', 'title': '0 - Nunca'},
-                {'id': f'q_{question_index}_1', 'title': '1 - Raramente'},
-                {'id': f'q_{question_index}_2', 'title': '2 - Às vezes'},
-                {'id': f'q_{question_index}_3', 'title': '3 - Frequentemente'},
-                {'id': f'q_{question_index}_4', 'title': '4 - Muito frequente'}
-            ]
-        elif scale.name in ['AUDIT', 'DAST-10']:
+        if scale.name in TEXT_RESPONSE_SCALES:
             # Varia por pergunta - usar resposta de texto
             return self._send_text_question(patient, scale, question_index)
+        
+        # Opções de resposta compiladas no registro de escalas
+        if len(question.options) == 2:
+            buttons = [
+                {'id': f'q_{question_index}_{option.score}', 'title': option.label}
+                for option in question.options
+            ]
         else:
-            # Padrão: escala 0-3
             buttons = [
-                {'id': f'q_{question_index}_0', 'title': '0 - Não'},
-                {'id': f'q_{question_index}_1', 'title': '1 - Pouco'},
-                {'id': f'q_{question_index}_2', 'title': '2 - Moderado'},
-                {'id': f'q_{question_index}_3', 'title': '3 - Muito'}
+                {'id': f'q_{question_index}_{option.score}', 'title': f'{option.score} - {option.label}'}
+                for option in question.options
             ]
         
         # Enviar pergunta com botões
-        header = f"Pergunta {question_index + 1}/{len(scale.questions)}"
-        body = f"*{question}*\n\nComo isso se aplica a você?"
+        header = f"Pergunta {question_index + 1}/{scale.question_count}"
+        body = f"*{question.text}*\n\nComo isso se aplica a você?"
         
         result = self.whatsapp_service.send_interactive_message(
             patient.phone_number, header, body, buttons
@@ -89,13 +69,13 @@ Vamos começar? 🤝"""
         
         return {'status': 'processed', 'action': 'question_sent', 'question_index': question_index}
     
-    def _send_text_question(self, patient: Patient, scale: Scale, question_index: int) -> Dict:
+    def _send_text_question(self, patient: Patient, scale: CompiledScale, question_index: int) -> Dict:
         """Enviar pergunta que requer resposta de texto"""
         question = scale.questions[question_index]
         
-        message = f"""📋 *Pergunta {question_index + 1}/{len(scale.questions)}*
+        message = f"""📋 *Pergunta {question_index + 1}/{scale.question_count}*
 
-{question}
+{question.text}
 
 Por favor, responda com um número ou texto conforme apropriado."""
         
@@ -112,7 +92,7 @@ Por favor, responda com um número ou texto conforme apropriado."""
         question_index = user_state.get('question_index', 0)
         responses = user_state.get('responses', [])
         
-        scale = Scale.query.filter_by(name=scale_name).first()
+        scale = scale_registry.get(scale_name)
         if not scale:
             return {'status': 'error', 'message': 'Escala não encontrada'}
         
@@ -135,7 +115,7 @@ Por favor, responda com um número ou texto conforme apropriado."""
         responses.append(response_value)
         
         # Verificar se há mais perguntas
-        if question_index + 1 < len(scale.questions):
+        if question_index + 1 < scale.question_count:
             # Próxima pergunta
             user_state['responses'] = responses
             user_state['question_index'] = question_index + 1
@@ -144,7 +124,7 @@ Por favor, responda com um número ou texto conforme apropriado."""
             # Finalizar questionário
             return self._finish_questionnaire(patient, scale, responses)
     
-    def _parse_text_response(self, response_text: str, scale: Scale, question_index: int) -> int:
+    def _parse_text_response(self, response_text: str, scale: CompiledScale, question_index: int) -> int:
         """Converter resposta de texto em valor numérico"""
         # Tentar extrair número da resposta
         import re
@@ -172,7 +152,7 @@ Por favor, responda com um número ou texto conforme apropriado."""
         except:
             return 0
     
-    def _finish_questionnaire(self, patient: Patient, scale: Scale, responses: List[int] = None) -> Dict:
+    def _finish_questionnaire(self, patient: Patient, scale: CompiledScale, responses: List[int] = None) -> Dict:
         """Finalizar questionário e calcular pontuação"""
         if not responses:
             responses = []
@@ -181,13 +161,9 @@ Por favor, responda com um número ou texto conforme apropriado."""
         total_score = sum(responses)
         
         # Determinar categoria baseada nas regras de pontuação
-        category = 'Não categorizado'
-        is_alarming = total_score >= scale.alarm_threshold
-        
-        for rule in scale.scoring_rules:
-            if rule['min_score'] <= total_score <= rule['max_score']:
-                category = rule['category']
-                break
+        rule = scale.category_for(total_score)
+        category = rule.label if rule else 'Não categorizado'
+        is_alarming = scale.is_alarming(total_score)
         
         # Salvar resposta no banco de dados
         response_record = Response(
@@ -204,7 +180,7 @@ Por favor, responda com um número ou texto conforme apropriado."""
         result_message = f"""✅ *Questionário concluído!*
 
 📊 *Resultado:*
-• Pontuação: {total_score}/{len(scale.questions) * 3}
+• Pontuação: {total_score}/{scale.max_score}
 • Categoria: {category}
 
 Obrigado por responder! Suas respostas foram enviadas para seu profissional de saúde."""
@@ -238,7 +214,7 @@ Recomendo que entre em contato com seu profissional de saúde o mais breve poss
             'is_alarming': is_alarming
         }
     
-    def _notify_professional_alarm(self, patient: Patient, scale: Scale, score: int, category: str):
+    def _notify_professional_alarm(self, patient: Patient, scale: CompiledScale, score: int, category: str):
         """Notificar profissional sobre pontuação alarmante"""
         # Aqui você implementaria a lógica para notificar o profissional
         # Por exemplo, enviar mensagem para um número específico ou email
@@ -259,7 +235,7 @@ Recomendo que entre em contato com seu profissional de saúde o mais breve poss
         
         print(f"ALERTA: {alarm_message}")  # Log temporário
     
-    def _save_conversation_state(self, patient: Patient, scale: Scale, question_index: int):
+    def _save_conversation_state(self, patient: Patient, scale: CompiledScale, question_index: int):
         """Salvar estado da conversa"""
         # Implementar salvamento do estado
         # Por simplicidade, usando variável de classe
@@ -0,0 +1,216 @@
+"""
+Cache de dados de referência (exercícios de respiração, escalas)
+
+Tabelas quase estáticas são lidas uma vez e servidas da memória. Cada
+chave tem uma versão: edições em modelos observados incrementam a versão
+no commit e a próxima leitura recarrega. Cargas concorrentes da mesma
+chave são coalescidas (single-flight): só a primeira thread consulta o
+banco, as demais esperam o resultado dela.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limite de idade de uma entrada; cobre edições feitas por outros processos/workers
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', '300'))
+
+# Tempo máximo de espera por uma carga em andamento em outra thread
+_FLIGHT_TIMEOUT = 30
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReferenceCache:
+    """Cache read-through versionado com carga single-flight"""
+
+    def __init__(self, ttl: int = REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[str, tuple] = {}  # chave -> (versão, carregado_em, valor)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'coalesced': 0}
+
+    def register(self, key: str, loader: Callable[[], Any]) -> None:
+        """Registrar a função que carrega a chave (deve devolver dados imutáveis)"""
+        self._loaders[key] = loader
+        self._versions.setdefault(key, 0)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(key, entry):
+            self._stats['hits'] += 1
+            return entry[2]
+        return self._load(key)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Invalidar uma chave (ou todas) incrementando a versão"""
+        with self._lock:
+            keys = [key] if key else list(self._versions)
+            for k in keys:
+                self._versions[k] = self._versions.get(k, 0) + 1
+        logger.debug(f"Cache de referência invalidado: {keys}")
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def stats(self) -> Dict:
+        return dict(self._stats, keys={
+            key: {'version': self._versions.get(key, 0), 'cached': key in self._entries}
+            for key in self._loaders
+        })
+
+    def _is_fresh(self, key: str, entry: tuple) -> bool:
+        return entry[0] == self._versions.get(key, 0) and time.monotonic() - entry[1] < self.ttl
+
+    def _load(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(key, entry):
+                self._stats['hits'] += 1
+                return entry[2]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                version = self._versions.get(key, 0)
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.event.wait(_FLIGHT_TIMEOUT):
+                raise TimeoutError(f"Carga de '{key}' não terminou em {_FLIGHT_TIMEOUT}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._loaders[key]()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+            raise
+
+        with self._lock:
+            # Se houve invalidação durante a carga, o valor serve a quem esperava mas não fica em cache
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = (version, time.monotonic(), value)
+            self._flights.pop(key, None)
+            self._stats['loads'] += 1
+
+        flight.value = value
+        flight.event.set()
+        return value
+
+
+# Instância global
+reference_cache = ReferenceCache()
+
+# Modelo -> chaves invalidadas quando ele é alterado
+_watched_models: Dict[type, set] = {}
+_hooks_installed = False
+
+
+def watch_model(model: type, key: str) -> None:
+    """Invalidar `key` após commits que inserem, alteram ou removem `model`"""
+    global _hooks_installed
+    _watched_models.setdefault(model, set()).add(key)
+    if _hooks_installed:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect_changes(session, flush_context):
+        keys = set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            keys.update(_watched_models.get(type(obj), ()))
+        if keys:
+            session.info.setdefault('reference_cache_keys', set()).update(keys)
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate_committed(session):
+        for key in session.info.pop('reference_cache_keys', ()):
+            reference_cache.invalidate(key)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_changes(session):
+        session.info.pop('reference_cache_keys', None)
+
+    _hooks_installed = True
+
+
+# ----------------------------------------------------------------------
+# Exercícios de respiração
+# ----------------------------------------------------------------------
+
+ExerciseSnapshot = namedtuple('ExerciseSnapshot', [
+    'id', 'name', 'description', 'duration_minutes', 'instructions', 'audio_url', 'category'
+])
+BreathingCatalog = namedtuple('BreathingCatalog', ['exercises', 'by_id', 'menu_sections'])
+
+
+def _load_breathing_catalog() -> BreathingCatalog:
+    from src.models.breathing_exercise import BreathingExercise
+
+    rows = BreathingExercise.query.order_by(BreathingExercise.id).all()
+    by_id = {
+        e.id: ExerciseSnapshot(
+            e.id, e.name, e.description, e.duration_minutes, e.instructions, e.audio_url,
+            getattr(e, 'category', None)
+        )
+        for e in rows
+    }
+    exercises = tuple(by_id[e.id] for e in rows if e.is_active)
+
+    # Seções da lista do WhatsApp montadas uma vez por versão
+    menu_sections = ({
+        "title": "Exercícios Disponíveis",
+        "rows": [
+            {
+                "id": f"start_breathing_{exercise.id}",
+                "title": exercise.name,
+                "description": f"{exercise.duration_minutes}min - {(exercise.description or '')[:50]}..."
+            }
+            for exercise in exercises[:10]  # Máximo 10 exercícios
+        ]
+    },)
+
+    return BreathingCatalog(exercises, by_id, menu_sections)
+
+
+reference_cache.register('breathing_exercises', _load_breathing_catalog)
+
+
+def breathing_catalog() -> BreathingCatalog:
+    """Exercícios de respiração (lista dos ativos e todos por id, somente leitura)"""
+    return reference_cache.get('breathing_exercises')
+
+
+def install_model_watchers() -> None:
+    """Ligar a invalidação automática às tabelas de referência (chamado na inicialização)"""
+    from src.models.breathing_exercise import BreathingExercise
+    from src.models.scale import Scale
+
+    watch_model(BreathingExercise, 'breathing_exercises')
+    watch_model(Scale, 'scales')
@@ -6,7 +6,9 @@ import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from src.templates.whatsapp_templates import *
+from src.templates.whatsapp_templates import WELCOME_MESSAGES
+from src.services.scale_registry import scale_registry
+from src.ops.metrics import ACTIVE_SESSIONS
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +30,16 @@ class QuestionnaireSession:
     def add_response(self, response: str) -> bool:
         """Adiciona resposta e retorna se é válida"""
         try:
-            # Converte resposta para pontuação
-            score_map = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4}
-            if response.lower() in score_map:
-                self.responses.append(score_map[response.lower()])
-                self.current_question += 1
-                return True
-            return False
+            # Converte a letra em pontuação pela tabela compilada da escala
+            scale = scale_registry.get(self.questionnaire_type)
+            if scale is None:
+                return False
+            score = scale.letter_score(self.current_question, response)
+            if score is None:
+                return False
+            self.responses.append(score)
+            self.current_question += 1
+            return True
         except Exception as e:
             logger.error(f"Erro ao processar resposta: {e}")
             return False
@@ -44,24 +49,22 @@ class QuestionnaireSession:
     
     def is_complete(self) -> bool:
         """Verifica se questionário está completo"""
-        question_counts = {
-            'uetg': 3,
-            'gad7': 7, 
-            'phq9': 9,
-            'asrs18': 18
-        }
-        return len(self.responses) >= question_counts.get(self.questionnaire_type, 0)
+        scale = scale_registry.get(self.questionnaire_type)
+        return scale is not None and len(self.responses) >= scale.question_count
 
 class ResponseProcessor:
     """Processa respostas automáticas do WhatsApp"""
     
     def __init__(self):
         self.active_sessions: Dict[str, QuestionnaireSession] = {}
-        self.score_ranges = calculate_scores()
     
     def start_questionnaire(self, patient_id: int, phone: str, questionnaire_type: str) -> str:
         """Inicia novo questionário"""
         try:
+            scale = scale_registry.get(questionnaire_type)
+            if scale is None or not scale.prompts:
+                return "❌ Questionário não encontrado."
+            
             # Remove sessão anterior se existir
             if phone in self.active_sessions:
                 del self.active_sessions[phone]
@@ -71,14 +74,7 @@ class ResponseProcessor:
             self.active_sessions[phone] = session
             
             # Retorna primeira pergunta
-            templates = {
-                'uetg': UETG_TEMPLATES,
-                'gad7': GAD7_TEMPLATES,
-                'phq9': PHQ9_TEMPLATES,
-                'asrs18': ASRS18_TEMPLATES
-            }
-            
-            template = templates[questionnaire_type]['start']['template']
+            template = scale.prompts[0]
             logger.info(f"Questionário {questionnaire_type} iniciado para paciente {patient_id}")
             
             return template
@@ -136,26 +132,9 @@ class ResponseProcessor:
     def _get_next_question(self, session: QuestionnaireSession) -> str:
         """Retorna próxima pergunta do questionário"""
         try:
-            question_num = session.current_question + 1
-            
-            if session.questionnaire_type == 'uetg':
-                if question_num == 2:
-                    return UETG_TEMPLATES['question_2']['template']
-                elif question_num == 3:
-                    return UETG_TEMPLATES['question_3']['template']
-            
-            elif session.questionnaire_type in ['gad7', 'phq9']:
-                templates = GAD7_TEMPLATES if session.questionnaire_type == 'gad7' else PHQ9_TEMPLATES
-                questions = templates['questions']
-                
-                if question_num <= len(questions):
-                    return f"*{question_num + 1}.* {questions[question_num - 1]}\n\na) Nenhuma vez (0)\nb) Vários dias (1)\nc) Mais da metade dos dias (2)\nd) Quase todos os dias (3)\n\nResponda apenas com a letra (a, b, c ou d)"
-            
-            elif session.questionnaire_type == 'asrs18':
-                questions = ASRS18_TEMPLATES['questions']
-                
-                if question_num <= len(questions):
-                    return f"*{question_num + 1}.* {questions[question_num - 1]}\n\na) Nunca (0)\nb) Raramente (1)\nc) Às vezes (2)\nd) Frequentemente (3)\ne) Muito frequentemente (4)\n\nResponda apenas com a letra (a, b, c, d ou e)"
+            scale = scale_registry.get(session.questionnaire_type)
+            if scale and session.current_question < len(scale.prompts):
+                return scale.prompts[session.current_question]
             
             return "Erro ao carregar próxima pergunta."
             
@@ -168,28 +147,15 @@ class ResponseProcessor:
         try:
             score = session.get_total_score()
             questionnaire_type = session.questionnaire_type
-            ranges = self.score_ranges[questionnaire_type]
+            scale = scale_registry.get(questionnaire_type)
             
             # Determina categoria do resultado
-            result_category = None
-            for category, (min_score, max_score) in ranges.items():
-                if min_score <= score <= max_score:
-                    result_category = category
-                    break
-            
-            if not result_category:
+            category = scale.category_for(score) if scale else None
+            if not category or category.key not in scale.result_templates:
                 return "❌ Erro ao calcular resultado."
             
-            # Seleciona template de resultado
-            templates = {
-                'uetg': UETG_TEMPLATES,
-                'gad7': GAD7_TEMPLATES,
-                'phq9': PHQ9_TEMPLATES,
-                'asrs18': ASRS18_TEMPLATES
-            }
-            
-            template_key = f"result_{result_category}"
-            template = templates[questionnaire_type][template_key]['template']
+            result_category = category.key
+            template = scale.result_templates[result_category]
             
             # Calcula próximo teste (exemplo: 1 semana)
             next_test = (datetime.now() + timedelta(days=7)).strftime("%d/%m/%Y")
@@ -222,12 +188,8 @@ class ResponseProcessor:
         """Retorna status da sessão atual"""
         try:
             progress = len(session.responses)
-            total = {
-                'uetg': 3,
-                'gad7': 7,
-                'phq9': 9, 
-                'asrs18': 18
-            }.get(session.questionnaire_type, 0)
+            scale = scale_registry.get(session.questionnaire_type)
+            total = scale.question_count if scale else 0
             
             return f"📊 *Status do Questionário*\n\nTipo: {session.questionnaire_type.upper()}\nProgresso: {progress}/{total}\nIniciado: {session.started_at.strftime('%H:%M')}\nExpira: {session.expires_at.strftime('%H:%M')}"
             
@@ -252,3 +214,5 @@ class ResponseProcessor:
 
 # Instância global do processador
 response_processor = ResponseProcessor()
+
+ACTIVE_SESSIONS.set_function(lambda: len(response_processor.active_sessions), kind='questionnaire')
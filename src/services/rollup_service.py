@@ -0,0 +1,265 @@
+import logging
+from typing import Dict, List, Optional
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import case, func
+from src.models.daily_rollup import PatientDailyRollup, RollupWatermark
+from src.models.mood import MoodChart
+from src.models.response import Response
+from src.models.user import db
+from src.services.adherence_service import MedicationAdherenceService
+
+logger = logging.getLogger(__name__)
+
+# Dias sempre recalculados pelo job incremental (aderência de hoje/ontem muda sem novas linhas)
+ROLLUP_TRAILING_DAYS = 2
+# Nome da marca d'água do job incremental (patient_daily_rollup_watermark)
+INCREMENTAL_WATERMARK = 'incremental'
+
+_COUNTER_FIELDS = (
+    'response_count', 'score_sum', 'alarming_count',
+    'mood_count', 'mood_sum', 'functioning_sum', 'sleep_sum', 'anxiety_sum',
+    'doses_expected', 'doses_confirmed', 'doses_missed',
+)
+
+
+class RollupService:
+    """Manutenção e leitura dos agregados diários por paciente
+
+    Cada recálculo cobre um intervalo de dias com uma consulta agregada por
+    entidade (respostas, humor, aderência) e grava as linhas de
+    patient_daily_rollup em um único commit. Relatórios de longo prazo
+    somam essas linhas, custando O(dias) em vez de O(eventos).
+    """
+
+    def __init__(self):
+        self.adherence_service = MedicationAdherenceService()
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def refresh(self, start_date: date, end_date: date, patient_ids: Optional[List] = None) -> int:
+        """
+        Recalcular os agregados de [start_date, end_date]
+
+        Returns:
+            Número de linhas (paciente x dia) gravadas
+        """
+        refreshed_at = datetime.utcnow()
+        aggregates = {}
+
+        def bucket(patient_id, day):
+            if not isinstance(day, date):
+                # SQLite devolve date() como texto
+                day = date.fromisoformat(str(day)[:10])
+            key = (str(patient_id), day)
+            if key not in aggregates:
+                aggregates[key] = dict.fromkeys(_COUNTER_FIELDS, 0)
+                aggregates[key]['score_max'] = None
+            return aggregates[key]
+
+        for patient_id, day, count, score_sum, score_max, alarming in self._response_aggregates(
+                start_date, end_date, patient_ids):
+            values = bucket(patient_id, day)
+            values['response_count'] = count
+            values['score_sum'] = score_sum or 0
+            values['score_max'] = score_max
+            values['alarming_count'] = alarming or 0
+
+        # O afetivograma (src/models/mood.py) só registra o valor do dia;
+        # functioning/sleep/anxiety ficam em zero
+        for patient_id, day, count, mood in self._mood_aggregates(start_date, end_date, patient_ids):
+            values = bucket(patient_id, day)
+            values['mood_count'] = count
+            values['mood_sum'] = mood or 0
+
+        doses = self.adherence_service.daily_totals(patient_ids, start_date, end_date)
+        for (patient_id, day), totals in doses.items():
+            values = bucket(patient_id, day)
+            values['doses_expected'] = totals['expected']
+            values['doses_confirmed'] = totals['confirmed']
+            values['doses_missed'] = totals['missed']
+
+        # Linhas existentes no intervalo (uma consulta); as que sumiram dos dados voltam a zero
+        query = PatientDailyRollup.query.filter(
+            PatientDailyRollup.day >= start_date,
+            PatientDailyRollup.day <= end_date
+        )
+        if patient_ids is not None:
+            query = query.filter(PatientDailyRollup.patient_id.in_([str(p) for p in patient_ids]))
+        existing = {(row.patient_id, row.day): row for row in query.all()}
+
+        for key, row in existing.items():
+            if key not in aggregates:
+                aggregates[key] = dict.fromkeys(_COUNTER_FIELDS, 0)
+                aggregates[key]['score_max'] = None
+
+        for (patient_id, day), values in aggregates.items():
+            row = existing.get((patient_id, day))
+            if row is None:
+                row = PatientDailyRollup(patient_id=patient_id, day=day)
+                db.session.add(row)
+            for field, value in values.items():
+                setattr(row, field, value)
+            row.updated_at = refreshed_at
+
+        db.session.commit()
+        return len(aggregates)
+
+    def backfill(self, start_date: date, end_date: date, chunk_days: int = 31) -> int:
+        """Recalcular um período longo em blocos de `chunk_days` dias"""
+        written = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            written += self.refresh(chunk_start, chunk_end)
+            logger.info(f"Rollup backfill {chunk_start}..{chunk_end} concluído")
+            chunk_start = chunk_end + timedelta(days=1)
+        return written
+
+    def refresh_incremental(self) -> int:
+        """
+        Recalcular apenas os dias afetados desde a última execução
+
+        A marca d'água é o início da última rodada concluída. Dias com
+        respostas ou registros de humor criados depois dela, mais os últimos
+        ROLLUP_TRAILING_DAYS dias, são recalculados.
+        """
+        started_at = datetime.utcnow()
+        today = date.today()
+        dirty = {today - timedelta(days=i) for i in range(ROLLUP_TRAILING_DAYS)}
+
+        watermark = self.watermark()
+        if watermark is None:
+            logger.info("Rollups sem marca d'água - execute o backfill para o histórico")
+        else:
+            response_day = func.date(Response.created_at)
+            for (day,) in db.session.query(response_day).filter(
+                    Response.created_at > watermark).distinct().all():
+                dirty.add(day if isinstance(day, date) else date.fromisoformat(str(day)[:10]))
+            for (day,) in db.session.query(MoodChart.day).filter(
+                    MoodChart.created_at > watermark).distinct().all():
+                dirty.add(day)
+
+        written = 0
+        for start_date, end_date in self._contiguous_ranges(dirty):
+            written += self.refresh(start_date, end_date)
+        self.set_watermark(started_at)
+        return written
+
+    def watermark(self) -> Optional[datetime]:
+        """Início da última rodada concluída (None: nenhuma rodada nem backfill ainda)"""
+        row = db.session.get(RollupWatermark, INCREMENTAL_WATERMARK)
+        return row.value if row else None
+
+    def set_watermark(self, value: datetime) -> None:
+        row = db.session.get(RollupWatermark, INCREMENTAL_WATERMARK)
+        if row is None:
+            db.session.add(RollupWatermark(name=INCREMENTAL_WATERMARK, value=value))
+        else:
+            row.value = value
+        db.session.commit()
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def summary(self, start_date: date, end_date: date, patient_ids: Optional[List] = None) -> Dict:
+        """Totais por paciente no período, somados a partir dos rollups"""
+        r = PatientDailyRollup
+        query = db.session.query(
+            r.patient_id,
+            func.count(r.id),
+            func.sum(r.response_count),
+            func.sum(r.score_sum),
+            func.max(r.score_max),
+            func.sum(r.alarming_count),
+            func.sum(r.mood_count),
+            func.sum(r.mood_sum),
+            func.sum(r.functioning_sum),
+            func.sum(r.sleep_sum),
+            func.sum(r.anxiety_sum),
+            func.sum(r.doses_expected),
+            func.sum(r.doses_confirmed),
+            func.sum(r.doses_missed),
+        ).filter(r.day >= start_date, r.day <= end_date)
+        if patient_ids is not None:
+            query = query.filter(r.patient_id.in_([str(p) for p in patient_ids]))
+
+        patients = {}
+        for (patient_id, days, responses, score_sum, score_max, alarming, moods, mood_sum,
+             functioning_sum, sleep_sum, anxiety_sum, expected, confirmed, missed) in query.group_by(r.patient_id).all():
+            patients[patient_id] = {
+                'days_with_data': days,
+                'responses': responses or 0,
+                'score_avg': round(score_sum / responses, 1) if responses else None,
+                'score_max': score_max,
+                'alarming': alarming or 0,
+                'mood_entries': moods or 0,
+                'mood_avg': round(mood_sum / moods, 2) if moods else None,
+                'functioning_avg': round(functioning_sum / moods, 1) if moods else None,
+                'sleep_avg': round(sleep_sum / moods, 2) if moods else None,
+                'anxiety_avg': round(anxiety_sum / moods, 2) if moods else None,
+                'doses_expected': expected or 0,
+                'doses_confirmed': confirmed or 0,
+                'doses_missed': missed or 0,
+                'adherence_rate': round(confirmed / expected * 100, 1) if expected else None,
+            }
+
+        return {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'patients': patients
+        }
+
+    def daily(self, start_date: date, end_date: date, patient_ids: Optional[List] = None) -> List[PatientDailyRollup]:
+        """Linhas diárias do período (para gráficos e exportações de longo prazo)"""
+        query = PatientDailyRollup.query.filter(
+            PatientDailyRollup.day >= start_date,
+            PatientDailyRollup.day <= end_date
+        )
+        if patient_ids is not None:
+            query = query.filter(PatientDailyRollup.patient_id.in_([str(p) for p in patient_ids]))
+        return query.order_by(PatientDailyRollup.patient_id, PatientDailyRollup.day).all()
+
+    # ------------------------------------------------------------------
+    # Consultas agregadas
+    # ------------------------------------------------------------------
+
+    def _response_aggregates(self, start_date: date, end_date: date, patient_ids: Optional[List]):
+        day = func.date(Response.created_at)
+        query = db.session.query(
+            Response.patient_id,
+            day,
+            func.count(Response.id),
+            func.sum(Response.score),
+            func.max(Response.score),
+            func.sum(case((Response.is_alarming == True, 1), else_=0)),  # noqa: E712
+        ).filter(
+            Response.created_at >= datetime.combine(start_date, time.min),
+            Response.created_at < datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+        if patient_ids is not None:
+            query = query.filter(Response.patient_id.in_([str(p) for p in patient_ids]))
+        return query.group_by(Response.patient_id, day).all()
+
+    def _mood_aggregates(self, start_date: date, end_date: date, patient_ids: Optional[List]):
+        query = db.session.query(
+            MoodChart.patient_id,
+            MoodChart.day,
+            func.count(MoodChart.id),
+            func.sum(MoodChart.value),
+        ).filter(MoodChart.day >= start_date, MoodChart.day <= end_date)
+        if patient_ids is not None:
+            query = query.filter(MoodChart.patient_id.in_([str(p) for p in patient_ids]))
+        return query.group_by(MoodChart.patient_id, MoodChart.day).all()
+
+    def _contiguous_ranges(self, days) -> List[tuple]:
+        """Agrupar dias em intervalos contíguos [(início, fim), ...]"""
+        ranges = []
+        for day in sorted(days):
+            if ranges and day - ranges[-1][1] == timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        return ranges
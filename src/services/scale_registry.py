@@ -0,0 +1,304 @@
+"""
+Registro compilado de escalas clínicas
+
+Reúne em um só lugar as escalas dos templates de WhatsApp (u-ETG, GAD-7,
+PHQ-9, ASRS-18) e as escalas cadastradas na tabela Scale. Cada escala é
+compilada uma vez em tabelas imutáveis (perguntas, pontuação por opção,
+faixas de categoria), de modo que o processamento de cada resposta é só
+indexação em tuplas, sem consulta ao banco nem parsing de JSON.
+"""
+
+import json
+import logging
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Dict, List, Optional
+from src.templates import whatsapp_templates
+from src.services.score_categorizer import ScoreCategorizer
+from src.services.reference_cache import reference_cache
+
+logger = logging.getLogger(__name__)
+
+ScaleOption = namedtuple('ScaleOption', ['label', 'score'])
+ScaleQuestion = namedtuple('ScaleQuestion', ['text', 'options'])
+ScaleCategory = namedtuple('ScaleCategory', ['min_score', 'max_score', 'key', 'label', 'alarming'])
+
+LETTERS = 'abcdefghij'
+
+
+def _options(*labels) -> tuple:
+    return tuple(ScaleOption(label, score) for score, label in enumerate(labels))
+
+
+# Opções de resposta das escalas cadastradas no banco sem opções por pergunta
+_DB_SCALE_OPTIONS = {
+    'PHQ-9': _options('Nem um pouco', 'Vários dias', 'Mais da metade', 'Quase todos os dias'),
+    'GAD-7': _options('Nem um pouco', 'Vários dias', 'Mais da metade', 'Quase todos os dias'),
+    'MDQ': (ScaleOption('Sim', 1), ScaleOption('Não', 0)),
+    'ASRS': _options('Nunca', 'Raramente', 'Às vezes', 'Frequentemente', 'Muito frequente'),
+}
+_DEFAULT_OPTIONS = _options('Não', 'Pouco', 'Moderado', 'Muito')
+
+# Escalas que aceitam resposta livre (a pontuação varia por pergunta)
+TEXT_RESPONSE_SCALES = frozenset(['AUDIT', 'DAST-10'])
+
+_FREQUENCY_OPTIONS = _options('Nenhuma vez', 'Vários dias', 'Mais da metade dos dias', 'Quase todos os dias')
+_ASRS_OPTIONS = _options('Nunca', 'Raramente', 'Às vezes', 'Frequentemente', 'Muito frequentemente')
+_UETG_OPTIONS = _options('0 pontos', '1 ponto', '2 pontos', '3 pontos', '4 pontos')
+
+# Escalas dos templates de WhatsApp: chave -> (templates, nome, opções, qtd. de perguntas)
+_TEMPLATE_SCALES = {
+    'uetg': (whatsapp_templates.UETG_TEMPLATES, 'u-ETG', _UETG_OPTIONS, 3),
+    'gad7': (whatsapp_templates.GAD7_TEMPLATES, 'GAD-7', _FREQUENCY_OPTIONS, 7),
+    'phq9': (whatsapp_templates.PHQ9_TEMPLATES, 'PHQ-9', _FREQUENCY_OPTIONS, 9),
+    'asrs18': (whatsapp_templates.ASRS18_TEMPLATES, 'ASRS-18', _ASRS_OPTIONS, 18),
+}
+
+
+def _letter_prompt(number: int, text: str, options: tuple) -> str:
+    """Pergunta numerada com opções em letras (canal de texto)"""
+    lines = [f"*{number}.* {text}", ""]
+    for letter, option in zip(LETTERS, options):
+        lines.append(f"{letter}) {option.label} ({option.score})")
+    letters = [LETTERS[i] for i in range(len(options))]
+    lines.append("")
+    lines.append(f"Responda apenas com a letra ({', '.join(letters[:-1])} ou {letters[-1]})")
+    return "\n".join(lines)
+
+
+class CompiledScale:
+    """Escala pronta para uso nos canais (somente leitura)"""
+
+    __slots__ = ('key', 'name', 'title', 'description', 'scale_id', 'questions', 'prompts',
+                 'categories', 'alarm_threshold', 'max_score', 'result_templates', '_categorizer',
+                 '_answer_scores')
+
+    def __init__(self, key: str, name: str, title: str, description: Optional[str],
+                 scale_id: Optional[int], questions: tuple, prompts: tuple, categories: tuple,
+                 alarm_threshold: Optional[int], result_templates: Dict[str, str] = None):
+        self.key = key
+        self.name = name
+        self.title = title
+        self.description = description
+        self.scale_id = scale_id
+        self.questions = questions
+        self.prompts = prompts
+        self.categories = tuple(sorted(categories, key=lambda c: c.min_score))
+        self.alarm_threshold = alarm_threshold
+        self.max_score = sum(max((o.score for o in q.options), default=0) for q in questions)
+        self.result_templates = MappingProxyType(dict(result_templates or {}))
+        self._categorizer = ScoreCategorizer((c.min_score, c.max_score, c) for c in self.categories)
+        # Pontuação por pergunta indexada pela posição da opção (letra a=0, b=1...)
+        self._answer_scores = tuple(tuple(o.score for o in q.options) for q in questions)
+
+    @property
+    def question_count(self) -> int:
+        return len(self.questions)
+
+    def answer_score(self, question_index: int, option_index: int) -> Optional[int]:
+        """Pontuação da opção escolhida (None se a opção não existe)"""
+        if question_index >= len(self._answer_scores):
+            return None
+        scores = self._answer_scores[question_index]
+        if 0 <= option_index < len(scores):
+            return scores[option_index]
+        return None
+
+    def letter_score(self, question_index: int, answer: str) -> Optional[int]:
+        """Pontuação de uma resposta em letra ('a', 'b', ...)"""
+        answer = answer.strip().lower()
+        if len(answer) != 1:
+            return None
+        return self.answer_score(question_index, ord(answer) - 97)
+
+    def category_for(self, score: int) -> Optional[ScaleCategory]:
+        """Faixa que contém a pontuação (busca binária nas faixas ordenadas)"""
+        return self._categorizer.categorize(score)
+
+    def categorize_many(self, scores: List[int]) -> List[Optional[ScaleCategory]]:
+        """Faixas de várias pontuações (reclassificação em lote)"""
+        return self._categorizer.categorize_many(scores)
+
+    def is_alarming(self, score: int) -> bool:
+        if self.alarm_threshold is not None:
+            return score >= self.alarm_threshold
+        category = self.category_for(score)
+        return bool(category and category.alarming)
+
+    def to_dict(self) -> Dict:
+        return {
+            'key': self.key,
+            'name': self.name,
+            'title': self.title,
+            'description': self.description,
+            'scale_id': self.scale_id,
+            'question_count': self.question_count,
+            'max_score': self.max_score,
+            'alarm_threshold': self.alarm_threshold,
+            'categories': [c._asdict() for c in self.categories]
+        }
+
+
+class ScaleRegistry:
+    """Registro de escalas compiladas, servido pelo cache de referência
+
+    As escalas dos templates ficam sob a chave curta ('gad7', 'uetg'...)
+    e as do banco sob o nome cadastrado ('GAD-7', 'MDQ'...). A compilação
+    é a carga da chave 'scales' do reference_cache: commits em Scale
+    incrementam a versão e a próxima leitura recompila uma única vez.
+    """
+
+    def __init__(self):
+        reference_cache.register('scales', self._compile_all)
+
+    def load(self) -> int:
+        """Compilar templates e escalas do banco (requer contexto da aplicação para o banco)"""
+        reference_cache.invalidate('scales')
+        scales, _by_id = reference_cache.get('scales')
+        logger.info(f"Registro de escalas carregado: {len(scales)} escalas")
+        return len(scales)
+
+    def reload(self) -> int:
+        """Recarregar após edição de escalas"""
+        return self.load()
+
+    def get(self, name: str) -> Optional[CompiledScale]:
+        """Escala pelo nome cadastrado ou pela chave do template"""
+        scales, _by_id = reference_cache.get('scales')
+        scale = scales.get(name)
+        if scale is None and name:
+            lowered = name.lower()
+            for candidate in scales.values():
+                if candidate.name.lower() == lowered:
+                    return candidate
+        return scale
+
+    def get_by_id(self, scale_id: int) -> Optional[CompiledScale]:
+        _scales, by_id = reference_cache.get('scales')
+        return by_id.get(scale_id)
+
+    def db_scales(self) -> List[CompiledScale]:
+        """Escalas cadastradas no banco"""
+        _scales, by_id = reference_cache.get('scales')
+        return list(by_id.values())
+
+    def _compile_all(self) -> tuple:
+        scales = {}
+        for key in _TEMPLATE_SCALES:
+            scales[key] = self._compile_template_scale(key)
+
+        try:
+            from src.models.scale import Scale
+            for row in Scale.query.all():
+                try:
+                    scales[row.name] = self._compile_db_scale(row)
+                except Exception as e:
+                    logger.error(f"Erro ao compilar escala {row.name}: {e}")
+        except Exception as e:
+            logger.warning(f"Escalas do banco não carregadas no registro: {e}")
+
+        by_id = {s.scale_id: s for s in scales.values() if s.scale_id is not None}
+        return MappingProxyType(scales), MappingProxyType(by_id)
+
+    # ------------------------------------------------------------------
+    # Compilação
+    # ------------------------------------------------------------------
+
+    def _compile_template_scale(self, key: str) -> CompiledScale:
+        templates, name, options, count = _TEMPLATE_SCALES[key]
+
+        if key == 'uetg':
+            prompts = (
+                templates['start']['template'],
+                templates['question_2']['template'],
+                templates['question_3']['template'],
+            )
+        else:
+            # A primeira pergunta vem no template de início; 'questions' traz as demais
+            prompts = (templates['start']['template'],) + tuple(
+                _letter_prompt(number, text, options)
+                for number, text in enumerate(templates['questions'], start=2)
+            )
+        prompts = prompts[:count]
+
+        # Texto da primeira pergunta não existe isolado no template
+        texts = ('',) + tuple(templates.get('questions', ()))
+        questions = tuple(
+            ScaleQuestion(texts[i] if i < len(texts) else '', options) for i in range(count)
+        )
+
+        ranges = whatsapp_templates.SCORE_RANGES[key]
+        top = max(ranges.values())
+        categories = [
+            ScaleCategory(low, high, category, category, (low, high) == top)
+            for category, (low, high) in ranges.items()
+        ]
+        result_templates = {
+            category: templates[f"result_{category}"]['template']
+            for category in ranges
+            if f"result_{category}" in templates
+        }
+
+        return CompiledScale(
+            key=key, name=name, title=name, description=None, scale_id=None,
+            questions=questions, prompts=prompts, categories=categories,
+            alarm_threshold=top[0], result_templates=result_templates
+        )
+
+    def _compile_db_scale(self, row) -> CompiledScale:
+        """Normalizar os formatos de Scale usados pelos canais"""
+        questions_data = getattr(row, 'questions_data', None) or {}
+        raw_questions = questions_data.get('questions') or row.questions or []
+        if isinstance(raw_questions, str):
+            raw_questions = json.loads(raw_questions)
+
+        default_options = _DB_SCALE_OPTIONS.get(row.name, _DEFAULT_OPTIONS)
+        questions = []
+        for item in raw_questions:
+            if isinstance(item, dict):
+                text = item.get('text') or item.get('question') or ''
+                raw_options = item.get('options') or []
+                options = tuple(
+                    ScaleOption(o.get('text', ''), int(o.get('score', o.get('value', i))))
+                    for i, o in enumerate(raw_options)
+                ) or default_options
+            else:
+                text, options = str(item), default_options
+            questions.append(ScaleQuestion(text, options))
+        questions = tuple(questions)
+
+        categories = []
+        for rule in row.scoring_rules or []:
+            categories.append(ScaleCategory(
+                rule['min_score'], rule['max_score'], rule.get('category'), rule.get('category'), False
+            ))
+        for rule in (questions_data.get('scoring') or {}).get('categories', []):
+            label = rule.get('name', 'Não categorizado')
+            categories.append(ScaleCategory(
+                rule.get('min_score', 0), rule.get('max_score', 999), label, label,
+                bool(rule.get('alarming', False))
+            ))
+
+        alarm_threshold = getattr(row, 'alarm_threshold', None)
+        thresholds = getattr(row, 'scoring_thresholds', None)
+        if alarm_threshold is None and thresholds:
+            thresholds = json.loads(thresholds) if isinstance(thresholds, str) else thresholds
+            alarm_threshold = thresholds.get('alert')
+        if alarm_threshold is not None:
+            categories = [
+                c._replace(alarming=c.alarming or c.min_score >= alarm_threshold) for c in categories
+            ]
+
+        prompts = tuple(
+            _letter_prompt(number, q.text, q.options) for number, q in enumerate(questions, start=1)
+        )
+
+        return CompiledScale(
+            key=row.name, name=row.name, title=row.title or row.name,
+            description=row.description, scale_id=row.id, questions=questions,
+            prompts=prompts, categories=categories, alarm_threshold=alarm_threshold
+        )
+
+
+# Instância global do registro
+scale_registry = ScaleRegistry()
@@ -1,21 +1,60 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from src.models.patient import Patient
 from src.models.reminder import Reminder
 from src.models.medication import Medication
 from src.models.user import db
-from src.services.whatsapp_service import WhatsAppService
+from src.messaging import OutboundMessage, messaging
+from src.messaging.send_buckets import SEND_BUCKET_LEAD_SECONDS, send_bucketer
+from src.services.lazy_service import LazyService
+from src.services.patient_cache import snapshot_of
 from src.services.questionnaire_service import QuestionnaireService
 from src.services.medication_service import MedicationService
 from src.services.mood_service import MoodService
 from datetime import datetime, timedelta, time, date
+from src.ops.metrics import SCHEDULER_QUEUE_DEPTH, observe_lag
+from src.ops.query_profiler import query_profiler
+import os
 import threading
 import time as time_module
+from zoneinfo import ZoneInfo
+
+# Tipos de lembrete liberados na virada do minuto, sem espaçamento. Só valem
+# os tipos que passam pelo envio agrupado (os de _reminder_message: scale,
+# task, motivational, breathing, mood_chart); medicação tem fluxo próprio.
+URGENT_REMINDER_TYPES = frozenset(
+    t.strip() for t in (os.getenv('URGENT_REMINDER_TYPES') or '').split(',') if t.strip()
+)
+
+
+def _scheduler_tz():
+    """
+    Fuso dos horários sem tzinfo do agendador (datetime.now() do processo)
+
+    Com TZ no ambiente a hora local do processo é a desse fuso, então o
+    nome vai para o envio agrupado e identifica o grupo; sem TZ (ou com um
+    valor que não é nome IANA) fica a hora local do servidor.
+    """
+    name = (os.getenv('TZ') or '').strip().lstrip(':')
+    if not name:
+        return None
+    try:
+        ZoneInfo(name)
+    except Exception:
+        return None
+    return name
+
+
+SCHEDULER_TZ = _scheduler_tz()
+
+# Lembretes sem template de canal (medicação, humor) saem pelo agendador do Telegram
+_telegram_scheduler = LazyService('src.services.telegram_scheduler_service.TelegramSchedulerService')
 
 class SchedulerService:
     """Serviço para agendamento e envio automático de lembretes"""
     
     def __init__(self):
-        self.whatsapp_service = WhatsAppService()
+        self.messaging = messaging
+        self.send_bucketer = send_bucketer
         self.questionnaire_service = QuestionnaireService()
         self.medication_service = MedicationService()
         self.mood_service = MoodService()
@@ -44,9 +83,12 @@ class SchedulerService:
         """Loop principal do agendador"""
         while self.running:
             try:
-                self._check_and_send_reminders()
-                self._check_and_send_medication_reminders()
-                self._check_and_send_mood_reminders()
+                with query_profiler.profile('scheduler.reminders'):
+                    self._check_and_send_reminders()
+                with query_profiler.profile('scheduler.medication'):
+                    self._check_and_send_medication_reminders()
+                with query_profiler.profile('scheduler.mood'):
+                    self._check_and_send_mood_reminders()
                 
                 # Aguardar 1 minuto antes da próxima verificação
                 time_module.sleep(60)
@@ -56,167 +98,135 @@ class SchedulerService:
                 time_module.sleep(60)  # Aguardar antes de tentar novamente
     
     def _check_and_send_reminders(self):
-        """Verificar e enviar lembretes programados"""
+        """
+        Gravar os lembretes já enviados e pré-renderizar os dos próximos minutos
+
+        Os lembretes que vencem até SEND_BUCKET_LEAD_SECONDS à frente vão para
+        o envio agrupado por minuto (src/messaging/send_buckets.py), que os
+        libera na virada do minuto; a próxima data é atualizada aqui, na
+        varredura seguinte ao envio.
+        """
+        self._record_sent_reminders()
+
         now = datetime.now()
-        
-        # Buscar lembretes que devem ser enviados
-        due_reminders = Reminder.query.filter(
+        upcoming = Reminder.query.filter(
             Reminder.is_active == True,
-            Reminder.next_send_date <= now
+            Reminder.next_send_date <= now + timedelta(seconds=SEND_BUCKET_LEAD_SECONDS)
         ).all()
-        
-        for reminder in due_reminders:
-            try:
-                self._send_reminder(reminder)
-                self._update_next_send_date(reminder)
-            except Exception as e:
-                print(f"Erro ao enviar lembrete {reminder.id}: {e}")
-    
-    def _send_reminder(self, reminder: Reminder):
-        """Enviar um lembrete específico"""
-        patient = Patient.query.get(reminder.patient_id)
-        if not patient:
-            print(f"Paciente não encontrado para lembrete {reminder.id}")
+        SCHEDULER_QUEUE_DEPTH.set(sum(1 for r in upcoming if r.next_send_date <= now), queue='reminders')
+        if not upcoming:
             return
-        
-        if reminder.reminder_type == 'scale':
-            self._send_scale_reminder(patient, reminder)
-        elif reminder.reminder_type == 'task':
-            self._send_task_reminder(patient, reminder)
-        elif reminder.reminder_type == 'motivational':
-            self._send_motivational_reminder(patient, reminder)
-        elif reminder.reminder_type == 'breathing':
-            self._send_breathing_reminder(patient, reminder)
-        elif reminder.reminder_type == 'mood_chart':
-            self._send_mood_chart_reminder(patient, reminder)
-    
-    def _send_scale_reminder(self, patient: Patient, reminder: Reminder):
-        """Enviar lembrete de questionário de escala"""
-        message = f"""📋 *Lembrete de Questionário*
-
-Olá {patient.name}! 👋
-
-É hora de responder o questionário **{reminder.title}**.
-
-{reminder.description if reminder.description else ''}
-
-Este questionário ajuda no acompanhamento do seu tratamento. Vamos começar?"""
-        
-        buttons = [
-            {'id': f'start_scale_{reminder.scale_type}', 'title': '📋 Começar agora'},
-            {'id': f'delay_reminder_{reminder.id}', 'title': '⏰ Lembrar em 1h'},
-            {'id': 'help_questionnaire', 'title': '❓ Preciso de ajuda'}
-        ]
-        
-        self.whatsapp_service.send_interactive_message(
-            patient.phone_number,
-            "📋 Questionário Agendado",
-            message,
-            buttons
-        )
-        
-        print(f"Lembrete de escala enviado para {patient.name}: {reminder.scale_type}")
-    
-    def _send_task_reminder(self, patient: Patient, reminder: Reminder):
-        """Enviar lembrete de tarefa"""
-        message = f"""📝 *Lembrete de Tarefa*
-
-Olá {patient.name}! 👋
-
-**{reminder.title}**
-
-{reminder.description if reminder.description else ''}
-
-Por favor, complete esta tarefa e me informe quando terminar."""
-        
-        buttons = [
-            {'id': f'task_completed_{reminder.id}', 'title': '✅ Tarefa concluída'},
-            {'id': f'task_help_{reminder.id}', 'title': '❓ Preciso de ajuda'},
-            {'id': f'delay_reminder_{reminder.id}', 'title': '⏰ Lembrar depois'}
-        ]
-        
-        self.whatsapp_service.send_interactive_message(
-            patient.phone_number,
-            "📝 Tarefa Agendada",
-            message,
-            buttons
-        )
-        
-        print(f"Lembrete de tarefa enviado para {patient.name}: {reminder.title}")
-    
-    def _send_motivational_reminder(self, patient: Patient, reminder: Reminder):
-        """Enviar mensagem motivacional"""
-        message = f"""✨ *Mensagem Motivacional*
-
-Olá {patient.name}! 🌟
-
-{reminder.description if reminder.description else reminder.title}
 
-Lembre-se: você é mais forte do que imagina! 💪
+        patients = {
+            patient.id: snapshot_of(patient)
+            for patient in Patient.query.filter(Patient.id.in_({r.patient_id for r in upcoming}))
+        }
+        telegram_due = []
+        for reminder in upcoming:
+            try:
+                patient = patients.get(reminder.patient_id)
+                if not patient:
+                    print(f"Paciente não encontrado para lembrete {reminder.id}")
+                    continue
 
-Continue cuidando de si mesmo. Estou aqui para apoiá-lo! 🤗"""
-        
-        self.whatsapp_service.send_text_message(patient.phone_number, message)
-        
-        print(f"Mensagem motivacional enviada para {patient.name}")
-    
-    def _send_breathing_reminder(self, patient: Patient, reminder: Reminder):
-        """Enviar lembrete de exercício de respiração"""
-        message = f"""🫁 *Hora do Exercício de Respiração*
+                message = self._reminder_message(patient, reminder)
+                if message is None:
+                    # Tipo sem mensagem neste agendador: vai em lote pelo Telegram quando vence
+                    if reminder.next_send_date <= now:
+                        telegram_due.append(reminder)
+                    continue
 
-Olá {patient.name}! 😌
+                self.send_bucketer.stage(
+                    ('reminder', reminder.id, reminder.next_send_date),
+                    reminder.next_send_date.replace(second=0, microsecond=0),
+                    patient,
+                    message,
+                    tz=SCHEDULER_TZ,
+                    urgent=reminder.reminder_type in URGENT_REMINDER_TYPES,
+                )
+            except Exception as e:
+                print(f"Erro ao agendar lembrete {reminder.id}: {e}")
 
-Que tal fazer uma pausa para um exercício de respiração?
+        if telegram_due:
+            self._send_telegram_reminders(telegram_due)
 
-Isso pode ajudar a:
-• Reduzir o estresse
-• Melhorar o foco
-• Relaxar o corpo e a mente
+    def _send_telegram_reminders(self, reminders: List[Reminder]):
+        """Enviar em lote (broadcast do dispatcher do Telegram) e avançar a próxima data"""
+        if os.getenv('TELEGRAM_BOT_TOKEN'):
+            results = _telegram_scheduler.send_reminders(reminders)
+            for reminder_id, result in results.items():
+                if result.get('status') == 'error':
+                    print(f"Erro ao enviar lembrete {reminder_id} via Telegram: {result.get('message')}")
+        for reminder in reminders:
+            observe_lag('reminders', reminder.next_send_date)
+            self._update_next_send_date(reminder)
 
-Escolha um exercício para começar:"""
-        
-        buttons = [
-            {'id': 'breathing_478', 'title': '🫁 Respiração 4-7-8'},
-            {'id': 'breathing_box', 'title': '📦 Respiração Quadrada'},
-            {'id': 'breathing_anxiety', 'title': '😰 Anti-Ansiedade'},
-            {'id': 'breathing_list', 'title': '📋 Ver todos'}
-        ]
-        
-        self.whatsapp_service.send_interactive_message(
-            patient.phone_number,
-            "🫁 Momento de Respirar",
-            message,
-            buttons
-        )
-        
-        print(f"Lembrete de respiração enviado para {patient.name}")
-    
-    def _send_mood_chart_reminder(self, patient: Patient, reminder: Reminder):
-        """Enviar lembrete de registro de humor"""
-        message = f"""😊 *Registro de Humor Diário*
+    def _record_sent_reminders(self):
+        """Atualizar a próxima data dos lembretes que o envio agrupado já entregou"""
+        for (_, reminder_id, due_at), result in self.send_bucketer.completed():
+            try:
+                observe_lag('reminders', due_at, now=result.get('delivered_at'))
+                reminder = Reminder.query.get(reminder_id)
+                if not reminder or reminder.next_send_date != due_at:
+                    continue  # editado ou removido enquanto aguardava o envio
 
-Olá {patient.name}! 📊
+                if result.get('success'):
+                    print(f"Lembrete {reminder.reminder_type} enviado (lembrete {reminder.id}, via {result.get('channel')})")
+                else:
+                    print(f"Erro ao enviar lembrete {reminder.id}: {result.get('error')}")
+                self._update_next_send_date(reminder)
+            except Exception as e:
+                print(f"Erro ao atualizar lembrete {reminder_id}: {e}")
 
-Como você está se sentindo hoje?
+    def _send_reminder(self, reminder: Reminder):
+        """Enviar um lembrete específico (imediato, fora do envio agrupado)"""
+        patient = Patient.query.get(reminder.patient_id)
+        if not patient:
+            print(f"Paciente não encontrado para lembrete {reminder.id}")
+            return
 
-É importante registrar seu humor diariamente para acompanhar sua evolução.
+        message = self._reminder_message(patient, reminder)
+        if message is not None:
+            self.messaging.send(patient, message)
+            print(f"Lembrete {reminder.reminder_type} enviado para {patient.name}: {reminder.title}")
 
-Vamos fazer o registro de hoje?"""
-        
-        buttons = [
-            {'id': 'start_mood_chart', 'title': '😊 Registrar humor'},
-            {'id': 'mood_help', 'title': '❓ Como funciona?'},
-            {'id': f'delay_reminder_{reminder.id}', 'title': '⏰ Lembrar depois'}
-        ]
-        
-        self.whatsapp_service.send_interactive_message(
-            patient.phone_number,
-            "😊 Registro de Humor",
-            message,
-            buttons
-        )
-        
-        print(f"Lembrete de humor enviado para {patient.name}")
+    def _reminder_message(self, patient, reminder: Reminder) -> Optional[OutboundMessage]:
+        """Mensagem do lembrete conforme o tipo (None = tipo não enviado por aqui)"""
+        if reminder.reminder_type == 'scale':
+            return OutboundMessage.from_template(
+                'scale_reminder',
+                name=patient.name,
+                title=reminder.title,
+                description=reminder.description or '',
+                scale_type=reminder.scale_type,
+                reminder_id=reminder.id
+            )
+        if reminder.reminder_type == 'task':
+            return OutboundMessage.from_template(
+                'task_reminder',
+                name=patient.name,
+                title=reminder.title,
+                description=reminder.description or '',
+                reminder_id=reminder.id
+            )
+        if reminder.reminder_type == 'motivational':
+            return OutboundMessage.from_template(
+                'motivational_reminder',
+                name=patient.name,
+                text=reminder.description if reminder.description else reminder.title
+            )
+        if reminder.reminder_type == 'breathing':
+            return OutboundMessage.from_template(
+                'breathing_exercise_reminder',
+                name=patient.name
+            )
+        if reminder.reminder_type == 'mood_chart':
+            return OutboundMessage.from_template(
+                'mood_chart_reminder',
+                name=patient.name,
+                reminder_id=reminder.id
+            )
+        return None
     
     def _check_and_send_medication_reminders(self):
         """Verificar e enviar lembretes de medicação"""
@@ -247,6 +257,7 @@ Vamos fazer o registro de hoje?"""
                 if time_diff <= 1:  # Tolerância de 1 minuto
                     patient = Patient.query.get(medication.patient_id)
                     if patient:
+                        observe_lag('medication', datetime.combine(current_date, scheduled_time))
                         self.medication_service.send_medication_reminder(patient, medication)
     
     def _check_and_send_mood_reminders(self):
@@ -271,24 +282,10 @@ Vamos fazer o registro de hoje?"""
             
             if not existing_entry:
                 # Enviar lembrete de humor
-                message = f"""😊 *Lembrete de Humor*
-
-Olá {patient.name}! 🌙
-
-Você ainda não registrou seu humor hoje. 
-
-Que tal fazer isso agora antes de dormir? Leva apenas 2 minutos!"""
-                
-                buttons = [
-                    {'id': 'start_mood_chart', 'title': '😊 Registrar agora'},
-                    {'id': 'mood_tomorrow', 'title': '🌅 Amanhã cedo'}
-                ]
-                
-                self.whatsapp_service.send_interactive_message(
-                    patient.phone_number,
-                    "😊 Registro de Humor",
-                    message,
-                    buttons
+                self.messaging.send_template(
+                    patient,
+                    'mood_evening_reminder',
+                    name=patient.name
                 )
                 
                 print(f"Lembrete de humor noturno enviado para {patient.name}")
@@ -391,6 +388,7 @@ Que tal fazer isso agora antes de dormir? Leva apenas 2 minutos!"""
             'running': self.running,
             'due_reminders': self.get_due_reminders_count(),
             'total_active_reminders': Reminder.query.filter_by(is_active=True).count(),
-            'total_active_medications': Medication.query.filter_by(is_active=True).count()
+            'total_active_medications': Medication.query.filter_by(is_active=True).count(),
+            'send_buckets': self.send_bucketer.stats()
         }
 
@@ -0,0 +1,164 @@
+"""
+Categorização de pontuações por faixas ordenadas
+
+Cada escala tem suas faixas [mínimo, máximo] guardadas como arrays de
+limites ordenados. Uma pontuação isolada é classificada com bisect; em
+lote (reclassificação do histórico quando os pontos de corte mudam) as
+pontuações inteiras usam uma tabela densa pontuação -> categoria montada
+uma única vez.
+"""
+
+import logging
+from bisect import bisect_right
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ScoreBand = namedtuple('ScoreBand', ['label', 'alarming'])
+
+# Intervalo máximo coberto pela tabela densa (acima disso usa bisect)
+DENSE_TABLE_LIMIT = 1024
+
+
+class ScoreCategorizer:
+    """Faixas de pontuação de uma escala
+
+    Args:
+        ranges: Iterável de (mínimo, máximo, valor); o valor devolvido pode
+            ser qualquer objeto (rótulo, ScoreBand, ScaleCategory...)
+    """
+
+    __slots__ = ('lower', 'upper', 'values', 'max_score', '_dense', '_dense_origin')
+
+    def __init__(self, ranges: Iterable[tuple]):
+        ordered = sorted(ranges, key=lambda r: r[0])
+        self.lower = tuple(r[0] for r in ordered)
+        self.upper = tuple(r[1] for r in ordered)
+        self.values = tuple(r[2] for r in ordered)
+        self.max_score = max(self.upper) if self.upper else None
+
+        self._dense = None
+        self._dense_origin = 0
+        if self.lower and all(isinstance(v, int) for v in self.lower + self.upper):
+            start, end = self.lower[0], self.max_score
+            if end - start < DENSE_TABLE_LIMIT:
+                self._dense_origin = start
+                self._dense = tuple(self.categorize(score) for score in range(start, end + 1))
+
+    def categorize(self, score):
+        """Valor da faixa que contém a pontuação (None fora das faixas)"""
+        if score is None:
+            return None
+        index = bisect_right(self.lower, score) - 1
+        if index < 0 or score > self.upper[index]:
+            return None
+        return self.values[index]
+
+    def categorize_many(self, scores: Iterable) -> List:
+        """Classificar várias pontuações de uma vez"""
+        table = self._dense
+        if table is None:
+            return [self.categorize(score) for score in scores]
+
+        origin = self._dense_origin
+        size = len(table)
+        result = []
+        for score in scores:
+            offset = score - origin if type(score) is int else -1
+            result.append(table[offset] if 0 <= offset < size else self.categorize(score))
+        return result
+
+
+def _bands(rules: List[tuple], alarm_from: int) -> ScoreCategorizer:
+    return ScoreCategorizer(
+        (low, high, ScoreBand(label, low >= alarm_from)) for low, high, label in rules
+    )
+
+
+# Pontos de corte dos questionários gravados pelo MedicalDatabase (sqlite)
+QUESTIONNAIRE_CATEGORIZERS: Dict[str, ScoreCategorizer] = {
+    'GAD-7': _bands([
+        (0, 4, 'Ansiedade mínima'),
+        (5, 9, 'Ansiedade leve'),
+        (10, 14, 'Ansiedade moderada'),
+        (15, 21, 'Ansiedade severa'),
+    ], alarm_from=15),
+    'PHQ-9': _bands([
+        (0, 4, 'Depressão mínima'),
+        (5, 9, 'Depressão leve'),
+        (10, 14, 'Depressão moderada'),
+        (15, 19, 'Depressão moderadamente severa'),
+        (20, 27, 'Depressão severa'),
+    ], alarm_from=20),
+}
+
+
+def recategorize_responses(scale_name: Optional[str] = None, chunk_size: int = 1000) -> Dict:
+    """
+    Reclassificar o histórico de Response com os pontos de corte atuais
+
+    Lê somente (id, score, response_data, is_alarming) em blocos por id,
+    classifica cada bloco em lote pela escala compilada e grava apenas as
+    linhas que mudaram (bulk update, um commit por bloco).
+
+    Args:
+        scale_name: Restringe a uma escala (None = todas)
+        chunk_size: Linhas por bloco
+
+    Returns:
+        {'scanned', 'updated', 'skipped'}
+    """
+    from src.models.response import Response
+    from src.models.user import db
+    from src.services.scale_registry import scale_registry
+
+    stats = {'scanned': 0, 'updated': 0, 'skipped': 0}
+    last_id = 0
+
+    while True:
+        rows = db.session.query(
+            Response.id, Response.score, Response.response_data, Response.is_alarming
+        ).filter(
+            Response.id > last_id,
+            Response.score.isnot(None)
+        ).order_by(Response.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        stats['scanned'] += len(rows)
+
+        # Agrupa o bloco por escala para classificar cada grupo de uma vez
+        groups = {}
+        for row in rows:
+            name = (row[2] or {}).get('scale_name') if isinstance(row[2], dict) else None
+            if scale_name and name != scale_name:
+                continue
+            groups.setdefault(name, []).append(row)
+
+        mappings = []
+        for name, group in groups.items():
+            scale = scale_registry.get(name) if name else None
+            if scale is None:
+                stats['skipped'] += len(group)
+                continue
+
+            categories = scale.categorize_many([row[1] for row in group])
+            for (response_id, score, data, was_alarming), category in zip(group, categories):
+                label = category.label if category else None
+                alarming = scale.is_alarming(score)
+                if alarming == bool(was_alarming) and data.get('category') == label:
+                    continue
+                mappings.append({
+                    'id': response_id,
+                    'is_alarming': alarming,
+                    'response_data': dict(data, category=label)
+                })
+
+        if mappings:
+            db.session.bulk_update_mappings(Response, mappings)
+            db.session.commit()
+            stats['updated'] += len(mappings)
+
+    logger.info(f"Reclassificação de respostas concluída: {stats}")
+    return stats
@@ -1,23 +1,27 @@
 import logging
 import os
 from typing import Dict, List
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from src.services.telegram_service import TelegramService
+from src.services.rollup_service import RollupService
 from src.models.patient import Patient
 from src.models.reminder import Reminder
 from src.models.response import Response
 from src.models.medication import Medication
 from src.models.user import db
+from src.ops.metrics import ACTIVE_SESSIONS
 
 class TelegramAdminService:
     """Serviço de interface administrativa via Telegram"""
     
     def __init__(self):
         self.telegram_service = TelegramService(bot_token=os.getenv('TELEGRAM_BOT_TOKEN'))
+        self.rollup_service = RollupService()
         self.logger = logging.getLogger(__name__)
         
         # Estados de conversa para fluxos complexos
         self.conversation_states = {}
+        ACTIVE_SESSIONS.set_function(lambda: len(self.conversation_states), kind='telegram_admin')
     
     def handle_command(self, chat_id: str, command: str, user_info: Dict) -> Dict:
         """Processar comando administrativo"""
@@ -275,9 +279,18 @@ Use /menu para acessar o painel completo."""
         if not responses:
             message = "📋 *Respostas Recentes (7 dias)*\n\nNenhuma resposta encontrada."
         else:
+            # Totais da semana vêm dos rollups diários
+            totals = self.rollup_service.summary(week_ago.date(), date.today())['patients'].values()
             message = "📋 *Respostas Recentes (7 dias)*\n\n"
+            message += f"📊 Total: {sum(p['responses'] for p in totals)} respostas, "
+            message += f"{sum(p['alarming'] for p in totals)} alertas\n\n"
+            
+            # Response.patient_id é String(64); Patient.id é inteiro
+            patients = {str(p.id): p for p in Patient.query.filter(
+                Patient.id.in_({int(r.patient_id) for r in responses if str(r.patient_id).isdigit()})
+            ).all()}
             for response in responses:
-                patient = Patient.query.get(response.patient_id)
+                patient = patients.get(str(response.patient_id))
                 if patient:
                     response_data = response.response_data or {}
                     scale_name = response_data.get('scale_name', 'Questionário')
@@ -295,6 +308,55 @@ Use /menu para acessar o painel completo."""
         self.telegram_service.send_interactive_message(chat_id, message, buttons)
         return {"status": "sent", "action": "responses_report_sent"}
     
+    def _send_adherence_report(self, chat_id: str) -> Dict:
+        """Enviar relatório de aderência medicamentosa (últimos 30 dias, via rollups)"""
+        start_date = date.today() - timedelta(days=29)
+        summary = self.rollup_service.summary(start_date, date.today())['patients']
+        rows = sorted(
+            [(pid, p) for pid, p in summary.items() if p['doses_expected']],
+            key=lambda item: item[1]['adherence_rate']
+        )
+        
+        if not rows:
+            message = "💊 *Aderência (30 dias)*\n\nNenhuma dose registrada."
+        else:
+            patients = {str(p.id): p for p in Patient.query.filter(
+                Patient.id.in_([int(pid) for pid, _ in rows[:10] if str(pid).isdigit()])).all()}
+            message = "💊 *Aderência (30 dias)*\n\n"
+            for patient_id, data in rows[:10]:
+                patient = patients.get(str(patient_id))
+                message += f"👤 *{patient.name if patient else patient_id}*\n"
+                message += f"✅ {data['doses_confirmed']}/{data['doses_expected']} doses ({data['adherence_rate']}%)\n\n"
+            
+            if len(rows) > 10:
+                message += "_(Mostrando os 10 pacientes com menor aderência)_"
+        
+        buttons = [{"text": "🔙 Menu relatórios", "callback_data": "reports_menu"}]
+        self.telegram_service.send_interactive_message(chat_id, message, buttons)
+        return {"status": "sent", "action": "adherence_report_sent"}
+    
+    def _send_mood_report(self, chat_id: str) -> Dict:
+        """Enviar relatório de humor (últimos 7 dias, via rollups)"""
+        start_date = date.today() - timedelta(days=6)
+        summary = self.rollup_service.summary(start_date, date.today())['patients']
+        rows = [(pid, p) for pid, p in summary.items() if p['mood_entries']]
+        
+        if not rows:
+            message = "😊 *Humor (7 dias)*\n\nNenhum registro de humor encontrado."
+        else:
+            patients = {str(p.id): p for p in Patient.query.filter(
+                Patient.id.in_([int(pid) for pid, _ in rows[:10] if str(pid).isdigit()])).all()}
+            message = "😊 *Humor (7 dias)*\n\n"
+            for patient_id, data in rows[:10]:
+                patient = patients.get(str(patient_id))
+                message += f"👤 *{patient.name if patient else patient_id}*\n"
+                message += f"📊 Humor médio: {data['mood_avg']}\n"
+                message += f"📅 {data['mood_entries']} registros\n\n"
+        
+        buttons = [{"text": "🔙 Menu relatórios", "callback_data": "reports_menu"}]
+        self.telegram_service.send_interactive_message(chat_id, message, buttons)
+        return {"status": "sent", "action": "mood_report_sent"}
+    
     def _send_iclinic_export_menu(self, chat_id: str) -> Dict:
         """Enviar menu de exportação para iClinic"""
         message = """🏥 *Exportação para iClinic*
@@ -7,8 +7,13 @@ from src.services.telegram_questionnaire_service import TelegramQuestionnaireSer
 from src.services.telegram_scheduler_service import TelegramSchedulerService
 from src.services.telegram_mood_service import TelegramMoodService
 from src.models.patient import Patient
-from src.models.breathing_exercise import BreathingExercise
+from src.services.patient_cache import PatientSnapshot, patient_cache
+from src.services.reference_cache import breathing_catalog
 from src.models.user import db
+from src.messaging.callbacks import COMPACT_ONLY, CallbackRouter
+from src.ops.ingest_log import IngestLogger
+
+ingest_log = IngestLogger('telegram')
 
 class TelegramMessageHandler:
     """Handler principal para processar mensagens do Telegram"""
@@ -23,6 +28,15 @@ class TelegramMessageHandler:
         
         # Número do administrador (configurado via variável de ambiente)
         self.admin_chat_id = os.getenv('ADMIN_CHAT_ID')
+        
+        # Família da rota de callback -> handler (src/messaging/callbacks.py)
+        self.callback_router = CallbackRouter({
+            'questionnaire': self._handle_questionnaire_callback,
+            'medication': self._handle_medication_callback,
+            'mood': self._handle_mood_callback,
+            'breathing': self._handle_breathing_callback,
+            'reminder': self._handle_reminder_action,
+        }, compact_only=COMPACT_ONLY)
     
     def handle_update(self, update: Dict) -> Dict:
         """
@@ -52,7 +66,7 @@ class TelegramMessageHandler:
                 return self._handle_callback_query(update, user_info)
             
             else:
-                self.logger.warning(f"Tipo de atualização não suportado: {update}")
+                ingest_log.event("telegram.unsupported", level=logging.WARNING, keys=sorted(update))
                 return {"status": "ignored", "message": "Update type not supported"}
                 
         except Exception as e:
@@ -65,7 +79,7 @@ class TelegramMessageHandler:
         text = message.get("text", "")
         chat_id = user_info["chat_id"]
         
-        self.logger.info(f"Mensagem de texto recebida de {chat_id}: {text}")
+        ingest_log.event("telegram.text", chat_id=chat_id, text=text)
         
         # Verificar se é comando administrativo
         if self._is_admin(chat_id):
@@ -93,7 +107,7 @@ class TelegramMessageHandler:
         chat_id = user_info["chat_id"]
         callback_query_id = callback_query["id"]
         
-        self.logger.info(f"Callback query recebido de {chat_id}: {callback_data}")
+        ingest_log.event("telegram.callback", chat_id=chat_id, data=callback_data)
         
         # Responder ao callback query
         self.telegram_service.answer_callback_query(callback_query_id)
@@ -102,35 +116,12 @@ class TelegramMessageHandler:
         if self._is_admin(chat_id):
             return self._handle_admin_callback(chat_id, callback_data, user_info)
         
-        # Verificar se é resposta de questionário
-        if callback_data.startswith('questionnaire_') or callback_data.startswith('start_questionnaire_'):
-            patient = self._get_or_create_patient(user_info)
-            if patient:
-                return self._handle_questionnaire_callback(chat_id, callback_data, patient)
-        
-        # Verificar se é confirmação de medicação
-        if callback_data.startswith('medication_'):
-            patient = self._get_or_create_patient(user_info)
-            if patient:
-                return self._handle_medication_callback(chat_id, callback_data, patient)
-        
-        # Verificar se é registro de humor
-        if callback_data.startswith('mood_') or callback_data.startswith('start_mood_'):
-            patient = self._get_or_create_patient(user_info)
-            if patient:
-                return self._handle_mood_callback(chat_id, callback_data, patient)
-        
-        # Verificar se é exercício de respiração
-        if callback_data.startswith('breathing_') or callback_data.startswith('start_breathing_'):
-            patient = self._get_or_create_patient(user_info)
-            if patient:
-                return self._handle_breathing_callback(chat_id, callback_data, patient)
-        
-        # Verificar se é ação de lembrete (snooze, skip)
-        if callback_data.startswith('snooze_') or callback_data.startswith('skip_'):
+        # Demais fluxos: rota pelo prefixo (ou id compacto)
+        handler, callback = self.callback_router.resolve(callback_data)
+        if handler:
             patient = self._get_or_create_patient(user_info)
             if patient:
-                return self._handle_reminder_action(chat_id, callback_data, patient)
+                return handler(chat_id, callback.data, patient)
         
         return {"status": "processed", "action": "callback_handled"}
     
@@ -204,8 +195,8 @@ class TelegramMessageHandler:
             return {"status": "processed", "action": "breathing_callback_handled"}
     
     def _handle_reminder_action(self, chat_id: str, callback_data: str, patient: Patient) -> Dict:
-        """Processar ações de lembrete (snooze, skip)"""
-        if callback_data.startswith('snooze_'):
+        """Processar ações de lembrete (snooze, delay, skip)"""
+        if callback_data.startswith(('snooze_', 'delay_reminder_')):
             return self.scheduler_service.handle_reminder_snooze(chat_id, callback_data, patient)
         elif callback_data.startswith('skip_'):
             return self.scheduler_service.handle_reminder_skip(chat_id, callback_data, patient)
@@ -259,7 +250,7 @@ Entre em contato com seu profissional de saúde."""
     
     def _send_user_status(self, chat_id: str, user_info: Dict) -> Dict:
         """Enviar status do usuário"""
-        patient = Patient.query.filter_by(telegram_chat_id=chat_id).first()
+        patient = patient_cache.lookup('telegram_chat_id', chat_id)
         
         if patient:
             message = f"""*Seu Status no Sistema* 📊
@@ -281,12 +272,12 @@ Para ser cadastrado, solicite ao seu profissional de saúde que adicione seu cha
         self.telegram_service.send_text_message(chat_id, message)
         return {"status": "sent", "action": "status_message_sent"}
     
-    def _get_or_create_patient(self, user_info: Dict) -> Patient:
+    def _get_or_create_patient(self, user_info: Dict) -> PatientSnapshot:
         """Obter ou criar paciente baseado nas informações do usuário"""
         chat_id = user_info["chat_id"]
         
-        # Buscar paciente existente
-        patient = Patient.query.filter_by(telegram_chat_id=chat_id).first()
+        # Buscar paciente existente (cache por chat id)
+        patient = patient_cache.lookup('telegram_chat_id', chat_id)
         
         if not patient:
             # Criar paciente temporário (será ativado pelo admin)
@@ -298,6 +289,7 @@ Para ser cadastrado, solicite ao seu profissional de saúde que adicione seu cha
             )
             db.session.add(patient)
             db.session.commit()
+            patient = patient_cache.store(patient)
         
         return patient
     
@@ -313,7 +305,7 @@ Para ser cadastrado, solicite ao seu profissional de saúde que adicione seu cha
     def _start_breathing_exercise(self, chat_id: str, exercise_id: int, patient: Patient) -> Dict:
         """Iniciar exercício de respiração"""
         try:
-            exercise = BreathingExercise.query.get(exercise_id)
+            exercise = breathing_catalog().by_id.get(exercise_id)
             if not exercise:
                 self.telegram_service.send_text_message(
                     chat_id,
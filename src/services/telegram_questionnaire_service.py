@@ -3,9 +3,9 @@ import os
 from typing import Dict, List, Any
 from src.services.telegram_service import TelegramService
 from src.models.patient import Patient
-from src.models.scale import Scale
 from src.models.response import Response
 from src.models.user import db
+from src.services.scale_registry import scale_registry
 from datetime import datetime
 
 class TelegramQuestionnaireService:
@@ -31,8 +31,8 @@ class TelegramQuestionnaireService:
             Resultado da operação
         """
         try:
-            # Buscar escala
-            scale = Scale.query.filter_by(name=scale_name).first()
+            # Buscar escala compilada
+            scale = scale_registry.get(scale_name)
             if not scale:
                 self.telegram_service.send_text_message(
                     chat_id,
@@ -40,11 +40,7 @@ class TelegramQuestionnaireService:
                 )
                 return {"status": "error", "message": "Scale not found"}
             
-            # Parsear perguntas da escala
-            scale_data = scale.questions_data or {}
-            questions = scale_data.get('questions', [])
-            
-            if not questions:
+            if not scale.questions:
                 self.telegram_service.send_text_message(
                     chat_id,
                     f"❌ Escala '{scale_name}' não possui perguntas configuradas."
@@ -53,10 +49,10 @@ class TelegramQuestionnaireService:
             
             # Inicializar estado do questionário
             questionnaire_state = {
-                "scale_id": scale.id,
+                "scale_id": scale.scale_id,
+                "scale_key": scale.key,
                 "scale_name": scale_name,
                 "patient_id": patient.id,
-                "questions": questions,
                 "current_question": 0,
                 "responses": [],
                 "started_at": datetime.now().isoformat()
@@ -100,24 +96,22 @@ class TelegramQuestionnaireService:
             
             answer_index = int(callback_data.split('_')[-1])
             current_question_index = state["current_question"]
-            questions = state["questions"]
+            scale = scale_registry.get(state["scale_key"])
             
-            if current_question_index >= len(questions):
+            if not scale or current_question_index >= scale.question_count:
                 return {"status": "error", "message": "Invalid question index"}
             
-            current_question = questions[current_question_index]
-            options = current_question.get('options', [])
+            current_question = scale.questions[current_question_index]
+            score = scale.answer_score(current_question_index, answer_index)
             
-            if answer_index >= len(options):
+            if score is None:
                 return {"status": "error", "message": "Invalid answer index"}
             
-            selected_option = options[answer_index]
-            
             # Salvar resposta
             response_data = {
-                "question": current_question.get('text', ''),
-                "answer": selected_option.get('text', ''),
-                "score": selected_option.get('score', 0)
+                "question": current_question.text,
+                "answer": current_question.options[answer_index].label,
+                "score": score
             }
             
             state["responses"].append(response_data)
@@ -126,7 +120,7 @@ class TelegramQuestionnaireService:
             state["current_question"] += 1
             
             # Verificar se terminou o questionário
-            if state["current_question"] >= len(questions):
+            if state["current_question"] >= scale.question_count:
                 return self._finish_questionnaire(chat_id, state)
             else:
                 return self._send_current_question(chat_id)
@@ -139,25 +133,23 @@ class TelegramQuestionnaireService:
         """Enviar pergunta atual do questionário"""
         try:
             state = self.active_questionnaires[chat_id]
-            questions = state["questions"]
+            scale = scale_registry.get(state["scale_key"])
             current_index = state["current_question"]
             
-            if current_index >= len(questions):
+            if not scale or current_index >= scale.question_count:
                 return {"status": "error", "message": "No more questions"}
             
-            current_question = questions[current_index]
-            question_text = current_question.get('text', '')
-            options = current_question.get('options', [])
+            current_question = scale.questions[current_index]
             
             # Montar mensagem
-            progress = f"({current_index + 1}/{len(questions)})"
-            message = f"📋 *{state['scale_name']}* {progress}\n\n{question_text}"
+            progress = f"({current_index + 1}/{scale.question_count})"
+            message = f"📋 *{state['scale_name']}* {progress}\n\n{current_question.text}"
             
             # Montar botões
             buttons = []
-            for i, option in enumerate(options):
+            for i, option in enumerate(current_question.options):
                 buttons.append({
-                    "text": option.get('text', f'Opção {i+1}'),
+                    "text": option.label or f'Opção {i+1}',
                     "callback_data": f"questionnaire_answer_{i}"
                 })
             
@@ -175,27 +167,15 @@ class TelegramQuestionnaireService:
             # Calcular pontuação total
             total_score = sum(response.get('score', 0) for response in state['responses'])
             
-            # Buscar escala para obter categorias
-            scale = Scale.query.get(state['scale_id'])
+            # Escala compilada com as faixas de categoria
+            scale = scale_registry.get(state['scale_key'])
             if not scale:
                 return {"status": "error", "message": "Scale not found"}
             
-            scale_data = scale.questions_data or {}
-            scoring = scale_data.get('scoring', {})
-            categories = scoring.get('categories', [])
-            
             # Determinar categoria baseada na pontuação
-            category = "Não categorizado"
-            is_alarming = False
-            
-            for cat in categories:
-                min_score = cat.get('min_score', 0)
-                max_score = cat.get('max_score', 999)
-                
-                if min_score <= total_score <= max_score:
-                    category = cat.get('name', 'Não categorizado')
-                    is_alarming = cat.get('alarming', False)
-                    break
+            matched = scale.category_for(total_score)
+            category = matched.label if matched else "Não categorizado"
+            is_alarming = bool(matched and matched.alarming)
             
             # Salvar resposta no banco de dados
             response = Response(
@@ -204,7 +184,7 @@ class TelegramQuestionnaireService:
                 response_data={
                     'scale_name': state['scale_name'],
                     'responses': state['responses'],
-                    'total_questions': len(state['questions'])
+                    'total_questions': scale.question_count
                 },
                 score=total_score,
                 category=category,
@@ -308,16 +288,14 @@ Continue cuidando bem de você! 💚"""
     
     def get_available_scales(self) -> List[Dict]:
         """Obter lista de escalas disponíveis"""
-        scales = Scale.query.filter_by(is_active=True).all()
-        
         return [
             {
-                "id": scale.id,
+                "id": scale.scale_id,
                 "name": scale.name,
                 "description": scale.description,
-                "question_count": len(scale.questions_data.get('questions', []) if scale.questions_data else [])
+                "question_count": scale.question_count
             }
-            for scale in scales
+            for scale in scale_registry.db_scales()
         ]
     
     def send_scale_selection_menu(self, chat_id: str, patient: Patient) -> Dict:
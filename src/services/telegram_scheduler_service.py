@@ -8,7 +8,9 @@ from src.models.patient import Patient
 from src.models.reminder import Reminder
 from src.models.medication import Medication, MedicationConfirmation
 from src.models.mood_chart import MoodChart
-from src.models.breathing_exercise import BreathingExercise
+from src.services.reference_cache import breathing_catalog
+from src.services.timer_service import timer_service
+from src.messaging.callbacks import callback_id
 from src.models.user import db
 
 class TelegramSchedulerService:
@@ -42,8 +44,8 @@ Este questionário ajuda seu profissional de saúde a acompanhar seu bem-estar.
             
             buttons = [
                 {"text": "📝 Responder agora", "callback_data": f"start_questionnaire_{scale_name}"},
-                {"text": "⏰ Lembrar em 1 hora", "callback_data": f"snooze_reminder_{reminder.id}_1"},
-                {"text": "❌ Pular hoje", "callback_data": f"skip_reminder_{reminder.id}"}
+                {"text": "⏰ Lembrar em 1 hora", "callback_data": callback_id('reminder.snooze', reminder_id=reminder.id, minutes=60)},
+                {"text": "❌ Pular hoje", "callback_data": callback_id('reminder.skip', reminder_id=reminder.id)}
             ]
             
             result = self.telegram_service.send_interactive_message(chat_id, message, buttons)
@@ -93,13 +95,13 @@ Olá, {patient.name}! 👋
                 
                 buttons.append({
                     "text": f"✅ Tomei {medication.name}",
-                    "callback_data": f"medication_taken_{medication.id}"
+                    "callback_data": callback_id('medication.taken', medication_id=medication.id)
                 })
             
             # Botões adicionais
             buttons.extend([
-                {"text": "⏰ Lembrar em 15 min", "callback_data": f"snooze_medication_{reminder.id}_15"},
-                {"text": "❌ Não vou tomar hoje", "callback_data": f"skip_medication_{reminder.id}"}
+                {"text": "⏰ Lembrar em 15 min", "callback_data": callback_id('reminder.snooze_medication', reminder_id=reminder.id, minutes=15)},
+                {"text": "❌ Não vou tomar hoje", "callback_data": callback_id('reminder.skip_medication', reminder_id=reminder.id)}
             ])
             
             result = self.telegram_service.send_interactive_message(chat_id, message, buttons)
@@ -156,8 +158,8 @@ Este registro ajuda você e seu profissional a acompanhar seu bem-estar ao longo
             
             buttons = [
                 {"text": "😊 Registrar humor", "callback_data": "start_mood_chart"},
-                {"text": "⏰ Lembrar mais tarde", "callback_data": f"snooze_reminder_{reminder.id}_2"},
-                {"text": "❌ Pular hoje", "callback_data": f"skip_reminder_{reminder.id}"}
+                {"text": "⏰ Lembrar mais tarde", "callback_data": callback_id('reminder.snooze', reminder_id=reminder.id, minutes=120)},
+                {"text": "❌ Pular hoje", "callback_data": callback_id('reminder.skip', reminder_id=reminder.id)}
             ]
             
             result = self.telegram_service.send_interactive_message(chat_id, message, buttons)
@@ -181,7 +183,7 @@ Este registro ajuda você e seu profissional a acompanhar seu bem-estar ao longo
             chat_id = patient.telegram_chat_id
             
             # Buscar exercícios de respiração disponíveis
-            exercises = BreathingExercise.query.filter_by(is_active=True).limit(3).all()
+            exercises = breathing_catalog().exercises[:3]
             
             message = f"""🫁 *Exercício de Respiração*
 
@@ -206,8 +208,8 @@ Os exercícios de respiração ajudam a:
             
             # Botões adicionais
             buttons.extend([
-                {"text": "⏰ Lembrar em 30 min", "callback_data": f"snooze_reminder_{reminder.id}_30"},
-                {"text": "❌ Não agora", "callback_data": f"skip_reminder_{reminder.id}"}
+                {"text": "⏰ Lembrar em 30 min", "callback_data": callback_id('reminder.snooze', reminder_id=reminder.id, minutes=30)},
+                {"text": "❌ Não agora", "callback_data": callback_id('reminder.skip', reminder_id=reminder.id)}
             ])
             
             result = self.telegram_service.send_interactive_message(chat_id, message, buttons)
@@ -285,7 +287,7 @@ Lembre-se: você está fazendo um ótimo trabalho cuidando da sua saúde mental.
             medication_id = int(callback_data.split('_')[-1])
             
             medication = Medication.query.get(medication_id)
-            if not medication:
+            if not medication or str(medication.patient_id) != str(patient.id):
                 return {"status": "error", "message": "Medication not found"}
             
             # Criar confirmação
@@ -323,20 +325,25 @@ Continue assim! 👏"""
         try:
             # Extrair dados do callback_data
             # Formato: snooze_reminder_X_Y onde X é reminder_id e Y são os minutos
+            # (templates compartilhados com o WhatsApp enviam só snooze_reminder_X: 1 hora)
             parts = callback_data.split('_')
             reminder_id = int(parts[2])
-            minutes = int(parts[3])
+            minutes = int(parts[3]) if len(parts) > 3 else 60
             
             reminder = Reminder.query.get(reminder_id)
-            if not reminder:
+            # Lembrete de outro paciente: mesma resposta que inexistente
+            if not reminder or str(reminder.patient_id) != str(patient.id):
                 return {"status": "error", "message": "Reminder not found"}
             
             # Agendar novo lembrete
+            timer_service.schedule(
+                'reminder.resend',
+                {'reminder_id': reminder_id, 'channel': 'telegram'},
+                delay=timedelta(minutes=minutes),
+                dedupe_key=f"reminder:{reminder_id}"
+            )
             new_time = datetime.now() + timedelta(minutes=minutes)
             
-            # Aqui você implementaria a lógica para reagendar o lembrete
-            # Por simplicidade, apenas confirmamos o adiamento
-            
             message = f"""⏰ *Lembrete Adiado*
 
 Ok! Vou te lembrar novamente em {minutes} minutos.
@@ -358,7 +365,8 @@ Ok! Vou te lembrar novamente em {minutes} minutos.
             reminder_id = int(callback_data.split('_')[-1])
             
             reminder = Reminder.query.get(reminder_id)
-            if not reminder:
+            # Lembrete de outro paciente: mesma resposta que inexistente
+            if not reminder or str(reminder.patient_id) != str(patient.id):
                 return {"status": "error", "message": "Reminder not found"}
             
             message = """❌ *Lembrete Pulado*
@@ -393,3 +401,36 @@ Lembre-se: cuidar da sua saúde mental é importante. 💙"""
             self.logger.warning(f"Tipo de lembrete não suportado: {reminder_type}")
             return {"status": "error", "message": f"Unsupported reminder type: {reminder_type}"}
 
+    
+    def send_reminders(self, reminders: List[Reminder]) -> Dict[int, Dict]:
+        """
+        Enviar vários lembretes em paralelo entre pacientes
+        
+        Usa o broadcast do dispatcher do Telegram: lembretes do mesmo paciente
+        saem em ordem, na mesma tarefa, e os limites global e por chat valem
+        para todos. Cada envio roda no próprio app context e recarrega o
+        lembrete pelo id.
+        
+        Returns:
+            {reminder_id: resultado de send_reminder_by_type}
+        """
+        from flask import current_app
+        from src.messaging.telegram_dispatcher import dispatcher_for
+        
+        app = current_app._get_current_object()
+        
+        def task(reminder_id):
+            def run():
+                with app.app_context():
+                    try:
+                        return self.send_reminder_by_type(db.session.get(Reminder, reminder_id))
+                    except Exception as e:
+                        self.logger.error(f"Erro ao enviar lembrete {reminder_id}: {e}")
+                        return {"status": "error", "message": str(e)}
+            return run
+        
+        ids = [reminder.id for reminder in reminders]
+        results = dispatcher_for(self.telegram_service).broadcast(
+            [(reminder.patient_id, task(reminder.id)) for reminder in reminders]
+        )
+        return dict(zip(ids, results))
@@ -3,6 +3,8 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote
+from src.messaging.http import http_session
+from src.messaging.telegram_dispatcher import dispatcher_for
 
 class TelegramService:
     """Serviço para integração com a API do Telegram Bot"""
@@ -12,6 +14,43 @@ class TelegramService:
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
         self.logger = logging.getLogger(__name__)
     
+    def call(self, method: str, payload: Dict) -> Dict:
+        """
+        Chamada crua à Bot API, sem limites de envio (use o dispatcher para envios)
+        
+        O Telegram responde JSON também nos erros (error_code, description e,
+        em 429, parameters.retry_after), então o corpo é devolvido como veio.
+        """
+        url = f"{self.base_url}/{method}"
+        
+        try:
+            response = http_session().post(url, json=payload, timeout=30)
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+    
+    @staticmethod
+    def inline_keyboard(buttons: List[Dict]) -> Dict:
+        """Botões [{"text", "callback_data"}] no formato reply_markup (um por linha)"""
+        return {
+            "inline_keyboard": [[{
+                "text": button.get("text", button.get("title", "Botão")),
+                "callback_data": button.get("callback_data", button.get("id", "button"))
+            }] for button in buttons]
+        }
+    
+    def message_payload(self, chat_id: str, text: str, buttons: Optional[List[Dict]] = None,
+                        parse_mode: str = "Markdown") -> Dict:
+        """Payload de sendMessage (com inline keyboard se houver botões)"""
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode
+        }
+        if buttons:
+            payload["reply_markup"] = self.inline_keyboard(buttons)
+        return payload
+    
     def send_text_message(self, chat_id: str, text: str, parse_mode: str = "Markdown") -> Dict:
         """
         Enviar mensagem de texto
@@ -24,21 +63,10 @@ class TelegramService:
         Returns:
             Resposta da API do Telegram
         """
-        url = f"{self.base_url}/sendMessage"
-        
-        payload = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": parse_mode
-        }
-        
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Erro ao enviar mensagem: {e}")
-            return {"ok": False, "error": str(e)}
+        result = dispatcher_for(self).send("sendMessage", self.message_payload(chat_id, text, parse_mode=parse_mode))
+        if not result.get("ok"):
+            self.logger.error(f"Erro ao enviar mensagem: {result.get('description') or result.get('error')}")
+        return result
     
     def send_interactive_message(self, chat_id: str, text: str, buttons: List[Dict], parse_mode: str = "Markdown") -> Dict:
         """
@@ -53,32 +81,11 @@ class TelegramService:
         Returns:
             Resposta da API do Telegram
         """
-        url = f"{self.base_url}/sendMessage"
-        
-        # Converter botões para formato do Telegram
-        keyboard = []
-        for button in buttons:
-            keyboard.append([{
-                "text": button.get("text", button.get("title", "Botão")),
-                "callback_data": button.get("callback_data", button.get("id", "button"))
-            }])
-        
-        payload = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": parse_mode,
-            "reply_markup": {
-                "inline_keyboard": keyboard
-            }
-        }
-        
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Erro ao enviar mensagem interativa: {e}")
-            return {"ok": False, "error": str(e)}
+        payload = self.message_payload(chat_id, text, buttons, parse_mode)
+        result = dispatcher_for(self).send("sendMessage", payload)
+        if not result.get("ok"):
+            self.logger.error(f"Erro ao enviar mensagem interativa: {result.get('description') or result.get('error')}")
+        return result
     
     def send_audio_message(self, chat_id: str, audio_url: str, caption: str = None) -> Dict:
         """
@@ -103,7 +110,7 @@ class TelegramService:
             payload["caption"] = caption
         
         try:
-            response = requests.post(url, json=payload)
+            response = http_session().post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -133,7 +140,7 @@ class TelegramService:
             payload["caption"] = caption
         
         try:
-            response = requests.post(url, json=payload)
+            response = http_session().post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -165,7 +172,7 @@ class TelegramService:
             payload["show_alert"] = True
         
         try:
-            response = requests.post(url, json=payload)
+            response = http_session().post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -186,8 +193,6 @@ class TelegramService:
         Returns:
             Resposta da API do Telegram
         """
-        url = f"{self.base_url}/editMessageText"
-        
         payload = {
             "chat_id": chat_id,
             "message_id": message_id,
@@ -196,24 +201,12 @@ class TelegramService:
         }
         
         if buttons:
-            keyboard = []
-            for button in buttons:
-                keyboard.append([{
-                    "text": button.get("text", button.get("title", "Botão")),
-                    "callback_data": button.get("callback_data", button.get("id", "button"))
-                }])
-            
-            payload["reply_markup"] = {
-                "inline_keyboard": keyboard
-            }
+            payload["reply_markup"] = self.inline_keyboard(buttons)
         
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Erro ao editar mensagem: {e}")
-            return {"ok": False, "error": str(e)}
+        result = dispatcher_for(self).send("editMessageText", payload)
+        if not result.get("ok"):
+            self.logger.error(f"Erro ao editar mensagem: {result.get('description') or result.get('error')}")
+        return result
     
     def get_chat_member(self, chat_id: str, user_id: int) -> Dict:
         """
@@ -234,7 +227,7 @@ class TelegramService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = http_session().post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -258,13 +251,45 @@ class TelegramService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = http_session().post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Erro ao configurar webhook: {e}")
             return {"ok": False, "error": str(e)}
     
+    def get_updates(self, offset: Optional[int] = None, limit: int = 100, timeout: int = 30,
+                    allowed_updates: Optional[List[str]] = None, session=None) -> Dict:
+        """
+        Buscar atualizações por long polling (alternativa ao webhook)
+
+        Args:
+            offset: Primeiro update_id ainda não confirmado
+            limit: Máximo de atualizações por chamada (1-100)
+            timeout: Segundos que o Telegram segura a conexão sem novidades
+            allowed_updates: Tipos de atualização desejados
+            session: requests.Session reaproveitada entre chamadas (opcional)
+
+        Returns:
+            Resposta da API do Telegram
+        """
+        url = f"{self.base_url}/getUpdates"
+
+        payload = {"limit": limit, "timeout": timeout}
+        if offset is not None:
+            payload["offset"] = offset
+        if allowed_updates is not None:
+            payload["allowed_updates"] = allowed_updates
+
+        try:
+            # Timeout HTTP maior que o do long polling para não cortar a espera
+            response = (session or http_session()).post(url, json=payload, timeout=timeout + 10)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Erro ao buscar atualizações: {e}")
+            return {"ok": False, "error": str(e)}
+
     def delete_webhook(self) -> Dict:
         """
         Remover webhook
@@ -275,7 +300,7 @@ class TelegramService:
         url = f"{self.base_url}/deleteWebhook"
         
         try:
-            response = requests.post(url)
+            response = http_session().post(url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -292,7 +317,7 @@ class TelegramService:
         url = f"{self.base_url}/getMe"
         
         try:
-            response = requests.get(url)
+            response = http_session().get(url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -0,0 +1,58 @@
+"""
+Ações executadas pelos timers (TIMER_ACTIONS em src/services/timer_service.py)
+
+Cada ação recebe o payload gravado no timer e roda dentro de app context;
+exceção = falha (o timer tenta de novo até TIMER_MAX_ATTEMPTS). Lembrete
+ou medicação desativados nesse meio-tempo não são reenviados.
+"""
+
+import logging
+from typing import Dict
+
+from src.models.medication import Medication
+from src.models.patient import Patient
+from src.models.reminder import Reminder
+from src.models.user import db
+from src.services.lazy_service import LazyService
+
+logger = logging.getLogger(__name__)
+
+_scheduler_service = LazyService('src.services.scheduler_service.SchedulerService')
+_telegram_scheduler = LazyService('src.services.telegram_scheduler_service.TelegramSchedulerService')
+_medication_service = LazyService('src.services.medication_service.MedicationService')
+
+
+def resend_reminder(payload: Dict) -> None:
+    """Reenviar um lembrete adiado: {'reminder_id', 'channel'}"""
+    reminder = db.session.get(Reminder, payload['reminder_id'])
+    if reminder is None or not reminder.is_active:
+        logger.info(f"Lembrete {payload['reminder_id']} inativo; adiamento descartado")
+        return
+
+    channel = payload.get('channel')
+    if channel == 'telegram':
+        result = _telegram_scheduler.send_reminder_by_type(reminder)
+        if result.get('status') == 'error':
+            raise RuntimeError(result.get('message'))
+        return
+
+    patient = db.session.get(Patient, reminder.patient_id)
+    if patient is None:
+        logger.info(f"Paciente do lembrete {reminder.id} não encontrado; adiamento descartado")
+        return
+    message = _scheduler_service._reminder_message(patient, reminder)
+    if message is None:
+        raise ValueError(f"Lembrete do tipo {reminder.reminder_type} não pode ser reenviado")
+    result = _scheduler_service.messaging.send(patient, message, channel=channel)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error'))
+
+
+def resend_medication(payload: Dict) -> None:
+    """Lembrar a dose de novo: {'medication_id', 'patient_id'}"""
+    medication = db.session.get(Medication, payload['medication_id'])
+    patient = db.session.get(Patient, payload['patient_id'])
+    if medication is None or patient is None or not medication.is_active:
+        logger.info(f"Medicação {payload['medication_id']} inativa; novo lembrete descartado")
+        return
+    _medication_service.send_medication_reminder(patient, medication)
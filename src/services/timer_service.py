@@ -0,0 +1,366 @@
+"""
+Timers únicos persistidos: adiar lembrete, lembrar a medicação de novo
+
+Cada timer é uma linha de scheduled_timers (a fonte da verdade) e uma
+entrada numa roda de tempo hierárquica em memória
+(src/services/timing_wheel.py). A thread do serviço avança a roda a cada
+tick e dispara só os vencidos; nada varre a tabela de lembretes.
+
+- schedule(): grava o timer e, se o serviço roda neste processo, põe na
+  roda; dedupe_key cancela o pendente anterior (adiar duas vezes = um envio).
+  Um índice único parcial garante um só pendente por chave mesmo com dois
+  processos agendando ao mesmo tempo (quem perde a corrida tenta de novo).
+- Boot/recarga: start() devolve a 'pending' os timers 'running' reservados
+  há mais de TIMER_STALE_SECONDS (processo morreu no meio do envio; se já
+  existe um pendente mais novo com a mesma chave, o antigo é cancelado) e
+  carrega os pendentes até
+  TIMER_HORIZON_HOURS à frente; a cada TIMER_REFILL_SECONDS a recarga pega
+  timers gravados por outros processos (consulta indexada por status+prazo).
+- Disparo: UPDATE condicional pending -> running (só um processo ganha),
+  ação do kind em TIMER_ACTIONS (src/services/timer_actions.py) num pool
+  com app context; falha volta a 'pending' com espera crescente até
+  TIMER_MAX_ATTEMPTS.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.timer import ScheduledTimer
+from src.models.user import db
+from src.ops.metrics import LAG_BUCKETS, metrics
+from src.services.timing_wheel import TimingWheel
+
+# Configurações
+TIMER_TICK_SECONDS = float(os.getenv("TIMER_TICK_SECONDS") or "1")
+TIMER_HORIZON_HOURS = float(os.getenv("TIMER_HORIZON_HOURS") or "24")
+TIMER_REFILL_SECONDS = float(os.getenv("TIMER_REFILL_SECONDS") or "60")
+TIMER_MAX_ATTEMPTS = int(os.getenv("TIMER_MAX_ATTEMPTS") or "3")
+TIMER_RETRY_SECONDS = float(os.getenv("TIMER_RETRY_SECONDS") or "60")
+TIMER_STALE_SECONDS = float(os.getenv("TIMER_STALE_SECONDS") or "300")
+TIMER_WORKERS = int(os.getenv("TIMER_WORKERS") or "4")
+# Tentativas de schedule() quando outro processo grava a mesma dedupe_key ao mesmo tempo
+TIMER_DEDUPE_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+FIRED_TOTAL = metrics.counter(
+    "timers_fired_total", "Timers disparados por tipo e resultado", ("kind", "status"))
+FIRE_LAG_SECONDS = metrics.histogram(
+    "timer_fire_lag_seconds", "Atraso entre o prazo do timer e o disparo", ("kind",), buckets=LAG_BUCKETS)
+
+
+def _epoch(value: datetime) -> float:
+    """fire_at (UTC sem tzinfo) -> epoch"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TimerService:
+    """Agenda e dispara timers persistidos através de uma roda de tempo"""
+
+    def __init__(self, tick: float = TIMER_TICK_SECONDS, workers: int = TIMER_WORKERS):
+        self.tick = tick
+        self.workers = workers
+        self.wheel = TimingWheel(tick=tick)
+        self._lock = threading.Condition()
+        self._app = None
+        self._thread = None
+        self._executor = None
+        self._running = False
+        self._next_refill = 0.0
+
+    # ---------- API ----------
+
+    def schedule(self, kind: str, payload: Optional[Dict] = None, delay: Optional[timedelta] = None,
+                 fire_at: Optional[datetime] = None, dedupe_key: Optional[str] = None) -> int:
+        """
+        Gravar um timer único
+
+        Args:
+            kind: Ação a executar (chave de TIMER_ACTIONS)
+            payload: Dados JSON passados à ação
+            delay / fire_at: Quando disparar (fire_at em UTC)
+            dedupe_key: Cancela o timer pendente com a mesma chave
+
+        Returns:
+            id do timer
+        """
+        if fire_at is None:
+            fire_at = datetime.utcnow() + (delay or timedelta())
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                cancelled = []
+                if dedupe_key:
+                    cancelled = [timer_id for (timer_id,) in db.session.query(ScheduledTimer.id).filter_by(
+                        dedupe_key=dedupe_key, status='pending')]
+                    if cancelled:
+                        ScheduledTimer.query.filter(
+                            ScheduledTimer.id.in_(cancelled), ScheduledTimer.status == 'pending'
+                        ).update({'status': 'cancelled'}, synchronize_session=False)
+                timer = ScheduledTimer(kind=kind, payload=payload or {}, fire_at=fire_at,
+                                       status='pending', dedupe_key=dedupe_key, attempts=0)
+                db.session.add(timer)
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Outro processo gravou um pendente com a mesma chave entre o cancelamento e o insert
+                db.session.rollback()
+                if not dedupe_key or attempt >= TIMER_DEDUPE_RETRIES:
+                    raise
+            except Exception:
+                db.session.rollback()
+                raise
+
+        with self._lock:
+            for timer_id in cancelled:
+                self.wheel.remove(timer_id)
+            if self._running and fire_at <= datetime.utcnow() + timedelta(hours=TIMER_HORIZON_HOURS):
+                self.wheel.add(timer.id, _epoch(fire_at))
+                self._lock.notify()
+        logger.info(f"Timer {kind} agendado para {fire_at.isoformat()} (id={timer.id})")
+        return timer.id
+
+    def cancel(self, timer_id: Optional[int] = None, dedupe_key: Optional[str] = None) -> int:
+        """Cancelar timers pendentes por id ou por dedupe_key; devolve quantos"""
+        query = ScheduledTimer.query.filter_by(status='pending')
+        if timer_id is not None:
+            query = query.filter_by(id=timer_id)
+        elif dedupe_key:
+            query = query.filter_by(dedupe_key=dedupe_key)
+        else:
+            return 0
+
+        try:
+            ids = [timer.id for timer in query.all()]
+            if ids:
+                ScheduledTimer.query.filter(ScheduledTimer.id.in_(ids)).update(
+                    {'status': 'cancelled'}, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        with self._lock:
+            for cancelled_id in ids:
+                self.wheel.remove(cancelled_id)
+        return len(ids)
+
+    # ---------- Ciclo de vida ----------
+
+    def start(self, app) -> None:
+        """Recuperar timers do banco e iniciar a thread da roda (uma vez por processo)"""
+        with self._lock:
+            if self._running:
+                return
+            self._app = app
+            self._running = True
+
+        with app.app_context():
+            self._recover_stale()
+            self._refill()
+        self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+        self._thread.start()
+        logger.info(f"Timer service iniciado ({len(self.wheel)} timers na roda)")
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            self._lock.notify()
+
+    def _recover_stale(self) -> None:
+        """'running' reservado há mais de TIMER_STALE_SECONDS volta a 'pending' (pelo menos uma vez)"""
+        cutoff = datetime.utcnow() - timedelta(seconds=TIMER_STALE_SECONDS)
+        try:
+            stale = [timer_id for (timer_id,) in db.session.query(ScheduledTimer.id).filter(
+                ScheduledTimer.status == 'running', ScheduledTimer.claimed_at <= cutoff)]
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao recuperar timers interrompidos: {e}")
+            return
+
+        recovered = superseded = 0
+        for timer_id in stale:
+            try:
+                recovered += ScheduledTimer.query.filter_by(id=timer_id, status='running').update(
+                    {'status': 'pending', 'claimed_at': None}, synchronize_session=False)
+                db.session.commit()
+            except IntegrityError:
+                # Já existe um pendente mais novo com a mesma dedupe_key: ele vale
+                db.session.rollback()
+                superseded += ScheduledTimer.query.filter_by(id=timer_id, status='running').update(
+                    {'status': 'cancelled'}, synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao recuperar timer {timer_id}: {e}")
+        if recovered or superseded:
+            logger.warning(f"{recovered} timers interrompidos voltaram para a fila "
+                           f"({superseded} substituídos por um pendente mais novo)")
+
+    def _refill(self) -> None:
+        """Carregar na roda os pendentes até o horizonte (inclui os de outros processos)"""
+        horizon = datetime.utcnow() + timedelta(hours=TIMER_HORIZON_HOURS)
+        try:
+            rows = db.session.query(ScheduledTimer.id, ScheduledTimer.fire_at).filter(
+                ScheduledTimer.status == 'pending', ScheduledTimer.fire_at <= horizon).all()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao carregar timers: {e}")
+            return
+        finally:
+            self._next_refill = time.monotonic() + TIMER_REFILL_SECONDS
+
+        with self._lock:
+            for timer_id, fire_at in rows:
+                if timer_id not in self.wheel:
+                    self.wheel.add(timer_id, _epoch(fire_at))
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="timer-fire")
+        return self._executor
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                # Roda vazia: só acorda para a recarga
+                timeout = self.tick if len(self.wheel) else max(self._next_refill - time.monotonic(), self.tick)
+                self._lock.wait(timeout)
+                if not self._running:
+                    return
+                expired = self.wheel.advance(time.time())
+
+            for timer_id in expired:
+                self.executor.submit(self._fire, timer_id)
+
+            if time.monotonic() >= self._next_refill:
+                try:
+                    with self._app.app_context():
+                        self._refill()
+                except Exception as e:
+                    logger.error(f"Erro na recarga de timers: {e}")
+
+    # ---------- Disparo ----------
+
+    def _fire(self, timer_id: int) -> None:
+        with self._app.app_context():
+            try:
+                claimed = ScheduledTimer.query.filter_by(id=timer_id, status='pending').update(
+                    {'status': 'running', 'attempts': ScheduledTimer.attempts + 1,
+                     'claimed_at': datetime.utcnow()},
+                    synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao reservar timer {timer_id}: {e}")
+                return
+            if not claimed:
+                return  # cancelado ou disparado por outro processo
+
+            timer = db.session.get(ScheduledTimer, timer_id)
+            FIRE_LAG_SECONDS.observe(max(time.time() - _epoch(timer.fire_at), 0.0), kind=timer.kind)
+            try:
+                action = TIMER_ACTIONS.get(timer.kind)
+                if action is None:
+                    raise ValueError(f"Tipo de timer desconhecido: {timer.kind}")
+                _resolve(action)(timer.payload or {})
+            except Exception as e:
+                db.session.rollback()
+                self._failed(timer_id, e)
+                return
+
+            try:
+                timer = db.session.get(ScheduledTimer, timer_id)
+                timer.status = 'fired'
+                timer.fired_at = datetime.utcnow()
+                db.session.commit()
+                FIRED_TOTAL.inc(kind=timer.kind, status='fired')
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Timer {timer_id} disparado mas não marcado: {e}")
+
+    def _failed(self, timer_id: int, error: Exception) -> None:
+        """Reagendar com espera crescente ou desistir após TIMER_MAX_ATTEMPTS"""
+        try:
+            timer = db.session.get(ScheduledTimer, timer_id)
+            timer.last_error = str(error)[:1000]
+            if timer.attempts < TIMER_MAX_ATTEMPTS:
+                timer.status = 'pending'
+                timer.fire_at = datetime.utcnow() + timedelta(seconds=TIMER_RETRY_SECONDS * timer.attempts)
+                status = 'retry'
+            else:
+                timer.status = 'failed'
+                status = 'failed'
+            db.session.commit()
+        except IntegrityError:
+            # Adiado de novo enquanto rodava: o pendente mais novo substitui a nova tentativa
+            db.session.rollback()
+            status = 'superseded'
+            try:
+                timer = db.session.get(ScheduledTimer, timer_id)
+                timer.last_error = str(error)[:1000]
+                timer.status = 'cancelled'
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao registrar falha do timer {timer_id}: {e}")
+                return
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao registrar falha do timer {timer_id}: {e}")
+            return
+
+        FIRED_TOTAL.inc(kind=timer.kind, status=status)
+        logger.error(f"Timer {timer.kind} (id={timer_id}) falhou [{status}]: {error}")
+        if status == 'retry':
+            with self._lock:
+                self.wheel.add(timer_id, _epoch(timer.fire_at))
+
+    # ---------- Diagnóstico ----------
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'running': self._running, **self.wheel.stats()}
+
+
+# Ação por tipo de timer: caminho "módulo.função" importado no primeiro disparo
+# (as ações dependem dos serviços de mensagem, que por sua vez agendam timers)
+TIMER_ACTIONS = {
+    'reminder.resend': 'src.services.timer_actions.resend_reminder',
+    'medication.resend': 'src.services.timer_actions.resend_medication',
+}
+
+_resolved = {}
+
+
+def _resolve(path: str):
+    fn = _resolved.get(path)
+    if fn is None:
+        module_name, _, attr = path.rpartition('.')
+        fn = _resolved[path] = getattr(importlib.import_module(module_name), attr)
+    return fn
+
+
+# Instância global
+timer_service = TimerService()
+
+
+def init_timer_service(app):
+    """Iniciar a roda de timers deste processo"""
+    try:
+        timer_service.start(app)
+    except Exception as e:
+        logger.error(f"Erro ao iniciar timer service: {e}")
@@ -0,0 +1,155 @@
+"""
+Roda de tempo hierárquica para timers únicos
+
+Três níveis por padrão (tick de 1 s): 60 slots de segundos, 60 de minutos
+e 24 de horas; prazos além de um dia ficam numa lista de estouro revista a
+cada hora. add/remove são O(1); advance() custa O(1) por tick mais O(1)
+por timer vencido ou rebaixado de nível (cada timer desce no máximo uma
+vez por nível). Saltos maiores que a roda inteira (processo parado,
+relógio ajustado) reconstroem a roda em vez de andar tick a tick.
+
+Não é thread-safe: o dono (TimerService) serializa o acesso.
+"""
+
+import time
+from typing import Dict, Hashable, List, Optional, Sequence
+
+_DUE = "due"
+_OVERFLOW = "overflow"
+
+
+class TimingWheel:
+    """Timers identificados por id com prazo em epoch (segundos)"""
+
+    def __init__(self, tick: float = 1.0, sizes: Sequence[int] = (60, 60, 24), now: Optional[float] = None):
+        self.tick = tick
+        self.sizes = tuple(sizes)
+        self._units = [1]
+        for size in self.sizes[:-1]:
+            self._units.append(self._units[-1] * size)
+        self._span = self._units[-1] * self.sizes[-1]
+        self._slots = [[set() for _ in range(size)] for size in self.sizes]
+        self._overflow = set()
+        self._due: Dict[Hashable, None] = {}  # já vencidos ao entrar (ordem de chegada)
+        self._deadline: Dict[Hashable, int] = {}
+        self._where: Dict[Hashable, object] = {}
+        self._current = int((time.time() if now is None else now) // tick)
+
+    def __len__(self) -> int:
+        return len(self._deadline)
+
+    def __contains__(self, timer_id) -> bool:
+        return timer_id in self._deadline
+
+    # ---------- Inserção/remoção ----------
+
+    def add(self, timer_id: Hashable, when: float) -> None:
+        """Agendar (ou reagendar) timer_id para o epoch `when`; nunca dispara antes"""
+        if timer_id in self._deadline:
+            self.remove(timer_id)
+        deadline = int(-(-when // self.tick))
+        self._deadline[timer_id] = deadline
+        self._place(timer_id, deadline)
+
+    def remove(self, timer_id: Hashable) -> bool:
+        where = self._where.pop(timer_id, None)
+        if where is None:
+            return False
+        del self._deadline[timer_id]
+        if where == _DUE:
+            del self._due[timer_id]
+        elif where == _OVERFLOW:
+            self._overflow.discard(timer_id)
+        else:
+            level, slot = where
+            self._slots[level][slot].discard(timer_id)
+        return True
+
+    def _place(self, timer_id, deadline: int) -> None:
+        current = self._current
+        if deadline <= current:
+            self._due[timer_id] = None
+            self._where[timer_id] = _DUE
+            return
+        for level, (unit, size) in enumerate(zip(self._units, self.sizes)):
+            if deadline // unit - current // unit < size:
+                slot = (deadline // unit) % size
+                self._slots[level][slot].add(timer_id)
+                self._where[timer_id] = (level, slot)
+                return
+        self._overflow.add(timer_id)
+        self._where[timer_id] = _OVERFLOW
+
+    # ---------- Avanço ----------
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Avançar o relógio até `now` e devolver os ids vencidos (removidos da roda)"""
+        target = int((time.time() if now is None else now) // self.tick)
+        expired = self._take_due()
+
+        if target - self._current >= self._span:
+            # Salto maior que a roda: reposicionar tudo a partir do novo tick
+            pending = list(self._deadline.items())
+            for level_slots in self._slots:
+                for slot in level_slots:
+                    slot.clear()
+            self._overflow.clear()
+            self._current = target
+            for timer_id, deadline in pending:
+                self._place(timer_id, deadline)
+        else:
+            top = len(self.sizes) - 1
+            while self._current < target:
+                self._current += 1
+                current = self._current
+                # Níveis altos primeiro: o que desce cai no nível de baixo já na posição certa
+                for level in range(top, 0, -1):
+                    unit = self._units[level]
+                    if current % unit == 0:
+                        if level == top and self._overflow:
+                            self._cascade(list(self._overflow), self._overflow)
+                        self._cascade_slot(level, (current // unit) % self.sizes[level])
+                slot = self._slots[0][current % self.sizes[0]]
+                if slot:
+                    expired.extend(slot)
+                    for timer_id in slot:
+                        del self._deadline[timer_id]
+                        del self._where[timer_id]
+                    slot.clear()
+
+        expired.extend(self._take_due())
+        return expired
+
+    def _take_due(self) -> List[Hashable]:
+        due = list(self._due)
+        self._due.clear()
+        for timer_id in due:
+            del self._deadline[timer_id]
+            del self._where[timer_id]
+        return due
+
+    def _cascade_slot(self, level: int, index: int) -> None:
+        slot = self._slots[level][index]
+        if slot:
+            self._cascade(list(slot), slot)
+
+    def _cascade(self, timer_ids: List, source: set) -> None:
+        source.clear()
+        for timer_id in timer_ids:
+            self._place(timer_id, self._deadline[timer_id])
+
+    # ---------- Diagnóstico ----------
+
+    def next_deadline(self) -> Optional[float]:
+        """Menor prazo agendado (epoch) ou None; O(n), só para diagnóstico"""
+        if not self._deadline:
+            return None
+        return min(self._deadline.values()) * self.tick
+
+    def stats(self) -> Dict:
+        return {
+            'timers': len(self._deadline),
+            'levels': [sum(len(slot) for slot in slots) for slots in self._slots],
+            'overflow': len(self._overflow),
+            'tick_seconds': self.tick,
+        }
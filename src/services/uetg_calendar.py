@@ -0,0 +1,138 @@
+"""
+Calendário determinístico do u-ETG
+
+O sorteio de cada paciente/semana sai de um HMAC-SHA256 com a chave
+UETG_DRAW_KEY sobre "<telefone>:<segunda-feira>": reproduzível por quem
+tem a chave (auditoria), imprevisível para o paciente e independente da
+lista de pacientes ou da ordem de processamento.
+
+precompute() calcula N semanas à frente (UETG_PRECOMPUTE_WEEKS) e monta
+o índice dia -> pacientes; is_draw_day() e due_on() respondem em O(1)
+dentro do horizonte e calculam (com cache) fora dele.
+
+Sem UETG_DRAW_KEY o calendário fica desligado (enabled=False): sorteios
+levantam RuntimeError em vez de usar uma chave conhecida, que deixaria o
+paciente prever os dias do exame. "Hoje" é a data no fuso do app (TZ).
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Sem fallback para APP_SECRET nem valor padrão: chave ausente desliga o sorteio
+UETG_DRAW_KEY = (os.getenv("UETG_DRAW_KEY") or "").strip()
+APP_TIMEZONE = os.getenv("TZ") or "America/Sao_Paulo"
+UETG_PRECOMPUTE_WEEKS = int(os.getenv("UETG_PRECOMPUTE_WEEKS") or "8")
+
+# Opções por metade da semana (dias após a segunda-feira)
+EARLY_OFFSETS = (0, 1)  # segunda, terça
+LATE_OFFSETS = (3, 4)   # quinta, sexta
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+def week_start_of(day: date) -> date:
+    """Segunda-feira da semana de `day`"""
+    return day - timedelta(days=day.weekday())
+
+
+def app_today() -> date:
+    """Data de hoje no fuso do app (o servidor costuma rodar em UTC)"""
+    return datetime.now(ZoneInfo(APP_TIMEZONE)).date()
+
+
+class UetgCalendar:
+    """Sorteios por chave + índice pré-calculado por dia"""
+
+    def __init__(self, key: str = UETG_DRAW_KEY, weeks_ahead: int = UETG_PRECOMPUTE_WEEKS):
+        self.enabled = bool(key)
+        self._key = key.encode("utf-8") if key else None
+        # Identifica a chave nas linhas gravadas sem expô-la
+        self.key_id = "hmac:" + hashlib.sha256(self._key).hexdigest()[:8] if key else None
+        self.weeks_ahead = weeks_ahead
+        self._draws: Dict[Tuple[str, date], Tuple[date, date]] = {}
+        self._by_day: Dict[date, FrozenSet[str]] = {}
+        self._patients: FrozenSet[str] = _EMPTY
+        self._horizon: Optional[Tuple[date, date]] = None
+        self._lock = threading.Lock()
+
+    def week_draw(self, patient_key: str, week_start: date) -> Tuple[date, date]:
+        """(dia do início, dia do fim da semana) sorteados para o paciente"""
+        week_start = week_start_of(week_start)
+        cache_key = (str(patient_key), week_start)
+        draw = self._draws.get(cache_key)
+        if draw is None:
+            if not self.enabled:
+                raise RuntimeError("UETG_DRAW_KEY não definido: sorteio u-ETG desligado")
+            digest = hmac.new(self._key, f"{cache_key[0]}:{week_start.isoformat()}".encode("utf-8"),
+                              hashlib.sha256).digest()
+            draw = (
+                week_start + timedelta(days=EARLY_OFFSETS[digest[0] % len(EARLY_OFFSETS)]),
+                week_start + timedelta(days=LATE_OFFSETS[digest[1] % len(LATE_OFFSETS)]),
+            )
+            self._draws[cache_key] = draw
+        return draw
+
+    def precompute(self, patient_keys: Iterable[str], start: Optional[date] = None,
+                   weeks: Optional[int] = None) -> int:
+        """Calcular `weeks` semanas a partir de `start` e trocar o índice por dia; devolve nº de sorteios"""
+        if not self.enabled:
+            logger.warning("UETG_DRAW_KEY não definido: calendário u-ETG não pré-calculado")
+            return 0
+        first_week = week_start_of(start or app_today())
+        weeks = self.weeks_ahead if weeks is None else weeks
+        patients = frozenset(str(k) for k in patient_keys)
+
+        draws: Dict[Tuple[str, date], Tuple[date, date]] = {}
+        by_day: Dict[date, set] = {}
+        for offset in range(weeks):
+            week_start = first_week + timedelta(weeks=offset)
+            for key in patients:
+                draw = draws[(key, week_start)] = self.week_draw(key, week_start)
+                for day in draw:
+                    by_day.setdefault(day, set()).add(key)
+
+        with self._lock:
+            # Descarta sorteios avulsos antigos junto com o índice anterior
+            self._draws = draws
+            self._by_day = {day: frozenset(keys) for day, keys in by_day.items()}
+            self._patients = patients
+            self._horizon = (first_week, first_week + timedelta(weeks=weeks))
+        logger.info(f"Calendário u-ETG: {len(patients)} pacientes x {weeks} semanas a partir de {first_week}")
+        return len(draws)
+
+    def _covers(self, patient_key: str, day: date) -> bool:
+        horizon = self._horizon
+        return horizon is not None and horizon[0] <= day < horizon[1] and patient_key in self._patients
+
+    def is_draw_day(self, patient_key: str, day: date) -> bool:
+        """O dia foi sorteado para o paciente?"""
+        patient_key = str(patient_key)
+        if self._covers(patient_key, day):
+            return patient_key in self._by_day.get(day, _EMPTY)
+        return day in self.week_draw(patient_key, day)
+
+    def due_on(self, day: date) -> FrozenSet[str]:
+        """Pacientes pré-calculados sorteados para o dia"""
+        return self._by_day.get(day, _EMPTY)
+
+    def stats(self) -> Dict:
+        horizon = self._horizon
+        return {
+            "enabled": self.enabled,
+            "key_id": self.key_id,
+            "patients": len(self._patients),
+            "horizon": [horizon[0].isoformat(), horizon[1].isoformat()] if horizon else None,
+            "cached_draws": len(self._draws),
+        }
+
+
+# Instância global
+uetg_calendar = UetgCalendar()
@@ -0,0 +1,198 @@
+"""
+Sorteio u-ETG em lote para todos os pacientes ativos
+
+Pacientes u-ETG: ativos com a tag UETG_PATIENT_TAG (padrão "u-etg", a
+mesma sugerida no cadastro do Admin) mais os extras informados pelo job
+(o paciente legado de UETG_PATIENT_PHONE).
+
+- Sorteio: uma passada por semana com o calendário por chave
+  (src/services/uetg_calendar.py); o id da chave fica gravado em cada
+  linha (draw_seed) e o sorteio é reproduzível com a mesma chave.
+- Gravação: INSERT em lote numa transação; quem já tem sorteio na
+  semana é pulado (o job pode rodar de novo sem duplicar) e linhas que
+  outra execução concorrente gravou antes são ignoradas uma a uma
+  (ON CONFLICT DO NOTHING), sem desfazer o lote.
+- Envio: os pacientes do dia saem de uma consulta indexada por dia,
+  reconferidos na hora (paciente ainda ativo e com a tag u-ETG), e são
+  despachados num pool de threads compartilhado (UETG_SEND_WORKERS).
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from src.models.patient import Patient
+from src.models.uetg import UetgPlanDay
+from src.models.user import db
+from src.services.uetg_calendar import uetg_calendar
+from src.services.uetg_store import uetg_store
+
+logger = logging.getLogger(__name__)
+
+UETG_PATIENT_TAG = (os.getenv("UETG_PATIENT_TAG") or "u-etg").strip().lower()
+UETG_SEND_WORKERS = int(os.getenv("UETG_SEND_WORKERS") or "8")
+
+UetgTarget = namedtuple("UetgTarget", ["phone", "name"])
+
+_TAG_SPLIT_RE = re.compile(r"[,;\s]+")
+
+
+def has_uetg_tag(tags: Optional[str]) -> bool:
+    """A tag u-ETG aparece como item da lista de tags (não como substring)"""
+    return UETG_PATIENT_TAG in {t for t in _TAG_SPLIT_RE.split((tags or "").lower()) if t}
+
+
+class UetgDrawEngine:
+    """Sorteio semanal e envio diário para vários pacientes de uma vez"""
+
+    def __init__(self, store=uetg_store, calendar=uetg_calendar, workers: int = UETG_SEND_WORKERS):
+        self.store = store
+        self.calendar = calendar
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="uetg-send")
+        return self._executor
+
+    # ---------- Pacientes ----------
+
+    def active_patients(self, extra: Sequence[UetgTarget] = ()) -> List[UetgTarget]:
+        """Pacientes u-ETG ativos + `extra`, ordenados por telefone (uma consulta)"""
+        rows = (db.session.query(Patient.phone_e164, Patient.name, Patient.tags)
+                .filter(Patient.active.is_(True),
+                        func.lower(func.coalesce(Patient.tags, "")).like(f"%{UETG_PATIENT_TAG}%"))
+                .all())
+        targets = {phone: UetgTarget(phone, name) for phone, name, tags in rows if has_uetg_tag(tags)}
+        for target in extra:
+            targets.setdefault(target.phone, target)
+        return sorted(targets.values())
+
+    # ---------- Sorteio ----------
+
+    def draw_week(self, week_start: date, patients: Optional[List[UetgTarget]] = None) -> Dict:
+        """
+        Sortear e gravar a semana de todos os pacientes u-ETG
+
+        Returns:
+            {'week_start', 'seed', 'drawn': {telefone: [dias]}, 'skipped': [telefones]}
+        """
+        seed = self.calendar.key_id
+        patients = sorted(patients) if patients is not None else self.active_patients()
+
+        phones = [p.phone for p in patients]
+        existing = {
+            phone for (phone,) in db.session.query(UetgPlanDay.phone_e164)
+            .filter(UetgPlanDay.week_start == week_start, UetgPlanDay.phone_e164.in_(phones))
+            .distinct()
+        } if phones else set()
+
+        planned_at = datetime.utcnow()
+        rows, drawn = [], {}
+        for target in patients:
+            if target.phone in existing:
+                continue
+            days = self.calendar.week_draw(target.phone, week_start)
+            drawn[target.phone] = [d.isoformat() for d in days]
+            rows.extend(
+                {"phone_e164": target.phone, "day": d, "week_start": week_start,
+                 "planned_at": planned_at, "draw_seed": seed}
+                for d in days
+            )
+
+        if rows:
+            try:
+                self._insert_ignoring_conflicts(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                self.store.invalidate()
+
+        logger.info(f"Sorteio u-ETG {week_start}: {len(drawn)} pacientes, {len(existing)} já sorteados (chave={seed})")
+        return {"week_start": week_start.isoformat(), "seed": seed, "drawn": drawn, "skipped": sorted(existing)}
+
+    @staticmethod
+    def _insert_ignoring_conflicts(rows: List[Dict]) -> None:
+        """INSERT em lote; (telefone, dia) já gravado por outra execução é ignorado por linha"""
+        table = UetgPlanDay.__table__
+        dialect = db.engine.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).on_conflict_do_nothing(index_elements=["phone_e164", "day"])
+            db.session.execute(stmt, rows)
+            return
+
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(**row))
+            except IntegrityError:
+                continue
+
+    # ---------- Envio ----------
+
+    def due_on(self, day: date, default_name: str = "Paciente",
+               extra: Sequence[UetgTarget] = ()) -> List[UetgTarget]:
+        """
+        Pacientes sorteados para o dia (consulta pelo índice de dia)
+
+        O sorteio é da semana anterior: quem foi desativado ou perdeu a tag
+        u-ETG desde então não recebe. Telefones sem cadastro só recebem se
+        vierem em `extra` (paciente legado da configuração).
+        """
+        phones = [phone for (phone,) in db.session.query(UetgPlanDay.phone_e164).filter(UetgPlanDay.day == day)]
+        if not phones:
+            return []
+        extras = {target.phone: target for target in extra}
+        patients = {
+            phone: (name, active, tags) for phone, name, active, tags in
+            db.session.query(Patient.phone_e164, Patient.name, Patient.active, Patient.tags)
+            .filter(Patient.phone_e164.in_(phones))
+        }
+
+        targets = []
+        for phone in phones:
+            if phone in patients:
+                name, active, tags = patients[phone]
+                if not active or not (has_uetg_tag(tags) or phone in extras):
+                    continue
+                targets.append(UetgTarget(phone, name or default_name))
+            elif phone in extras:
+                targets.append(UetgTarget(phone, extras[phone].name or default_name))
+        skipped = len(phones) - len(targets)
+        if skipped:
+            logger.info(f"u-ETG {day}: {skipped} sorteados fora do envio (inativos ou sem a tag)")
+        return sorted(targets)
+
+    def dispatch(self, targets: List[UetgTarget], send: Callable[[UetgTarget], bool]) -> Dict[str, bool]:
+        """Executar `send` para cada paciente no pool compartilhado; {telefone: enviado}"""
+        def run(target):
+            try:
+                return bool(send(target))
+            except Exception as e:
+                logger.error(f"Erro no envio u-ETG: {e}")
+                return False
+
+        return dict(zip((t.phone for t in targets), self.executor.map(run, targets)))
+
+
+# Instância global
+uetg_draw_engine = UetgDrawEngine()
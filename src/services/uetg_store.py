@@ -0,0 +1,164 @@
+"""
+Armazenamento do u-ETG (plano semanal e confirmações) no banco
+
+Substitui os arquivos /tmp/uetg_plan.json e /tmp/uetg_confirmations.json:
+- uma linha por (telefone, dia) em uetg_plan_days / uetg_confirmations;
+- confirmação gravada por upsert atômico (INSERT ... ON CONFLICT no
+  PostgreSQL/SQLite), seguro com vários workers confirmando ao mesmo tempo;
+- o plano da semana é regravado numa única transação;
+- leituras do plano passam por um cache em memória com TTL curto
+  (UETG_CACHE_TTL), invalidado pelas gravações deste processo.
+
+Precisa de app context (o job do agendador abre um).
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.uetg import UetgConfirmation, UetgPlanDay
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+UETG_CACHE_TTL = float(os.getenv("UETG_CACHE_TTL") or "60")
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class UetgStore:
+    """Plano e confirmações do u-ETG por telefone do paciente"""
+
+    def __init__(self, ttl: float = UETG_CACHE_TTL):
+        self.ttl = ttl
+        self._cache: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Cache ----------
+
+    def _cached(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._cache[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, phone: Optional[str] = None) -> None:
+        with self._lock:
+            if phone is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[1] == phone]:
+                    del self._cache[key]
+
+    # ---------- Plano ----------
+
+    def save_plan(self, phone: str, week_start, days: List, planned_at: Optional[datetime] = None) -> None:
+        """Regravar os dias sorteados da semana (transação única)"""
+        week_start = _as_date(week_start)
+        planned_at = planned_at or datetime.utcnow()
+        try:
+            UetgPlanDay.query.filter_by(phone_e164=phone, week_start=week_start).delete(synchronize_session=False)
+            # Um dia pode ter sido sorteado em outra semana (replanejamento manual)
+            UetgPlanDay.query.filter(
+                UetgPlanDay.phone_e164 == phone,
+                UetgPlanDay.day.in_([_as_date(d) for d in days]),
+            ).delete(synchronize_session=False)
+            db.session.add_all([
+                UetgPlanDay(phone_e164=phone, day=_as_date(d), week_start=week_start, planned_at=planned_at)
+                for d in days
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            self.invalidate(phone)
+
+    def load_plan(self, phone: str) -> Dict:
+        """Plano mais recente: {'week_start', 'days': [iso...], 'planned_at'} ou {}"""
+        def load():
+            latest = (UetgPlanDay.query.filter_by(phone_e164=phone)
+                      .order_by(UetgPlanDay.week_start.desc()).first())
+            if latest is None:
+                return {}
+            rows = (UetgPlanDay.query.filter_by(phone_e164=phone, week_start=latest.week_start)
+                    .order_by(UetgPlanDay.day).all())
+            return {
+                "week_start": latest.week_start.isoformat(),
+                "days": [row.day.isoformat() for row in rows],
+                "planned_at": max(row.planned_at for row in rows).isoformat(),
+            }
+
+        return self._cached(("plan", phone), load)
+
+    def is_planned(self, phone: str, day) -> bool:
+        """O dia foi sorteado? (consulta indexada por telefone + dia)"""
+        day = _as_date(day)
+        return self._cached(
+            ("day", phone, day),
+            lambda: db.session.query(
+                UetgPlanDay.query.filter_by(phone_e164=phone, day=day).exists()
+            ).scalar(),
+        )
+
+    # ---------- Confirmações ----------
+
+    def save_confirmation(self, phone: str, day, slot: str, patient_name: Optional[str] = None) -> None:
+        """Gravar (ou substituir) o horário confirmado do dia, atomicamente"""
+        values = {
+            "phone_e164": phone,
+            "day": _as_date(day),
+            "slot": slot,
+            "patient_name": patient_name,
+            "confirmed_at": datetime.utcnow(),
+        }
+        update = {k: values[k] for k in ("slot", "patient_name", "confirmed_at")}
+        dialect = db.engine.dialect.name
+
+        try:
+            if dialect in ("postgresql", "sqlite"):
+                if dialect == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(UetgConfirmation.__table__).values(**values)
+                stmt = stmt.on_conflict_do_update(index_elements=["phone_e164", "day"], set_=update)
+                db.session.execute(stmt)
+            else:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(UetgConfirmation.__table__.insert().values(**values))
+                except IntegrityError:
+                    UetgConfirmation.query.filter_by(
+                        phone_e164=phone, day=values["day"]).update(update, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def confirmations(self, phone: str, since=None) -> Dict[str, Dict]:
+        """{dia iso: {'slot', 'patient_name', 'confirmed_at'}} (mesmo formato do JSON antigo)"""
+        query = UetgConfirmation.query.filter_by(phone_e164=phone)
+        if since is not None:
+            query = query.filter(UetgConfirmation.day >= _as_date(since))
+        return {row.day.isoformat(): row.to_dict() for row in query.order_by(UetgConfirmation.day).all()}
+
+
+# Instância global
+uetg_store = UetgStore()
@@ -6,10 +6,11 @@ from src.services.whatsapp_service import WhatsAppService
 from src.models.patient import Patient
 from src.models.reminder import Reminder
 from src.models.response import Response
-from src.models.scale import Scale
+from src.services.scale_registry import scale_registry
 from src.models.medication import Medication, MedicationConfirmation
 from src.models.mood_chart import MoodChart
 from src.models.user import db
+from src.ops.metrics import ACTIVE_SESSIONS
 
 class WhatsAppAdminService:
     """Serviço para interface administrativa via WhatsApp"""
@@ -20,6 +21,7 @@ class WhatsAppAdminService:
         
         # Estados de conversa para fluxos administrativos
         self.conversation_states = {}
+        ACTIVE_SESSIONS.set_function(lambda: len(self.conversation_states), kind='whatsapp_admin')
     
     def handle_command(self, phone_number: str, command: str, user_info: Dict) -> Dict:
         """Processar comando administrativo"""
@@ -311,7 +313,7 @@ Os pacientes receberão lembretes automáticos conforme programado."""
             
             for response in recent_responses:
                 patient = Patient.query.get(response.patient_id)
-                scale = Scale.query.get(response.scale_id)
+                scale = scale_registry.get_by_id(response.scale_id)
                 
                 alert_emoji = "🚨" if response.alert_triggered else "✅"
                 time_str = response.created_at.strftime('%H:%M')
@@ -350,7 +352,7 @@ Todos os pacientes estão com pontuações dentro dos parâmetros normais."""
             
             for alert in alerts:
                 patient = Patient.query.get(alert.patient_id)
-                scale = Scale.query.get(alert.scale_id)
+                scale = scale_registry.get_by_id(alert.scale_id)
                 
                 time_str = alert.created_at.strftime('%H:%M')
                 
@@ -7,7 +7,9 @@ from src.services.whatsapp_questionnaire_service import WhatsAppQuestionnaireSer
 from src.services.whatsapp_scheduler_service import WhatsAppSchedulerService
 from src.services.whatsapp_mood_service import WhatsAppMoodService
 from src.models.patient import Patient
-from src.models.breathing_exercise import BreathingExercise
+from src.services.patient_cache import PatientSnapshot, patient_cache
+from src.services.reference_cache import breathing_catalog
+from src.messaging.callbacks import CallbackRouter
 from src.models.user import db
 
 
@@ -25,6 +27,16 @@ class WhatsAppMessageHandler:
         # Número do administrador (configurado via variável de ambiente)
         self.admin_phone = os.getenv("ADMIN_PHONE_NUMBER")
 
+        # Família da rota de callback -> handler (src/messaging/callbacks.py)
+        self.callback_router = CallbackRouter({
+            "uetg": self._handle_uetg_slot_callback,
+            "questionnaire": self._handle_questionnaire_callback,
+            "medication": self._handle_medication_callback,
+            "mood": self._handle_mood_callback,
+            "breathing": self._handle_breathing_callback,
+            "reminder": self._handle_reminder_action,
+        })
+
     def handle_webhook(self, webhook_data: Dict) -> Dict:
         """
         Processar webhook do WhatsApp
@@ -115,9 +127,11 @@ class WhatsAppMessageHandler:
             # AUTO-CADASTRO: Garantir que o paciente existe ANTES de qualquer guard
             patient = self._get_or_create_patient(user_info)
             if patient and not patient.is_active:
-                # Reativar paciente se estiver inativo
-                patient.is_active = True
+                # Reativar paciente se estiver inativo (o commit invalida o cache)
+                record = db.session.get(Patient, patient.id)
+                record.is_active = True
                 db.session.commit()
+                patient = patient_cache.store(record)
                 self.logger.info(f"Paciente reativado: {patient.name}")
             
             # Extrair ID da resposta de forma robusta
@@ -164,56 +178,10 @@ class WhatsAppMessageHandler:
                     phone_number, final_response, user_info
                 )
 
-            # Verificar se é confirmação de horário u-ETG (PRIORIDADE - sem guard adicional)
-            if final_response.startswith("slot_"):
-                if patient:
-                    return self._handle_uetg_slot_callback(
-                        phone_number, final_response, patient
-                    )
-
-            # Para outros fluxos, usar o paciente já criado/reativado
-            # Verificar se é resposta de questionário
-            if final_response.startswith("questionnaire_") or final_response.startswith(
-                "start_questionnaire_"
-            ):
-                if patient:
-                    return self._handle_questionnaire_callback(
-                        phone_number, final_response, patient
-                    )
-
-            # Verificar se é confirmação de medicação
-            if final_response.startswith("medication_"):
-                if patient:
-                    return self._handle_medication_callback(
-                        phone_number, final_response, patient
-                    )
-
-            # Verificar se é registro de humor
-            if final_response.startswith("mood_") or final_response.startswith(
-                "start_mood_"
-            ):
-                if patient:
-                    return self._handle_mood_callback(
-                        phone_number, final_response, patient
-                    )
-
-            # Verificar se é exercício de respiração
-            if final_response.startswith("breathing_") or final_response.startswith(
-                "start_breathing_"
-            ):
-                if patient:
-                    return self._handle_breathing_callback(
-                        phone_number, final_response, patient
-                    )
-
-            # Verificar se é ação de lembrete (snooze, skip)
-            if final_response.startswith("snooze_") or final_response.startswith(
-                "skip_"
-            ):
-                if patient:
-                    return self._handle_reminder_action(
-                        phone_number, final_response, patient
-                    )
+            # Demais fluxos: rota pelo prefixo (ou id compacto), usando o paciente já criado/reativado
+            handler, callback = self.callback_router.resolve(final_response)
+            if handler and patient:
+                return handler(phone_number, callback.data, patient)
 
             self.logger.info(f"Resposta interativa não reconhecida: {final_response}")
             return {"status": "processed", "action": "interactive_handled"}
@@ -287,8 +255,8 @@ class WhatsAppMessageHandler:
     def _handle_reminder_action(
         self, phone_number: str, callback_data: str, patient: Patient
     ) -> Dict:
-        """Processar ações de lembrete (snooze, skip)"""
-        if callback_data.startswith("snooze_"):
+        """Processar ações de lembrete (snooze, delay, skip)"""
+        if callback_data.startswith(("snooze_", "delay_reminder_")):
             return self.scheduler_service.handle_reminder_snooze(
                 phone_number, callback_data, patient
             )
@@ -334,14 +302,14 @@ Aguarde os lembretes automáticos ou digite *menu* para ver as opções disponí
         self.whatsapp_service.send_text_message(phone_number, message)
         return {"status": "sent", "action": "welcome_message_sent"}
 
-    def _get_or_create_patient(self, user_info: Dict) -> Patient:
+    def _get_or_create_patient(self, user_info: Dict) -> PatientSnapshot:
         """Obter ou criar paciente"""
         phone_number = user_info.get("phone_number")
         if not phone_number:
             return None
 
-        # Buscar paciente existente
-        patient = Patient.query.filter_by(whatsapp_phone=phone_number).first()
+        # Buscar paciente existente (cache por telefone)
+        patient = patient_cache.lookup("whatsapp_phone", phone_number)
 
         if not patient:
             # Criar novo paciente
@@ -352,6 +320,7 @@ Aguarde os lembretes automáticos ou digite *menu* para ver as opções disponí
             )
             db.session.add(patient)
             db.session.commit()
+            patient = patient_cache.store(patient)
 
         return patient
 
@@ -369,7 +338,7 @@ Aguarde os lembretes automáticos ou digite *menu* para ver as opções disponí
     ) -> Dict:
         """Iniciar exercício de respiração"""
         try:
-            exercise = BreathingExercise.query.get(exercise_id)
+            exercise = breathing_catalog().by_id.get(exercise_id)
             if not exercise:
                 self.whatsapp_service.send_text_message(
                     phone_number, "❌ Exercício de respiração não encontrado."
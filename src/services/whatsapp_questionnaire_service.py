@@ -5,9 +5,9 @@ from typing import Dict, List
 from datetime import datetime
 from src.services.whatsapp_service import WhatsAppService
 from src.models.patient import Patient
-from src.models.scale import Scale
 from src.models.response import Response
 from src.models.user import db
+from src.services.scale_registry import scale_registry, CompiledScale
 
 class WhatsAppQuestionnaireService:
     """Serviço para gerenciar questionários dinâmicos via WhatsApp"""
@@ -22,8 +22,8 @@ class WhatsAppQuestionnaireService:
     def start_questionnaire(self, phone_number: str, scale_name: str, patient: Patient) -> Dict:
         """Iniciar questionário para uma escala específica"""
         try:
-            # Buscar escala no banco de dados
-            scale = Scale.query.filter_by(name=scale_name).first()
+            # Buscar escala compilada
+            scale = scale_registry.get(scale_name)
             if not scale:
                 self.whatsapp_service.send_text_message(
                     phone_number,
@@ -35,7 +35,7 @@ class WhatsAppQuestionnaireService:
             today = datetime.now().date()
             existing_response = Response.query.filter(
                 Response.patient_id == patient.id,
-                Response.scale_id == scale.id,
+                Response.scale_id == scale.scale_id,
                 db.func.date(Response.created_at) == today
             ).first()
             
@@ -53,12 +53,11 @@ Obrigado por manter seus registros em dia! 👏"""
                 return {"status": "already_completed", "action": "questionnaire_already_completed"}
             
             # Inicializar estado do questionário
-            questions = json.loads(scale.questions)
             questionnaire_state = {
                 "patient_id": patient.id,
-                "scale_id": scale.id,
+                "scale_id": scale.scale_id,
+                "scale_key": scale.key,
                 "scale_name": scale.name,
-                "questions": questions,
                 "current_question": 0,
                 "responses": [],
                 "started_at": datetime.now().isoformat()
@@ -98,7 +97,7 @@ Obrigado por manter seus registros em dia! 👏"""
             state["current_question"] += 1
             
             # Verificar se terminou o questionário
-            if state["current_question"] >= len(state["questions"]):
+            if state["current_question"] >= scale_registry.get(state["scale_key"]).question_count:
                 return self._finish_questionnaire(phone_number, state)
             else:
                 return self._send_current_question(phone_number)
@@ -112,17 +111,15 @@ Obrigado por manter seus registros em dia! 👏"""
         try:
             state = self.active_questionnaires[phone_number]
             current_q = state["current_question"]
-            questions = state["questions"]
+            scale = scale_registry.get(state["scale_key"])
             
-            if current_q >= len(questions):
+            if not scale or current_q >= scale.question_count:
                 return {"status": "error", "message": "No more questions"}
             
-            question_data = questions[current_q]
-            question_text = question_data["question"]
-            options = question_data["options"]
+            question_text, options = scale.questions[current_q]
             
             # Cabeçalho com progresso
-            progress = f"({current_q + 1}/{len(questions)})"
+            progress = f"({current_q + 1}/{scale.question_count})"
             header = f"📋 {state['scale_name']} {progress}"
             
             # Corpo da mensagem
@@ -132,8 +129,8 @@ Obrigado por manter seus registros em dia! 👏"""
             buttons = []
             for i, option in enumerate(options[:3]):
                 buttons.append({
-                    "id": f"questionnaire_answer_{option['value']}",
-                    "title": f"{option['value']}. {option['text'][:15]}..."  # Limitar texto do botão
+                    "id": f"questionnaire_answer_{option.score}",
+                    "title": f"{option.score}. {option.label[:15]}..."  # Limitar texto do botão
                 })
             
             # Se há mais de 3 opções, usar lista
@@ -142,9 +139,9 @@ Obrigado por manter seus registros em dia! 👏"""
                     "title": "Opções de Resposta",
                     "rows": [
                         {
-                            "id": f"questionnaire_answer_{option['value']}",
-                            "title": f"{option['value']}. {option['text'][:20]}",
-                            "description": option['text'][:60] if len(option['text']) > 20 else ""
+                            "id": f"questionnaire_answer_{option.score}",
+                            "title": f"{option.score}. {option.label[:20]}",
+                            "description": option.label[:60] if len(option.label) > 20 else ""
                         }
                         for option in options
                     ]
@@ -177,15 +174,13 @@ Obrigado por manter seus registros em dia! 👏"""
             # Calcular pontuação total
             total_score = sum(state["responses"])
             
-            # Buscar escala para obter thresholds
-            scale = Scale.query.get(state["scale_id"])
+            # Escala compilada com limiar de alerta
+            scale = scale_registry.get(state["scale_key"])
             if not scale:
                 return {"status": "error", "message": "Scale not found"}
             
             # Determinar se é um alerta
-            thresholds = json.loads(scale.scoring_thresholds) if scale.scoring_thresholds else {}
-            alert_threshold = thresholds.get("alert", 999)
-            is_alert = total_score >= alert_threshold
+            is_alert = scale.is_alarming(total_score)
             
             # Salvar resposta no banco de dados
             response = Response(
@@ -222,7 +217,7 @@ Obrigado por manter seus registros em dia! 👏"""
             self.logger.error(f"Erro ao finalizar questionário: {e}")
             return {"status": "error", "message": str(e)}
     
-    def _send_questionnaire_result(self, phone_number: str, state: Dict, score: int, is_alert: bool, scale: Scale) -> None:
+    def _send_questionnaire_result(self, phone_number: str, state: Dict, score: int, is_alert: bool, scale: CompiledScale) -> None:
         """Enviar resultado do questionário para o paciente"""
         try:
             scale_name = state["scale_name"]
@@ -231,7 +226,7 @@ Obrigado por manter seus registros em dia! 👏"""
             if is_alert:
                 emoji = "🚨"
                 status_msg = "Pontuação elevada - Recomendamos contato com seu profissional de saúde"
-            elif score <= (json.loads(scale.scoring_thresholds).get("low", 0) if scale.scoring_thresholds else 5):
+            elif score <= (scale.categories[0].max_score if scale.categories else 5):
                 emoji = "✅"
                 status_msg = "Pontuação baixa - Continue cuidando bem de você!"
             else:
@@ -261,7 +256,7 @@ Obrigado por responder! Suas informações foram enviadas ao seu profissional de
         except Exception as e:
             self.logger.error(f"Erro ao enviar resultado: {e}")
     
-    def _notify_admin_alert(self, state: Dict, score: int, scale: Scale) -> None:
+    def _notify_admin_alert(self, state: Dict, score: int, scale: CompiledScale) -> None:
         """Notificar administrador sobre pontuação de alerta"""
         try:
             patient = Patient.query.get(state["patient_id"])
@@ -307,14 +302,13 @@ Obrigado por responder! Suas informações foram enviadas ao seu profissional de
     
     def get_available_scales(self) -> List[Dict]:
         """Obter escalas disponíveis"""
-        scales = Scale.query.filter_by(is_active=True).all()
         return [
             {
                 "name": scale.name,
-                "description": scale.description,
-                "questions_count": len(json.loads(scale.questions)) if scale.questions else 0
+                "description": scale.description or "",
+                "questions_count": scale.question_count
             }
-            for scale in scales
+            for scale in scale_registry.db_scales()
         ]
     
     def send_scale_menu(self, phone_number: str, patient: Patient) -> Dict:
@@ -6,9 +6,14 @@ from src.services.whatsapp_service import WhatsAppService
 from src.models.patient import Patient
 from src.models.reminder import Reminder
 from src.models.medication import Medication, MedicationConfirmation
-from src.models.breathing_exercise import BreathingExercise
+from src.services.reference_cache import breathing_catalog
+from src.services.timer_service import timer_service
 from src.models.user import db
 
+# Minutos de adiamento (iguais aos rótulos dos botões dos templates)
+MEDICATION_SNOOZE_MINUTES = 30
+REMINDER_SNOOZE_MINUTES = 60
+
 class WhatsAppSchedulerService:
     """Serviço de agendamento para enviar lembretes automáticos via WhatsApp"""
     
@@ -19,27 +24,12 @@ class WhatsAppSchedulerService:
     def send_questionnaire_reminder(self, patient: Patient, scale_name: str, reminder: Reminder) -> Dict:
         """Enviar lembrete de questionário"""
         try:
-            message = f"""📋 *Lembrete de Questionário*
-
-Olá, {patient.name}! 
-
-É hora de responder o questionário *{scale_name}*.
-
-Este questionário ajuda seu profissional de saúde a acompanhar seu progresso e bem-estar.
-
-⏱️ *Tempo estimado:* 2-3 minutos"""
-            
-            buttons = [
-                {"id": f"start_questionnaire_{scale_name}", "title": "📝 Responder Agora"},
-                {"id": f"snooze_reminder_{reminder.id}", "title": "⏰ Lembrar em 1h"},
-                {"id": f"skip_reminder_{reminder.id}", "title": "⏭️ Pular Hoje"}
-            ]
-            
-            result = self.whatsapp_service.send_interactive_message(
+            result = self.whatsapp_service.send_template(
                 patient.whatsapp_phone,
-                "Lembrete de Questionário",
-                message,
-                buttons
+                'questionnaire_reminder',
+                name=patient.name,
+                scale_name=scale_name,
+                reminder_id=reminder.id
             )
             
             if result.get('success'):
@@ -54,34 +44,17 @@ Este questionário ajuda seu profissional de saúde a acompanhar seu progresso e
     def send_medication_reminder(self, patient: Patient, medication: Medication, reminder: Reminder) -> Dict:
         """Enviar lembrete de medicação"""
         try:
-            message = f"""💊 *Lembrete de Medicação*
-
-Olá, {patient.name}!
-
-É hora de tomar sua medicação:
-
-💊 *{medication.name}*
-📏 *Dosagem:* {medication.dosage}
-🕐 *Horário:* {medication.time.strftime('%H:%M')}
-
-"""
-            
-            if medication.instructions:
-                message += f"📝 *Instruções:* {medication.instructions}\n\n"
-            
-            message += "Por favor, confirme quando tomar a medicação:"
-            
-            buttons = [
-                {"id": f"medication_taken_{medication.id}", "title": "✅ Tomei"},
-                {"id": f"medication_snooze_{medication.id}", "title": "⏰ Lembrar em 30min"},
-                {"id": f"medication_skip_{medication.id}", "title": "❌ Não vou tomar"}
-            ]
+            instructions = f"📝 *Instruções:* {medication.instructions}\n\n" if medication.instructions else ""
             
-            result = self.whatsapp_service.send_interactive_message(
+            result = self.whatsapp_service.send_template(
                 patient.whatsapp_phone,
-                "Lembrete de Medicação",
-                message,
-                buttons
+                'medication_reminder',
+                name=patient.name,
+                medication_name=medication.name,
+                dosage=medication.dosage,
+                time=medication.time.strftime('%H:%M'),
+                instructions=instructions,
+                medication_id=medication.id
             )
             
             if result.get('success'):
@@ -96,27 +69,11 @@ Olá, {patient.name}!
     def send_mood_reminder(self, patient: Patient, reminder: Reminder) -> Dict:
         """Enviar lembrete de registro de humor"""
         try:
-            message = f"""😊 *Lembrete de Registro de Humor*
-
-Olá, {patient.name}!
-
-Como você está se sentindo hoje?
-
-O registro diário de humor ajuda seu profissional de saúde a entender melhor seus padrões e ajustar o tratamento.
-
-⏱️ *Tempo estimado:* 1-2 minutos"""
-            
-            buttons = [
-                {"id": "start_mood_chart", "title": "😊 Registrar Humor"},
-                {"id": f"snooze_reminder_{reminder.id}", "title": "⏰ Lembrar em 2h"},
-                {"id": f"skip_reminder_{reminder.id}", "title": "⏭️ Pular Hoje"}
-            ]
-            
-            result = self.whatsapp_service.send_interactive_message(
+            result = self.whatsapp_service.send_template(
                 patient.whatsapp_phone,
-                "Registro de Humor",
-                message,
-                buttons
+                'mood_reminder',
+                name=patient.name,
+                reminder_id=reminder.id
             )
             
             if result.get('success'):
@@ -131,30 +88,11 @@ O registro diário de humor ajuda seu profissional de saúde a entender melhor s
     def send_breathing_reminder(self, patient: Patient, reminder: Reminder) -> Dict:
         """Enviar lembrete de exercício de respiração"""
         try:
-            message = f"""🫁 *Lembrete de Exercício de Respiração*
-
-Olá, {patient.name}!
-
-Que tal fazer um exercício de respiração para relaxar?
-
-Os exercícios de respiração ajudam a:
-• Reduzir ansiedade e estresse
-• Melhorar o foco e concentração
-• Promover relaxamento
-
-⏱️ *Duração:* 3-15 minutos"""
-            
-            buttons = [
-                {"id": "breathing_menu", "title": "🫁 Ver Exercícios"},
-                {"id": f"snooze_reminder_{reminder.id}", "title": "⏰ Lembrar em 1h"},
-                {"id": f"skip_reminder_{reminder.id}", "title": "⏭️ Pular Hoje"}
-            ]
-            
-            result = self.whatsapp_service.send_interactive_message(
+            result = self.whatsapp_service.send_template(
                 patient.whatsapp_phone,
-                "Exercício de Respiração",
-                message,
-                buttons
+                'breathing_reminder',
+                name=patient.name,
+                reminder_id=reminder.id
             )
             
             if result.get('success'):
@@ -219,7 +157,7 @@ Continue cuidando bem de você."""
         """Confirmar que medicação foi tomada"""
         try:
             medication = Medication.query.get(medication_id)
-            if not medication:
+            if not medication or str(medication.patient_id) != str(patient.id):
                 return {"status": "error", "message": "Medication not found"}
             
             # Registrar confirmação
@@ -252,16 +190,25 @@ Continue mantendo sua rotina de medicação em dia! 👏"""
     def _snooze_medication_reminder(self, phone_number: str, medication_id: int, patient: Patient) -> Dict:
         """Adiar lembrete de medicação"""
         try:
-            message = """⏰ *Lembrete Adiado*
+            medication = Medication.query.get(medication_id)
+            if not medication or str(medication.patient_id) != str(patient.id):
+                return {"status": "error", "message": "Medication not found"}
+            
+            timer_service.schedule(
+                'medication.resend',
+                {'medication_id': medication_id, 'patient_id': patient.id},
+                delay=timedelta(minutes=MEDICATION_SNOOZE_MINUTES),
+                dedupe_key=f"medication:{patient.id}:{medication_id}"
+            )
+            
+            message = f"""⏰ *Lembrete Adiado*
 
-Ok! Vou te lembrar novamente em 30 minutos.
+Ok! Vou te lembrar novamente em {MEDICATION_SNOOZE_MINUTES} minutos.
 
 Não se esqueça da sua medicação! 💊"""
             
             self.whatsapp_service.send_text_message(phone_number, message)
             
-            # TODO: Implementar reagendamento automático
-            
             return {"status": "snoozed", "action": "medication_snoozed"}
             
         except Exception as e:
@@ -272,7 +219,7 @@ Não se esqueça da sua medicação! 💊"""
         """Pular medicação"""
         try:
             medication = Medication.query.get(medication_id)
-            if not medication:
+            if not medication or str(medication.patient_id) != str(patient.id):
                 return {"status": "error", "message": "Medication not found"}
             
             # Registrar como pulada
@@ -308,19 +255,33 @@ Se tiver dúvidas sobre sua medicação, converse com seu profissional de saúde
     def handle_reminder_snooze(self, phone_number: str, callback_data: str, patient: Patient) -> Dict:
         """Processar adiamento de lembrete"""
         try:
-            reminder_id = int(callback_data.split('_')[-1])
+            # Formato: snooze_reminder_X[_Y] (ou delay_reminder_X) onde Y são os minutos
+            parts = callback_data.split('_')
+            reminder_id = int(parts[2])
+            minutes = int(parts[3]) if len(parts) > 3 else REMINDER_SNOOZE_MINUTES
+            
+            reminder = Reminder.query.get(reminder_id)
+            # Lembrete de outro paciente: mesma resposta que inexistente
+            if not reminder or str(reminder.patient_id) != str(patient.id):
+                return {"status": "error", "message": "Reminder not found"}
+            
+            timer_service.schedule(
+                'reminder.resend',
+                {'reminder_id': reminder_id, 'channel': 'whatsapp'},
+                delay=timedelta(minutes=minutes),
+                dedupe_key=f"reminder:{reminder_id}"
+            )
+            new_time = datetime.now() + timedelta(minutes=minutes)
             
-            message = """⏰ *Lembrete Adiado*
+            message = f"""⏰ *Lembrete Adiado*
 
-Ok! Vou te lembrar novamente mais tarde.
+Ok! Vou te lembrar novamente às {new_time.strftime('%H:%M')}.
 
 Obrigado por manter seus cuidados em dia! 👍"""
             
             self.whatsapp_service.send_text_message(phone_number, message)
             
-            # TODO: Implementar reagendamento automático
-            
-            return {"status": "snoozed", "action": "reminder_snoozed"}
+            return {"status": "snoozed", "action": "reminder_snoozed", "minutes": minutes}
             
         except Exception as e:
             self.logger.error(f"Erro ao adiar lembrete: {e}")
@@ -348,9 +309,9 @@ Estamos aqui para apoiar você no seu ritmo. 💚"""
     def send_breathing_exercises_menu(self, phone_number: str, patient: Patient) -> Dict:
         """Enviar menu de exercícios de respiração"""
         try:
-            exercises = BreathingExercise.query.filter_by(is_active=True).all()
+            catalog = breathing_catalog()
             
-            if not exercises:
+            if not catalog.exercises:
                 self.whatsapp_service.send_text_message(
                     phone_number,
                     "❌ Nenhum exercício de respiração disponível no momento."
@@ -361,18 +322,8 @@ Estamos aqui para apoiar você no seu ritmo. 💚"""
 
 Escolha um exercício para começar:"""
             
-            # Preparar seções para lista
-            sections = [{
-                "title": "Exercícios Disponíveis",
-                "rows": [
-                    {
-                        "id": f"start_breathing_{exercise.id}",
-                        "title": exercise.name,
-                        "description": f"{exercise.duration_minutes}min - {exercise.description[:50]}..."
-                    }
-                    for exercise in exercises[:10]  # Máximo 10 exercícios
-                ]
-            }]
+            # Seções da lista montadas uma vez por versão do catálogo
+            sections = catalog.menu_sections
             
             self.whatsapp_service.send_list_message(
                 phone_number,
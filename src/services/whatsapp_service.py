@@ -1,8 +1,9 @@
-import requests
 import json
 import os
 from datetime import datetime
 from typing import Dict, List, Optional
+from src.templates.message_templates import get_message_template
+from src.ops.metrics import timed_post
 
 class WhatsAppService:
     """Serviço para integração com WhatsApp Business API"""
@@ -35,7 +36,7 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.text', url, headers=self.headers, json=payload)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -83,7 +84,7 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.interactive', url, headers=self.headers, json=payload)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -121,7 +122,30 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.list', url, headers=self.headers, json=payload)
+            return {
+                'success': response.status_code == 200,
+                'response': response.json(),
+                'status_code': response.status_code
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'status_code': 500
+            }
+    
+    def send_template(self, to: str, template_name: str, **fields) -> Dict:
+        """Enviar mensagem a partir de um template pré-compilado (src/templates/message_templates.py)"""
+        template = get_message_template(template_name)
+        return self.send_payload(template.render_payload(to, **fields))
+    
+    def send_payload(self, data: bytes) -> Dict:
+        """Enviar payload JSON já serializado"""
+        url = f"{self.base_url}/messages"
+        
+        try:
+            response = timed_post('messages.payload', url, headers=self.headers, data=data)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -148,7 +172,7 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.audio', url, headers=self.headers, json=payload)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -177,7 +201,7 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.document', url, headers=self.headers, json=payload)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -201,7 +225,7 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = timed_post('messages.read', url, headers=self.headers, json=payload)
             return {
                 'success': response.status_code == 200,
                 'response': response.json(),
@@ -0,0 +1,320 @@
+"""
+Templates de lembretes com renderização pré-compilada
+
+Cada template (cabeçalho, corpo e botões) é compilado uma vez no import:
+o payload da API do WhatsApp é serializado com marcadores no lugar dos
+campos variáveis e quebrado em trechos de JSON prontos. No envio só os
+campos do paciente são escapados e concatenados aos trechos em cache, sem
+montar dicionários nem chamar json.dumps no payload inteiro.
+"""
+
+import json
+import re
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+# Marcadores em área de uso privado do Unicode (não aparecem nos textos)
+_FIELD_START = '\ue000'
+_FIELD_END = '\ue001'
+_MARKER_RE = re.compile(f'{_FIELD_START}([a-z_]+){_FIELD_END}')
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+
+
+def _mark(text: str) -> str:
+    """Trocar {campo} pelo marcador do campo"""
+    parts = []
+    for literal, field, _spec, _conv in Formatter().parse(text):
+        parts.append(literal)
+        if field is not None:
+            parts.append(f'{_FIELD_START}{field}{_FIELD_END}')
+    return ''.join(parts)
+
+
+def _escape(value) -> str:
+    """Valor escapado para dentro de uma string JSON"""
+    if value is None:
+        return ''
+    text = value if type(value) is str else str(value)
+    if _NEEDS_ESCAPE.search(text) is None:
+        return text
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+class CompiledMessage:
+    """Template de mensagem com payload JSON pré-serializado"""
+
+    __slots__ = ('name', 'header', 'body', 'buttons', 'fields', '_segments', '_slots')
+
+    def __init__(self, name: str, body: str, header: Optional[str] = None,
+                 buttons: Optional[List[Tuple[str, str]]] = None):
+        self.name = name
+        self.header = header
+        self.body = body
+        self.buttons = tuple(buttons or ())
+
+        if self.buttons:
+            payload = {
+                "messaging_product": "whatsapp",
+                "to": "{to}",
+                "type": "interactive",
+                "interactive": {
+                    "type": "button",
+                    "header": {"type": "text", "text": header or ''},
+                    "body": {"text": body},
+                    "action": {
+                        "buttons": [
+                            {"type": "reply", "reply": {"id": button_id, "title": title}}
+                            for button_id, title in self.buttons
+                        ]
+                    }
+                }
+            }
+        else:
+            payload = {
+                "messaging_product": "whatsapp",
+                "to": "{to}",
+                "type": "text",
+                "text": {"body": body}
+            }
+
+        serialized = json.dumps(self._mark_payload(payload), ensure_ascii=False)
+
+        # Trechos alternados: texto JSON fixo, nome do campo, texto fixo...
+        segments = _MARKER_RE.split(serialized)
+        self._segments = tuple(segments)
+        self._slots = tuple((segments[i], segments[i + 1]) for i in range(1, len(segments), 2))
+        self.fields = frozenset(segments[1::2])
+
+    def _mark_payload(self, value):
+        if isinstance(value, dict):
+            return {k: self._mark_payload(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._mark_payload(v) for v in value]
+        if isinstance(value, str):
+            return _mark(value)
+        return value
+
+    def render_text(self, **values) -> str:
+        """Corpo da mensagem com os campos preenchidos (canais de texto)"""
+        return self.body.format_map(values)
+
+    def render_buttons(self, **values) -> Tuple[Tuple[str, str], ...]:
+        """Botões [(id, título)] com os campos preenchidos (canais sem payload próprio)"""
+        return tuple(
+            (button_id.format_map(values), title.format_map(values))
+            for button_id, title in self.buttons
+        )
+
+    def render_payload(self, to: str, **values) -> bytes:
+        """Payload JSON completo para a API do WhatsApp"""
+        values['to'] = to
+        parts = [self._segments[0]]
+        append = parts.append
+        for field, literal in self._slots:
+            append(_escape(values.get(field)))
+            append(literal)
+        return ''.join(parts).encode('utf-8')
+
+
+# Definições: nome -> (cabeçalho, corpo, botões [(id, título)])
+_TEMPLATE_SPECS = {
+    'questionnaire_reminder': (
+        "Lembrete de Questionário",
+        """📋 *Lembrete de Questionário*
+
+Olá, {name}!
+
+É hora de responder o questionário *{scale_name}*.
+
+Este questionário ajuda seu profissional de saúde a acompanhar seu progresso e bem-estar.
+
+⏱️ *Tempo estimado:* 2-3 minutos""",
+        [
+            ("start_questionnaire_{scale_name}", "📝 Responder Agora"),
+            ("snooze_reminder_{reminder_id}", "⏰ Lembrar em 1h"),
+            ("skip_reminder_{reminder_id}", "⏭️ Pular Hoje"),
+        ]
+    ),
+    'medication_reminder': (
+        "Lembrete de Medicação",
+        """💊 *Lembrete de Medicação*
+
+Olá, {name}!
+
+É hora de tomar sua medicação:
+
+💊 *{medication_name}*
+📏 *Dosagem:* {dosage}
+🕐 *Horário:* {time}
+
+{instructions}Por favor, confirme quando tomar a medicação:""",
+        [
+            ("medication_taken_{medication_id}", "✅ Tomei"),
+            ("medication_snooze_{medication_id}", "⏰ Lembrar em 30min"),
+            ("medication_skip_{medication_id}", "❌ Não vou tomar"),
+        ]
+    ),
+    'mood_reminder': (
+        "Registro de Humor",
+        """😊 *Lembrete de Registro de Humor*
+
+Olá, {name}!
+
+Como você está se sentindo hoje?
+
+O registro diário de humor ajuda seu profissional de saúde a entender melhor seus padrões e ajustar o tratamento.
+
+⏱️ *Tempo estimado:* 1-2 minutos""",
+        [
+            ("start_mood_chart", "😊 Registrar Humor"),
+            ("snooze_reminder_{reminder_id}_120", "⏰ Lembrar em 2h"),
+            ("skip_reminder_{reminder_id}", "⏭️ Pular Hoje"),
+        ]
+    ),
+    'breathing_reminder': (
+        "Exercício de Respiração",
+        """🫁 *Lembrete de Exercício de Respiração*
+
+Olá, {name}!
+
+Que tal fazer um exercício de respiração para relaxar?
+
+Os exercícios de respiração ajudam a:
+• Reduzir ansiedade e estresse
+• Melhorar o foco e concentração
+• Promover relaxamento
+
+⏱️ *Duração:* 3-15 minutos""",
+        [
+            ("breathing_menu", "🫁 Ver Exercícios"),
+            ("snooze_reminder_{reminder_id}", "⏰ Lembrar em 1h"),
+            ("skip_reminder_{reminder_id}", "⏭️ Pular Hoje"),
+        ]
+    ),
+    'scale_reminder': (
+        "📋 Questionário Agendado",
+        """📋 *Lembrete de Questionário*
+
+Olá {name}! 👋
+
+É hora de responder o questionário **{title}**.
+
+{description}
+
+Este questionário ajuda no acompanhamento do seu tratamento. Vamos começar?""",
+        [
+            ("start_scale_{scale_type}", "📋 Começar agora"),
+            ("delay_reminder_{reminder_id}", "⏰ Lembrar em 1h"),
+            ("help_questionnaire", "❓ Preciso de ajuda"),
+        ]
+    ),
+    'task_reminder': (
+        "📝 Tarefa Agendada",
+        """📝 *Lembrete de Tarefa*
+
+Olá {name}! 👋
+
+**{title}**
+
+{description}
+
+Por favor, complete esta tarefa e me informe quando terminar.""",
+        [
+            ("task_completed_{reminder_id}", "✅ Tarefa concluída"),
+            ("task_help_{reminder_id}", "❓ Preciso de ajuda"),
+            ("delay_reminder_{reminder_id}", "⏰ Lembrar depois"),
+        ]
+    ),
+    'motivational_reminder': (
+        None,
+        """✨ *Mensagem Motivacional*
+
+Olá {name}! 🌟
+
+{text}
+
+Lembre-se: você é mais forte do que imagina! 💪
+
+Continue cuidando de si mesmo. Estou aqui para apoiá-lo! 🤗""",
+        None
+    ),
+    'breathing_exercise_reminder': (
+        "🫁 Momento de Respirar",
+        """🫁 *Hora do Exercício de Respiração*
+
+Olá {name}! 😌
+
+Que tal fazer uma pausa para um exercício de respiração?
+
+Isso pode ajudar a:
+• Reduzir o estresse
+• Melhorar o foco
+• Relaxar o corpo e a mente
+
+Escolha um exercício para começar:""",
+        [
+            ("breathing_478", "🫁 Respiração 4-7-8"),
+            ("breathing_box", "📦 Respiração Quadrada"),
+            ("breathing_anxiety", "😰 Anti-Ansiedade"),
+            ("breathing_list", "📋 Ver todos"),
+        ]
+    ),
+    'mood_chart_reminder': (
+        "😊 Registro de Humor",
+        """😊 *Registro de Humor Diário*
+
+Olá {name}! 📊
+
+Como você está se sentindo hoje?
+
+É importante registrar seu humor diariamente para acompanhar sua evolução.
+
+Vamos fazer o registro de hoje?""",
+        [
+            ("start_mood_chart", "😊 Registrar humor"),
+            ("mood_help", "❓ Como funciona?"),
+            ("delay_reminder_{reminder_id}", "⏰ Lembrar depois"),
+        ]
+    ),
+    'mood_evening_reminder': (
+        "😊 Registro de Humor",
+        """😊 *Lembrete de Humor*
+
+Olá {name}! 🌙
+
+Você ainda não registrou seu humor hoje.
+
+Que tal fazer isso agora antes de dormir? Leva apenas 2 minutos!""",
+        [
+            ("start_mood_chart", "😊 Registrar agora"),
+            ("mood_tomorrow", "🌅 Amanhã cedo"),
+        ]
+    ),
+    'medication_dose_reminder': (
+        "💊 Hora do Medicamento",
+        """💊 *Lembrete de Medicação*
+
+⏰ *Horário:* {time}
+💊 *Medicamento:* {medication_name}
+📏 *Dosagem:* {dosage}
+
+{instructions}
+
+Por favor, confirme quando tomar o medicamento.""",
+        [
+            ("med_confirm_{medication_id}", "✅ Tomei agora"),
+            ("med_delay_{medication_id}", "⏰ Lembrar em 15min"),
+            ("med_skip_{medication_id}", "❌ Pular esta dose"),
+        ]
+    ),
+}
+
+MESSAGE_TEMPLATES: Dict[str, CompiledMessage] = {
+    name: CompiledMessage(name, body, header, buttons)
+    for name, (header, body, buttons) in _TEMPLATE_SPECS.items()
+}
+
+
+def get_message_template(name: str) -> CompiledMessage:
+    """Template compilado pelo nome (KeyError se não existir)"""
+    return MESSAGE_TEMPLATES[name]
@@ -354,32 +354,36 @@ _Próxima avaliação em: {next_test}_"""
     }
 }
 
-# Função para calcular pontuações
-def calculate_scores():
-    return {
-        "uetg": {
-            "low": (0, 3),
-            "medium": (4, 7),
-            "high": (8, 12)
-        },
-        "gad7": {
-            "minimal": (0, 4),
-            "mild": (5, 9),
-            "moderate": (10, 14),
-            "severe": (15, 21)
-        },
-        "phq9": {
-            "minimal": (0, 4),
-            "mild": (5, 9),
-            "moderate": (10, 14),
-            "severe": (15, 27)
-        },
-        "asrs18": {
-            "low": (0, 23),
-            "moderate": (24, 47),
-            "high": (48, 72)
-        }
+# Faixas de pontuação por questionário (montadas uma vez no import)
+SCORE_RANGES = {
+    "uetg": {
+        "low": (0, 3),
+        "medium": (4, 7),
+        "high": (8, 12)
+    },
+    "gad7": {
+        "minimal": (0, 4),
+        "mild": (5, 9),
+        "moderate": (10, 14),
+        "severe": (15, 21)
+    },
+    "phq9": {
+        "minimal": (0, 4),
+        "mild": (5, 9),
+        "moderate": (10, 14),
+        "severe": (15, 27)
+    },
+    "asrs18": {
+        "low": (0, 23),
+        "moderate": (24, 47),
+        "high": (48, 72)
     }
+}
+
+
+def calculate_scores():
+    """Faixas de pontuação por questionário (mesmo dicionário a cada chamada)"""
+    return SCORE_RANGES
 
 # Mensagens de boas-vindas e instruções
 WELCOME_MESSAGES = {